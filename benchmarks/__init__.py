@@ -0,0 +1,3 @@
+"""
+Benchmarks - startup timing, synthetic dataset generator and performance suite
+"""
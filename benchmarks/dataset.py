@@ -0,0 +1,244 @@
+"""
+Sinh dữ liệu giả lập quy mô lớn cho benchmark
+Chạy lệnh: python benchmarks/dataset.py bench.db --equipment 100000
+
+Ghi thẳng bằng executemany theo lô trong một giao dịch (không đi qua model,
+không commit từng dòng), nên một triệu thiết bị kèm nhật ký chỉ mất vài phút.
+Cùng --seed thì cùng dữ liệu, để kết quả benchmark so sánh được giữa các phiên bản.
+"""
+import sys
+import os
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.migrations import migrate
+from src.models.maintenance_type import DEFAULT_MAINTENANCE_TYPES
+from src.models.maintenance_log import MAINTENANCE_STATUS
+from src.models.category import DEFAULT_CATEGORIES
+from src.config import EQUIPMENT_STATUS
+
+BATCH_SIZE = 10000
+START_DATE = datetime(2015, 1, 1)
+SPAN_SECONDS = 10 * 365 * 24 * 3600
+
+MODEL_NAMES = {
+    "Súng ngắn": ["K54", "K59", "Makarov PM", "CZ 75"],
+    "Súng trường": ["AK-47", "AKM", "CKC", "STV-380", "M16A1"],
+    "Súng máy": ["RPD", "PKM", "RPK", "DShK"],
+    "Súng phóng lựu": ["B40", "B41", "M79", "RPG-29"],
+    "Khí tài quang học": ["Ống nhòm 7x50", "Kính ngắm PSO-1", "Kính nhìn đêm"],
+    "Khí tài thông tin": ["VRU-812", "VRH-811", "PRC-77", "Tổng đài dã chiến"],
+    "Phương tiện vận tải": ["Ural-375", "Zil-131", "KamAZ-43118", "UAZ-469"],
+    "Trang bị bảo hộ": ["Mũ cối", "Áo giáp", "Mặt nạ phòng độc"],
+    "Khác": ["Lưỡi lê", "Thùng đạn", "Bao súng"],
+}
+MANUFACTURERS = ["Z111", "Z125", "Z129", "Liên Xô", "Trung Quốc", "Séc", "Mỹ", "Viettel"]
+LOCATIONS = ["Kho A", "Kho B", "Kho C", "Nhà kho trung tâm", "Phòng trực ban", "Giá súng tiểu đội"]
+TECHNICIANS = ["Nguyễn Văn An", "Trần Văn Bình", "Lê Văn Cường", "Phạm Văn Dũng", "Hoàng Văn Em"]
+
+
+def _ts(rng: random.Random, after: datetime = START_DATE, span: int = SPAN_SECONDS) -> datetime:
+    return after + timedelta(seconds=rng.randrange(span))
+
+
+def _fmt(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _insert_batches(conn: sqlite3.Connection, sql: str, rows) -> int:
+    """executemany in BATCH_SIZE slices so generators never materialize fully"""
+    rows = iter(rows)
+    total = 0
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            return total
+        conn.executemany(sql, batch)
+        total += len(batch)
+
+
+def _units(conn: sqlite3.Connection, fanout: int, depth: int) -> list:
+    """Unit tree: one level-0 root, each unit has fanout children, depth levels. Returns leaf ids."""
+    level_ids = []
+    parents = [None]
+    next_id = 1
+    rows = []
+    for level in range(depth):
+        current = []
+        for parent_id in parents:
+            for i in range(1 if level == 0 else fanout):
+                rows.append((next_id, f"Đơn vị {level}-{next_id}", f"DV{next_id:05d}",
+                             parent_id, level, f"Chỉ huy {next_id}"))
+                current.append(next_id)
+                next_id += 1
+        level_ids.append(current)
+        parents = current
+    conn.executemany(
+        "INSERT INTO units (id, name, code, parent_id, level, commander) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    return level_ids[-1]
+
+
+def _lookup_ids(conn: sqlite3.Connection) -> dict:
+    """Name -> id maps seeded by the migrations, keyed like src.models.lookups"""
+    ids = {
+        'category': dict(conn.execute("SELECT name, id FROM categories")),
+        'maintenance_type': dict(conn.execute("SELECT name, id FROM maintenance_types")),
+    }
+    for kind, name, key in conn.execute("SELECT kind, name, id FROM statuses"):
+        ids.setdefault(kind, {})[name] = key
+    return ids
+
+
+def _equipment_rows(rng: random.Random, count: int, unit_ids: list, leaf_ids: list, ids: dict):
+    categories = [name for name, _, _ in DEFAULT_CATEGORIES]
+    in_stock = ids['equipment_loan']["Đang ở kho"]
+    for i in range(1, count + 1):
+        category = rng.choice(categories)
+        created = _ts(rng)
+        # Phần lớn trang bị thuộc đơn vị cấp thấp nhất
+        unit_id = rng.choice(leaf_ids) if rng.random() < 0.9 else rng.choice(unit_ids)
+        yield (
+            i, f"{rng.choice(MODEL_NAMES[category])} #{i}", f"SN-{i:08d}", ids['category'][category],
+            rng.choice(MANUFACTURERS), rng.randint(1960, 2024),
+            ids['equipment'][rng.choice(EQUIPMENT_STATUS)], in_stock,
+            unit_id, rng.choice(LOCATIONS), _fmt(created), _fmt(created), _fmt(created),
+        )
+
+
+def _maintenance_rows(rng: random.Random, equipment_count: int, per_equipment: float, ids: dict):
+    types = [ids['maintenance_type'][name] for name, _, _ in DEFAULT_MAINTENANCE_TYPES]
+    for equipment_id in range(1, equipment_count + 1):
+        for _ in range(_poisson(rng, per_equipment)):
+            start = _ts(rng)
+            status = rng.choices(MAINTENANCE_STATUS, weights=(1, 8, 1, 1))[0]
+            end = start + timedelta(days=rng.randint(1, 30)) if status == "Hoàn thành" else None
+            yield (
+                equipment_id, rng.choice(types), "Bảo dưỡng định kỳ theo kế hoạch",
+                rng.choice(TECHNICIANS), ids['maintenance'][status], _fmt(start), end and _fmt(end),
+                _fmt(start),
+            )
+
+
+def _loan_rows(rng: random.Random, equipment_count: int, per_equipment: float,
+               unit_names: list, ids: dict):
+    returned_id, on_loan_id = ids['loan']["Đã trả"], ids['loan']["Đang mượn"]
+    for equipment_id in range(1, equipment_count + 1):
+        for _ in range(_poisson(rng, per_equipment)):
+            loan = _ts(rng)
+            expected = loan + timedelta(days=rng.randint(3, 60))
+            returned = rng.random() < 0.85
+            yield (
+                equipment_id, rng.choice(unit_names), _fmt(loan), _fmt(expected),
+                _fmt(expected - timedelta(days=rng.randint(0, 2))) if returned else None,
+                returned_id if returned else on_loan_id, _fmt(loan),
+            )
+
+
+def _image_rows(rng: random.Random, equipment_count: int, ratio: float):
+    for equipment_id in range(1, equipment_count + 1):
+        if rng.random() < ratio:
+            for n in range(rng.randint(1, 3)):
+                yield ("Equipment", equipment_id, "general",
+                       f"images/equipment/{equipment_id}_{n}.jpg")
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    """Small-mean Poisson sample (Knuth)"""
+    if mean <= 0:
+        return 0
+    limit, k, p = pow(2.718281828459045, -mean), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def generate(db_path, equipment: int = 10000, maintenance_per: float = 3.0,
+             loans_per: float = 1.5, image_ratio: float = 0.3, unit_fanout: int = 4,
+             unit_depth: int = 4, seed: int = 42) -> dict:
+    """
+    Create (or replace) a synthetic database at db_path and return row counts.
+    The schema comes from the normal migrations, so it always matches the app.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    migrate(db_path)
+    rng = random.Random(seed)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        started = time.perf_counter()
+
+        leaf_ids = _units(conn, unit_fanout, unit_depth)
+        unit_ids = [row[0] for row in conn.execute("SELECT id FROM units")]
+        unit_names = [row[0] for row in conn.execute("SELECT name FROM units")]
+        ids = _lookup_ids(conn)
+
+        counts = {'units': len(unit_ids)}
+        counts['equipment'] = _insert_batches(conn, '''
+            INSERT INTO equipment (id, name, serial_number, category_id, manufacturer,
+                manufacture_year, status_id, loan_status_id, unit_id, location, receive_date,
+                created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', _equipment_rows(rng, equipment, unit_ids, leaf_ids, ids))
+        counts['maintenance_log'] = _insert_batches(conn, '''
+            INSERT INTO maintenance_log (equipment_id, maintenance_type_id, description,
+                technician_name, status_id, start_date, end_date, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', _maintenance_rows(rng, equipment, maintenance_per, ids))
+        counts['loan_log'] = _insert_batches(conn, '''
+            INSERT INTO loan_log (equipment_id, borrower_unit, loan_date, expected_return_date,
+                return_date, status_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', _loan_rows(rng, equipment, loans_per, unit_names, ids))
+        counts['item_images'] = _insert_batches(conn, '''
+            INSERT INTO item_images (target_type, target_id, image_category, file_path)
+            VALUES (?, ?, ?, ?)
+        ''', _image_rows(rng, equipment, image_ratio))
+
+        # Trạng thái mượn trên thiết bị khớp với các phiếu mượn chưa trả
+        conn.execute('''
+            UPDATE equipment SET loan_status_id = ?
+            WHERE id IN (SELECT equipment_id FROM loan_log WHERE status_id = ?)
+        ''', (ids['equipment_loan']["Đã cho mượn"], ids['loan']["Đang mượn"]))
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        counts['seconds'] = round(time.perf_counter() - started, 2)
+        return counts
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh CSDL giả lập cho benchmark")
+    parser.add_argument("db_path", help="File CSDL sẽ tạo (ghi đè nếu đã có)")
+    parser.add_argument("--equipment", type=int, default=10000, help="Số thiết bị")
+    parser.add_argument("--maintenance-per", type=float, default=3.0, help="Số phiếu bảo dưỡng TB / thiết bị")
+    parser.add_argument("--loans-per", type=float, default=1.5, help="Số phiếu mượn TB / thiết bị")
+    parser.add_argument("--image-ratio", type=float, default=0.3, help="Tỷ lệ thiết bị có ảnh")
+    parser.add_argument("--unit-fanout", type=int, default=4, help="Số đơn vị con mỗi đơn vị")
+    parser.add_argument("--unit-depth", type=int, default=4, help="Số cấp đơn vị")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = generate(
+        args.db_path, args.equipment, args.maintenance_per, args.loans_per,
+        args.image_ratio, args.unit_fanout, args.unit_depth, args.seed
+    )
+    print(", ".join(f"{key}: {value}" for key, value in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
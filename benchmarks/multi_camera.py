@@ -0,0 +1,175 @@
+"""
+Đo nhiều camera quét cùng lúc trên một DecodePool dùng chung (không cần camera thật)
+Chạy lệnh:
+    python benchmarks/multi_camera.py                          # 1, 2, 4, 8 camera; 1 camera có mã
+    python benchmarks/multi_camera.py --cameras 4 --active 4   # cả 4 camera đều đang quét nhãn
+    python benchmarks/multi_camera.py --cameras 8 --workers 1 --seconds 20
+
+Mỗi camera giả lập là một luồng đẩy khung tổng hợp (dựng sẵn, lặp vòng) vào
+DecodePool với tốc độ --fps, qua FrameGate riêng như CameraService. Chỉ --active
+camera đầu có nhãn QR trong khung; các camera còn lại nhìn bàn trống. Ghi nhận:
+  - cpu:      thời gian CPU của tiến trình / thời gian thực (1.0 = một lõi)
+  - decode:   số lần thật sự giải mã, có mã / lần, độ trễ từ lúc chụp (TB, p95)
+  - dropped:  khung bị thay bằng khung mới hơn trước khi được giải mã
+  - reported: số lần báo mã sau DetectionDeduper (mọi camera dùng chung)
+Kết quả lưu JSON trong benchmarks/results/ như run.py.
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import statistics
+import threading
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _render(index: int, active: bool, args):
+    """Pre-rendered frames of one simulated camera (capture cost left out)"""
+    from src.services.frame_sources import SyntheticFrameSource
+
+    # Camera không có mã nhìn một bàn trống cố định (chỉ nhiễu cảm biến thay đổi)
+    hold = args.hold if active else args.ring
+    source = SyntheticFrameSource(count=max(1, args.ring // hold), seed=args.seed + index, width=args.width,
+                                  height=args.height, module_px=(4, 8), hold=hold,
+                                  empty_ratio=0.0 if active else 1.0)
+    with source:
+        return list(source)
+
+
+def run(cameras: int, active: int, args) -> dict:
+    from src.services.decode_pool import DecodePool, DetectionDeduper
+    from src.services.frame_gate import FrameGate
+
+    rings = [_render(i, i < active, args) for i in range(cameras)]
+    pool = DecodePool(workers=args.workers)
+    deduper = DetectionDeduper(cooldown=2.0)
+    lock = threading.Lock()
+    per_camera = {f"cam{i}": {'latency_ms': [], 'hits': 0} for i in range(cameras)}
+    reported = [0]
+
+    def make_callback(name, gate):
+        def on_result(codes, latency):
+            with lock:
+                stats = per_camera[name]
+                if gate.decoded:
+                    stats['latency_ms'].append(latency * 1000)
+                    stats['hits'] += bool(codes)
+                reported[0] += sum(deduper.accept(code.data) for code in codes)
+        return on_result
+
+    lanes = []
+    for i in range(cameras):
+        gate = FrameGate()
+        lanes.append(pool.lane(f"cam{i}", gate.process, make_callback(f"cam{i}", gate)))
+
+    stop = threading.Event()
+
+    def capture(lane, ring):
+        interval = 1.0 / args.fps
+        next_time = time.perf_counter()
+        position = 0
+        while not stop.is_set():
+            lane.submit(ring[position % len(ring)])
+            position += 1
+            next_time += interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    threads = [threading.Thread(target=capture, args=(lane, ring), daemon=True)
+               for lane, ring in zip(lanes, rings)]
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    for lane in lanes:
+        lane.close()
+    time.sleep(0.2)  # Khung đang giải mã dở
+
+    result = {'cameras': cameras, 'active': active, 'cpu': cpu / wall, 'reported': reported[0], 'lanes': {}}
+    for lane in lanes:
+        stats = per_camera[lane.name]
+        latency = stats['latency_ms']
+        result['lanes'][lane.name] = {
+            'frames': lane.submitted,
+            'dropped': lane.dropped,
+            'decoded': len(latency),
+            'hits': stats['hits'],
+            'latency_mean_ms': statistics.mean(latency) if latency else 0.0,
+            'latency_p95_ms': _percentile(latency, 0.95) if latency else 0.0,
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo nhiều camera dùng chung DecodePool")
+    parser.add_argument("--cameras", default="1,2,4,8", help="Số camera, cách nhau bởi dấu phẩy")
+    parser.add_argument("--active", type=int, default=1, help="Số camera có nhãn QR trong khung")
+    parser.add_argument("--workers", type=int, help="Số luồng giải mã (mặc định CAMERA_DECODE_WORKERS)")
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Thời gian đo mỗi cấu hình")
+    parser.add_argument("--hold", type=int, default=15, help="Số khung mỗi cảnh đứng yên")
+    parser.add_argument("--ring", type=int, default=45, help="Số khung dựng sẵn mỗi camera (lặp vòng)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="File JSON kết quả (mặc định: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    from src.config import CAMERA_DECODE_WORKERS
+    if args.workers is None:
+        args.workers = CAMERA_DECODE_WORKERS
+
+    print(f"{args.workers} luồng giải mã, {args.fps:.0f} FPS mỗi camera, {args.width}x{args.height}")
+    results = []
+    for cameras in (int(n) for n in args.cameras.split(",")):
+        result = run(cameras, min(args.active, cameras), args)
+        results.append(result)
+        print(f"  {cameras} camera ({result['active']} có mã): CPU {result['cpu']:5.2f} lõi  "
+              f"báo mã {result['reported']}")
+        for name, lane in result['lanes'].items():
+            print(f"    {name:6s} {lane['frames']:5d} khung  bỏ {lane['dropped']:4d}  "
+                  f"giải mã {lane['decoded']:4d} (có mã {lane['hits']:4d})  "
+                  f"trễ {lane['latency_mean_ms']:7.1f} ms (p95 {lane['latency_p95_ms']:7.1f})")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workers': args.workers,
+            'fps': args.fps,
+            'seconds': args.seconds,
+            'hold': args.hold,
+            'size': f"{args.width}x{args.height}",
+        },
+        'results': results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"multi_camera_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã lưu kết quả: {output}")
+
+
+if __name__ == "__main__":
+    main()
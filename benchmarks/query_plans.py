@@ -0,0 +1,365 @@
+"""
+Kiểm tra kế hoạch truy vấn (EXPLAIN QUERY PLAN) của mọi truy vấn trong models
+Chạy lệnh:
+    python benchmarks/query_plans.py            # CSDL trống mới tạo bằng migrations
+    python benchmarks/query_plans.py --db app.db --verbose
+
+Gọi từng hàm truy vấn của model, bắt mọi câu SQL mà Database thực thi rồi chạy
+EXPLAIN QUERY PLAN ngay trên kết nối đó. Mỗi trường hợp khai báo chỉ mục bắt buộc
+phải dùng và các bảng được phép quét toàn bộ (kèm lý do). Quét toàn bảng ngoài
+danh sách, thiếu chỉ mục, hoặc hàm truy vấn mới chưa có trong CASES đều làm lệnh
+thoát với mã 1, nên có thể gắn vào CI như một bài test.
+Với --db, kế hoạch phụ thuộc thống kê ANALYZE của CSDL đó, nên có thể khác mặc định.
+"""
+import sys
+import os
+import argparse
+import importlib
+import inspect
+import re
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bảng lớn: quét toàn bộ các bảng này là lỗi trừ khi được khai báo trong scans
+LARGE_TABLES = {"equipment", "maintenance_log", "loan_log", "audit_logs", "item_images",
+                "stocktake_scans", "stocktake_results"}
+
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$")
+
+
+@dataclass
+class Case:
+    """One model query method, the indexes it must use and the scans it may do"""
+    name: str
+    call: Callable[[], object]
+    indexes: Tuple[str, ...] = ()
+    scans: Tuple[str, ...] = ()
+    reason: str = ""
+
+
+@dataclass
+class Captured:
+    query: str
+    plan: List[str] = field(default_factory=list)
+
+
+def _cases() -> List[Case]:
+    from src.models.database import Database
+    from src.models.equipment import Equipment
+    from src.models.maintenance_log import MaintenanceLog
+    from src.models.loan_log import LoanLog
+    from src.models.unit import Unit
+    from src.models.user import User
+    from src.models.category import Category
+    from src.models.maintenance_type import MaintenanceType
+    from src.models.audit_log import AuditLog
+    from src.models.stocktake import StocktakeSession, OUTCOME_MISSING
+
+    day = datetime(2024, 6, 1)
+    later = day + timedelta(days=30)
+    like = "LIKE '%...%' không dùng được chỉ mục"
+    listing = "danh sách/xuất toàn bộ, có LIMIT hoặc cần đọc hết bảng"
+
+    def stocktake_session():
+        session = StocktakeSession(name="Kiểm kê", unit_id=1)
+        session.save()
+        return session
+
+    return [
+        # Equipment
+        Case("Equipment.get_by_id", lambda: Equipment.get_by_id(1)),
+        Case("Equipment.get_by_serial", lambda: Equipment.get_by_serial("SN-00000001")),
+        Case("Equipment.get_by_ids", lambda: Equipment.get_by_ids([1, 2, 3])),
+        Case("Equipment.get_ids_by_unit", lambda: Equipment.get_ids_by_unit(1),
+             indexes=("idx_equipment_unit",)),
+        Case("Equipment.get_ids_by_unit(flat)", lambda: Equipment.get_ids_by_unit(1, include_children=False),
+             indexes=("idx_equipment_unit",)),
+        Case("Equipment.get_all", lambda: Equipment.get_all(limit=100), scans=("equipment",), reason=listing),
+        Case("Equipment.search", lambda: Equipment.search("AK"), scans=("equipment",), reason=like),
+        Case("Equipment.get_by_status", lambda: Equipment.get_by_status("Tốt"),
+             indexes=("idx_equipment_status",)),
+        Case("Equipment.get_by_category", lambda: Equipment.get_by_category("Súng trường"),
+             indexes=("idx_equipment_category",)),
+        Case("Equipment.get_by_unit", lambda: Equipment.get_by_unit(1), indexes=("idx_equipment_unit",)),
+        Case("Equipment.get_by_date_range", lambda: Equipment.get_by_date_range(day, later),
+             indexes=("idx_equipment_receive_date",)),
+        Case("Equipment.get_by_loan_status", lambda: Equipment.get_by_loan_status("Đã cho mượn"),
+             scans=("equipment",), reason="chỉ 2 giá trị, chỉ mục không giúp lọc"),
+        Case("Equipment.iter_report_rows", lambda: list(Equipment.iter_report_rows(group_by="unit")),
+             scans=("equipment",), reason=listing),
+        Case("Equipment.iter_report_rows(category)",
+             lambda: list(Equipment.iter_report_rows({'category': "Súng trường"}, group_by="category")),
+             indexes=("idx_equipment_category",)),
+        Case("Equipment.iter_export_rows", lambda: list(Equipment.iter_export_rows()),
+             scans=("equipment",), reason=listing),
+        Case("Equipment.count_filtered", lambda: Equipment.count_filtered({'status': "Tốt"}),
+             indexes=("idx_equipment_status",)),
+        Case("Equipment.get_ids_filtered",
+             lambda: Equipment.get_ids_filtered({'start_date': day, 'end_date': later}),
+             indexes=("idx_equipment_receive_date",)),
+        Case("Equipment.count_by_group", lambda: Equipment.count_by_group(group_by="category"),
+             scans=("equipment",), reason="đếm theo nhóm trên toàn bộ thiết bị"),
+        Case("Equipment.count", lambda: Equipment.count(), scans=("equipment",), reason="COUNT(*) toàn bảng"),
+        Case("Equipment.serial_exists", lambda: Equipment.serial_exists("SN-00000001", exclude_id=1)),
+        Case("Equipment.load_images_many", lambda: Equipment.load_images_many([Equipment(id=1), Equipment(id=2)]),
+             indexes=("idx_images_target",)),
+        Case("Equipment.check_active_pointers", lambda: Equipment.check_active_pointers(),
+             indexes=("idx_loan_equipment_date", "idx_maintenance_equipment_date"),
+             scans=("equipment",), reason="kiểm tra toàn bộ thiết bị, mỗi dòng một lần dò chỉ mục"),
+
+        # MaintenanceLog
+        Case("MaintenanceLog.get_by_id", lambda: MaintenanceLog.get_by_id(1)),
+        Case("MaintenanceLog.get_by_equipment", lambda: MaintenanceLog.get_by_equipment(1),
+             indexes=("idx_maintenance_equipment_date",)),
+        Case("MaintenanceLog.get_by_equipment_ids", lambda: MaintenanceLog.get_by_equipment_ids([1, 2, 3]),
+             indexes=("idx_maintenance_equipment_date",)),
+        Case("MaintenanceLog.get_active_by_equipment", lambda: MaintenanceLog.get_active_by_equipment(1)),
+        Case("MaintenanceLog.get_active", lambda: MaintenanceLog.get_active(),
+             indexes=("idx_maintenance_status",)),
+        Case("MaintenanceLog.get_all", lambda: MaintenanceLog.get_all(limit=100),
+             indexes=("idx_maintenance_start_date",)),
+        Case("MaintenanceLog.get_recent", lambda: MaintenanceLog.get_recent(10),
+             indexes=("idx_maintenance_created_at",)),
+        Case("MaintenanceLog.get_today", lambda: MaintenanceLog.get_today(),
+             indexes=("idx_maintenance_start_date", "idx_maintenance_created_at")),
+        Case("MaintenanceLog.iter_export_rows",
+             lambda: list(MaintenanceLog.iter_export_rows({'start_date': day, 'end_date': later})),
+             indexes=("idx_maintenance_start_date",)),
+        Case("MaintenanceLog.count_filtered", lambda: MaintenanceLog.count_filtered({'status': "Hoàn thành"}),
+             indexes=("idx_maintenance_status",)),
+        Case("MaintenanceLog.get_by_date_range", lambda: MaintenanceLog.get_by_date_range(day, later),
+             indexes=("idx_maintenance_start_date",)),
+        Case("MaintenanceLog.get_by_equipment_and_date",
+             lambda: MaintenanceLog.get_by_equipment_and_date(1, day, later),
+             indexes=("idx_maintenance_equipment_date",)),
+        Case("MaintenanceLog.count_active", lambda: MaintenanceLog.count_active(),
+             indexes=("idx_maintenance_status",)),
+
+        # LoanLog
+        Case("LoanLog.get_by_id", lambda: LoanLog.get_by_id(1)),
+        Case("LoanLog.get_by_equipment", lambda: LoanLog.get_by_equipment(1),
+             indexes=("idx_loan_equipment_date",)),
+        Case("LoanLog.get_by_equipment_ids", lambda: LoanLog.get_by_equipment_ids([1, 2, 3]),
+             indexes=("idx_loan_equipment_date",)),
+        Case("LoanLog.get_active_by_equipment", lambda: LoanLog.get_active_by_equipment(1)),
+        Case("LoanLog.get_active", lambda: LoanLog.get_active(), indexes=("idx_loan_status",)),
+        Case("LoanLog.get_all", lambda: LoanLog.get_all(limit=100), indexes=("idx_loan_date",)),
+        Case("LoanLog.get_recent", lambda: LoanLog.get_recent(10), scans=("loan_log",),
+             reason="sắp theo created_at, bảng nhỏ hơn nhiều so với thiết bị"),
+        Case("LoanLog.iter_export_rows",
+             lambda: list(LoanLog.iter_export_rows({'start_date': day, 'end_date': later})),
+             indexes=("idx_loan_date",)),
+        Case("LoanLog.count_filtered", lambda: LoanLog.count_filtered({'status': "Đang mượn"}),
+             indexes=("idx_loan_status",)),
+        Case("LoanLog.get_by_date_range", lambda: LoanLog.get_by_date_range(day, later),
+             indexes=("idx_loan_date",)),
+        Case("LoanLog.get_by_equipment_and_date", lambda: LoanLog.get_by_equipment_and_date(1, day, later),
+             indexes=("idx_loan_equipment_date",)),
+        Case("LoanLog.count_active", lambda: LoanLog.count_active(), indexes=("idx_loan_status",)),
+
+        # AuditLog
+        Case("AuditLog.get_filtered", lambda: AuditLog.get_filtered(action="LOGIN"),
+             indexes=("idx_audit_action",)),
+        Case("AuditLog.get_filtered(dates)",
+             lambda: AuditLog.get_filtered(start_date=day, end_date=later),
+             indexes=("idx_audit_created_at",)),
+        Case("AuditLog.iter_export_rows", lambda: list(AuditLog.iter_export_rows({'action': "LOGIN"})),
+             indexes=("idx_audit_action",)),
+        Case("AuditLog.count_filtered",
+             lambda: AuditLog.count_filtered({'start_date': day, 'end_date': later}),
+             indexes=("idx_audit_created_at",)),
+
+        # StocktakeSession
+        Case("StocktakeSession.reconcile", lambda: stocktake_session().reconcile(),
+             indexes=("idx_equipment_unit",)),
+        Case("StocktakeSession.record_scans", lambda: stocktake_session().record_scans([(1, "SN-00000001")])),
+        Case("StocktakeSession.get_by_id", lambda: StocktakeSession.get_by_id(1)),
+        Case("StocktakeSession.get_all", lambda: StocktakeSession.get_all()),
+        Case("StocktakeSession.get_open", lambda: StocktakeSession.get_open()),
+        Case("StocktakeSession.iter_export_rows",
+             lambda: list(StocktakeSession.iter_export_rows({'session_id': 1}))),
+        Case("StocktakeSession.count_filtered",
+             lambda: StocktakeSession.count_filtered({'session_id': 1, 'outcome': OUTCOME_MISSING})),
+        Case("StocktakeSession.get_results", lambda: StocktakeSession.get_results(1, OUTCOME_MISSING)),
+
+        # Bảng danh mục nhỏ: chỉ kiểm tra chúng không lỗi và không đụng bảng lớn
+        Case("Unit.get_by_id", lambda: Unit.get_by_id(1)),
+        Case("Unit.get_by_code", lambda: Unit.get_by_code("DV00001")),
+        Case("Unit.get_all", lambda: Unit.get_all()),
+        Case("Unit.get_by_level", lambda: Unit.get_by_level(1)),
+        Case("Unit.get_potential_parents", lambda: Unit.get_potential_parents(2, exclude_id=1)),
+        Case("Unit.get_by_parent", lambda: Unit.get_by_parent(1)),
+        Case("Unit.get_top_level", lambda: Unit.get_top_level()),
+        Case("Unit.search", lambda: Unit.search("Đơn vị")),
+        Case("Unit.count", lambda: Unit.count()),
+        Case("Unit.code_exists", lambda: Unit.code_exists("DV00001", exclude_id=1)),
+        Case("User.get_by_id", lambda: User.get_by_id(1)),
+        Case("User.get_by_username", lambda: User.get_by_username("admin")),
+        Case("User.get_all", lambda: User.get_all()),
+        Case("User.get_by_role", lambda: User.get_by_role("admin")),
+        Case("User.get_by_unit", lambda: User.get_by_unit(1)),
+        Case("User.search", lambda: User.search("admin")),
+        Case("User.count", lambda: User.count()),
+        Case("User.username_exists", lambda: User.username_exists("admin", exclude_id=1)),
+        Case("Category.get_by_id", lambda: Category.get_by_id(1)),
+        Case("Category.get_by_name", lambda: Category.get_by_name("Súng trường")),
+        Case("Category.get_all", lambda: Category.get_all()),
+        Case("Category.search", lambda: Category.search("Súng")),
+        Case("Category.count", lambda: Category.count()),
+        Case("Category.name_exists", lambda: Category.name_exists("Súng trường", exclude_id=1)),
+        Case("Category.code_exists", lambda: Category.code_exists("SR", exclude_id=1)),
+        Case("MaintenanceType.get_by_id", lambda: MaintenanceType.get_by_id(1)),
+        Case("MaintenanceType.get_by_name", lambda: MaintenanceType.get_by_name("Bảo dưỡng")),
+        Case("MaintenanceType.get_all", lambda: MaintenanceType.get_all()),
+        Case("MaintenanceType.name_exists", lambda: MaintenanceType.name_exists("Bảo dưỡng", exclude_id=1)),
+        Case("MaintenanceType.code_exists", lambda: MaintenanceType.code_exists("BD", exclude_id=1)),
+        Case("MaintenanceType.search", lambda: MaintenanceType.search("Bảo")),
+
+        Case("Database.get_statistics", lambda: Database().get_statistics(),
+             indexes=("idx_equipment_status", "idx_equipment_category", "idx_maintenance_status",
+                      "idx_loan_status", "idx_maintenance_start_date"),
+             scans=("equipment",), reason="đếm theo loan_status trên toàn bộ thiết bị"),
+    ]
+
+
+# Hàm có truy vấn nhưng cố ý không kiểm tra (ghi dữ liệu)
+SKIPPED = {"User.create_default_admin"}
+
+
+def _query_methods() -> List[str]:
+    """Every model classmethod/staticmethod whose body talks to Database"""
+    names = []
+    for module_name in ("equipment", "maintenance_log", "loan_log", "unit", "user",
+                        "category", "maintenance_type", "audit_log", "stocktake"):
+        module = importlib.import_module(f"src.models.{module_name}")
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for attr, raw in cls.__dict__.items():
+                if not isinstance(raw, (classmethod, staticmethod)):
+                    continue
+                source = inspect.getsource(raw.__func__)
+                if any(key in source for key in ("fetch_", "execute(", "iter_rows(", "insert(")):
+                    names.append(f"{cls_name}.{attr}")
+    return names
+
+
+def _scanned_tables(plan: List[str]) -> List[str]:
+    """Tables read in full (SCAN without an index) in a plan"""
+    tables = []
+    for step in plan:
+        match = _SCAN_RE.match(step)
+        if match and "INDEX" not in match.group(3) and "CONSTANT ROW" not in step:
+            tables.append(match.group(1))
+    return tables
+
+
+def _table_aliases(query: str) -> dict:
+    """alias -> table for 'FROM/JOIN table alias' in a query"""
+    aliases = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", query, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in ("WHERE", "JOIN", "LEFT", "INNER", "ON", "ORDER", "GROUP", "LIMIT"):
+            aliases[alias] = table
+    return aliases
+
+
+def check(verbose: bool = False) -> int:
+    from src.models.query_stats import QUERY_STATS
+
+    captured: List[Captured] = []
+
+    def record(conn, query, params, duration, rows, error=None):
+        if error is not None:
+            captured.append(Captured(query, [f"ERROR: {error}"]))
+            return
+        if query.lstrip().upper().startswith(("CREATE", "DROP")):
+            return  # DDL (vd. bảng TEMP) không có kế hoạch truy vấn
+        plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+        captured.append(Captured(query, plan))
+
+    # Dùng chính đường đo của Database, thay bộ ghi bằng hàm lấy kế hoạch
+    QUERY_STATS.record = record
+    QUERY_STATS.enable(True)
+
+    cases = _cases()
+    failures = []
+    covered = set()
+    for case in cases:
+        covered.add(case.name.split("(")[0])
+        captured.clear()
+        try:
+            case.call()
+        except Exception as e:
+            failures.append(f"{case.name}: lỗi khi chạy ({e})")
+            continue
+        if not captured:
+            failures.append(f"{case.name}: không có truy vấn nào")
+            continue
+
+        used = set()
+        problems = []
+        for item in captured:
+            if item.plan and item.plan[0].startswith("ERROR"):
+                problems.append(item.plan[0])
+                continue
+            used.update(re.findall(r"INDEX (\w+)", " ".join(item.plan)))
+            aliases = _table_aliases(item.query)
+            for alias in _scanned_tables(item.plan):
+                table = aliases.get(alias, alias)
+                if table in LARGE_TABLES and table not in case.scans:
+                    problems.append(f"quét toàn bảng {table}")
+        missing = [name for name in case.indexes if name not in used]
+        if missing:
+            problems.append(f"không dùng chỉ mục {', '.join(missing)}")
+
+        status = "FAIL" if problems else "ok"
+        note = f"  (quét được phép: {case.reason})" if case.scans and not problems else ""
+        print(f"  {status:4s} {case.name}{note}")
+        if problems or verbose:
+            for item in captured:
+                for step in item.plan:
+                    print(f"         {step}")
+        if problems:
+            failures.append(f"{case.name}: {'; '.join(problems)}")
+
+    uncovered = [name for name in _query_methods() if name not in covered and name not in SKIPPED]
+    for name in uncovered:
+        failures.append(f"{name}: chưa có trong CASES")
+
+    print()
+    if failures:
+        print(f"{len(failures)} lỗi:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print(f"Tất cả {len(cases)} trường hợp đạt.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra EXPLAIN QUERY PLAN của các truy vấn model")
+    parser.add_argument("--db", help="CSDL có sẵn (mặc định: CSDL trống mới tạo)")
+    parser.add_argument("--verbose", action="store_true", help="In kế hoạch của mọi truy vấn")
+    args = parser.parse_args()
+
+    if args.db:
+        db_path = os.path.abspath(args.db)
+    else:
+        # CSDL trống chưa ANALYZE: SQLite chọn kế hoạch như trên máy người dùng mới cài
+        db_path = os.path.join(tempfile.mkdtemp(prefix="vktbkt_plans_"), "plans.db")
+    # Phải đặt trước khi import src.config
+    os.environ["VKTBKT_DB_PATH"] = db_path
+    sys.path.insert(0, ROOT_DIR)
+
+    from src.models.database import Database
+    Database()
+    sys.exit(check(args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Bộ benchmark hiệu năng cho phần mềm Quản lý VKTBKT
+Chạy lệnh:
+    python benchmarks/run.py --equipment 100000
+    python benchmarks/run.py --db bench.db --only model. --compare benchmarks/results/cu.json
+
+Mỗi phép đo chạy 1 lần khởi động rồi --repeat lần đo, ghi min/trung vị/max (ms).
+Kết quả lưu JSON trong benchmarks/results/ để so sánh giữa các phiên bản.
+Phép đo thiếu thư viện tùy chọn (reportlab, cv2, pyzbar, openpyxl, psutil) được
+đánh dấu "skipped"; lỗi khác (kể cả ImportError của module trong src) làm lệnh
+kết thúc với mã lỗi khác 0.
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+# Thư viện tùy chọn: thiếu thì bỏ qua phép đo thay vì báo lỗi
+OPTIONAL_MODULES = {'reportlab', 'cv2', 'pyzbar', 'openpyxl', 'psutil'}
+
+# (tên, hàm, số lần đo riêng hoặc None); hàm nhận BenchContext
+BENCHMARKS = []
+
+
+def bench(name: str, repeat: int = None):
+    def register(func):
+        BENCHMARKS.append((name, func, repeat))
+        return func
+    return register
+
+
+class BenchContext:
+    """Shared inputs picked once from the dataset so every run uses the same rows"""
+
+    def __init__(self, work_dir: str):
+        from src.models.database import Database
+        self.work_dir = work_dir
+        db = Database()
+        self.equipment_count = db.fetch_one("SELECT COUNT(*) AS n FROM equipment")['n']
+        middle = max(1, self.equipment_count // 2)
+        row = db.fetch_one("SELECT id, serial_number FROM equipment WHERE id >= ? ORDER BY id LIMIT 1", (middle,))
+        self.equipment_id = row['id']
+        self.serial_number = row['serial_number']
+        self.root_unit_id = db.fetch_one("SELECT id FROM units WHERE level = 0 ORDER BY id LIMIT 1")['id']
+        self.leaf_unit_id = db.fetch_one("SELECT id FROM units ORDER BY level DESC, id LIMIT 1")['id']
+        self.sample_ids = [r['id'] for r in db.fetch_all("SELECT id FROM equipment ORDER BY id LIMIT 40")]
+
+
+# ----------------------------------------------------------------------
+# Model queries
+# ----------------------------------------------------------------------
+
+@bench("model.equipment_get_all_page")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.get_all(limit=100, offset=ctx.equipment_count // 2)
+
+
+@bench("model.equipment_get_by_id")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.get_by_id(ctx.equipment_id)
+
+
+@bench("model.equipment_get_by_serial")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.get_by_serial(ctx.serial_number)
+
+
+@bench("model.equipment_ids_by_unit_tree")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.get_ids_by_unit(ctx.root_unit_id, include_children=True)
+
+
+@bench("model.equipment_by_status")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.get_by_status("Cấp 5")
+
+
+@bench("model.maintenance_by_equipment")
+def _(ctx):
+    from src.models.maintenance_log import MaintenanceLog
+    MaintenanceLog.get_by_equipment(ctx.equipment_id)
+
+
+@bench("model.maintenance_active")
+def _(ctx):
+    from src.models.maintenance_log import MaintenanceLog
+    MaintenanceLog.get_active()
+
+
+@bench("model.loan_active")
+def _(ctx):
+    from src.models.loan_log import LoanLog
+    LoanLog.get_active()
+
+
+@bench("model.loan_by_date_range")
+def _(ctx):
+    from src.models.loan_log import LoanLog
+    LoanLog.get_by_date_range(datetime(2020, 1, 1), datetime(2020, 1, 31))
+
+
+@bench("model.equipment_count_filtered")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.count_filtered({'category': "Súng trường", 'status': "Cấp 2"})
+
+
+# ----------------------------------------------------------------------
+# Search, dashboard, controllers
+# ----------------------------------------------------------------------
+
+@bench("search.keyword")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.search("AK-47")
+
+
+@bench("search.serial")
+def _(ctx):
+    from src.models.equipment import Equipment
+    Equipment.search(ctx.serial_number)
+
+
+@bench("dashboard.statistics")
+def _(ctx):
+    from src.models.database import Database
+    Database().get_statistics()
+
+
+@bench("controller.equipment_list_default")
+def _(ctx):
+    from src.controllers.equipment_controller import EquipmentController
+    EquipmentController().get_equipment_list()
+
+
+@bench("controller.equipment_detail")
+def _(ctx):
+    from src.controllers.equipment_controller import EquipmentController
+    EquipmentController().get_equipment_detail(ctx.equipment_id)
+
+
+@bench("controller.lookup_by_qr")
+def _(ctx):
+    from src.controllers.equipment_controller import EquipmentController
+    from src.services.qr_payload import equipment_payload
+    EquipmentController().lookup_by_qr(equipment_payload(ctx.equipment_id, ctx.serial_number))
+
+
+@bench("controller.create_delete_equipment", repeat=3)
+def _(ctx):
+    from src.controllers.equipment_controller import EquipmentController
+    controller = EquipmentController()
+    ok, message, equipment = controller.create_equipment({
+        'name': "Benchmark", 'serial_number': f"BENCH-{time.time_ns()}",
+        'category': "Khác", 'status': "Cấp 1",
+    })
+    if not ok:
+        raise RuntimeError(message)
+    controller.delete_equipment(equipment.id)
+
+
+# ----------------------------------------------------------------------
+# Export and scan
+# ----------------------------------------------------------------------
+
+@bench("export.pdf_report_slice", repeat=3)
+def _(ctx):
+    from src.services.export_service import ExportService
+    ExportService.instance().export_equipment_report(
+        os.path.join(ctx.work_dir, "report.pdf"),
+        filters={'category': "Súng ngắn", 'status': "Cấp 1"}, group_by='unit'
+    )
+
+
+@bench("export.qr_sheet_40", repeat=3)
+def _(ctx):
+    from src.models.equipment import Equipment
+    from src.services.export_service import ExportService
+    ExportService.instance().export_qr_sheet(
+        Equipment.get_by_ids(ctx.sample_ids), os.path.join(ctx.work_dir, "qr.pdf")
+    )
+
+
+@bench("qr.generate_image")
+def _(ctx):
+    from src.services.qr_service import QRService
+    from src.services.qr_payload import equipment_payload
+    QRService().generate_qr_code(equipment_payload(ctx.equipment_id, ctx.serial_number))
+
+
+_scan_frame = None
+
+
+@bench("scan.decode_frame")
+def _(ctx):
+    global _scan_frame
+    import numpy as np
+    from src.services.qr_decoder import decode_frame
+    if _scan_frame is None:
+        from PIL import Image
+        from src.services.qr_service import QRService
+        from src.services.qr_payload import equipment_payload
+        # Khung hình 1280x720 giống camera, mã QR nằm lệch giữa
+        qr_img, _ = QRService().generate_qr_code(equipment_payload(ctx.equipment_id, ctx.serial_number), box_size=6)
+        frame = Image.new("RGB", (1280, 720), (90, 90, 90))
+        frame.paste(qr_img.convert("RGB"), (500, 200))
+        _scan_frame = np.array(frame)[:, :, ::-1].copy()
+    decoded = decode_frame(_scan_frame)
+    if not decoded:
+        raise RuntimeError("QR not decoded")
+
+
+@bench("scan.lookup_cold")
+def _(ctx):
+    from src.services.scan_lookup_service import ScanLookupService
+    lookup = ScanLookupService.instance()
+    lookup.clear()
+    lookup.get_by_id(ctx.equipment_id)
+
+
+@bench("scan.lookup_cached")
+def _(ctx):
+    from src.services.scan_lookup_service import ScanLookupService
+    ScanLookupService.instance().get_by_id(ctx.equipment_id)
+
+
+@bench("scan.wedge_resolve")
+def _(ctx):
+    from src.services.keyboard_wedge import WedgeDetector, resolve_payload
+    from src.services.qr_payload import equipment_payload
+    # Máy quét USB gõ mã 5 ms/phím rồi Enter; tra cứu từ bộ đệm như lần quét lặp lại
+    detector = WedgeDetector()
+    payload = equipment_payload(ctx.equipment_id, "")
+    for i, char in enumerate(payload):
+        detector.feed(char, i * 0.005)
+    code, _ = resolve_payload(detector.enter(len(payload) * 0.005))
+    if code is None:
+        raise RuntimeError("wedge payload not recognised")
+
+
+@bench("scan.decode_and_lookup")
+def _(ctx):
+    from src.services.qr_decoder import decode_frame
+    from src.controllers.equipment_controller import EquipmentController
+    if _scan_frame is None:
+        raise RuntimeError("run scan.decode_frame first")
+    data = decode_frame(_scan_frame)[0].data
+    EquipmentController().lookup_by_qr(data)
+
+
+# ----------------------------------------------------------------------
+# Stocktake
+# ----------------------------------------------------------------------
+
+_stocktake = None
+
+
+@bench("stocktake.reconcile_root")
+def _(ctx):
+    global _stocktake
+    from src.models.database import Database
+    from src.models.stocktake import StocktakeSession
+    if _stocktake is None:
+        # Kiểm kê toàn bộ cây đơn vị: quét thấy 9/10 thiết bị, thêm vài mã lạ
+        rows = Database().fetch_all("SELECT id, serial_number FROM equipment")
+        _stocktake = StocktakeSession(name="benchmark", unit_id=ctx.root_unit_id)
+        _stocktake.save()
+        codes = [(row['id'], row['serial_number']) for i, row in enumerate(rows) if i % 10]
+        codes += [(ctx.equipment_count + i + 1, "X") for i in range(10)]
+        _stocktake.record_scans(codes)
+    _stocktake.reconcile()
+
+
+# ----------------------------------------------------------------------
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_benchmarks(ctx: BenchContext, repeat: int, only: str = None) -> dict:
+    results = {}
+    for name, func, bench_repeat in BENCHMARKS:
+        if only and not name.startswith(only):
+            continue
+        try:
+            func(ctx)  # khởi động: import, cache của SQLite
+            times = []
+            for _ in range(bench_repeat or repeat):
+                started = time.perf_counter()
+                func(ctx)
+                times.append((time.perf_counter() - started) * 1000)
+        except ImportError as e:
+            if (e.name or "").split(".")[0] in OPTIONAL_MODULES:
+                results[name] = {'skipped': f"thiếu thư viện: {e.name}"}
+                print(f"  {name:40s} bỏ qua ({e.name})")
+            else:
+                results[name] = {'error': str(e)}
+                print(f"  {name:40s} LỖI: {e}")
+            continue
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            print(f"  {name:40s} LỖI: {e}")
+            continue
+        results[name] = {
+            'min_ms': min(times), 'median_ms': statistics.median(times),
+            'max_ms': max(times), 'runs': len(times),
+        }
+        print(f"  {name:40s} {statistics.median(times):10.2f} ms")
+    return results
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nSo với {baseline_path} ({baseline['meta'].get('commit') or '?'}):")
+    if baseline['meta'].get('equipment_rows') != current['meta'].get('equipment_rows'):
+        print(f"  CẢNH BÁO: khác cỡ dữ liệu ({baseline['meta'].get('equipment_rows')} "
+              f"so với {current['meta'].get('equipment_rows')} thiết bị)")
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name, {})
+        if 'median_ms' not in result or 'median_ms' not in old:
+            continue
+        ratio = result['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        flag = "  <-- chậm hơn" if ratio > 1.2 else ""
+        print(f"  {name:40s} {old['median_ms']:10.2f} -> {result['median_ms']:10.2f} ms  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hiệu năng")
+    parser.add_argument("--db", help="CSDL có sẵn (mặc định: sinh mới vào thư mục tạm)")
+    parser.add_argument("--equipment", type=int, default=10000, help="Số thiết bị khi sinh dữ liệu")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần đo mỗi phép")
+    parser.add_argument("--only", help="Chỉ chạy các phép đo có tên bắt đầu bằng chuỗi này")
+    parser.add_argument("--output", help="File JSON kết quả (mặc định: benchmarks/results/...)")
+    parser.add_argument("--compare", help="File JSON kết quả cũ để so sánh")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="vktbkt_bench_")
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(work_dir, "bench.db")
+    # Phải đặt trước khi import src.config
+    os.environ["VKTBKT_DB_PATH"] = db_path
+    sys.path.insert(0, ROOT_DIR)
+
+    from benchmarks.dataset import generate
+    from src.models.database import Database
+    from src.config import APP_VERSION
+
+    dataset = None
+    if not args.db or not os.path.exists(db_path):
+        print(f"Sinh dữ liệu: {args.equipment} thiết bị...")
+        dataset = generate(db_path, equipment=args.equipment, seed=args.seed)
+        print("  " + ", ".join(f"{k}: {v}" for k, v in dataset.items()))
+    Database()
+
+    print("Chạy benchmark:")
+    ctx = BenchContext(work_dir)
+    results = run_benchmarks(ctx, args.repeat, args.only)
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'app_version': APP_VERSION,
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'db_path': db_path,
+            'dataset': dataset,
+            'equipment_rows': ctx.equipment_count,
+            'equipment': args.equipment if dataset else None,
+            'seed': args.seed if dataset else None,
+        },
+        'results': results,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{report['meta']['commit'] or 'local'}_{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã lưu kết quả: {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+    failed = [name for name, result in results.items() if 'error' in result]
+    if failed:
+        print(f"{len(failed)} phép đo lỗi: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
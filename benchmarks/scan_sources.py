@@ -0,0 +1,223 @@
+"""
+Đo đường giải mã QR không cần giao diện / camera
+Chạy lệnh:
+    python benchmarks/scan_sources.py                                   # ảnh tổng hợp
+    python benchmarks/scan_sources.py --source synthetic:500 --blur 3 --noise 12
+    python benchmarks/scan_sources.py --source data/anh_quet/ --source clip.mp4 --source 0
+    python benchmarks/scan_sources.py --hold 30 --empty 0.5 --gate     # bàn quét phần lớn thời gian trống
+    python benchmarks/scan_sources.py --stages gray                    # chỉ bộ giải mã chính, không cascade
+    python benchmarks/scan_sources.py --code-px 50,80 --payload legacy # cùng cỡ in: nhãn cũ / rút gọn
+
+Mỗi nguồn ảnh (camera, video, thư mục ảnh, ảnh tổng hợp) được đọc từng khung và
+giải mã bằng đúng hàm CameraService dùng (qr_decoder.decode_frame). Ghi nhận:
+  - read:    thời gian lấy một khung từ nguồn
+  - decode:  thời gian giải mã một khung (trung bình, trung vị, p95)
+  - hit:     tỷ lệ khung giải mã được ít nhất một mã
+  - success: tỷ lệ khung giải mã đủ các mã thật sự có (chỉ nguồn tổng hợp biết)
+  - --gate:  chạy qua FrameGate như CameraService; decode_ratio là tỷ lệ khung
+             thật sự phải giải mã; decode tính cả thời gian của bộ lọc
+  - stages:  số lần thử / trúng / thời gian trung bình của từng bước cascade
+             (gray, clahe, threshold, pyramid, fallback) và số khung hết ngân sách
+  - modules: số ô mỗi cạnh của mã tổng hợp (theo --payload, --ecc); với --code-px
+             (cỡ mã cố định, tính cả lề) mã ít ô hơn có ô to hơn
+Kết quả lưu JSON trong benchmarks/results/ như run.py.
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(source, frames: int, gate=None) -> dict:
+    """Read up to frames frames from an opened source and time the decode of each"""
+    from src.services.qr_decoder import decode_frame
+
+    decode = gate.process if gate else decode_frame
+
+    read_ms, decode_ms = [], []
+    hits = 0
+    known = 0
+    success = 0
+    wrong = 0
+    while len(decode_ms) < frames:
+        started = time.perf_counter()
+        frame = source.read()
+        if frame is None:
+            if source.live:
+                continue
+            break
+        read_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        codes = decode(frame)
+        decode_ms.append((time.perf_counter() - started) * 1000)
+
+        found = {code.data for code in codes}
+        hits += bool(found)
+        expected = source.expected_codes()
+        if expected is not None:
+            known += 1
+            success += set(expected) <= found
+            wrong += bool(found - set(expected))
+
+    if not decode_ms:
+        return {'frames': 0}
+    result = {
+        'frames': len(decode_ms),
+        'read_ms': statistics.median(read_ms),
+        'decode_mean_ms': statistics.mean(decode_ms),
+        'decode_median_ms': statistics.median(decode_ms),
+        'decode_p95_ms': _percentile(decode_ms, 0.95),
+        'hit_rate': hits / len(decode_ms),
+    }
+    if known:
+        result['success_rate'] = success / known
+        result['wrong_frames'] = wrong
+    if gate:
+        result['decode_ratio'] = gate.stats.decoded / gate.stats.frames
+        result['gate'] = gate.stats.to_dict()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo giải mã QR theo nguồn ảnh")
+    parser.add_argument("--source", action="append",
+                        help="'synthetic[:N]', chỉ số camera, thư mục ảnh hoặc file video (lặp lại được)")
+    parser.add_argument("--frames", type=int, default=200, help="Số khung tối đa mỗi nguồn")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--noise", type=float, help="Nhiễu của ảnh tổng hợp (độ lệch chuẩn)")
+    parser.add_argument("--blur", type=float, help="Độ mờ tối đa của ảnh tổng hợp (sigma)")
+    parser.add_argument("--perspective", type=float, help="Độ nghiêng tối đa của ảnh tổng hợp (0-0.4)")
+    parser.add_argument("--empty", type=float, default=0.0, help="Tỷ lệ khung tổng hợp không có mã")
+    parser.add_argument("--payload", choices=["compact", "legacy"], help="Định dạng nội dung mã tổng hợp")
+    parser.add_argument("--ecc", choices=["L", "M", "Q", "H"], default="H", help="Mức sửa lỗi của mã tổng hợp")
+    parser.add_argument("--code-px", help="Cạnh mã tổng hợp (px, kể cả lề) 'min,max' thay cho cỡ ô cố định")
+    parser.add_argument("--hold", type=int, default=1, help="Số khung mỗi cảnh tổng hợp đứng yên")
+    parser.add_argument("--gate", action="store_true", help="Lọc khung bằng FrameGate như CameraService")
+    parser.add_argument("--no-tracking", action="store_true", help="Tắt bám vùng mã cũ của FrameGate")
+    parser.add_argument("--fps", type=float, default=30.0, help="Tốc độ khung giả lập cho FrameGate")
+    parser.add_argument("--stages", help="Các bước giải mã, cách nhau bởi dấu phẩy (mặc định: tất cả)")
+    parser.add_argument("--budget", type=float, help="Ngân sách thời gian giải mã mỗi khung (ms)")
+    parser.add_argument("--output", help="File JSON kết quả (mặc định: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+    from src.services.frame_sources import SyntheticFrameSource, open_frame_source
+    from src.services.qr_payload import equipment_payload
+    from src.services import qr_decoder
+    from src.services.qr_decoder import STAGES, DecoderCascade
+    from src.services.frame_gate import FrameGate
+
+    stages = [name.strip() for name in args.stages.split(",")] if args.stages else list(STAGES)
+    cascade = DecoderCascade(stages, args.budget) if args.budget else DecoderCascade(stages)
+    qr_decoder.CASCADE = cascade
+    primary, second = qr_decoder.engines()
+    engine_names = [fn.__name__.replace("_decode_", "") for fn in (primary, second) if fn]
+
+    results = {}
+    print(f"Bộ giải mã: {' -> '.join(engine_names)}; các bước: {', '.join(stages)}; "
+          f"ngân sách {cascade.budget_ms:.0f} ms")
+    for spec in args.source or ["synthetic"]:
+        try:
+            source = open_frame_source(spec)
+        except ValueError as e:
+            print(f"  {spec}: {e}")
+            continue
+        if isinstance(source, SyntheticFrameSource):
+            source.seed = args.seed
+            source.empty_ratio = args.empty
+            source.hold = max(1, args.hold)
+            source.count = max(1, args.frames // source.hold)
+            source.name = f"synthetic:{source.count}x{source.hold}"
+            source.error_correction = args.ecc
+            if args.payload:
+                source.payloads = [
+                    equipment_payload(i, f"SN-{i:08d}", args.payload) for i in range(1, source.count + 1)
+                ]
+            if args.code_px:
+                low, _, high = args.code_px.partition(",")
+                source.code_px = (int(low), int(high or low))
+            for name in ("noise", "blur", "perspective"):
+                if getattr(args, name) is not None:
+                    setattr(source, name, getattr(args, name))
+        if not source.open():
+            print(f"  {source.name}: không mở được")
+            results[source.name] = {'error': "không mở được"}
+            continue
+        cascade.stats.reset()
+        gate = None
+        if args.gate:
+            # Đồng hồ theo số khung: kết quả không phụ thuộc tốc độ máy đo
+            ticks = iter(range(10 ** 9))
+            gate = FrameGate(tracking=not args.no_tracking, clock=lambda: next(ticks) / args.fps)
+        try:
+            result = measure(source, args.frames, gate)
+        finally:
+            source.close()
+        result['cascade'] = cascade.stats.stats()
+        if isinstance(source, SyntheticFrameSource):
+            result['modules'] = source.symbol_size()
+        results[source.name] = result
+        if not result['frames']:
+            print(f"  {source.name}: không có khung hình")
+            continue
+        line = (f"  {source.name:24s} {result['frames']:5d} khung  "
+                f"đọc {result['read_ms']:7.2f} ms  "
+                f"giải mã {result['decode_mean_ms']:7.2f} ms (trung vị {result['decode_median_ms']:7.2f}, "
+                f"p95 {result['decode_p95_ms']:7.2f})  "
+                f"có mã {result['hit_rate']:6.1%}")
+        if 'success_rate' in result:
+            line += f"  đúng {result['success_rate']:6.1%}"
+        if 'modules' in result:
+            line += f"  {result['modules']}x{result['modules']} ô"
+        if gate:
+            line += f"\n  {'':24s} giải mã {result['decode_ratio']:6.1%} số khung  {result['gate']}"
+        for stage, stats in result['cascade']['stages'].items():
+            line += (f"\n  {'':24s} {stage:10s} thử {stats['attempts']:5d}  trúng {stats['hits']:5d} "
+                     f"({stats['hit_ratio']:6.1%})  {stats['avg_ms']:7.2f} ms/lần")
+        if result['cascade']['cut_short']:
+            line += f"\n  {'':24s} hết ngân sách: {result['cascade']['cut_short']} khung"
+        print(line)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'decoder': engine_names,
+            'stages': stages,
+            'budget_ms': cascade.budget_ms,
+            'frames': args.frames,
+            'seed': args.seed,
+            'gate': args.gate,
+            'tracking': args.gate and not args.no_tracking,
+            'hold': args.hold,
+            'payload': args.payload,
+            'ecc': args.ecc,
+            'code_px': args.code_px,
+        },
+        'results': results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"scan_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã lưu kết quả: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Đo thời gian khởi động của phần mềm Quản lý VKTBKT
+Chạy lệnh: python benchmarks/startup.py [--runs 5]
+
+Mỗi lần đo chạy trong một tiến trình Python mới (import "lạnh") trên một
+CSDL tạm, và ghi nhận:
+  - login:     từ lúc bắt đầu tới lần vẽ đầu tiên của LoginDialog
+  - dashboard: từ lúc đăng nhập tới lần vẽ đầu tiên của trang Tổng quan
+  - heavy:     các thư viện nặng (cv2, pyzbar, numpy, reportlab, PIL) đã
+               bị nạp trước khi hộp thoại đăng nhập hiện ra
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+T0 = time.perf_counter()
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("cv2", "pyzbar", "numpy", "reportlab", "PIL")
+
+
+def _measure_once() -> dict:
+    """Chạy trong tiến trình con: khởi động app và đo tới lần vẽ đầu tiên"""
+    sys.path.insert(0, ROOT_DIR)
+
+    from PyQt6.QtCore import QObject, QEvent, QTimer
+
+    import main as app_main
+    from src.models.user import User
+
+    class FirstPaint(QObject):
+        """Ghi lại thời điểm widget được vẽ lần đầu rồi thoát vòng lặp sự kiện"""
+
+        def __init__(self, widget, app):
+            super().__init__()
+            self.at = None
+            self.app = app
+            widget.installEventFilter(self)
+
+        def eventFilter(self, obj, event):
+            if self.at is None and event.type() == QEvent.Type.Paint:
+                self.at = time.perf_counter()
+                QTimer.singleShot(0, self.app.quit)
+            return False
+
+    app_main.setup_high_dpi()
+    app = app_main.QApplication(sys.argv[:1])
+    app_main.setup_application_font(app)
+    app_main.initialize_database()
+
+    login_dialog = app_main.LoginDialog()
+    login_paint = FirstPaint(login_dialog, app)
+    login_dialog.show()
+    app.exec()
+    heavy = sorted(name for name in HEAVY_MODULES if name in sys.modules)
+
+    t_login = time.perf_counter()
+    user = User.authenticate("admin", "admin123")
+    login_dialog.close()
+    app_main.UserController.set_current_user(user)
+    window = app_main.MainWindow(current_user=user)
+    dashboard_paint = FirstPaint(window.dashboard_view, app)
+    window.show()
+    app.exec()
+
+    result = {
+        "login": login_paint.at - T0,
+        "dashboard": dashboard_paint.at - t_login,
+        "heavy": heavy,
+    }
+    window.logout_requested = True
+    window.close()
+    app_main.ExportJobManager.instance().shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động")
+    parser.add_argument("--runs", type=int, default=5, help="Số lần đo")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure_once()))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, VKTBKT_DB_PATH=os.path.join(tmp, "startup.db"))
+        for i in range(args.runs):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child"],
+                env=env, cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            print(f"  lần {i + 1}: đăng nhập {results[-1]['login'] * 1000:.0f} ms, "
+                  f"tổng quan {results[-1]['dashboard'] * 1000:.0f} ms")
+
+    # Lần đầu tạo CSDL nên thường chậm hơn, vẫn tính vào trung vị
+    for key, label in (("login", "Tới hộp thoại đăng nhập"), ("dashboard", "Tới trang Tổng quan")):
+        values = [r[key] * 1000 for r in results]
+        print(f"{label}: trung vị {statistics.median(values):.0f} ms "
+              f"(min {min(values):.0f}, max {max(values):.0f})")
+    heavy = sorted({name for r in results for name in r["heavy"]})
+    print("Thư viện nặng nạp trước đăng nhập:", ", ".join(heavy) if heavy else "không có")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Đọc mã QR từ ảnh chụp nhãn hàng loạt (thư mục ảnh, file ZIP, PDF scan)
+Chạy lệnh:
+    python decode_images.py data/anh_don_vi/
+    python decode_images.py anh_gui_ve.zip --csv ket_qua.csv
+    python decode_images.py bien_ban_scan.pdf --workers 4
+"""
+import sys
+import os
+import argparse
+
+# Thêm thư mục hiện tại vào path để import được các module trong src
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import IMAGE_DECODE_WORKERS, IMAGE_DECODE_BUDGET_MS
+from src.services.image_decode_service import ImageDecodeService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đọc mã QR từ ảnh chụp nhãn và tra cứu thiết bị")
+    parser.add_argument("path", help="Thư mục ảnh (tìm cả thư mục con, ZIP, PDF bên trong), file ZIP, PDF hoặc ảnh")
+    parser.add_argument("--workers", type=int, default=IMAGE_DECODE_WORKERS,
+                        help=f"Số tiến trình giải mã (mặc định {IMAGE_DECODE_WORKERS})")
+    parser.add_argument("--budget", type=float, default=IMAGE_DECODE_BUDGET_MS,
+                        help=f"Thời gian tối đa cho các bước giải mã bổ sung mỗi ảnh, ms (mặc định {IMAGE_DECODE_BUDGET_MS:.0f})")
+    parser.add_argument("--csv", help="Lưu báo cáo từng ảnh ra file CSV")
+    args = parser.parse_args()
+
+    service = ImageDecodeService(workers=args.workers, budget_ms=args.budget)
+
+    def progress(done, total):
+        print(f"\r🔍 Đang đọc ảnh {done}/{total}...", end="", flush=True)
+
+    try:
+        result = service.decode(args.path, progress)
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+    print()
+
+    session = result.session
+    rate = len(result.images) / result.seconds if result.seconds else 0
+    print(f"✅ {result.summary} trong {result.seconds:.1f} giây ({rate:.1f} ảnh/giây)")
+    for equipment in sorted(session.items.values(), key=lambda e: e.serial_number or ""):
+        note = f"  ⚠️ nhãn QR không khớp: {session.mismatched[equipment.id]}" if equipment.id in session.mismatched else ""
+        print(f"   {equipment.serial_number:20s} {equipment.name}{note}")
+    if session.not_found:
+        print(f"⚠️ Không có trong CSDL: {', '.join(str(i) for i in sorted(session.not_found))}")
+    if session.foreign:
+        print(f"⚠️ Mã không thuộc hệ thống: {len(session.foreign)}")
+    missing = [image.name for image in result.images if not image.codes]
+    if missing:
+        print(f"⚠️ {len(missing)} ảnh không thấy mã QR" + (" (xem báo cáo CSV)" if args.csv else ""))
+
+    if args.csv:
+        ImageDecodeService.write_report(result, args.csv)
+        print(f"📄 Đã lưu báo cáo: {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ Version: 1.0.0
 """
 import sys
 import os
+import multiprocessing
 
 # Add src to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -18,11 +19,8 @@ from PyQt6.QtGui import QFont
 from src.views.main_window import MainWindow
 from src.views.login_dialog import LoginDialog
 from src.models.database import Database
-from src.models.user import User
-from src.models.category import Category
-from src.models.maintenance_type import MaintenanceType
 from src.controllers.user_controller import UserController
-from src.controllers.maintenance_type_controller import MaintenanceTypeController
+from src.services.export_job_service import ExportJobManager
 from src.config import APP_NAME
 
 
@@ -42,15 +40,8 @@ def setup_application_font(app: QApplication):
 
 
 def initialize_database():
-    """Initialize database connection and tables"""
-    db = Database()
-    # Create default admin if not exists
-    User.create_default_admin("admin", "admin123")
-    # Initialize default categories
-    Category.initialize_default_categories()
-    # Initialize default maintenance types
-    MaintenanceTypeController.initialize_default_types()
-    return db
+    """Open the database; schema and default data come from migrations"""
+    return Database()
 
 
 def show_login_and_main(app: QApplication) -> bool:
@@ -107,8 +98,13 @@ def main():
     # Show login and main window (loop for logout support)
     show_login_and_main(app)
     
+    # Dừng các tiến trình xuất file chạy nền
+    ExportJobManager.instance().shutdown()
+    
     sys.exit(0)
 
 
 if __name__ == "__main__":
+    # Bắt buộc cho bản .exe: tiến trình con xuất PDF khởi động lại chính file này
+    multiprocessing.freeze_support()
     main()
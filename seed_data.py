@@ -25,7 +25,7 @@ db = Database()
 def clean_database():
     """Xóa dữ liệu cũ để nạp mới"""
     print("🧹 Đang dọn dẹp dữ liệu cũ...")
-    tables = ["loan_logs", "maintenance_logs", "equipments", "users", "categories", "maintenance_types", "units"]
+    tables = ["loan_log", "maintenance_log", "item_images", "equipment", "users", "categories", "maintenance_types", "units"]
     for table in tables:
         try:
             db.execute(f"DELETE FROM {table}")
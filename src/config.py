@@ -22,8 +22,8 @@ else:
 ASSETS_DIR = INTERNAL_DIR / "assets"
 DATA_DIR = EXTERNAL_DIR / "data"
 
-# Database configuration
-DATABASE_PATH = DATA_DIR / "vktbkt.db"
+# Database configuration (VKTBKT_DB_PATH: dùng CSDL khác, vd. khi đo hiệu năng)
+DATABASE_PATH = Path(os.environ.get("VKTBKT_DB_PATH") or DATA_DIR / "vktbkt.db")
 
 # Ensure data directory exists (Tạo thư mục data nếu chưa có)
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -65,11 +65,45 @@ EQUIPMENT_CATEGORIES = [
 QR_BOX_SIZE = 10
 QR_BORDER = 4
 QR_VERSION = 1
+# Nội dung nhãn QR mới: "compact" (VK1:..., ít ô hơn) hoặc "legacy" (VKTBKT|id|số hiệu)
+QR_PAYLOAD_FORMAT = os.environ.get("VKTBKT_QR_FORMAT", "compact")
+# Mức sửa lỗi tối thiểu theo cỡ nhãn in: nhãn nhỏ chấp nhận mức thấp hơn nếu nhờ đó
+# mã có ít ô hơn (ô to, dễ đọc hơn); mức được nâng lên khi không làm tăng số ô
+QR_ERROR_CORRECTION_BY_SIZE = [  # (cạnh mã QR tối đa, mm) -> mức L / M / Q / H
+    (20, "M"),
+    (30, "Q"),
+]
+QR_ERROR_CORRECTION_DEFAULT = "H"
 
 # Camera settings
 CAMERA_WIDTH = 1280
 CAMERA_HEIGHT = 720
 CAMERA_FPS = 30
+# Số chỉ số camera dò tìm (dừng sớm khi gặp 2 chỉ số trống liên tiếp)
+CAMERA_PROBE_LIMIT = 8
+# Luồng giải mã dùng chung cho mọi camera đang quét (không tăng theo số camera)
+CAMERA_DECODE_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+# Thời gian tối đa cho các bước giải mã bổ sung trên một khung hình (ms)
+DECODE_BUDGET_MS = float(os.environ.get("VKTBKT_DECODE_BUDGET_MS", "250"))
+# Đọc mã QR từ ảnh chụp / PDF hàng loạt: số tiến trình và thời gian tối đa mỗi ảnh (ms)
+IMAGE_DECODE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+IMAGE_DECODE_BUDGET_MS = 1500.0
+
+# Máy quét cầm tay USB giả lập bàn phím: gõ cả mã trong vài ms rồi Enter.
+# Chuỗi phím cách nhau không quá WEDGE_MAX_INTERVAL_MS và dài ít nhất
+# WEDGE_MIN_LENGTH ký tự được coi là một lần quét, không phải người gõ
+WEDGE_SCANNER_ENABLED = True
+WEDGE_MAX_INTERVAL_MS = float(os.environ.get("VKTBKT_WEDGE_INTERVAL_MS", "35"))
+WEDGE_MIN_LENGTH = 4
+
+# Export job settings (tiến trình xuất file chạy nền)
+EXPORT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+EXPORT_POLL_INTERVAL_MS = 150
+
+# Query instrumentation (đo thời gian truy vấn SQL; tắt mặc định)
+QUERY_STATS_ENABLED = os.environ.get("VKTBKT_QUERY_STATS", "") not in ("", "0")
+SLOW_QUERY_MS = float(os.environ.get("VKTBKT_SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG = DATA_DIR / "logs" / "slow_queries.log"
 
 # Theme settings
 THEMES = {
@@ -1,20 +1,32 @@
 """
 Controllers Package - Business logic controllers
+
+Submodules are imported on first attribute access (see services/__init__).
 """
-from .equipment_controller import EquipmentController
-from .maintenance_controller import MaintenanceController
-from .loan_controller import LoanController
-from .unit_controller import UnitController
-from .user_controller import UserController
-from .category_controller import CategoryController
-from .maintenance_type_controller import MaintenanceTypeController
+from importlib import import_module
+
+_EXPORTS = {
+    'EquipmentController': '.equipment_controller',
+    'MaintenanceController': '.maintenance_controller',
+    'LoanController': '.loan_controller',
+    'UnitController': '.unit_controller',
+    'UserController': '.user_controller',
+    'CategoryController': '.category_controller',
+    'MaintenanceTypeController': '.maintenance_type_controller',
+    'StocktakeController': '.stocktake_controller',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = [
-    'EquipmentController', 
-    'MaintenanceController',
-    'LoanController',
-    'UnitController',
-    'UserController',
-    'CategoryController',
-    'MaintenanceTypeController'
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
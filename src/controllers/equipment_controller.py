@@ -9,8 +9,7 @@ import uuid
 from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog
 from ..models.database import Database 
-from ..services.qr_service import QRService
-from ..services.export_service import ExportService
+from ..services.scan_lookup_service import ScanLookupService
 from .user_controller import UserController
 from ..config import DATA_DIR # [MỚI] Để biết chỗ lưu ảnh
 
@@ -21,14 +20,29 @@ class EquipmentController:
     """
     
     def __init__(self):
-        self.qr_service = QRService()
-        self.export_service = ExportService()
+        self._qr_service = None
+        self._export_service = None
         self.db = Database()
         
         # [MỚI] Khởi tạo thư mục lưu ảnh chung
         self.image_dir = DATA_DIR / "images"
         self.image_dir.mkdir(parents=True, exist_ok=True)
     
+    # Dịch vụ QR/PDF tạo khi dùng lần đầu (reportlab, PIL nạp chậm)
+    @property
+    def qr_service(self):
+        if self._qr_service is None:
+            from ..services.qr_service import QRService
+            self._qr_service = QRService()
+        return self._qr_service
+    
+    @property
+    def export_service(self):
+        if self._export_service is None:
+            from ..services.export_service import ExportService
+            self._export_service = ExportService.instance()
+        return self._export_service
+    
     def _get_current_user_info(self):
         user = UserController.get_current_user()
         if user:
@@ -126,6 +140,7 @@ class EquipmentController:
             _, qr_path = self.qr_service.generate_equipment_qr(equipment.id, equipment.serial_number)
             equipment.qr_code_path = qr_path
             equipment.save()
+            ScanLookupService.instance().invalidate(equipment.id)
             
             user_id, username = self._get_current_user_info()
             log_details = f"Thêm mới trang bị: {equipment.name} (Số hiệu: {equipment.serial_number})"
@@ -136,6 +151,12 @@ class EquipmentController:
         except Exception as e:
             return False, f"Lỗi: {str(e)}", None
     
+    def import_equipment_file(self, file_path: str):
+        """Nhập hàng loạt trang bị từ file CSV/XLSX (chạy nền, trả về ExportJob)"""
+        from ..services.export_job_service import ExportJobManager
+        user_id, username = self._get_current_user_info()
+        return ExportJobManager.instance().submit_equipment_import(file_path, user_id, username)
+    
     def update_equipment(self, equipment_id: int, equipment_data: dict, 
                          new_images: List[str] = None, deleted_images: List[str] = None) -> Tuple[bool, str]:
         """[FIX] Thêm tham số mảng ảnh mới và ảnh bị xóa"""
@@ -176,6 +197,7 @@ class EquipmentController:
                 _, qr_path = self.qr_service.generate_equipment_qr(equipment_id, new_serial)
                 equipment.qr_code_path = qr_path
                 equipment.save()
+            ScanLookupService.instance().invalidate(equipment_id)
             
             user_id, username = self._get_current_user_info()
             log_details = f"Cập nhật trang bị: {equipment.name} (Số hiệu: {equipment.serial_number})"
@@ -202,6 +224,7 @@ class EquipmentController:
             self._delete_images("Equipment", equipment_id)
             
             equipment.delete()
+            ScanLookupService.instance().invalidate(equipment_id)
             
             user_id, username = self._get_current_user_info()
             log_details = f"Xóa trang bị: {name} (Số hiệu: {serial})"
@@ -233,7 +256,7 @@ class EquipmentController:
     def lookup_by_qr(self, qr_data: str) -> Tuple[bool, str, Optional[Equipment]]:
         decoded = self.qr_service.decode_qr_data(qr_data)
         if decoded['type'] == 'equipment':
-            equipment = Equipment.get_by_id(decoded['equipment_id'])
+            equipment = ScanLookupService.instance().get_by_id(decoded['equipment_id'])
             if equipment: return True, "Tìm thấy thiết bị!", equipment
             else: return False, f"Không tìm thấy thiết bị với ID: {decoded['equipment_id']}", None
         elif decoded['type'] == 'unknown':
@@ -248,6 +271,16 @@ class EquipmentController:
             return True, filepath
         except Exception as e: return False, f"Lỗi xuất file: {str(e)}"
     
+    def export_equipment_report_pdf(self, filters: dict = None, group_by: str = None,
+                                    save_path: str = None) -> Tuple[bool, str]:
+        """Streaming PDF report built straight from the DB (no in-memory list)"""
+        try:
+            filepath = self.export_service.export_equipment_report(
+                save_path=save_path, filters=filters, group_by=group_by
+            )
+            return True, filepath
+        except Exception as e: return False, f"Lỗi xuất file: {str(e)}"
+    
     def export_qr_sheet_pdf(self, equipment_list: List[Equipment]) -> Tuple[bool, str]:
         if not equipment_list: return False, "Không có dữ liệu để xuất!"
         try:
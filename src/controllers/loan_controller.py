@@ -10,6 +10,8 @@ import uuid
 from ..models.equipment import Equipment
 from ..models.loan_log import LoanLog
 from ..models.database import Database
+from ..models.lookups import LOOKUPS, STATUS_EQUIPMENT_LOAN
+from ..services.scan_lookup_service import ScanLookupService
 from .user_controller import UserController
 from ..config import DATA_DIR # [MỚI]
 
@@ -80,8 +82,7 @@ class LoanController:
         if equipment.loan_status == "Đã cho mượn":
             return False, "Thiết bị đang được cho mượn, không thể tạo phiếu mượn mới!", None
         
-        active_loan = LoanLog.get_active_by_equipment(equipment_id)
-        if active_loan:
+        if equipment.active_loan_id:
             return False, "Thiết bị đang có phiếu mượn chưa hoàn thành!", None
         
         if not loan_data.get('borrower_unit'):
@@ -109,6 +110,7 @@ class LoanController:
                 self._save_images("Loan", loan.id, images_before, 'before')
             
             equipment.update_loan_status("Đã cho mượn")
+            ScanLookupService.instance().invalidate(equipment_id)
             
             user_id, username = self._get_current_user_info()
             self.db.log_action(user_id, username, "CREATE", "Loan", loan.id, f"Tạo phiếu mượn cho thiết bị ID: {equipment_id}. Đơn vị: {loan.borrower_unit}")
@@ -169,6 +171,7 @@ class LoanController:
             
             equipment = Equipment.get_by_id(loan.equipment_id)
             if equipment: equipment.update_loan_status("Đang ở kho")
+            ScanLookupService.instance().invalidate(loan.equipment_id)
             
             user_id, username = self._get_current_user_info()
             equip_name = equipment.name if equipment else f"ID {loan.equipment_id}"
@@ -192,6 +195,7 @@ class LoanController:
             self._delete_images("Loan", loan_id)
             
             loan.delete()
+            ScanLookupService.instance().invalidate(equip_id)
             user_id, username = self._get_current_user_info()
             self.db.log_action(user_id, username, "DELETE", "Loan", loan_id, f"Xóa phiếu mượn ID {loan_id}")
             return True, "Đã xóa bản ghi!"
@@ -210,10 +214,15 @@ class LoanController:
         for log in all_logs: by_unit[log.borrower_unit] = by_unit.get(log.borrower_unit, 0) + 1
         return {'total': len(all_logs), 'active': len(active_logs), 'returned': len(returned_logs), 'by_unit': by_unit}
     def check_equipment_available(self, equipment_id: int) -> Tuple[bool, str]:
-        equipment = Equipment.get_by_id(equipment_id)
-        if not equipment: return False, "Không tìm thấy thiết bị!"
-        if equipment.loan_status == "Đã cho mượn":
-            active_loan = LoanLog.get_active_by_equipment(equipment_id)
-            if active_loan: return False, f"Thiết bị đang được mượn bởi: {active_loan.borrower_unit}"
+        # Một lần đọc theo khóa chính nhờ con trỏ equipment.active_loan_id
+        row = self.db.fetch_one('''
+            SELECT e.loan_status_id, l.borrower_unit
+            FROM equipment e
+            LEFT JOIN loan_log l ON l.id = e.active_loan_id
+            WHERE e.id = ?
+        ''', (equipment_id,))
+        if not row: return False, "Không tìm thấy thiết bị!"
+        if row['borrower_unit'] is not None: return False, f"Thiết bị đang được mượn bởi: {row['borrower_unit']}"
+        if row['loan_status_id'] == LOOKUPS.find_id(STATUS_EQUIPMENT_LOAN, "Đã cho mượn"):
             return False, "Thiết bị đang ở trạng thái cho mượn"
         return True, "Thiết bị sẵn sàng cho mượn"
\ No newline at end of file
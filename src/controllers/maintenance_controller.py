@@ -10,6 +10,7 @@ import uuid
 from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog
 from ..models.database import Database 
+from ..services.scan_lookup_service import ScanLookupService
 from .user_controller import UserController
 from ..config import DATA_DIR 
 
@@ -93,6 +94,7 @@ class MaintenanceController:
             if update_equipment_status:
                 equipment.status = update_equipment_status
                 equipment.save()
+            ScanLookupService.instance().invalidate(equipment_id)
             
             user_id, username = self._get_current_user_info()
             self.db.log_action(user_id, username, "CREATE", "Maintenance", log.id, f"Thêm lịch bảo dưỡng: '{log.maintenance_type}' cho ID: {equipment_id}")
@@ -131,6 +133,7 @@ class MaintenanceController:
                 if equipment:
                     equipment.status = update_equipment_status
                     equipment.save()
+            ScanLookupService.instance().invalidate(log.equipment_id)
             
             user_id, username = self._get_current_user_info()
             self.db.log_action(user_id, username, "UPDATE", "Maintenance", log.id, f"Cập nhật lịch bảo dưỡng ID {log_id}")
@@ -148,6 +151,7 @@ class MaintenanceController:
                 if equipment:
                     equipment.status = update_equipment_status
                     equipment.save()
+            ScanLookupService.instance().invalidate(log.equipment_id)
             user_id, username = self._get_current_user_info()
             self.db.log_action(user_id, username, "UPDATE", "Maintenance", log_id, f"Hoàn thành bảo dưỡng ID {log_id}")
             return True, "Đã hoàn thành công việc bảo dưỡng!"
@@ -160,6 +164,7 @@ class MaintenanceController:
             log_type, equip_id = log.maintenance_type, log.equipment_id
             self._delete_images("Maintenance", log_id)
             log.delete()
+            ScanLookupService.instance().invalidate(equip_id)
             user_id, username = self._get_current_user_info()
             self.db.log_action(user_id, username, "DELETE", "Maintenance", log_id, f"Xóa lịch bảo dưỡng ID {log_id}")
             return True, "Đã xóa bản ghi!"
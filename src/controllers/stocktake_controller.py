@@ -0,0 +1,99 @@
+"""
+Stocktake Controller - Business logic for inventory check sessions
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+
+from ..models.database import Database
+from ..models.stocktake import StocktakeSession
+from ..models.unit import Unit
+from .user_controller import UserController
+
+
+class StocktakeController:
+    """
+    Controller for stocktake sessions: start one for a unit (and its
+    sub-units), feed it scanned codes, reconcile and close it
+    """
+
+    def __init__(self):
+        self.db = Database()
+
+    def _get_current_user_info(self):
+        user = UserController.get_current_user()
+        if user:
+            return user.id, user.username
+        return None, "Hệ thống"
+
+    def start_session(self, unit_id: int, name: str = "", notes: str = "") -> Tuple[bool, str, Optional[StocktakeSession]]:
+        unit = Unit.get_by_id(unit_id)
+        if not unit:
+            return False, "Không tìm thấy đơn vị!", None
+
+        try:
+            user_id, username = self._get_current_user_info()
+            session = StocktakeSession()
+            session.name = name or f"Kiểm kê {unit.name} {datetime.now():%d/%m/%Y}"
+            session.unit_id = unit_id
+            session.unit_name = unit.name
+            session.notes = notes
+            session.created_by = user_id
+            session.save()
+
+            self.db.log_action(user_id, username, "CREATE", "Stocktake", session.id,
+                               f"Bắt đầu kiểm kê '{session.name}' (đơn vị: {unit.name})")
+            return True, "Đã bắt đầu phiên kiểm kê!", session
+        except Exception as e:
+            return False, f"Lỗi: {str(e)}", None
+
+    def record_scans(self, session: StocktakeSession, codes: Iterable[Tuple[int, Optional[str]]]) -> int:
+        """Add scanned (equipment_id, serial) pairs; returns how many were new"""
+        if not session.is_open:
+            return 0
+        return session.record_scans(codes)
+
+    def reconcile(self, session: StocktakeSession) -> Tuple[bool, str, Dict[int, int]]:
+        if not session.is_open:
+            return False, "Phiên kiểm kê đã kết thúc, kết quả không thay đổi!", {}
+        try:
+            counts = session.reconcile()
+            return True, "Đã đối chiếu kết quả kiểm kê!", counts
+        except Exception as e:
+            return False, f"Lỗi: {str(e)}", {}
+
+    def finish_session(self, session: StocktakeSession) -> Tuple[bool, str, Dict[int, int]]:
+        if not session.is_open:
+            return False, "Phiên kiểm kê đã kết thúc trước đó!", {}
+        try:
+            counts = session.finish()
+            user_id, username = self._get_current_user_info()
+            self.db.log_action(
+                user_id, username, "UPDATE", "Stocktake", session.id,
+                f"Kết thúc kiểm kê '{session.name}': có mặt {session.found_count}/{session.expected_count}, "
+                f"thiếu {session.missing_count}, sai đơn vị {session.wrong_unit_count}, "
+                f"mã lạ {session.unknown_count}"
+            )
+            return True, "Đã kết thúc phiên kiểm kê!", counts
+        except Exception as e:
+            return False, f"Lỗi: {str(e)}", {}
+
+    def delete_session(self, session_id: int) -> Tuple[bool, str]:
+        session = StocktakeSession.get_by_id(session_id)
+        if not session:
+            return False, "Không tìm thấy phiên kiểm kê!"
+        try:
+            session.delete()
+            user_id, username = self._get_current_user_info()
+            self.db.log_action(user_id, username, "DELETE", "Stocktake", session_id,
+                               f"Xóa phiên kiểm kê '{session.name}'")
+            return True, "Đã xóa phiên kiểm kê!"
+        except Exception as e:
+            return False, f"Lỗi: {str(e)}"
+
+    @staticmethod
+    def get_sessions(limit: int = 100) -> List[StocktakeSession]:
+        return StocktakeSession.get_all(limit=limit)
+
+    @staticmethod
+    def get_open_sessions() -> List[StocktakeSession]:
+        return StocktakeSession.get_open()
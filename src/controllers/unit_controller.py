@@ -3,6 +3,7 @@ Unit Controller - Business logic for unit management
 """
 from typing import List, Optional
 from ..models.unit import Unit, UNIT_LEVELS
+from ..services.scan_lookup_service import ScanLookupService
 
 
 class UnitController:
@@ -69,6 +70,8 @@ class UnitController:
                 setattr(unit, key, value)
         
         unit.save()
+        # Tên đơn vị nằm trong các thiết bị đã lưu ở bộ đệm tra cứu quét
+        ScanLookupService.instance().clear()
         return unit
     
     @staticmethod
@@ -78,10 +81,9 @@ class UnitController:
         if not unit:
             return False
         
-        if hard_delete:
-            return unit.hard_delete()
-        else:
-            return unit.delete()
+        deleted = unit.hard_delete() if hard_delete else unit.delete()
+        ScanLookupService.instance().clear()
+        return deleted
     
     @staticmethod
     def get_unit_count(include_inactive: bool = False) -> int:
@@ -9,6 +9,7 @@ from .unit import Unit, UNIT_LEVELS, get_level_name
 from .user import User, UserRole, ROLE_PERMISSIONS, ROLE_DISPLAY_NAMES
 from .category import Category
 from .maintenance_type import MaintenanceType, get_maintenance_type_names, DEFAULT_MAINTENANCE_TYPES
+from .stocktake import StocktakeSession, OUTCOME_NAMES
 
 __all__ = [
     'Equipment', 
@@ -26,5 +27,7 @@ __all__ = [
     'Category',
     'MaintenanceType',
     'get_maintenance_type_names',
-    'DEFAULT_MAINTENANCE_TYPES'
+    'DEFAULT_MAINTENANCE_TYPES',
+    'StocktakeSession',
+    'OUTCOME_NAMES'
 ]
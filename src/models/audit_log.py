@@ -2,10 +2,22 @@
 Audit Log Model - Represents a system activity log
 """
 from datetime import datetime
-from typing import List, Optional
-from .database import Database
+from typing import List, Optional, Tuple, Iterator
+from .database import Database, day_range, parse_timestamp
 
 class AuditLog:
+    # Cột xuất CSV/Excel: (biểu thức SQL, tiêu đề)
+    EXPORT_COLUMNS = [
+        ("id", "ID"),
+        ("created_at", "Thời gian"),
+        ("username", "Người dùng"),
+        ("action", "Thao tác"),
+        ("target_type", "Đối tượng"),
+        ("target_id", "Mã đối tượng"),
+        ("details", "Chi tiết"),
+        ("ip_address", "Địa chỉ"),
+    ]
+
     def __init__(self):
         self.id: Optional[int] = None
         self.user_id: Optional[int] = None
@@ -28,12 +40,12 @@ class AuditLog:
         log.target_id = row['target_id']
         log.details = row['details']
         log.ip_address = row['ip_address']
-        log.created_at = row['created_at']
+        log.created_at = parse_timestamp(row['created_at'], utc=True)
         return log
 
     @classmethod
     def get_filtered(cls, keyword: str = None, action: str = None, 
-                     start_date: str = None, end_date: str = None, limit: int = 1000) -> List['AuditLog']:
+                     start_date=None, end_date=None, limit: int = 1000) -> List['AuditLog']:
         """Lấy danh sách log có bộ lọc"""
         db = Database()
         query = "SELECT * FROM audit_logs WHERE 1=1"
@@ -49,12 +61,49 @@ class AuditLog:
             params.append(action)
 
         if start_date and end_date:
-            # SQLite so sánh datetime chuẩn ISO YYYY-MM-DD HH:MM:SS
-            query += " AND created_at >= ? AND created_at <= ?"
-            params.extend([start_date, end_date])
+            # Cả ngày theo giờ địa phương; created_at lưu giờ UTC
+            query += " AND created_at >= ? AND created_at < ?"
+            params.extend(day_range(start_date, end_date, utc=True))
 
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
 
         rows = db.fetch_all(query, tuple(params))
-        return [cls._from_row(r) for r in rows]
\ No newline at end of file
+        return [cls._from_row(r) for r in rows]
+
+    @staticmethod
+    def build_filter(keyword: str = None, action: str = None,
+                     start_date=None, end_date=None) -> Tuple[str, list]:
+        """WHERE clause matching the filters of AuditView (dates are whole days)"""
+        clauses = []
+        params = []
+        if keyword:
+            pattern = f"%{keyword}%"
+            clauses.append("(username LIKE ? OR details LIKE ? OR target_type LIKE ?)")
+            params.extend([pattern, pattern, pattern])
+        if action:
+            clauses.append("action = ?")
+            params.append(action)
+        if start_date and end_date:
+            clauses.append("created_at >= ? AND created_at < ?")
+            params.extend(day_range(start_date, end_date, utc=True))
+        where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where_sql, params
+
+    @classmethod
+    def iter_export_rows(cls, filters: dict = None, chunk_size: int = 5000) -> Iterator[list]:
+        """Stream EXPORT_COLUMNS rows from a DB cursor, newest first"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        columns = ", ".join(expr for expr, _ in cls.EXPORT_COLUMNS)
+        return Database().iter_rows(
+            f"SELECT {columns} FROM audit_logs {where_sql} ORDER BY id DESC",
+            tuple(params), chunk_size
+        )
+
+    @classmethod
+    def count_filtered(cls, filters: dict = None) -> int:
+        where_sql, params = cls.build_filter(**(filters or {}))
+        row = Database().fetch_one(
+            f"SELECT COUNT(*) as count FROM audit_logs {where_sql}", tuple(params)
+        )
+        return row['count'] if row else 0
@@ -4,7 +4,22 @@ Category Model - Represents equipment categories
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
-from .database import Database
+from .database import Database, parse_timestamp
+from .lookups import LOOKUPS
+
+
+# Danh mục mặc định (tên, mã, mô tả) - nạp một lần khi tạo CSDL mới
+DEFAULT_CATEGORIES = [
+    ("Súng ngắn", "SN", "Các loại súng ngắn"),
+    ("Súng trường", "ST", "Các loại súng trường"),
+    ("Súng máy", "SM", "Các loại súng máy"),
+    ("Súng phóng lựu", "SPL", "Các loại súng phóng lựu"),
+    ("Khí tài quang học", "KTQH", "Ống nhòm, kính ngắm..."),
+    ("Khí tài thông tin", "KTTT", "Máy bộ đàm, điện thoại quân sự..."),
+    ("Phương tiện vận tải", "PTVT", "Xe quân sự, xe tải..."),
+    ("Trang bị bảo hộ", "TBBH", "Mũ, áo giáp, găng tay..."),
+    ("Khác", "K", "Các loại trang bị khác"),
+]
 
 
 @dataclass
@@ -25,10 +40,9 @@ class Category:
     
     def save(self) -> int:
         """Save category to database (insert or update)"""
-        if self.id:
-            return self._update()
-        else:
-            return self._insert()
+        category_id = self._update() if self.id else self._insert()
+        LOOKUPS.invalidate()
+        return category_id
     
     def _insert(self) -> int:
         """Insert new category"""
@@ -72,18 +86,18 @@ class Category:
             return False
         query = "DELETE FROM categories WHERE id = ?"
         self.db.execute(query, (self.id,))
+        LOOKUPS.invalidate()
         return True
 
     def get_equipment_count(self) -> int:
         """
         [MỚI] Get count of equipment belonging to this category
         """
-        if not self.name:
+        if not self.id:
             return 0
-        # Lưu ý: Bảng equipment liên kết với category bằng TÊN (string) chứ không phải ID
         row = self.db.fetch_one(
-            "SELECT COUNT(*) as count FROM equipment WHERE category = ?", 
-            (self.name,)
+            "SELECT COUNT(*) as count FROM equipment WHERE category_id = ?", 
+            (self.id,)
         )
         return row['count'] if row else 0
     
@@ -178,26 +192,15 @@ class Category:
         category.code = row['code'] or ""
         category.description = row['description'] or ""
         category.is_active = bool(row['is_active'])
-        category.created_at = row['created_at']
-        category.updated_at = row['updated_at']
+        category.created_at = parse_timestamp(row['created_at'], utc=True)
+        category.updated_at = parse_timestamp(row['updated_at'], utc=True)
         return category
     
     @classmethod
     def initialize_default_categories(cls):
         """Initialize default categories if table is empty"""
         if cls.count(include_inactive=True) == 0:
-            default_categories = [
-                ("Súng ngắn", "SN", "Các loại súng ngắn"),
-                ("Súng trường", "ST", "Các loại súng trường"),
-                ("Súng máy", "SM", "Các loại súng máy"),
-                ("Súng phóng lựu", "SPL", "Các loại súng phóng lựu"),
-                ("Khí tài quang học", "KTQH", "Ống nhòm, kính ngắm..."),
-                ("Khí tài thông tin", "KTTT", "Máy bộ đàm, điện thoại quân sự..."),
-                ("Phương tiện vận tải", "PTVT", "Xe quân sự, xe tải..."),
-                ("Trang bị bảo hộ", "TBBH", "Mũ, áo giáp, găng tay..."),
-                ("Khác", "K", "Các loại trang bị khác"),
-            ]
-            for name, code, desc in default_categories:
+            for name, code, desc in DEFAULT_CATEGORIES:
                 cat = cls()
                 cat.name = name
                 cat.code = code
@@ -2,12 +2,94 @@
 Database connection and initialization module
 """
 import sqlite3
+import time
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, List, Any
+from datetime import datetime, date, time as dt_time, timedelta, timezone
+from typing import Optional, List, Any, Iterator, Callable
 from contextlib import contextmanager
 
 from ..config import DATABASE_PATH
+from .migrations import migrate
+from .query_stats import QUERY_STATS
+
+# Số id tối đa trong một mệnh đề IN (SQLITE_MAX_VARIABLE_NUMBER mặc định 999)
+ID_BATCH_SIZE = 900
+
+
+# Mọi cột TIMESTAMP lưu dạng text ISO-8601 cùng độ dài, nên so sánh chuỗi = so sánh thời gian.
+# Ngày nghiệp vụ (receive_date, start_date, loan_date...) là giờ địa phương; created_at,
+# updated_at, last_login do CURRENT_TIMESTAMP ghi nên là giờ UTC.
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_db_timestamp(value) -> Optional[str]:
+    """datetime/date/ISO text -> canonical 'YYYY-MM-DD HH:MM:SS' for binding, or None"""
+    if isinstance(value, str):
+        value = parse_timestamp(value)
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, dt_time.min)
+    if value is None:
+        return None
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value, utc: bool = False) -> Optional[datetime]:
+    """
+    Column value -> naive local datetime (None for NULL, '' or unparsable text).
+    Pass utc=True for CURRENT_TIMESTAMP columns so they display in local time.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime.combine(value, dt_time.min)
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None and utc:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.replace(microsecond=0)
+
+
+def day_range(start_date, end_date, utc: bool = False) -> tuple:
+    """
+    Half-open text bounds [start day, day after end) for a TIMESTAMP column.
+    Comparing the raw column (instead of DATE(col)) lets SQLite use an index.
+    With utc=True the local-day bounds are shifted for CURRENT_TIMESTAMP columns.
+    """
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    if isinstance(end_date, datetime):
+        end_date = end_date.date()
+    end_date = end_date + timedelta(days=1)
+    if not utc:
+        return start_date.isoformat(), end_date.isoformat()
+    return tuple(
+        datetime.combine(day, dt_time.min).astimezone(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        for day in (start_date, end_date)
+    )
+
+
+class Transaction:
+    """Statements of one Database.transaction() block, timed like Database calls"""
+
+    def __init__(self, db: 'Database', conn: sqlite3.Connection):
+        self._db = db
+        self._conn = conn
+
+    def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
+        return self._db._run(query, params, lambda cursor: cursor, self._conn)
+
+    def fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        return self._db._run(query, params, sqlite3.Cursor.fetchone, self._conn)
+
+    def fetch_all(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
+        return self._db._run(query, params, sqlite3.Cursor.fetchall, self._conn)
 
 
 class Database:
@@ -45,242 +127,132 @@ class Database:
             conn.close()
     
     def _initialize_database(self):
-        """Create database tables if they don't exist"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Categories table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    code TEXT,
-                    description TEXT,
-                    is_active INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Units table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS units (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    code TEXT UNIQUE,
-                    parent_id INTEGER,
-                    level INTEGER DEFAULT 0,
-                    address TEXT,
-                    phone TEXT,
-                    commander TEXT,
-                    description TEXT,
-                    is_active INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (parent_id) REFERENCES units(id) ON DELETE SET NULL
-                )
-            ''')
-            
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    salt TEXT NOT NULL,
-                    full_name TEXT,
-                    email TEXT,
-                    phone TEXT,
-                    role TEXT DEFAULT 'viewer',
-                    unit_id INTEGER,
-                    is_active INTEGER DEFAULT 1,
-                    last_login TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_by INTEGER,
-                    FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE SET NULL,
-                    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
-                )
-            ''')
-            
-            # Equipment table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS equipment (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    serial_number TEXT UNIQUE NOT NULL,
-                    category TEXT NOT NULL,
-                    manufacturer TEXT,
-                    manufacture_year INTEGER,
-                    status TEXT DEFAULT 'Trong kho',
-                    unit_id INTEGER,
-                    location TEXT,
-                    description TEXT,
-                    qr_code_path TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_by INTEGER,
-                    FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE SET NULL,
-                    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
-                )
-            ''')
-            
-            # Maintenance log table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS maintenance_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    equipment_id INTEGER NOT NULL,
-                    maintenance_type TEXT NOT NULL,
-                    description TEXT,
-                    technician_id INTEGER,
-                    technician_name TEXT,
-                    status TEXT DEFAULT 'Đang thực hiện',
-                    start_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    end_date TIMESTAMP,
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_by INTEGER,
-                    FOREIGN KEY (equipment_id) REFERENCES equipment(id) ON DELETE CASCADE,
-                    FOREIGN KEY (technician_id) REFERENCES users(id) ON DELETE SET NULL,
-                    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
-                )
-            ''')
-            
-            # Maintenance types table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS maintenance_types (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    code TEXT,
-                    description TEXT,
-                    is_active INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Loan log table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS loan_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    equipment_id INTEGER NOT NULL,
-                    borrower_unit TEXT NOT NULL,
-                    loan_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expected_return_date TIMESTAMP,
-                    return_date TIMESTAMP,
-                    status TEXT DEFAULT 'Đang mượn',
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_by INTEGER,
-                    FOREIGN KEY (equipment_id) REFERENCES equipment(id) ON DELETE CASCADE,
-                    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
-                )
-            ''')
+        """Apply pending schema migrations (one PRAGMA read when up to date)"""
+        migrate(self.db_path)
+    
+    def _run(self, query: str, params: tuple, fetch: Callable[[sqlite3.Cursor], Any],
+             conn: Optional[sqlite3.Connection] = None) -> Any:
+        """Execute one statement and return fetch(cursor), timed when stats are on"""
+        if conn is None:
+            with self.get_connection() as conn:
+                return self._run(query, params, fetch, conn)
+        cursor = conn.cursor()
+        if not QUERY_STATS.enabled:
+            cursor.execute(query, params)
+            return fetch(cursor)
+        started = time.perf_counter()
+        try:
+            cursor.execute(query, params)
+            result = fetch(cursor)
+        except Exception as e:
+            QUERY_STATS.record(conn, query, params, time.perf_counter() - started, 0, error=e)
+            raise
+        if isinstance(result, list):
+            rows = len(result)
+        elif cursor.rowcount >= 0:
+            rows = cursor.rowcount
+        else:
+            rows = 0 if result is None else 1
+        QUERY_STATS.record(conn, query, params, time.perf_counter() - started, rows)
+        return result
 
-            # [MỚI] Audit Logs Table - Bảng ghi nhật ký hệ thống
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS audit_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username TEXT,
-                    action TEXT NOT NULL,
-                    target_type TEXT NOT NULL,
-                    target_id INTEGER,
-                    details TEXT,
-                    ip_address TEXT DEFAULT 'localhost',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
-                )
-            ''')
-            
-            # [MỚI] Bảng lưu trữ đường dẫn Hình ảnh cho toàn hệ thống
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS item_images (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    target_type TEXT NOT NULL, 
-                    target_id INTEGER NOT NULL, 
-                    image_category TEXT DEFAULT 'general', -- [MỚI] 'before', 'after', 'general'
-                    file_path TEXT NOT NULL,    
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            # [MỚI] Lệnh an toàn để nâng cấp DB cũ chưa có cột image_category
-            try: cursor.execute("ALTER TABLE item_images ADD COLUMN image_category TEXT DEFAULT 'general'")
-            except: pass
-            
-            # Add columns safely
-            try: cursor.execute('ALTER TABLE equipment ADD COLUMN receive_date TIMESTAMP')
-            except: pass
-            
-            try: cursor.execute("ALTER TABLE equipment ADD COLUMN loan_status TEXT DEFAULT 'Đang ở kho'")
-            except: pass
-            
-            # Create indexes
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_units_code ON units(code)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_equipment_serial ON equipment(serial_number)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_equipment_status ON equipment(status)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_equipment_unit ON equipment(unit_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_maintenance_equipment ON maintenance_log(equipment_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_loan_equipment ON loan_log(equipment_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_loan_status ON loan_log(status)')
-            
-            # Index cho bảng audit
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_created_at ON audit_logs(created_at)')
-            # [MỚI] Index cho ảnh để tải nhanh
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_images_target ON item_images(target_type, target_id)')
-            
-            conn.commit()
+    @contextmanager
+    def transaction(self) -> Iterator['Transaction']:
+        """
+        Several statements on one connection, committed together (rolled back
+        on error). Needed for TEMP tables, which only live as long as their
+        connection.
+        """
+        with self.get_connection() as conn:
+            yield Transaction(self, conn)
     
     def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor
+        return self._run(query, params, lambda cursor: cursor)
     
     def fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchone()
+        return self._run(query, params, sqlite3.Cursor.fetchone)
     
     def fetch_all(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
+        return self._run(query, params, sqlite3.Cursor.fetchall)
     
     def insert(self, query: str, params: tuple = ()) -> int:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.lastrowid
-    
+        return self._run(query, params, lambda cursor: cursor.lastrowid)
+
+    def iter_rows(self, query: str, params: tuple = (), chunk_size: int = 1000) -> Iterator[List[sqlite3.Row]]:
+        """
+        Stream a query result in chunks of at most chunk_size rows.
+        The connection stays open until the generator is exhausted or closed,
+        so callers never hold more than one chunk in memory.
+        When stats are on, only time spent inside SQLite is counted, not the
+        caller's work between chunks.
+        """
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        timed = QUERY_STATS.enabled
+        elapsed = 0.0
+        total = 0
+        try:
+            started = time.perf_counter() if timed else 0.0
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if timed:
+                    elapsed += time.perf_counter() - started
+                if not rows:
+                    break
+                total += len(rows)
+                yield rows
+                if timed:
+                    started = time.perf_counter()
+            if timed:
+                QUERY_STATS.record(conn, query, params, elapsed, total)
+        finally:
+            conn.close()
+
     def get_statistics(self) -> dict:
         stats = {}
         row = self.fetch_one("SELECT COUNT(*) as count FROM equipment")
         stats['total_equipment'] = row['count'] if row else 0
         
-        rows = self.fetch_all("SELECT status, COUNT(*) as count FROM equipment GROUP BY status")
+        # Đếm theo khóa số trên bảng lớn, rồi mới nối sang bảng tra cứu nhỏ để lấy tên
+        rows = self.fetch_all('''
+            SELECT s.name as status, g.count FROM (
+                SELECT status_id, COUNT(*) as count FROM equipment GROUP BY status_id
+            ) g LEFT JOIN statuses s ON g.status_id = s.id
+        ''')
         stats['by_status'] = {row['status']: row['count'] for row in rows}
         
-        rows = self.fetch_all("SELECT category, COUNT(*) as count FROM equipment GROUP BY category")
+        rows = self.fetch_all('''
+            SELECT c.name as category, g.count FROM (
+                SELECT category_id, COUNT(*) as count FROM equipment GROUP BY category_id
+            ) g LEFT JOIN categories c ON g.category_id = c.id
+        ''')
         stats['by_category'] = {row['category']: row['count'] for row in rows}
         
-        row = self.fetch_one("SELECT COUNT(*) as count FROM maintenance_log WHERE status = 'Đang thực hiện'")
+        row = self.fetch_one('''
+            SELECT COUNT(*) as count FROM maintenance_log WHERE status_id =
+                (SELECT id FROM statuses WHERE kind = 'maintenance' AND name = 'Đang thực hiện')
+        ''')
         stats['active_maintenance'] = row['count'] if row else 0
         
-        row = self.fetch_one("SELECT COUNT(*) as count FROM loan_log WHERE status = 'Đang mượn'")
+        row = self.fetch_one('''
+            SELECT COUNT(*) as count FROM loan_log WHERE status_id =
+                (SELECT id FROM statuses WHERE kind = 'loan' AND name = 'Đang mượn')
+        ''')
         stats['active_loans'] = row['count'] if row else 0
         
-        rows = self.fetch_all("SELECT loan_status, COUNT(*) as count FROM equipment GROUP BY loan_status")
+        rows = self.fetch_all('''
+            SELECT s.name as loan_status, g.count FROM (
+                SELECT loan_status_id, COUNT(*) as count FROM equipment GROUP BY loan_status_id
+            ) g LEFT JOIN statuses s ON g.loan_status_id = s.id
+        ''')
         stats['by_loan_status'] = {row['loan_status']: row['count'] for row in rows}
         
         rows = self.fetch_all('''
-            SELECT e.name, m.maintenance_type, m.start_date
+            SELECT e.name, mt.name as maintenance_type, m.start_date
             FROM maintenance_log m
             JOIN equipment e ON m.equipment_id = e.id
+            LEFT JOIN maintenance_types mt ON m.maintenance_type_id = mt.id
             ORDER BY m.start_date DESC
             LIMIT 5
         ''')
@@ -3,8 +3,25 @@ Equipment Model - Represents a weapon/equipment item
 """
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
-from .database import Database
+from typing import Optional, List, Tuple, Iterator
+from .database import Database, ID_BATCH_SIZE, day_range, parse_timestamp, to_db_timestamp
+from .lookups import LOOKUPS, CATEGORY, STATUS_EQUIPMENT, STATUS_EQUIPMENT_LOAN
+
+# Con trỏ tới phiếu mượn / phiếu bảo dưỡng đang mở của thiết bị.
+# Giá trị đúng của mỗi cột, tính từ bảng nhật ký ({equipment_id} là biểu thức SQL);
+# trigger (migration v6) và check_active_pointers() dùng chung các câu này.
+ACTIVE_POINTERS = {
+    'active_loan_id': (
+        "SELECT l.id FROM loan_log l WHERE l.equipment_id = {equipment_id}"
+        " AND l.status_id = (SELECT id FROM statuses WHERE kind = 'loan' AND name = 'Đang mượn')"
+        " ORDER BY l.loan_date DESC, l.id DESC LIMIT 1"
+    ),
+    'active_maintenance_id': (
+        "SELECT m.id FROM maintenance_log m WHERE m.equipment_id = {equipment_id}"
+        " AND m.status_id != (SELECT id FROM statuses WHERE kind = 'maintenance' AND name = 'Hoàn thành')"
+        " ORDER BY m.start_date DESC, m.id DESC LIMIT 1"
+    ),
+}
 
 
 @dataclass
@@ -28,6 +45,9 @@ class Equipment:
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
     created_by: Optional[int] = None  # Foreign key to users table
+    # Do trigger duy trì, không ghi từ model
+    active_loan_id: Optional[int] = None  # Phiếu mượn đang mở
+    active_maintenance_id: Optional[int] = None  # Phiếu bảo dưỡng chưa hoàn thành
     
     # Transient fields (not stored in DB directly)
     unit_name: str = ""  # For display purposes
@@ -47,16 +67,17 @@ class Equipment:
         """Insert new equipment"""
         query = '''
             INSERT INTO equipment 
-            (name, serial_number, category, manufacturer, manufacture_year, 
-             status, unit_id, location, description, qr_code_path, 
-             receive_date, loan_status, created_by)
+            (name, serial_number, category_id, manufacturer, manufacture_year, 
+             status_id, unit_id, location, description, qr_code_path, 
+             receive_date, loan_status_id, created_by)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
         params = (
-            self.name, self.serial_number, self.category, self.manufacturer,
-            self.manufacture_year, self.status, self.unit_id, self.location,
-            self.description, self.qr_code_path, self.receive_date, 
-            self.loan_status, self.created_by
+            self.name, self.serial_number, LOOKUPS.ensure_id(CATEGORY, self.category),
+            self.manufacturer, self.manufacture_year, LOOKUPS.ensure_id(STATUS_EQUIPMENT, self.status),
+            self.unit_id, self.location, self.description, self.qr_code_path,
+            to_db_timestamp(self.receive_date),
+            LOOKUPS.ensure_id(STATUS_EQUIPMENT_LOAN, self.loan_status), self.created_by
         )
         self.id = self.db.insert(query, params)
         return self.id
@@ -65,17 +86,18 @@ class Equipment:
         """Update existing equipment"""
         query = '''
             UPDATE equipment SET
-                name = ?, serial_number = ?, category = ?, manufacturer = ?,
-                manufacture_year = ?, status = ?, unit_id = ?, location = ?,
+                name = ?, serial_number = ?, category_id = ?, manufacturer = ?,
+                manufacture_year = ?, status_id = ?, unit_id = ?, location = ?,
                 description = ?, qr_code_path = ?, receive_date = ?, 
-                loan_status = ?, updated_at = CURRENT_TIMESTAMP
+                loan_status_id = ?, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         '''
         params = (
-            self.name, self.serial_number, self.category, self.manufacturer,
-            self.manufacture_year, self.status, self.unit_id, self.location,
-            self.description, self.qr_code_path, self.receive_date,
-            self.loan_status, self.id
+            self.name, self.serial_number, LOOKUPS.ensure_id(CATEGORY, self.category),
+            self.manufacturer, self.manufacture_year, LOOKUPS.ensure_id(STATUS_EQUIPMENT, self.status),
+            self.unit_id, self.location, self.description, self.qr_code_path,
+            to_db_timestamp(self.receive_date),
+            LOOKUPS.ensure_id(STATUS_EQUIPMENT_LOAN, self.loan_status), self.id
         )
         self.db.execute(query, params)
         return self.id
@@ -101,7 +123,26 @@ class Equipment:
             (self.id,)
         )
         self.images = [row['file_path'] for row in rows]
-    
+
+    @classmethod
+    def load_images_many(cls, equipments: List['Equipment']):
+        """load_images() for many items in a few IN queries"""
+        by_id = {e.id: e for e in equipments if e.id}
+        for e in by_id.values():
+            e.images = []
+        ids = list(by_id)
+        db = Database()
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            batch = ids[start:start + ID_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = db.fetch_all(f'''
+                SELECT target_id, file_path FROM item_images
+                WHERE target_type='Equipment' AND target_id IN ({placeholders})
+                ORDER BY id
+            ''', tuple(batch))
+            for row in rows:
+                by_id[row['target_id']].images.append(row['file_path'])
+
     @classmethod
     def get_by_id(cls, equipment_id: int) -> Optional['Equipment']:
         """Get equipment by ID"""
@@ -131,7 +172,47 @@ class Equipment:
             equip.load_images() # [MỚI] Tự động tải ảnh khi xem chi tiết
             return equip
         return None
-    
+
+    @classmethod
+    def get_by_ids(cls, equipment_ids: List[int]) -> List['Equipment']:
+        """Get many equipment by ID in a few IN queries, keeping the input order"""
+        db = Database()
+        found = {}
+        ids = list(dict.fromkeys(equipment_ids))
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            batch = ids[start:start + ID_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = db.fetch_all(f'''
+                SELECT e.*, u.name as unit_name
+                FROM equipment e
+                LEFT JOIN units u ON e.unit_id = u.id
+                WHERE e.id IN ({placeholders})
+            ''', tuple(batch))
+            for row in rows:
+                found[row['id']] = cls._from_row(row)
+        return [found[i] for i in ids if i in found]
+
+    @classmethod
+    def get_ids_by_unit(cls, unit_id: int, include_children: bool = True) -> List[int]:
+        """Equipment IDs of a unit (and all its sub-units), ordered by name"""
+        db = Database()
+        if include_children:
+            rows = db.fetch_all('''
+                WITH RECURSIVE subtree(id) AS (
+                    SELECT ?
+                    UNION
+                    SELECT u.id FROM units u JOIN subtree s ON u.parent_id = s.id
+                )
+                SELECT e.id FROM equipment e
+                WHERE e.unit_id IN (SELECT id FROM subtree)
+                ORDER BY e.name, e.id
+            ''', (unit_id,))
+        else:
+            rows = db.fetch_all(
+                "SELECT id FROM equipment WHERE unit_id = ? ORDER BY name, id", (unit_id,)
+            )
+        return [row['id'] for row in rows]
+
     @classmethod
     def get_all(cls, limit: int = 100, offset: int = 0) -> List['Equipment']:
         """Get all equipment with pagination"""
@@ -153,7 +234,8 @@ class Equipment:
             SELECT e.*, u.name as unit_name 
             FROM equipment e 
             LEFT JOIN units u ON e.unit_id = u.id 
-            WHERE e.name LIKE ? OR e.serial_number LIKE ? OR e.category LIKE ?
+            WHERE e.name LIKE ? OR e.serial_number LIKE ?
+               OR e.category_id IN (SELECT id FROM categories WHERE name LIKE ?)
             ORDER BY e.name
         ''', (search_pattern, search_pattern, search_pattern))
         return [cls._from_row(row) for row in rows]
@@ -166,8 +248,8 @@ class Equipment:
             SELECT e.*, u.name as unit_name 
             FROM equipment e 
             LEFT JOIN units u ON e.unit_id = u.id 
-            WHERE e.status = ? ORDER BY e.name
-        ''', (status,))
+            WHERE e.status_id = ? ORDER BY e.name
+        ''', (LOOKUPS.find_id(STATUS_EQUIPMENT, status),))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
@@ -178,8 +260,8 @@ class Equipment:
             SELECT e.*, u.name as unit_name 
             FROM equipment e 
             LEFT JOIN units u ON e.unit_id = u.id 
-            WHERE e.category = ? ORDER BY e.name
-        ''', (category,))
+            WHERE e.category_id = ? ORDER BY e.name
+        ''', (LOOKUPS.find_id(CATEGORY, category),))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
@@ -202,9 +284,9 @@ class Equipment:
             SELECT e.*, u.name as unit_name 
             FROM equipment e 
             LEFT JOIN units u ON e.unit_id = u.id 
-            WHERE e.receive_date BETWEEN ? AND ?
+            WHERE e.receive_date >= ? AND e.receive_date < ?
             ORDER BY e.receive_date DESC
-        ''', (start_date, end_date))
+        ''', day_range(start_date, end_date))
         return [cls._from_row(row) for row in rows]
 
     @classmethod
@@ -215,8 +297,8 @@ class Equipment:
             SELECT e.*, u.name as unit_name 
             FROM equipment e 
             LEFT JOIN units u ON e.unit_id = u.id 
-            WHERE e.loan_status = ? ORDER BY e.name
-        ''', (loan_status,))
+            WHERE e.loan_status_id = ? ORDER BY e.name
+        ''', (LOOKUPS.find_id(STATUS_EQUIPMENT_LOAN, loan_status),))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
@@ -229,10 +311,146 @@ class Equipment:
         if not self.id:
             return False
         self.loan_status = new_status
-        query = "UPDATE equipment SET loan_status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
-        self.db.execute(query, (new_status, self.id))
+        query = "UPDATE equipment SET loan_status_id = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?"
+        self.db.execute(query, (LOOKUPS.ensure_id(STATUS_EQUIPMENT_LOAN, new_status), self.id))
         return True
     
+    # Khóa số -> tên cho các câu truy vấn báo cáo / xuất file
+    LOOKUP_JOINS = '''
+            LEFT JOIN categories c ON e.category_id = c.id
+            LEFT JOIN statuses s ON e.status_id = s.id
+            LEFT JOIN statuses ls ON e.loan_status_id = ls.id'''
+
+    # Thứ tự sắp xếp cho báo cáo: nhóm được quyết định bởi ORDER BY trong SQL
+    REPORT_GROUP_COLUMNS = {
+        'unit': "COALESCE(u.name, '')",
+        'category': "COALESCE(c.name, '')",
+    }
+
+    @staticmethod
+    def build_filter(keyword: str = None, category: str = None, status: str = None,
+                     start_date: datetime = None, end_date: datetime = None) -> Tuple[str, list]:
+        """
+        Build a WHERE clause matching the filters offered by EquipmentView.
+        Returns (where_sql, params); where_sql is empty when no filter applies.
+        """
+        clauses = []
+        params = []
+        if keyword:
+            pattern = f"%{keyword}%"
+            clauses.append("(e.name LIKE ? OR e.serial_number LIKE ?"
+                           " OR e.category_id IN (SELECT id FROM categories WHERE name LIKE ?))")
+            params.extend([pattern, pattern, pattern])
+        if category:
+            clauses.append("e.category_id = ?")
+            params.append(LOOKUPS.find_id(CATEGORY, category))
+        if status:
+            clauses.append("e.status_id = ?")
+            params.append(LOOKUPS.find_id(STATUS_EQUIPMENT, status))
+        if start_date and end_date:
+            clauses.append("e.receive_date >= ? AND e.receive_date < ?")
+            params.extend(day_range(start_date, end_date))
+        where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where_sql, params
+
+    @classmethod
+    def iter_report_rows(cls, filters: dict = None, group_by: str = None,
+                         chunk_size: int = 1000) -> Iterator[list]:
+        """
+        Stream report rows in chunks straight from a DB cursor.
+        When group_by is 'unit' or 'category' each row carries a group_name
+        column and rows arrive already ordered by group.
+        """
+        where_sql, params = cls.build_filter(**(filters or {}))
+        group_col = cls.REPORT_GROUP_COLUMNS.get(group_by)
+        if group_col:
+            select_group = f", {group_col} as group_name"
+            order_sql = f"{group_col}, e.name, e.id"
+        else:
+            # Không nhóm: duyệt theo rowid, SQLite không cần sắp xếp tạm
+            select_group = ""
+            order_sql = "e.id"
+        query = f'''
+            SELECT e.id, e.name, e.serial_number, c.name as category, e.manufacturer,
+                   e.manufacture_year, s.name as status, e.location, u.name as unit_name{select_group}
+            FROM equipment e
+            LEFT JOIN units u ON e.unit_id = u.id
+            {cls.LOOKUP_JOINS}
+            {where_sql}
+            ORDER BY {order_sql}
+        '''
+        return Database().iter_rows(query, tuple(params), chunk_size)
+
+    # Cột xuất CSV/Excel: (biểu thức SQL, tiêu đề)
+    EXPORT_COLUMNS = [
+        ("e.id", "ID"),
+        ("e.name", "Tên thiết bị"),
+        ("e.serial_number", "Số hiệu"),
+        ("c.name", "Loại"),
+        ("e.manufacturer", "Nhà sản xuất"),
+        ("e.manufacture_year", "Năm SX"),
+        ("s.name", "Tình trạng"),
+        ("ls.name", "TT cho mượn"),
+        ("u.name", "Đơn vị"),
+        ("e.location", "Vị trí"),
+        ("e.receive_date", "Ngày cấp phát"),
+        ("e.description", "Mô tả"),
+    ]
+
+    @classmethod
+    def iter_export_rows(cls, filters: dict = None, chunk_size: int = 5000) -> Iterator[list]:
+        """Stream EXPORT_COLUMNS rows from a DB cursor (tabular export)"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        columns = ", ".join(expr for expr, _ in cls.EXPORT_COLUMNS)
+        return Database().iter_rows(f'''
+            SELECT {columns}
+            FROM equipment e
+            LEFT JOIN units u ON e.unit_id = u.id
+            {cls.LOOKUP_JOINS}
+            {where_sql}
+            ORDER BY e.id
+        ''', tuple(params), chunk_size)
+
+    @classmethod
+    def count_filtered(cls, filters: dict = None) -> int:
+        """Count equipment matching the view filters"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        row = Database().fetch_one(f'''
+            SELECT COUNT(*) as count
+            FROM equipment e
+            {where_sql}
+        ''', tuple(params))
+        return row['count'] if row else 0
+
+    @classmethod
+    def get_ids_filtered(cls, filters: dict = None) -> List[int]:
+        """IDs of all equipment matching the view filters, ordered by name"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        rows = Database().fetch_all(f'''
+            SELECT e.id
+            FROM equipment e
+            {where_sql}
+            ORDER BY e.name, e.id
+        ''', tuple(params))
+        return [row['id'] for row in rows]
+
+    @classmethod
+    def count_by_group(cls, filters: dict = None, group_by: str = None) -> dict:
+        """Count filtered equipment per report group (unit or category name)"""
+        group_col = cls.REPORT_GROUP_COLUMNS.get(group_by)
+        if not group_col:
+            return {}
+        where_sql, params = cls.build_filter(**(filters or {}))
+        rows = Database().fetch_all(f'''
+            SELECT {group_col} as group_name, COUNT(*) as count
+            FROM equipment e
+            LEFT JOIN units u ON e.unit_id = u.id
+            LEFT JOIN categories c ON e.category_id = c.id
+            {where_sql}
+            GROUP BY group_name
+        ''', tuple(params))
+        return {row['group_name']: row['count'] for row in rows}
+
     @classmethod
     def count(cls) -> int:
         """Get total equipment count"""
@@ -255,7 +473,32 @@ class Equipment:
                 (serial_number,)
             )
         return row is not None
-    
+
+    @classmethod
+    def check_active_pointers(cls, repair: bool = False) -> List[dict]:
+        """
+        Compare active_loan_id / active_maintenance_id with the log tables.
+        Returns one dict per wrong pointer; repair=True also rewrites them.
+        """
+        db = Database()
+        mismatches = []
+        for column, expected_sql in ACTIVE_POINTERS.items():
+            expected = expected_sql.format(equipment_id="e.id")
+            rows = db.fetch_all(f'''
+                SELECT e.id, e.{column} as stored, ({expected}) as expected
+                FROM equipment e
+                WHERE e.{column} IS NOT ({expected})
+            ''')
+            mismatches.extend(
+                {'equipment_id': row['id'], 'column': column,
+                 'stored': row['stored'], 'expected': row['expected']}
+                for row in rows
+            )
+            if repair and rows:
+                expected = expected_sql.format(equipment_id="equipment.id")
+                db.execute(f"UPDATE equipment SET {column} = ({expected}) WHERE {column} IS NOT ({expected})")
+        return mismatches
+
     @classmethod
     def _from_row(cls, row) -> 'Equipment':
         """Create Equipment instance from database row"""
@@ -263,18 +506,20 @@ class Equipment:
         equipment.id = row['id']
         equipment.name = row['name']
         equipment.serial_number = row['serial_number']
-        equipment.category = row['category']
+        equipment.category = LOOKUPS.name(CATEGORY, row['category_id'])
         equipment.manufacturer = row['manufacturer'] or ""
         equipment.manufacture_year = row['manufacture_year']
-        equipment.status = row['status']
+        equipment.status = LOOKUPS.name(STATUS_EQUIPMENT, row['status_id'])
         equipment.unit_id = row['unit_id']
         equipment.location = row['location'] or ""
         equipment.description = row['description'] or ""
         equipment.qr_code_path = row['qr_code_path'] or ""
-        equipment.receive_date = row['receive_date'] if 'receive_date' in row.keys() else None
-        equipment.loan_status = row['loan_status'] if 'loan_status' in row.keys() else "Đang ở kho"
-        equipment.created_at = row['created_at']
-        equipment.updated_at = row['updated_at']
+        equipment.receive_date = parse_timestamp(row['receive_date']) if 'receive_date' in row.keys() else None
+        equipment.loan_status = LOOKUPS.name(STATUS_EQUIPMENT_LOAN, row['loan_status_id']) or "Đang ở kho"
+        equipment.created_at = parse_timestamp(row['created_at'], utc=True)
+        equipment.updated_at = parse_timestamp(row['updated_at'], utc=True)
+        equipment.active_loan_id = row['active_loan_id']
+        equipment.active_maintenance_id = row['active_maintenance_id']
         # Handle unit_name from JOIN query
         try:
             equipment.unit_name = row['unit_name'] or ""
@@ -306,6 +551,8 @@ class Equipment:
             'qr_code_path': self.qr_code_path,
             'receive_date': str(self.receive_date) if self.receive_date else None,
             'loan_status': self.loan_status,
+            'active_loan_id': self.active_loan_id,
+            'active_maintenance_id': self.active_maintenance_id,
             'created_at': str(self.created_at) if self.created_at else None,
             'updated_at': str(self.updated_at) if self.updated_at else None,
             'images': self.images # [MỚI] Xuất list ảnh khi gọi dict
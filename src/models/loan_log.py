@@ -3,8 +3,9 @@ LoanLog Model - Represents equipment loan/borrowing history
 """
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
-from .database import Database
+from typing import Optional, List, Dict, Tuple, Iterator
+from .database import Database, ID_BATCH_SIZE, day_range, parse_timestamp, to_db_timestamp
+from .lookups import LOOKUPS, STATUS_LOAN
 
 
 @dataclass
@@ -44,14 +45,14 @@ class LoanLog:
         query = '''
             INSERT INTO loan_log 
             (equipment_id, borrower_unit, loan_date, expected_return_date, 
-             return_date, status, notes, created_by)
+             return_date, status_id, notes, created_by)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         '''
         loan_date = self.loan_date or datetime.now()
         params = (
-            self.equipment_id, self.borrower_unit, loan_date,
-            self.expected_return_date, self.return_date, 
-            self.status, self.notes, self.created_by
+            self.equipment_id, self.borrower_unit, to_db_timestamp(loan_date),
+            to_db_timestamp(self.expected_return_date), to_db_timestamp(self.return_date),
+            LOOKUPS.ensure_id(STATUS_LOAN, self.status), self.notes, self.created_by
         )
         self.id = self.db.insert(query, params)
         return self.id
@@ -60,13 +61,13 @@ class LoanLog:
         query = '''
             UPDATE loan_log SET
                 equipment_id = ?, borrower_unit = ?, loan_date = ?,
-                expected_return_date = ?, return_date = ?, status = ?, notes = ?
+                expected_return_date = ?, return_date = ?, status_id = ?, notes = ?
             WHERE id = ?
         '''
         params = (
-            self.equipment_id, self.borrower_unit, self.loan_date,
-            self.expected_return_date, self.return_date, 
-            self.status, self.notes, self.id
+            self.equipment_id, self.borrower_unit, to_db_timestamp(self.loan_date),
+            to_db_timestamp(self.expected_return_date), to_db_timestamp(self.return_date),
+            LOOKUPS.ensure_id(STATUS_LOAN, self.status), self.notes, self.id
         )
         self.db.execute(query, params)
         return self.id
@@ -139,16 +140,35 @@ class LoanLog:
             logs.append(log)
         return logs
     
+    @classmethod
+    def get_by_equipment_ids(cls, equipment_ids: List[int]) -> Dict[int, List['LoanLog']]:
+        """Prefetch loan logs of many equipment in a few IN queries (without images)"""
+        db = Database()
+        result: Dict[int, List['LoanLog']] = {}
+        ids = list(dict.fromkeys(equipment_ids))
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            batch = ids[start:start + ID_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = db.fetch_all(f'''
+                SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
+                FROM loan_log l
+                JOIN equipment e ON l.equipment_id = e.id
+                WHERE l.equipment_id IN ({placeholders})
+                ORDER BY l.equipment_id, l.loan_date DESC
+            ''', tuple(batch))
+            for row in rows:
+                result.setdefault(row['equipment_id'], []).append(cls._from_row(row))
+        return result
+    
     @classmethod
     def get_active_by_equipment(cls, equipment_id: int) -> Optional['LoanLog']:
         db = Database()
+        # equipment.active_loan_id do trigger duy trì: hai lần đọc theo khóa chính
         row = db.fetch_one('''
             SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
-            FROM loan_log l
-            JOIN equipment e ON l.equipment_id = e.id
-            WHERE l.equipment_id = ? AND l.status = 'Đang mượn'
-            ORDER BY l.loan_date DESC
-            LIMIT 1
+            FROM equipment e
+            JOIN loan_log l ON l.id = e.active_loan_id
+            WHERE e.id = ?
         ''', (equipment_id,))
         if row:
             log = cls._from_row(row)
@@ -163,9 +183,9 @@ class LoanLog:
             SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
             FROM loan_log l
             JOIN equipment e ON l.equipment_id = e.id
-            WHERE l.status = 'Đang mượn'
+            WHERE l.status_id = ?
             ORDER BY l.loan_date DESC
-        ''')
+        ''', (LOOKUPS.find_id(STATUS_LOAN, 'Đang mượn'),))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
@@ -192,60 +212,95 @@ class LoanLog:
         ''', (limit,))
         return [cls._from_row(row) for row in rows]
     
+    # Cột xuất CSV/Excel: (biểu thức SQL, tiêu đề)
+    EXPORT_COLUMNS = [
+        ("l.id", "ID"),
+        ("e.name", "Thiết bị"),
+        ("e.serial_number", "Số hiệu"),
+        ("l.borrower_unit", "Đơn vị mượn"),
+        ("l.loan_date", "Ngày mượn"),
+        ("l.expected_return_date", "Ngày hẹn trả"),
+        ("l.return_date", "Ngày trả"),
+        ("s.name", "Trạng thái"),
+        ("l.notes", "Ghi chú"),
+    ]
+    
+    @staticmethod
+    def build_filter(keyword: str = None, status: str = None,
+                     start_date=None, end_date=None) -> Tuple[str, list]:
+        """WHERE clause matching the filters of LoanListView (loan_date range)"""
+        clauses = []
+        params = []
+        if keyword:
+            pattern = f"%{keyword}%"
+            clauses.append("(l.borrower_unit LIKE ? OR e.serial_number LIKE ? OR e.name LIKE ?)")
+            params.extend([pattern, pattern, pattern])
+        if status:
+            clauses.append("l.status_id = ?")
+            params.append(LOOKUPS.find_id(STATUS_LOAN, status))
+        if start_date and end_date:
+            clauses.append("l.loan_date >= ? AND l.loan_date < ?")
+            params.extend(day_range(start_date, end_date))
+        where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where_sql, params
+    
+    @classmethod
+    def iter_export_rows(cls, filters: dict = None, chunk_size: int = 5000) -> Iterator[list]:
+        """Stream EXPORT_COLUMNS rows from a DB cursor, newest loans first"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        columns = ", ".join(expr for expr, _ in cls.EXPORT_COLUMNS)
+        return Database().iter_rows(f'''
+            SELECT {columns}
+            FROM loan_log l
+            JOIN equipment e ON l.equipment_id = e.id
+            LEFT JOIN statuses s ON l.status_id = s.id
+            {where_sql}
+            ORDER BY l.loan_date DESC, l.id DESC
+        ''', tuple(params), chunk_size)
+    
+    @classmethod
+    def count_filtered(cls, filters: dict = None) -> int:
+        where_sql, params = cls.build_filter(**(filters or {}))
+        row = Database().fetch_one(f'''
+            SELECT COUNT(*) as count
+            FROM loan_log l
+            JOIN equipment e ON l.equipment_id = e.id
+            {where_sql}
+        ''', tuple(params))
+        return row['count'] if row else 0
+    
     @classmethod
     def get_by_date_range(cls, start_date, end_date=None) -> List['LoanLog']:
         db = Database()
-        start_str = start_date.strftime('%Y-%m-%d')
-        if end_date:
-            end_str = end_date.strftime('%Y-%m-%d')
-            rows = db.fetch_all('''
-                SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM loan_log l
-                JOIN equipment e ON l.equipment_id = e.id
-                WHERE DATE(l.loan_date) >= ? AND DATE(l.loan_date) <= ?
-                ORDER BY l.loan_date DESC
-            ''', (start_str, end_str))
-        else:
-            rows = db.fetch_all('''
-                SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM loan_log l
-                JOIN equipment e ON l.equipment_id = e.id
-                WHERE DATE(l.loan_date) = ?
-                ORDER BY l.loan_date DESC
-            ''', (start_str,))
+        rows = db.fetch_all('''
+            SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
+            FROM loan_log l
+            JOIN equipment e ON l.equipment_id = e.id
+            WHERE l.loan_date >= ? AND l.loan_date < ?
+            ORDER BY l.loan_date DESC
+        ''', day_range(start_date, end_date or start_date))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
     def get_by_equipment_and_date(cls, equipment_id: int, start_date=None, end_date=None) -> List['LoanLog']:
-        db = Database()
-        if start_date and end_date:
-            start_str = start_date.strftime('%Y-%m-%d')
-            end_str = end_date.strftime('%Y-%m-%d')
-            rows = db.fetch_all('''
-                SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM loan_log l
-                JOIN equipment e ON l.equipment_id = e.id
-                WHERE l.equipment_id = ? AND DATE(l.loan_date) >= ? AND DATE(l.loan_date) <= ?
-                ORDER BY l.loan_date DESC
-            ''', (equipment_id, start_str, end_str))
-        elif start_date:
-            start_str = start_date.strftime('%Y-%m-%d')
-            rows = db.fetch_all('''
-                SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM loan_log l
-                JOIN equipment e ON l.equipment_id = e.id
-                WHERE l.equipment_id = ? AND DATE(l.loan_date) = ?
-                ORDER BY l.loan_date DESC
-            ''', (equipment_id, start_str))
-        else:
+        if not start_date:
             return cls.get_by_equipment(equipment_id)
+        db = Database()
+        rows = db.fetch_all('''
+            SELECT l.*, e.name as equipment_name, e.serial_number as equipment_serial
+            FROM loan_log l
+            JOIN equipment e ON l.equipment_id = e.id
+            WHERE l.equipment_id = ? AND l.loan_date >= ? AND l.loan_date < ?
+            ORDER BY l.loan_date DESC
+        ''', (equipment_id, *day_range(start_date, end_date or start_date)))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
     def count_active(cls) -> int:
         db = Database()
         row = db.fetch_one(
-            "SELECT COUNT(*) as count FROM loan_log WHERE status = 'Đang mượn'"
+            "SELECT COUNT(*) as count FROM loan_log WHERE status_id = ?",
+            (LOOKUPS.find_id(STATUS_LOAN, 'Đang mượn'),)
         )
         return row['count'] if row else 0
     
@@ -255,12 +310,12 @@ class LoanLog:
         log.id = row['id']
         log.equipment_id = row['equipment_id']
         log.borrower_unit = row['borrower_unit'] or ""
-        log.loan_date = row['loan_date']
-        log.expected_return_date = row['expected_return_date']
-        log.return_date = row['return_date']
-        log.status = row['status']
+        log.loan_date = parse_timestamp(row['loan_date'])
+        log.expected_return_date = parse_timestamp(row['expected_return_date'])
+        log.return_date = parse_timestamp(row['return_date'])
+        log.status = LOOKUPS.name(STATUS_LOAN, row['status_id'])
         log.notes = row['notes'] or ""
-        log.created_at = row['created_at']
+        log.created_at = parse_timestamp(row['created_at'], utc=True)
         log.created_by = row['created_by'] if 'created_by' in row.keys() else None
         
         if 'equipment_name' in row.keys():
@@ -292,4 +347,4 @@ class LoanLog:
 LOAN_STATUS = [
     "Đang mượn",
     "Đã trả"
-]
\ No newline at end of file
+]
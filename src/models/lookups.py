@@ -0,0 +1,96 @@
+"""
+Lookup cache - name <-> id maps for categories, maintenance types and statuses
+"""
+import threading
+from typing import Dict, Optional
+
+from .database import Database
+
+# Loại tra cứu. Loại thiết bị và loại công việc có bảng riêng;
+# các loại trạng thái dùng chung bảng statuses, phân biệt bằng cột kind.
+CATEGORY = "category"
+MAINTENANCE_TYPE = "maintenance_type"
+STATUS_EQUIPMENT = "equipment"
+STATUS_EQUIPMENT_LOAN = "equipment_loan"
+STATUS_MAINTENANCE = "maintenance"
+STATUS_LOAN = "loan"
+
+_TABLES = {
+    CATEGORY: "categories",
+    MAINTENANCE_TYPE: "maintenance_types",
+}
+
+
+class LookupCache:
+    """
+    Process-wide dictionaries behind the integer keys stored in equipment,
+    maintenance_log and loan_log. Loaded in one pass on first use (the tables
+    hold a few dozen rows) and dropped by invalidate() after any edit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Optional[Dict[str, Dict[str, int]]] = None
+        self._names: Optional[Dict[str, Dict[int, str]]] = None
+        # Tăng sau mỗi lần xoá cache: bộ đệm giữ tên đã tra (vd. tra cứu quét) so sánh để tự làm mới
+        self.version = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+            self._names = None
+            self.version += 1
+
+    def _load(self):
+        with self._lock:
+            if self._ids is not None:
+                return self._ids, self._names
+            db = Database()
+            ids: Dict[str, Dict[str, int]] = {}
+            names: Dict[str, Dict[int, str]] = {}
+            for kind, table in _TABLES.items():
+                rows = db.fetch_all(f"SELECT id, name FROM {table}")
+                ids[kind] = {row['name']: row['id'] for row in rows}
+                names[kind] = {row['id']: row['name'] for row in rows}
+            for row in db.fetch_all("SELECT id, kind, name FROM statuses"):
+                ids.setdefault(row['kind'], {})[row['name']] = row['id']
+                names.setdefault(row['kind'], {})[row['id']] = row['name']
+            self._ids, self._names = ids, names
+            return ids, names
+
+    def name(self, kind: str, key: Optional[int]) -> str:
+        """Display name for a stored id ("" for NULL or an unknown id)"""
+        if key is None:
+            return ""
+        return self._load()[1].get(kind, {}).get(key, "")
+
+    def find_id(self, kind: str, name: Optional[str]) -> Optional[int]:
+        """Id for a name, or None if it does not exist (filters then match nothing)"""
+        if not name:
+            return None
+        return self._load()[0].get(kind, {}).get(name)
+
+    def ensure_id(self, kind: str, name: Optional[str]) -> Optional[int]:
+        """Id for a name, adding the name to its lookup table if it is new"""
+        if not name:
+            return None
+        key = self.find_id(kind, name)
+        if key is not None:
+            return key
+        db = Database()
+        table = _TABLES.get(kind)
+        if table:
+            db.execute(f"INSERT OR IGNORE INTO {table} (name, is_active) VALUES (?, 1)", (name,))
+            row = db.fetch_one(f"SELECT id FROM {table} WHERE name = ?", (name,))
+        else:
+            db.execute("INSERT OR IGNORE INTO statuses (kind, name) VALUES (?, ?)", (kind, name))
+            row = db.fetch_one("SELECT id FROM statuses WHERE kind = ? AND name = ?", (kind, name))
+        self.invalidate()
+        return row['id']
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Copy of every name -> id map (for bulk writers such as imports)"""
+        return {kind: dict(mapping) for kind, mapping in self._load()[0].items()}
+
+
+LOOKUPS = LookupCache()
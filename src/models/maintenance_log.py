@@ -3,8 +3,9 @@ MaintenanceLog Model - Represents maintenance/repair history
 """
 from dataclasses import dataclass, field # [MỚI] Import field
 from datetime import datetime
-from typing import Optional, List
-from .database import Database
+from typing import Optional, List, Dict, Tuple, Iterator
+from .database import Database, ID_BATCH_SIZE, day_range, parse_timestamp, to_db_timestamp
+from .lookups import LOOKUPS, MAINTENANCE_TYPE, STATUS_MAINTENANCE
 
 
 @dataclass
@@ -44,15 +45,16 @@ class MaintenanceLog:
         """Insert new maintenance log"""
         query = '''
             INSERT INTO maintenance_log 
-            (equipment_id, maintenance_type, description, technician_name, 
-             technician_id, status, start_date, end_date, notes, created_by)
+            (equipment_id, maintenance_type_id, description, technician_name, 
+             technician_id, status_id, start_date, end_date, notes, created_by)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         '''
         start_date = self.start_date or datetime.now()
         params = (
-            self.equipment_id, self.maintenance_type, self.description,
-            self.technician_name, self.technician_id, self.status, 
-            start_date, self.end_date, self.notes, self.created_by
+            self.equipment_id, LOOKUPS.ensure_id(MAINTENANCE_TYPE, self.maintenance_type),
+            self.description, self.technician_name, self.technician_id,
+            LOOKUPS.ensure_id(STATUS_MAINTENANCE, self.status),
+            to_db_timestamp(start_date), to_db_timestamp(self.end_date), self.notes, self.created_by
         )
         self.id = self.db.insert(query, params)
         return self.id
@@ -61,15 +63,16 @@ class MaintenanceLog:
         """Update existing maintenance log"""
         query = '''
             UPDATE maintenance_log SET
-                equipment_id = ?, maintenance_type = ?, description = ?,
-                technician_name = ?, technician_id = ?, status = ?, 
+                equipment_id = ?, maintenance_type_id = ?, description = ?,
+                technician_name = ?, technician_id = ?, status_id = ?, 
                 start_date = ?, end_date = ?, notes = ?
             WHERE id = ?
         '''
         params = (
-            self.equipment_id, self.maintenance_type, self.description,
-            self.technician_name, self.technician_id, self.status, 
-            self.start_date, self.end_date, self.notes, self.id
+            self.equipment_id, LOOKUPS.ensure_id(MAINTENANCE_TYPE, self.maintenance_type),
+            self.description, self.technician_name, self.technician_id,
+            LOOKUPS.ensure_id(STATUS_MAINTENANCE, self.status),
+            to_db_timestamp(self.start_date), to_db_timestamp(self.end_date), self.notes, self.id
         )
         self.db.execute(query, params)
         return self.id
@@ -145,17 +148,39 @@ class MaintenanceLog:
             logs.append(log)
         return logs
     
+    @classmethod
+    def get_by_equipment_ids(cls, equipment_ids: List[int]) -> Dict[int, List['MaintenanceLog']]:
+        """
+        Prefetch maintenance logs of many equipment in a few IN queries.
+        Images are not loaded (batch reports do not print them).
+        """
+        db = Database()
+        result: Dict[int, List['MaintenanceLog']] = {}
+        ids = list(dict.fromkeys(equipment_ids))
+        for start in range(0, len(ids), ID_BATCH_SIZE):
+            batch = ids[start:start + ID_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = db.fetch_all(f'''
+                SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
+                FROM maintenance_log m
+                JOIN equipment e ON m.equipment_id = e.id
+                WHERE m.equipment_id IN ({placeholders})
+                ORDER BY m.equipment_id, m.start_date DESC
+            ''', tuple(batch))
+            for row in rows:
+                result.setdefault(row['equipment_id'], []).append(cls._from_row(row))
+        return result
+    
     @classmethod
     def get_active_by_equipment(cls, equipment_id: int) -> Optional['MaintenanceLog']:
         """Get active (ongoing) maintenance log for an equipment, returns None if no active log"""
         db = Database()
+        # equipment.active_maintenance_id do trigger duy trì: hai lần đọc theo khóa chính
         row = db.fetch_one('''
             SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
-            FROM maintenance_log m
-            JOIN equipment e ON m.equipment_id = e.id
-            WHERE m.equipment_id = ? AND m.status != 'Hoàn thành'
-            ORDER BY m.start_date DESC
-            LIMIT 1
+            FROM equipment e
+            JOIN maintenance_log m ON m.id = e.active_maintenance_id
+            WHERE e.id = ?
         ''', (equipment_id,))
         if row:
             log = cls._from_row(row)
@@ -171,9 +196,9 @@ class MaintenanceLog:
             SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
             FROM maintenance_log m
             JOIN equipment e ON m.equipment_id = e.id
-            WHERE m.status = 'Đang thực hiện'
+            WHERE m.status_id = ?
             ORDER BY m.start_date DESC
-        ''')
+        ''', (LOOKUPS.find_id(STATUS_MAINTENANCE, 'Đang thực hiện'),))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
@@ -206,65 +231,102 @@ class MaintenanceLog:
     def get_today(cls) -> List['MaintenanceLog']:
         """Get maintenance logs created/updated today"""
         db = Database()
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = datetime.now()
         rows = db.fetch_all('''
             SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
             FROM maintenance_log m
             JOIN equipment e ON m.equipment_id = e.id
-            WHERE DATE(m.start_date) = ? OR DATE(m.created_at) = ?
+            WHERE (m.start_date >= ? AND m.start_date < ?)
+               OR (m.created_at >= ? AND m.created_at < ?)
             ORDER BY m.start_date DESC
-        ''', (today, today))
+        ''', day_range(today, today) + day_range(today, today, utc=True))
         return [cls._from_row(row) for row in rows]
     
+    # Cột xuất CSV/Excel: (biểu thức SQL, tiêu đề)
+    EXPORT_COLUMNS = [
+        ("m.id", "ID"),
+        ("e.name", "Thiết bị"),
+        ("e.serial_number", "Số hiệu"),
+        ("mt.name", "Loại công việc"),
+        ("m.description", "Mô tả"),
+        ("m.technician_name", "Kỹ thuật viên"),
+        ("m.start_date", "Ngày bắt đầu"),
+        ("m.end_date", "Ngày kết thúc"),
+        ("s.name", "Trạng thái"),
+        ("m.notes", "Ghi chú"),
+    ]
+    
+    @staticmethod
+    def build_filter(keyword: str = None, status: str = None,
+                     start_date: datetime = None, end_date: datetime = None) -> Tuple[str, list]:
+        """WHERE clause matching the filters of MaintenanceListView (start_date range)"""
+        clauses = []
+        params = []
+        if keyword:
+            pattern = f"%{keyword}%"
+            clauses.append("(e.name LIKE ? OR e.serial_number LIKE ?)")
+            params.extend([pattern, pattern])
+        if status:
+            clauses.append("m.status_id = ?")
+            params.append(LOOKUPS.find_id(STATUS_MAINTENANCE, status))
+        if start_date and end_date:
+            clauses.append("m.start_date >= ? AND m.start_date < ?")
+            params.extend(day_range(start_date, end_date))
+        where_sql = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where_sql, params
+    
+    @classmethod
+    def iter_export_rows(cls, filters: dict = None, chunk_size: int = 5000) -> Iterator[list]:
+        """Stream EXPORT_COLUMNS rows from a DB cursor, newest first"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        columns = ", ".join(expr for expr, _ in cls.EXPORT_COLUMNS)
+        return Database().iter_rows(f'''
+            SELECT {columns}
+            FROM maintenance_log m
+            JOIN equipment e ON m.equipment_id = e.id
+            LEFT JOIN maintenance_types mt ON m.maintenance_type_id = mt.id
+            LEFT JOIN statuses s ON m.status_id = s.id
+            {where_sql}
+            ORDER BY m.start_date DESC, m.id DESC
+        ''', tuple(params), chunk_size)
+    
+    @classmethod
+    def count_filtered(cls, filters: dict = None) -> int:
+        where_sql, params = cls.build_filter(**(filters or {}))
+        row = Database().fetch_one(f'''
+            SELECT COUNT(*) as count
+            FROM maintenance_log m
+            JOIN equipment e ON m.equipment_id = e.id
+            {where_sql}
+        ''', tuple(params))
+        return row['count'] if row else 0
+    
     @classmethod
     def get_by_date_range(cls, start_date: datetime, end_date: datetime = None) -> List['MaintenanceLog']:
-        """Get maintenance logs within a date range"""
+        """Get maintenance logs within a date range (a single day if end_date is omitted)"""
         db = Database()
-        start_str = start_date.strftime('%Y-%m-%d')
-        if end_date:
-            end_str = end_date.strftime('%Y-%m-%d')
-            rows = db.fetch_all('''
-                SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM maintenance_log m
-                JOIN equipment e ON m.equipment_id = e.id
-                WHERE DATE(m.start_date) >= ? AND DATE(m.start_date) <= ?
-                ORDER BY m.start_date DESC
-            ''', (start_str, end_str))
-        else:
-            rows = db.fetch_all('''
-                SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM maintenance_log m
-                JOIN equipment e ON m.equipment_id = e.id
-                WHERE DATE(m.start_date) = ?
-                ORDER BY m.start_date DESC
-            ''', (start_str,))
+        rows = db.fetch_all('''
+            SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
+            FROM maintenance_log m
+            JOIN equipment e ON m.equipment_id = e.id
+            WHERE m.start_date >= ? AND m.start_date < ?
+            ORDER BY m.start_date DESC
+        ''', day_range(start_date, end_date or start_date))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
     def get_by_equipment_and_date(cls, equipment_id: int, start_date: datetime = None, end_date: datetime = None) -> List['MaintenanceLog']:
         """Get maintenance logs for equipment within optional date range"""
-        db = Database()
-        if start_date and end_date:
-            start_str = start_date.strftime('%Y-%m-%d')
-            end_str = end_date.strftime('%Y-%m-%d')
-            rows = db.fetch_all('''
-                SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM maintenance_log m
-                JOIN equipment e ON m.equipment_id = e.id
-                WHERE m.equipment_id = ? AND DATE(m.start_date) >= ? AND DATE(m.start_date) <= ?
-                ORDER BY m.start_date DESC
-            ''', (equipment_id, start_str, end_str))
-        elif start_date:
-            start_str = start_date.strftime('%Y-%m-%d')
-            rows = db.fetch_all('''
-                SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
-                FROM maintenance_log m
-                JOIN equipment e ON m.equipment_id = e.id
-                WHERE m.equipment_id = ? AND DATE(m.start_date) = ?
-                ORDER BY m.start_date DESC
-            ''', (equipment_id, start_str))
-        else:
+        if not start_date:
             return cls.get_by_equipment(equipment_id)
+        db = Database()
+        rows = db.fetch_all('''
+            SELECT m.*, e.name as equipment_name, e.serial_number as equipment_serial
+            FROM maintenance_log m
+            JOIN equipment e ON m.equipment_id = e.id
+            WHERE m.equipment_id = ? AND m.start_date >= ? AND m.start_date < ?
+            ORDER BY m.start_date DESC
+        ''', (equipment_id, *day_range(start_date, end_date or start_date)))
         return [cls._from_row(row) for row in rows]
     
     @classmethod
@@ -272,7 +334,8 @@ class MaintenanceLog:
         """Count active maintenance logs"""
         db = Database()
         row = db.fetch_one(
-            "SELECT COUNT(*) as count FROM maintenance_log WHERE status = 'Đang thực hiện'"
+            "SELECT COUNT(*) as count FROM maintenance_log WHERE status_id = ?",
+            (LOOKUPS.find_id(STATUS_MAINTENANCE, 'Đang thực hiện'),)
         )
         return row['count'] if row else 0
     
@@ -282,15 +345,15 @@ class MaintenanceLog:
         log = cls()
         log.id = row['id']
         log.equipment_id = row['equipment_id']
-        log.maintenance_type = row['maintenance_type']
+        log.maintenance_type = LOOKUPS.name(MAINTENANCE_TYPE, row['maintenance_type_id'])
         log.description = row['description'] or ""
         log.technician_name = row['technician_name'] or ""
         log.technician_id = row['technician_id']
-        log.status = row['status']
-        log.start_date = row['start_date']
-        log.end_date = row['end_date']
+        log.status = LOOKUPS.name(STATUS_MAINTENANCE, row['status_id'])
+        log.start_date = parse_timestamp(row['start_date'])
+        log.end_date = parse_timestamp(row['end_date'])
         log.notes = row['notes'] or ""
-        log.created_at = row['created_at']
+        log.created_at = parse_timestamp(row['created_at'], utc=True)
         log.created_by = row['created_by'] if 'created_by' in row.keys() else None
         
         if 'equipment_name' in row.keys():
@@ -4,7 +4,8 @@ Maintenance Type Model - Represents maintenance work types
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
-from .database import Database
+from .database import Database, parse_timestamp
+from .lookups import LOOKUPS
 
 
 @dataclass
@@ -25,10 +26,9 @@ class MaintenanceType:
     
     def save(self) -> int:
         """Save maintenance type to database (insert or update)"""
-        if self.id:
-            return self._update()
-        else:
-            return self._insert()
+        type_id = self._update() if self.id else self._insert()
+        LOOKUPS.invalidate()
+        return type_id
     
     def _insert(self) -> int:
         """Insert new maintenance type"""
@@ -44,14 +44,7 @@ class MaintenanceType:
         return self.id
     
     def _update(self) -> int:
-        """Update existing maintenance type with Cascade Update for logs"""
-        # [BƯỚC 1] Lấy tên cũ trước khi cập nhật
-        old_name = None
-        current_row = self.db.fetch_one("SELECT name FROM maintenance_types WHERE id = ?", (self.id,))
-        if current_row:
-            old_name = current_row['name']
-
-        # [BƯỚC 2] Cập nhật thông tin mới vào bảng loại công việc
+        """Update existing maintenance type (logs reference it by id, so a rename needs no cascade)"""
         query = '''
             UPDATE maintenance_types SET
                 name = ?, code = ?, description = ?,
@@ -63,17 +56,6 @@ class MaintenanceType:
             1 if self.is_active else 0, self.id
         )
         self.db.execute(query, params)
-
-        # [BƯỚC 3] QUAN TRỌNG: Nếu tên thay đổi, cập nhật đồng loạt trong bảng nhật ký (maintenance_log)
-        # Để đảm bảo tính nhất quán dữ liệu và số lượng đếm không bị về 0
-        if old_name and old_name != self.name:
-            try:
-                update_log_query = "UPDATE maintenance_log SET maintenance_type = ? WHERE maintenance_type = ?"
-                self.db.execute(update_log_query, (self.name, old_name))
-                print(f"Đã cập nhật tên loại công việc từ '{old_name}' thành '{self.name}' trong lịch sử bảo dưỡng.")
-            except Exception as e:
-                print(f"Lỗi khi cập nhật đồng bộ tên loại công việc: {e}")
-            
         return self.id
     
     def delete(self) -> bool:
@@ -90,16 +72,16 @@ class MaintenanceType:
             return False
         query = "DELETE FROM maintenance_types WHERE id = ?"
         self.db.execute(query, (self.id,))
+        LOOKUPS.invalidate()
         return True
 
     def get_maintenance_count(self) -> int:
         """Get count of maintenance logs using this type"""
-        if not self.name:
+        if not self.id:
             return 0
-        # Sử dụng đúng tên bảng 'maintenance_log' (số ít)
         row = self.db.fetch_one(
-            "SELECT COUNT(*) as count FROM maintenance_log WHERE maintenance_type = ?", 
-            (self.name,)
+            "SELECT COUNT(*) as count FROM maintenance_log WHERE maintenance_type_id = ?", 
+            (self.id,)
         )
         return row['count'] if row else 0
     
@@ -181,8 +163,8 @@ class MaintenanceType:
             code=row['code'] or "",
             description=row['description'] or "",
             is_active=bool(row['is_active']),
-            created_at=row['created_at'],
-            updated_at=row['updated_at']
+            created_at=parse_timestamp(row['created_at'], utc=True),
+            updated_at=parse_timestamp(row['updated_at'], utc=True)
         )
     
     @classmethod
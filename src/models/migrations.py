@@ -0,0 +1,601 @@
+"""
+Versioned schema migrations keyed on PRAGMA user_version
+"""
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, List
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema step; apply() runs inside the shared migration transaction"""
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """ALTER TABLE ... ADD COLUMN, skipped if a pre-migration DB already has it"""
+    if not _column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _create_index(conn: sqlite3.Connection, name: str, table: str, columns: str):
+    """Create an index and log how long it took (slow on large tables)"""
+    started = time.perf_counter()
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})")
+    print(f"[migration]   index {name}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def _v1_base_schema(conn: sqlite3.Connection):
+    """
+    Baseline schema. Uses IF NOT EXISTS so databases created before
+    migrations existed (user_version = 0) are adopted in place.
+    """
+    # Categories table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            code TEXT,
+            description TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Units table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS units (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            code TEXT UNIQUE,
+            parent_id INTEGER,
+            level INTEGER DEFAULT 0,
+            address TEXT,
+            phone TEXT,
+            commander TEXT,
+            description TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (parent_id) REFERENCES units(id) ON DELETE SET NULL
+        )
+    ''')
+    
+    # Users table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            full_name TEXT,
+            email TEXT,
+            phone TEXT,
+            role TEXT DEFAULT 'viewer',
+            unit_id INTEGER,
+            is_active INTEGER DEFAULT 1,
+            last_login TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    
+    # Equipment table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS equipment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            serial_number TEXT UNIQUE NOT NULL,
+            category TEXT NOT NULL,
+            manufacturer TEXT,
+            manufacture_year INTEGER,
+            status TEXT DEFAULT 'Trong kho',
+            unit_id INTEGER,
+            location TEXT,
+            description TEXT,
+            qr_code_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    
+    # Maintenance log table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_id INTEGER NOT NULL,
+            maintenance_type TEXT NOT NULL,
+            description TEXT,
+            technician_id INTEGER,
+            technician_name TEXT,
+            status TEXT DEFAULT 'Đang thực hiện',
+            start_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            end_date TIMESTAMP,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (equipment_id) REFERENCES equipment(id) ON DELETE CASCADE,
+            FOREIGN KEY (technician_id) REFERENCES users(id) ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    
+    # Maintenance types table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_types (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            code TEXT,
+            description TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Loan log table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS loan_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_id INTEGER NOT NULL,
+            borrower_unit TEXT NOT NULL,
+            loan_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expected_return_date TIMESTAMP,
+            return_date TIMESTAMP,
+            status TEXT DEFAULT 'Đang mượn',
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (equipment_id) REFERENCES equipment(id) ON DELETE CASCADE,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+
+    # [MỚI] Audit Logs Table - Bảng ghi nhật ký hệ thống
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            username TEXT,
+            action TEXT NOT NULL,
+            target_type TEXT NOT NULL,
+            target_id INTEGER,
+            details TEXT,
+            ip_address TEXT DEFAULT 'localhost',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    
+    # [MỚI] Bảng lưu trữ đường dẫn Hình ảnh cho toàn hệ thống
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS item_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_type TEXT NOT NULL, 
+            target_id INTEGER NOT NULL, 
+            image_category TEXT DEFAULT 'general', -- [MỚI] 'before', 'after', 'general'
+            file_path TEXT NOT NULL,    
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Cột bổ sung cho CSDL cũ
+    _add_column(conn, "item_images", "image_category", "TEXT DEFAULT 'general'")
+    _add_column(conn, "equipment", "receive_date", "TIMESTAMP")
+    _add_column(conn, "equipment", "loan_status", "TEXT DEFAULT 'Đang ở kho'")
+    
+    _create_index(conn, "idx_units_code", "units", "code")
+    _create_index(conn, "idx_users_username", "users", "username")
+    _create_index(conn, "idx_users_role", "users", "role")
+    _create_index(conn, "idx_equipment_serial", "equipment", "serial_number")
+    _create_index(conn, "idx_equipment_status", "equipment", "status")
+    _create_index(conn, "idx_equipment_unit", "equipment", "unit_id")
+    _create_index(conn, "idx_maintenance_equipment", "maintenance_log", "equipment_id")
+    _create_index(conn, "idx_loan_equipment", "loan_log", "equipment_id")
+    _create_index(conn, "idx_loan_status", "loan_log", "status")
+    _create_index(conn, "idx_audit_created_at", "audit_logs", "created_at")
+    _create_index(conn, "idx_images_target", "item_images", "target_type, target_id")
+
+
+def _v2_default_data(conn: sqlite3.Connection):
+    """Seed superadmin, categories and maintenance types (once, not every launch)"""
+    from .user import User, UserRole
+    from .category import DEFAULT_CATEGORIES
+    from .maintenance_type import DEFAULT_MAINTENANCE_TYPES
+    
+    if conn.execute("SELECT 1 FROM users WHERE role = ?", (UserRole.SUPERADMIN,)).fetchone() is None:
+        # CSDL cũ có sẵn user 'admin' thì nâng quyền, ngược lại tạo mới
+        cursor = conn.execute("UPDATE users SET role = ? WHERE username = 'admin'", (UserRole.SUPERADMIN,))
+        if cursor.rowcount == 0:
+            password_hash, salt = User.hash_password("admin123")
+            conn.execute(
+                "INSERT INTO users (username, password_hash, salt, full_name, role, is_active) "
+                "VALUES ('admin', ?, ?, ?, ?, 1)",
+                (password_hash, salt, "Quản trị viên cao cấp", UserRole.SUPERADMIN)
+            )
+    
+    if conn.execute("SELECT 1 FROM categories LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO categories (name, code, description, is_active) VALUES (?, ?, ?, 1)",
+            DEFAULT_CATEGORIES
+        )
+    
+    if conn.execute("SELECT 1 FROM maintenance_types LIMIT 1").fetchone() is None:
+        conn.executemany(
+            "INSERT INTO maintenance_types (name, code, description, is_active) VALUES (?, ?, ?, 1)",
+            DEFAULT_MAINTENANCE_TYPES
+        )
+
+
+def _v3_filter_indexes(conn: sqlite3.Connection):
+    """
+    Indexes for the category/date/action filters found by benchmarks/query_plans.py.
+    The (equipment_id, date) pairs replace the single-column equipment_id indexes:
+    they serve the same lookups and also return each item's history already sorted.
+    """
+    _create_index(conn, "idx_equipment_category", "equipment", "category")
+    _create_index(conn, "idx_equipment_receive_date", "equipment", "receive_date")
+    _create_index(conn, "idx_maintenance_equipment_date", "maintenance_log", "equipment_id, start_date")
+    _create_index(conn, "idx_maintenance_start_date", "maintenance_log", "start_date")
+    _create_index(conn, "idx_maintenance_created_at", "maintenance_log", "created_at")
+    _create_index(conn, "idx_maintenance_status", "maintenance_log", "status")
+    _create_index(conn, "idx_loan_equipment_date", "loan_log", "equipment_id, loan_date")
+    _create_index(conn, "idx_loan_date", "loan_log", "loan_date")
+    _create_index(conn, "idx_audit_action", "audit_logs", "action")
+    conn.execute("DROP INDEX IF EXISTS idx_maintenance_equipment")
+    conn.execute("DROP INDEX IF EXISTS idx_loan_equipment")
+
+
+# Cột thời gian của từng bảng; business dates là giờ địa phương, *_at/last_login là UTC
+TIMESTAMP_COLUMNS = {
+    "categories": ("created_at", "updated_at"),
+    "units": ("created_at", "updated_at"),
+    "users": ("last_login", "created_at", "updated_at"),
+    "equipment": ("receive_date", "created_at", "updated_at"),
+    "maintenance_log": ("start_date", "end_date", "created_at"),
+    "maintenance_types": ("created_at", "updated_at"),
+    "loan_log": ("loan_date", "expected_return_date", "return_date", "created_at"),
+    "audit_logs": ("created_at",),
+    "item_images": ("created_at",),
+}
+
+
+def _v4_normalize_timestamps(conn: sqlite3.Connection):
+    """
+    Rewrite every timestamp as 'YYYY-MM-DD HH:MM:SS' (the CURRENT_TIMESTAMP shape).
+    Older rows mix Python's 'YYYY-MM-DD HH:MM:SS.ffffff', 'T' separators and bare
+    dates, which sort inconsistently against range bounds. Empty strings become
+    NULL; text SQLite cannot parse is left untouched.
+    """
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            canonical = f"strftime('%Y-%m-%d %H:%M:%S', {column})"
+            conn.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''")
+            cursor = conn.execute(f'''
+                UPDATE {table} SET {column} = {canonical}
+                WHERE typeof({column}) = 'text' AND {canonical} IS NOT NULL
+                  AND {column} != {canonical}
+            ''')
+            if cursor.rowcount:
+                print(f"[migration]   {table}.{column}: {cursor.rowcount} dòng")
+
+
+def _v5_lookup_keys(conn: sqlite3.Connection):
+    """
+    Replace the repeated display strings in equipment (category, status,
+    loan_status), maintenance_log (maintenance_type, status) and loan_log
+    (status) with integer keys into categories, maintenance_types and a new
+    statuses table. SQLite cannot change column types in place, so the three
+    tables are rebuilt; ids and every other column are copied unchanged.
+    Names found in the data but missing from a lookup table are added
+    (inactive for categories/types) so nothing is lost.
+    """
+    from ..config import EQUIPMENT_STATUS, LOAN_STATUS_OPTIONS
+    from .maintenance_log import MAINTENANCE_STATUS
+    from .loan_log import LOAN_STATUS
+    
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS statuses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (kind, name)
+        )
+    ''')
+    seeds = [("equipment", EQUIPMENT_STATUS), ("equipment_loan", LOAN_STATUS_OPTIONS),
+             ("maintenance", MAINTENANCE_STATUS), ("loan", LOAN_STATUS)]
+    for kind, names in seeds:
+        conn.executemany("INSERT OR IGNORE INTO statuses (kind, name) VALUES (?, ?)",
+                         [(kind, name) for name in names])
+    for kind, table, column in [("equipment", "equipment", "status"),
+                                ("equipment_loan", "equipment", "loan_status"),
+                                ("maintenance", "maintenance_log", "status"),
+                                ("loan", "loan_log", "status")]:
+        conn.execute(f'''
+            INSERT OR IGNORE INTO statuses (kind, name)
+            SELECT DISTINCT ?, {column} FROM {table} WHERE {column} IS NOT NULL AND {column} != ''
+        ''', (kind,))
+    conn.execute('''
+        INSERT OR IGNORE INTO categories (name, is_active)
+        SELECT DISTINCT category, 0 FROM equipment WHERE category IS NOT NULL AND category != ''
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO maintenance_types (name, is_active)
+        SELECT DISTINCT maintenance_type, 0 FROM maintenance_log
+        WHERE maintenance_type IS NOT NULL AND maintenance_type != ''
+    ''')
+
+    conn.execute('''
+        CREATE TABLE equipment_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            serial_number TEXT UNIQUE NOT NULL,
+            category_id INTEGER,
+            manufacturer TEXT,
+            manufacture_year INTEGER,
+            status_id INTEGER,
+            loan_status_id INTEGER,
+            unit_id INTEGER,
+            location TEXT,
+            description TEXT,
+            qr_code_path TEXT,
+            receive_date TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (category_id) REFERENCES categories(id),
+            FOREIGN KEY (status_id) REFERENCES statuses(id),
+            FOREIGN KEY (loan_status_id) REFERENCES statuses(id),
+            FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO equipment_new
+            (id, name, serial_number, category_id, manufacturer, manufacture_year, status_id,
+             loan_status_id, unit_id, location, description, qr_code_path, receive_date,
+             created_at, updated_at, created_by)
+        SELECT e.id, e.name, e.serial_number, c.id, e.manufacturer, e.manufacture_year, s.id,
+               ls.id, e.unit_id, e.location, e.description, e.qr_code_path, e.receive_date,
+               e.created_at, e.updated_at, e.created_by
+        FROM equipment e
+        LEFT JOIN categories c ON c.name = e.category
+        LEFT JOIN statuses s ON s.kind = 'equipment' AND s.name = e.status
+        LEFT JOIN statuses ls ON ls.kind = 'equipment_loan' AND ls.name = e.loan_status
+    ''')
+    conn.execute("DROP TABLE equipment")
+    conn.execute("ALTER TABLE equipment_new RENAME TO equipment")
+    _create_index(conn, "idx_equipment_status", "equipment", "status_id")
+    _create_index(conn, "idx_equipment_unit", "equipment", "unit_id")
+    _create_index(conn, "idx_equipment_category", "equipment", "category_id")
+    _create_index(conn, "idx_equipment_receive_date", "equipment", "receive_date")
+
+    conn.execute('''
+        CREATE TABLE maintenance_log_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_id INTEGER NOT NULL,
+            maintenance_type_id INTEGER,
+            description TEXT,
+            technician_id INTEGER,
+            technician_name TEXT,
+            status_id INTEGER,
+            start_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            end_date TIMESTAMP,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (equipment_id) REFERENCES equipment(id) ON DELETE CASCADE,
+            FOREIGN KEY (maintenance_type_id) REFERENCES maintenance_types(id),
+            FOREIGN KEY (status_id) REFERENCES statuses(id),
+            FOREIGN KEY (technician_id) REFERENCES users(id) ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO maintenance_log_new
+            (id, equipment_id, maintenance_type_id, description, technician_id, technician_name,
+             status_id, start_date, end_date, notes, created_at, created_by)
+        SELECT m.id, m.equipment_id, t.id, m.description, m.technician_id, m.technician_name,
+               s.id, m.start_date, m.end_date, m.notes, m.created_at, m.created_by
+        FROM maintenance_log m
+        LEFT JOIN maintenance_types t ON t.name = m.maintenance_type
+        LEFT JOIN statuses s ON s.kind = 'maintenance' AND s.name = m.status
+    ''')
+    conn.execute("DROP TABLE maintenance_log")
+    conn.execute("ALTER TABLE maintenance_log_new RENAME TO maintenance_log")
+    _create_index(conn, "idx_maintenance_equipment_date", "maintenance_log", "equipment_id, start_date")
+    _create_index(conn, "idx_maintenance_start_date", "maintenance_log", "start_date")
+    _create_index(conn, "idx_maintenance_created_at", "maintenance_log", "created_at")
+    _create_index(conn, "idx_maintenance_status", "maintenance_log", "status_id")
+    _create_index(conn, "idx_maintenance_type", "maintenance_log", "maintenance_type_id")
+
+    conn.execute('''
+        CREATE TABLE loan_log_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipment_id INTEGER NOT NULL,
+            borrower_unit TEXT NOT NULL,
+            loan_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expected_return_date TIMESTAMP,
+            return_date TIMESTAMP,
+            status_id INTEGER,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (equipment_id) REFERENCES equipment(id) ON DELETE CASCADE,
+            FOREIGN KEY (status_id) REFERENCES statuses(id),
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO loan_log_new
+            (id, equipment_id, borrower_unit, loan_date, expected_return_date, return_date,
+             status_id, notes, created_at, created_by)
+        SELECT l.id, l.equipment_id, l.borrower_unit, l.loan_date, l.expected_return_date,
+               l.return_date, s.id, l.notes, l.created_at, l.created_by
+        FROM loan_log l
+        LEFT JOIN statuses s ON s.kind = 'loan' AND s.name = l.status
+    ''')
+    conn.execute("DROP TABLE loan_log")
+    conn.execute("ALTER TABLE loan_log_new RENAME TO loan_log")
+    _create_index(conn, "idx_loan_equipment_date", "loan_log", "equipment_id, loan_date")
+    _create_index(conn, "idx_loan_date", "loan_log", "loan_date")
+    _create_index(conn, "idx_loan_status", "loan_log", "status_id")
+
+
+
+def _v6_active_pointers(conn: sqlite3.Connection):
+    """
+    Add equipment.active_loan_id / active_maintenance_id and keep them in
+    step with loan_log / maintenance_log through triggers, so the pointers
+    change in the same transaction as the log row whatever code writes it.
+    Each trigger recomputes the pointer with one index probe on
+    (equipment_id, date).
+    """
+    from .equipment import ACTIVE_POINTERS
+
+    _add_column(conn, "equipment", "active_loan_id", "INTEGER")
+    _add_column(conn, "equipment", "active_maintenance_id", "INTEGER")
+    for column, table, prefix, date_column in [
+        ("active_loan_id", "loan_log", "loan", "loan_date"),
+        ("active_maintenance_id", "maintenance_log", "maintenance", "start_date"),
+    ]:
+        expected = ACTIVE_POINTERS[column]
+        new_sql = expected.format(equipment_id="NEW.equipment_id")
+        old_sql = expected.format(equipment_id="OLD.equipment_id")
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_active_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE equipment SET {column} = ({new_sql}) WHERE id = NEW.equipment_id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_active_update
+            AFTER UPDATE OF equipment_id, status_id, {date_column} ON {table}
+            BEGIN
+                UPDATE equipment SET {column} = ({new_sql}) WHERE id = NEW.equipment_id;
+                UPDATE equipment SET {column} = ({old_sql})
+                WHERE id = OLD.equipment_id AND OLD.equipment_id != NEW.equipment_id;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_active_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE equipment SET {column} = ({old_sql}) WHERE id = OLD.equipment_id;
+            END
+        ''')
+        started = time.perf_counter()
+        conn.execute(f"UPDATE equipment SET {column} = ({expected.format(equipment_id='equipment.id')})")
+        print(f"[migration]   backfill equipment.{column}: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def _v7_stocktake(conn: sqlite3.Connection):
+    """
+    Stocktake sessions. Scans and reconciliation results are keyed by
+    (session_id, equipment_id) in WITHOUT ROWID tables, so every per-session
+    read and the "was it scanned?" probe are primary-key range lookups.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stocktake_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            unit_id INTEGER,
+            notes TEXT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            reconciled_at TIMESTAMP,
+            expected_count INTEGER DEFAULT 0,
+            found_count INTEGER DEFAULT 0,
+            missing_count INTEGER DEFAULT 0,
+            wrong_unit_count INTEGER DEFAULT 0,
+            unknown_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by INTEGER,
+            FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE SET NULL,
+            FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stocktake_scans (
+            session_id INTEGER NOT NULL,
+            equipment_id INTEGER NOT NULL,
+            scanned_serial TEXT,
+            scanned_at TIMESTAMP,
+            PRIMARY KEY (session_id, equipment_id),
+            FOREIGN KEY (session_id) REFERENCES stocktake_sessions(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stocktake_results (
+            session_id INTEGER NOT NULL,
+            equipment_id INTEGER NOT NULL,
+            outcome INTEGER NOT NULL,
+            PRIMARY KEY (session_id, equipment_id),
+            FOREIGN KEY (session_id) REFERENCES stocktake_sessions(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+
+# Thêm bước mới vào cuối danh sách; không sửa các bước đã phát hành
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base schema", _v1_base_schema),
+    Migration(2, "default users, categories and maintenance types", _v2_default_data),
+    Migration(3, "indexes for category, date and action filters", _v3_filter_indexes),
+    Migration(4, "normalize timestamps to YYYY-MM-DD HH:MM:SS", _v4_normalize_timestamps),
+    Migration(5, "integer keys for categories, maintenance types and statuses", _v5_lookup_keys),
+    Migration(6, "active loan / maintenance pointers on equipment", _v6_active_pointers),
+    Migration(7, "stocktake sessions, scans and results", _v7_stocktake),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_path) -> int:
+    """
+    Bring the database at db_path up to SCHEMA_VERSION.
+    A current database costs one PRAGMA read. Pending steps run in a single
+    IMMEDIATE transaction together with the user_version bump, so a failure
+    leaves the schema exactly as it was. Returns the resulting version.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        version = get_version(conn)
+        if version >= SCHEMA_VERSION:
+            return version
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Tiến trình khác có thể đã nâng cấp trong lúc chờ khoá
+            version = get_version(conn)
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                started = time.perf_counter()
+                migration.apply(conn)
+                print(f"[migration] v{migration.version} {migration.description}: "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms")
+                version = migration.version
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+    finally:
+        conn.close()
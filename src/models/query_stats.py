@@ -0,0 +1,184 @@
+"""
+Query instrumentation - per-statement timing, slow-query log and call-site stats
+"""
+import re
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from ..config import QUERY_STATS_ENABLED, SLOW_QUERY_MS, SLOW_QUERY_LOG
+
+# Cận trên (ms) của các ô histogram; ô cuối là "lớn hơn"
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Số lần đo gần nhất giữ lại cho mỗi câu SQL (histogram cuộn)
+ROLLING_WINDOW = 500
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+_DATABASE_MODULE = __name__.rsplit(".", 1)[0] + ".database"
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace, literals and IN lists so similar statements group together"""
+    sql = _STRING_RE.sub("?", query)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def _call_site() -> str:
+    """Model method that issued the query (first frame outside database.py)"""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__") in (__name__, _DATABASE_MODULE):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+    return f"{module}.{name}"
+
+
+class _Series:
+    """Cumulative totals plus a rolling window of recent durations"""
+
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "rows", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.recent = deque(maxlen=ROLLING_WINDOW)
+
+    def add(self, duration_ms: float, rows: int, error: bool):
+        self.count += 1
+        self.errors += error
+        self.total_ms += duration_ms
+        self.rows += rows
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        self.recent.append(duration_ms)
+
+    def to_dict(self) -> dict:
+        recent = sorted(self.recent)
+        buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for value in recent:
+            for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+                if value <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': self.total_ms,
+            'avg_ms': self.total_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'rows': self.rows,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'histogram': buckets,
+        }
+
+
+class QueryStats:
+    """
+    Opt-in collector fed by Database. When disabled, Database skips the
+    timing entirely, so the only cost is one attribute check per statement.
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = SLOW_QUERY_MS,
+                 slow_log_path=SLOW_QUERY_LOG):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._by_sql: Dict[str, _Series] = {}
+        self._by_site: Dict[str, _Series] = {}
+        self._site_sql: Dict[str, set] = {}
+        self._all = _Series()
+        self._slow_count = 0
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._by_sql.clear()
+            self._by_site.clear()
+            self._site_sql.clear()
+            self._all = _Series()
+            self._slow_count = 0
+
+    def record(self, conn, query: str, params: tuple, duration: float, rows: int,
+               error: Optional[Exception] = None):
+        """Record one statement; conn is still open so slow plans can be explained"""
+        duration_ms = duration * 1000
+        sql = normalize_sql(query)
+        site = _call_site()
+        with self._lock:
+            self._by_sql.setdefault(sql, _Series()).add(duration_ms, rows, error is not None)
+            self._by_site.setdefault(site, _Series()).add(duration_ms, rows, error is not None)
+            self._site_sql.setdefault(site, set()).add(sql)
+            self._all.add(duration_ms, rows, error is not None)
+            slow = duration_ms >= self.slow_ms
+            if slow:
+                self._slow_count += 1
+        if slow or error is not None:
+            self._log_slow(conn, query, params, sql, site, duration_ms, rows, error)
+
+    def _log_slow(self, conn, query, params, sql, site, duration_ms, rows, error=None):
+        """Append the statement (and its plan, or the error) to the slow-query log"""
+        lines = [
+            f"{datetime.now():%Y-%m-%d %H:%M:%S} {duration_ms:.1f} ms, {rows} dòng, {site}",
+            f"  SQL: {sql}",
+        ]
+        if error is not None:
+            lines.append(f"  ERROR: {error}")
+        else:
+            try:
+                plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+            except Exception as e:
+                plan = [f"(không lấy được kế hoạch: {e})"]
+            lines += [f"  PLAN: {step}" for step in plan]
+        try:
+            self.slow_log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._log_lock, open(self.slow_log_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Lỗi ghi slow-query log: {e}")
+
+    def snapshot(self) -> dict:
+        """Copy of all counters: by normalized SQL and by calling model method"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'slow_ms': self.slow_ms,
+                'slow_count': self._slow_count,
+                'slow_log_path': str(self.slow_log_path),
+                'histogram_bounds_ms': HISTOGRAM_BOUNDS_MS,
+                'overall': self._all.to_dict(),
+                'by_sql': {sql: s.to_dict() for sql, s in self._by_sql.items()},
+                'by_call_site': {
+                    site: dict(s.to_dict(), statements=sorted(self._site_sql[site]))
+                    for site, s in self._by_site.items()
+                },
+            }
+
+
+QUERY_STATS = QueryStats(enabled=QUERY_STATS_ENABLED)
@@ -0,0 +1,324 @@
+"""
+Stocktake Model - Inventory check of a unit subtree against scanned equipment
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple, Iterable, Iterator
+from .database import Database, ID_BATCH_SIZE, parse_timestamp, to_db_timestamp
+
+# Kết quả đối chiếu của từng thiết bị (thứ tự số = thứ tự trong file xuất)
+OUTCOME_MISSING = 1     # Thuộc đơn vị nhưng không quét thấy
+OUTCOME_WRONG_UNIT = 2  # Quét thấy nhưng thuộc đơn vị khác
+OUTCOME_UNKNOWN = 3     # Mã QR trỏ tới id không có trong CSDL
+OUTCOME_FOUND = 4       # Thuộc đơn vị và đã quét thấy
+
+OUTCOME_NAMES = {
+    OUTCOME_MISSING: "Thiếu",
+    OUTCOME_WRONG_UNIT: "Sai đơn vị",
+    OUTCOME_UNKNOWN: "Không có trong CSDL",
+    OUTCOME_FOUND: "Có mặt",
+}
+
+# Số dòng trong một câu INSERT nhiều giá trị (4 tham số mỗi dòng)
+SCAN_BATCH_ROWS = ID_BATCH_SIZE // 4
+
+_OUTCOME_SQL = "CASE r.outcome " + " ".join(
+    f"WHEN {key} THEN '{name}'" for key, name in OUTCOME_NAMES.items()
+) + " END"
+
+_SESSION_SELECT = '''
+    SELECT st.*, u.name as unit_name,
+           (SELECT COUNT(*) FROM stocktake_scans sc WHERE sc.session_id = st.id) as scanned_count
+    FROM stocktake_sessions st
+    LEFT JOIN units u ON st.unit_id = u.id
+'''
+
+
+@dataclass
+class StocktakeSession:
+    """
+    One inventory check. Scanned ids are appended to stocktake_scans while
+    the session is open; reconcile() compares them with the equipment
+    currently assigned to the unit and its sub-units and stores one outcome
+    per item in stocktake_results (kept as-is once the session is finished).
+    """
+    id: Optional[int] = None
+    name: str = ""
+    unit_id: Optional[int] = None
+    notes: str = ""
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    reconciled_at: Optional[datetime] = None
+    created_by: Optional[int] = None
+
+    # Số liệu của lần đối chiếu gần nhất
+    expected_count: int = 0
+    found_count: int = 0
+    missing_count: int = 0
+    wrong_unit_count: int = 0
+    unknown_count: int = 0
+
+    # Populated from joins
+    unit_name: str = ""
+    scanned_count: int = 0
+
+    def __post_init__(self):
+        self.db = Database()
+
+    @property
+    def is_open(self) -> bool:
+        return self.id is not None and self.finished_at is None
+
+    def save(self) -> int:
+        if self.id:
+            return self._update()
+        return self._insert()
+
+    def _insert(self) -> int:
+        self.started_at = self.started_at or datetime.now().replace(microsecond=0)
+        self.id = self.db.insert('''
+            INSERT INTO stocktake_sessions (name, unit_id, notes, started_at, created_by)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (self.name, self.unit_id, self.notes, to_db_timestamp(self.started_at), self.created_by))
+        return self.id
+
+    def _update(self) -> int:
+        self.db.execute('''
+            UPDATE stocktake_sessions SET name = ?, notes = ?, finished_at = ?
+            WHERE id = ?
+        ''', (self.name, self.notes, to_db_timestamp(self.finished_at), self.id))
+        return self.id
+
+    def delete(self) -> bool:
+        if not self.id:
+            return False
+        with self.db.transaction() as tx:
+            tx.execute("DELETE FROM stocktake_results WHERE session_id = ?", (self.id,))
+            tx.execute("DELETE FROM stocktake_scans WHERE session_id = ?", (self.id,))
+            tx.execute("DELETE FROM stocktake_sessions WHERE id = ?", (self.id,))
+        return True
+
+    def record_scans(self, codes: Iterable[Tuple[int, Optional[str]]]) -> int:
+        """
+        Add (equipment_id, serial on the label) pairs; ids already in the
+        session are ignored. Returns how many ids were new. Compact labels
+        carry no serial (None).
+        """
+        rows = list(codes)
+        if not rows:
+            return 0
+        scanned_at = to_db_timestamp(datetime.now())
+        added = 0
+        with self.db.transaction() as tx:
+            for start in range(0, len(rows), SCAN_BATCH_ROWS):
+                batch = rows[start:start + SCAN_BATCH_ROWS]
+                values = ",".join(["(?, ?, ?, ?)"] * len(batch))
+                params = tuple(
+                    value for equipment_id, serial in batch
+                    for value in (self.id, equipment_id, serial, scanned_at)
+                )
+                added += tx.execute(f'''
+                    INSERT OR IGNORE INTO stocktake_scans
+                    (session_id, equipment_id, scanned_serial, scanned_at)
+                    VALUES {values}
+                ''', params).rowcount
+        self.scanned_count += added
+        return added
+
+    def reconcile(self) -> Dict[int, int]:
+        """
+        Recompute stocktake_results with set operations in SQLite: the unit
+        subtree and the expected ids go into TEMP tables keyed by id, then two
+        INSERT ... SELECT statements classify expected items (found / missing)
+        and unexpected scans (wrong unit / unknown). Returns outcome -> count.
+        """
+        with self.db.transaction() as tx:
+            tx.execute("CREATE TEMP TABLE stocktake_subtree (unit_id INTEGER PRIMARY KEY)")
+            tx.execute('''
+                INSERT INTO temp.stocktake_subtree (unit_id)
+                WITH RECURSIVE subtree(id) AS (
+                    SELECT ?
+                    UNION
+                    SELECT u.id FROM units u JOIN subtree s ON u.parent_id = s.id
+                )
+                SELECT id FROM subtree
+            ''', (self.unit_id,))
+            tx.execute("CREATE TEMP TABLE stocktake_expected (equipment_id INTEGER PRIMARY KEY)")
+            # CROSS JOIN giữ thứ tự: duyệt các đơn vị rồi tra idx_equipment_unit cho từng đơn vị
+            # (bảng TEMP chưa có thống kê nên bộ tối ưu có thể chọn quét cả chỉ mục)
+            tx.execute('''
+                INSERT INTO temp.stocktake_expected (equipment_id)
+                SELECT e.id FROM temp.stocktake_subtree t
+                CROSS JOIN equipment e ON e.unit_id = t.unit_id
+            ''')
+
+            tx.execute("DELETE FROM stocktake_results WHERE session_id = ?", (self.id,))
+            tx.execute(f'''
+                INSERT INTO stocktake_results (session_id, equipment_id, outcome)
+                SELECT ?, x.equipment_id,
+                       CASE WHEN EXISTS (
+                           SELECT 1 FROM stocktake_scans sc
+                           WHERE sc.session_id = ? AND sc.equipment_id = x.equipment_id
+                       ) THEN {OUTCOME_FOUND} ELSE {OUTCOME_MISSING} END
+                FROM temp.stocktake_expected x
+            ''', (self.id, self.id))
+            tx.execute(f'''
+                INSERT INTO stocktake_results (session_id, equipment_id, outcome)
+                SELECT ?, sc.equipment_id,
+                       CASE WHEN e.id IS NULL THEN {OUTCOME_UNKNOWN} ELSE {OUTCOME_WRONG_UNIT} END
+                FROM stocktake_scans sc
+                LEFT JOIN equipment e ON e.id = sc.equipment_id
+                WHERE sc.session_id = ?
+                  AND sc.equipment_id NOT IN (SELECT equipment_id FROM temp.stocktake_expected)
+            ''', (self.id, self.id))
+
+            rows = tx.fetch_all('''
+                SELECT outcome, COUNT(*) as count FROM stocktake_results
+                WHERE session_id = ? GROUP BY outcome
+            ''', (self.id,))
+            counts = {outcome: 0 for outcome in OUTCOME_NAMES}
+            counts.update({row['outcome']: row['count'] for row in rows})
+
+            self.found_count = counts[OUTCOME_FOUND]
+            self.missing_count = counts[OUTCOME_MISSING]
+            self.wrong_unit_count = counts[OUTCOME_WRONG_UNIT]
+            self.unknown_count = counts[OUTCOME_UNKNOWN]
+            self.expected_count = self.found_count + self.missing_count
+            self.reconciled_at = datetime.now().replace(microsecond=0)
+            tx.execute('''
+                UPDATE stocktake_sessions SET
+                    reconciled_at = ?, expected_count = ?, found_count = ?,
+                    missing_count = ?, wrong_unit_count = ?, unknown_count = ?
+                WHERE id = ?
+            ''', (to_db_timestamp(self.reconciled_at), self.expected_count, self.found_count,
+                  self.missing_count, self.wrong_unit_count, self.unknown_count, self.id))
+        return counts
+
+    def finish(self) -> Dict[int, int]:
+        """Reconcile one last time and close the session"""
+        counts = self.reconcile()
+        self.finished_at = datetime.now().replace(microsecond=0)
+        self._update()
+        return counts
+
+    @classmethod
+    def get_by_id(cls, session_id: int) -> Optional['StocktakeSession']:
+        db = Database()
+        row = db.fetch_one(f"{_SESSION_SELECT} WHERE st.id = ?", (session_id,))
+        return cls._from_row(row) if row else None
+
+    @classmethod
+    def get_all(cls, limit: int = 100) -> List['StocktakeSession']:
+        db = Database()
+        rows = db.fetch_all(f"{_SESSION_SELECT} ORDER BY st.started_at DESC, st.id DESC LIMIT ?", (limit,))
+        return [cls._from_row(row) for row in rows]
+
+    @classmethod
+    def get_open(cls) -> List['StocktakeSession']:
+        db = Database()
+        rows = db.fetch_all(
+            f"{_SESSION_SELECT} WHERE st.finished_at IS NULL ORDER BY st.started_at DESC, st.id DESC"
+        )
+        return [cls._from_row(row) for row in rows]
+
+    # Cột xuất CSV/Excel: (biểu thức SQL, tiêu đề)
+    EXPORT_COLUMNS = [
+        ("r.equipment_id", "ID"),
+        ("COALESCE(e.serial_number, sc.scanned_serial)", "Số hiệu"),
+        ("e.name", "Tên thiết bị"),
+        ("u.name", "Đơn vị quản lý"),
+        ("e.location", "Vị trí"),
+        (_OUTCOME_SQL, "Kết quả"),
+        ("CASE WHEN sc.scanned_serial != e.serial_number THEN sc.scanned_serial END", "Số hiệu trên nhãn (sai)"),
+        ("sc.scanned_at", "Thời điểm quét"),
+    ]
+
+    @staticmethod
+    def build_filter(session_id: int, outcome: int = None) -> Tuple[str, list]:
+        """WHERE clause over stocktake_results r of one session"""
+        clauses = ["r.session_id = ?"]
+        params = [session_id]
+        if outcome:
+            clauses.append("r.outcome = ?")
+            params.append(outcome)
+        return f"WHERE {' AND '.join(clauses)}", params
+
+    @classmethod
+    def iter_export_rows(cls, filters: dict = None, chunk_size: int = 5000) -> Iterator[list]:
+        """Stream EXPORT_COLUMNS rows of the last reconciliation, problems first"""
+        where_sql, params = cls.build_filter(**(filters or {}))
+        columns = ", ".join(expr for expr, _ in cls.EXPORT_COLUMNS)
+        return Database().iter_rows(f'''
+            SELECT {columns}
+            FROM stocktake_results r
+            LEFT JOIN equipment e ON e.id = r.equipment_id
+            LEFT JOIN units u ON u.id = e.unit_id
+            LEFT JOIN stocktake_scans sc ON sc.session_id = r.session_id AND sc.equipment_id = r.equipment_id
+            {where_sql}
+            ORDER BY r.outcome, e.name, r.equipment_id
+        ''', tuple(params), chunk_size)
+
+    @classmethod
+    def count_filtered(cls, filters: dict = None) -> int:
+        where_sql, params = cls.build_filter(**(filters or {}))
+        row = Database().fetch_one(
+            f"SELECT COUNT(*) as count FROM stocktake_results r {where_sql}", tuple(params)
+        )
+        return row['count'] if row else 0
+
+    @classmethod
+    def get_results(cls, session_id: int, outcome: int = None, limit: int = 500) -> List[dict]:
+        """First rows of the last reconciliation for on-screen display"""
+        where_sql, params = cls.build_filter(session_id, outcome)
+        rows = Database().fetch_all(f'''
+            SELECT r.equipment_id, r.outcome, e.name, e.serial_number, u.name as unit_name,
+                   sc.scanned_serial
+            FROM stocktake_results r
+            LEFT JOIN equipment e ON e.id = r.equipment_id
+            LEFT JOIN units u ON u.id = e.unit_id
+            LEFT JOIN stocktake_scans sc ON sc.session_id = r.session_id AND sc.equipment_id = r.equipment_id
+            {where_sql}
+            ORDER BY r.outcome, e.name, r.equipment_id
+            LIMIT ?
+        ''', (*params, limit))
+        return [dict(row) for row in rows]
+
+    @classmethod
+    def _from_row(cls, row) -> 'StocktakeSession':
+        session = cls()
+        session.id = row['id']
+        session.name = row['name']
+        session.unit_id = row['unit_id']
+        session.notes = row['notes'] or ""
+        session.started_at = parse_timestamp(row['started_at'])
+        session.finished_at = parse_timestamp(row['finished_at'])
+        session.reconciled_at = parse_timestamp(row['reconciled_at'])
+        session.created_by = row['created_by']
+        session.expected_count = row['expected_count'] or 0
+        session.found_count = row['found_count'] or 0
+        session.missing_count = row['missing_count'] or 0
+        session.wrong_unit_count = row['wrong_unit_count'] or 0
+        session.unknown_count = row['unknown_count'] or 0
+        if 'unit_name' in row.keys():
+            session.unit_name = row['unit_name'] or ""
+        if 'scanned_count' in row.keys():
+            session.scanned_count = row['scanned_count']
+        return session
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'unit_id': self.unit_id,
+            'unit_name': self.unit_name,
+            'notes': self.notes,
+            'started_at': str(self.started_at) if self.started_at else None,
+            'finished_at': str(self.finished_at) if self.finished_at else None,
+            'reconciled_at': str(self.reconciled_at) if self.reconciled_at else None,
+            'scanned_count': self.scanned_count,
+            'expected_count': self.expected_count,
+            'found_count': self.found_count,
+            'missing_count': self.missing_count,
+            'wrong_unit_count': self.wrong_unit_count,
+            'unknown_count': self.unknown_count,
+        }
@@ -4,7 +4,7 @@ Unit Model - Represents a military unit/organization
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
-from .database import Database
+from .database import Database, parse_timestamp
 
 
 @dataclass
@@ -236,8 +236,8 @@ class Unit:
         unit.commander = row['commander'] or ""
         unit.description = row['description'] or ""
         unit.is_active = bool(row['is_active'])
-        unit.created_at = row['created_at']
-        unit.updated_at = row['updated_at']
+        unit.created_at = parse_timestamp(row['created_at'], utc=True)
+        unit.updated_at = parse_timestamp(row['updated_at'], utc=True)
         # Handle parent_name from JOIN query
         try:
             unit.parent_name = row['parent_name'] or ""
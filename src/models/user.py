@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Optional, List
 import hashlib
 import secrets
-from .database import Database
+from .database import Database, parse_timestamp
 
 
 # User roles
@@ -328,9 +328,9 @@ class User:
         user.role = row['role']
         user.unit_id = row['unit_id']
         user.is_active = bool(row['is_active'])
-        user.last_login = row['last_login']
-        user.created_at = row['created_at']
-        user.updated_at = row['updated_at']
+        user.last_login = parse_timestamp(row['last_login'], utc=True)
+        user.created_at = parse_timestamp(row['created_at'], utc=True)
+        user.updated_at = parse_timestamp(row['updated_at'], utc=True)
         user.created_by = row['created_by']
         return user
     
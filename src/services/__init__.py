@@ -1,8 +1,39 @@
 """
 Services Package - Business logic and utility services
+
+Submodules are imported on first attribute access (PEP 562): the camera,
+PDF and QR services pull in cv2, pyzbar, numpy, reportlab and PIL, which
+must not load before the login dialog appears.
 """
-from .qr_service import QRService
-from .camera_service import CameraService
-from .export_service import ExportService
+from importlib import import_module
+
+_EXPORTS = {
+    'QRService': '.qr_service',
+    'CameraService': '.camera_service',
+    'ExportService': '.export_service',
+    'ExportJobManager': '.export_job_service',
+    'ExportJob': '.export_job_service',
+    'JobKind': '.export_job_service',
+    'JobStatus': '.export_job_service',
+    'ImportService': '.import_service',
+    'ImportResult': '.import_service',
+    'ScanLookupService': '.scan_lookup_service',
+    'BatchScanSession': '.batch_scan_service',
+    'ImageDecodeService': '.image_decode_service',
+    'BulkDecodeResult': '.image_decode_service',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = ['QRService', 'CameraService', 'ExportService']
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
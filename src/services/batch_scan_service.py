@@ -0,0 +1,87 @@
+"""
+Batch Scan Service - Accumulate many QR codes across frames and resolve them in bulk
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models.equipment import Equipment
+from .qr_payload import EquipmentCode, parse_equipment_code
+
+
+@dataclass
+class BatchScanSession:
+    """
+    Set of distinct codes seen while sweeping the camera over a rack.
+    add() only does set arithmetic, so it can run for every decoded frame;
+    resolve() loads everything new with one IN query (per ID_BATCH_SIZE ids).
+    """
+    items: Dict[int, Equipment] = field(default_factory=dict)  # Đã xác định
+    mismatched: Dict[int, str] = field(default_factory=dict)   # id -> nhãn QR không khớp số hiệu CSDL
+    not_found: Set[int] = field(default_factory=set)
+    foreign: Set[str] = field(default_factory=set)              # Mã QR không thuộc hệ thống
+    _seen: Set[str] = field(default_factory=set)
+    _pending: Dict[int, Set[EquipmentCode]] = field(default_factory=dict)  # id -> các nhãn đã quét, chờ resolve()
+    _codes: List[Tuple[int, Optional[str]]] = field(default_factory=list)  # (id, số hiệu) theo thứ tự quét
+
+    def add(self, payloads: Iterable[str]) -> int:
+        """Record decoded payloads; returns how many were new to the session"""
+        new = 0
+        for payload in payloads:
+            if payload in self._seen:
+                continue
+            self._seen.add(payload)
+            new += 1
+            code = parse_equipment_code(payload)
+            if code is None:
+                self.foreign.add(payload)
+                continue
+            equipment_id = code.equipment_id
+            self._codes.append((equipment_id, code.serial_number))
+            if equipment_id in self.items:
+                # Cùng id nhưng số hiệu khác (nhãn in sai / nhãn giả)
+                self._check_serial(self.items[equipment_id], code)
+            elif equipment_id not in self.not_found:
+                self._pending.setdefault(equipment_id, set()).add(code)
+        return new
+
+    def equipment_codes(self, start: int = 0) -> List[Tuple[int, Optional[str]]]:
+        """
+        (equipment_id, serial) of every equipment code seen, in scan order,
+        from position start; serial is None for compact labels
+        """
+        return self._codes[start:]
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def count(self) -> int:
+        """Distinct equipment codes seen (resolved or not)"""
+        return len(self.items) + len(self.not_found) + len(self._pending)
+
+    def resolve(self) -> List[Equipment]:
+        """Load all pending ids at once; returns the newly resolved equipment"""
+        if not self._pending:
+            return []
+        pending, self._pending = self._pending, {}
+        found = Equipment.get_by_ids(list(pending))
+        for equipment in found:
+            self.items[equipment.id] = equipment
+            for code in pending[equipment.id]:
+                self._check_serial(equipment, code)
+        self.not_found.update(set(pending) - {e.id for e in found})
+        return found
+
+    def _check_serial(self, equipment: Equipment, code: EquipmentCode):
+        if not code.matches(equipment.serial_number):
+            self.mismatched[equipment.id] = code.label
+
+    def clear(self):
+        self.items.clear()
+        self.mismatched.clear()
+        self.not_found.clear()
+        self.foreign.clear()
+        self._seen.clear()
+        self._pending.clear()
+        self._codes.clear()
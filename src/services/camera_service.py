@@ -3,13 +3,18 @@ Camera Service - Handle webcam/scanner input with QThread
 """
 import cv2
 import numpy as np
-from pyzbar import pyzbar
-from PyQt6.QtCore import QThread, pyqtSignal, QMutex, QMutexLocker
+from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtGui import QImage
-from typing import Optional
+from typing import List, Optional
 import time
 
-from ..config import CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS
+from ..config import CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_PROBE_LIMIT
+from .metrics import METRICS
+from .frame_sources import FrameSource, DeviceFrameSource, open_capture
+from .qr_decoder import decode_frame
+from .frame_gate import FrameGate
+from .decode_pool import DecodePool, DecodeLane, DetectionDeduper
+from .image_decode_service import ImageDecodeService, decode_image_file
 
 
 class CameraDiscoveryThread(QThread):
@@ -20,77 +25,125 @@ class CameraDiscoveryThread(QThread):
 
     def run(self):
         available = []
-        # Kiểm tra 3 index đầu tiên (thường là đủ cho laptop/PC)
-        # Giảm số lượng loop để nhanh hơn
-        for i in range(3):
+        misses = 0
+        for i in range(CAMERA_PROBE_LIMIT):
             try:
-                # Dùng CAP_DSHOW trên Windows để khởi động nhanh hơn
-                cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+                # Backend theo hệ điều hành (DirectShow trên Windows khởi động nhanh hơn)
+                cap = open_capture(i)
                 if cap.isOpened():
                     available.append(i)
-                    cap.release()
+                    misses = 0
+                else:
+                    misses += 1
+                cap.release()
             except:
-                pass
+                misses += 1
+            # Chỉ số camera thường liên tiếp; mỗi lần dò chỉ số trống mất thời gian
+            if misses >= 2:
+                break
         self.cameras_found.emit(available)
 
 
+class ImageDecodeThread(QThread):
+    """
+    Đọc mã QR từ thư mục ảnh / ZIP / PDF trong nền (ImageDecodeService).
+    Mã chưa tra cứu CSDL: giao diện đưa vào phiên quét hàng loạt của nó.
+    """
+    progress = pyqtSignal(int, int)
+    decoded = pyqtSignal(object)  # BulkDecodeResult
+    failed = pyqtSignal(str)
+
+    def __init__(self, path: str, parent=None):
+        super().__init__(parent)
+        self.path = path
+
+    def run(self):
+        try:
+            result = ImageDecodeService().decode(self.path, self.progress.emit, resolve=False)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.decoded.emit(result)
+
+
 class CameraService(QThread):
     """
     Camera service running on separate thread for QR scanning
     Emits signals when frames are captured or QR codes detected
+
+    The thread only captures: frames are decoded on a DecodePool shared by
+    every camera, and a DetectionDeduper shared by cameras at the same
+    station reports a code seen by several of them once.
     """
     
     # Signals
     frame_ready = pyqtSignal(QImage)  # Emitted when a new frame is ready
     qr_detected = pyqtSignal(str)      # Emitted when QR code is detected
+    codes_detected = pyqtSignal(list)  # Every distinct code in a frame (batch scan, no cooldown)
     error_occurred = pyqtSignal(str)   # Emitted on error
     camera_started = pyqtSignal()      # Emitted when camera starts
     camera_stopped = pyqtSignal()      # Emitted when camera stops
     
-    def __init__(self, camera_index: int = 0, parent=None):
+    def __init__(self, camera_index: int = 0, parent=None, source: Optional[FrameSource] = None,
+                 pool: Optional[DecodePool] = None, deduper: Optional[DetectionDeduper] = None):
         super().__init__(parent)
         self.camera_index = camera_index
-        self.cap: Optional[cv2.VideoCapture] = None
+        # Nguồn ảnh khác camera (video, thư mục ảnh, ảnh tổng hợp); mặc định là camera_index
+        self._source = source
+        self.source: Optional[FrameSource] = None
         self._running = False
-        self._mutex = QMutex()
-        self._last_qr_data = ""
-        self._last_qr_time = 0
-        self._qr_cooldown = 2.0  # Seconds between same QR detections
+        self._pool = pool or DecodePool.shared()
+        self._lane: Optional[DecodeLane] = None
+        # Cùng một mã trong 2 giây chỉ báo một lần (kể cả từ camera khác dùng chung deduper)
+        self._deduper = deduper or DetectionDeduper(cooldown=2.0)
+        # Chỉ giải mã khung hình đã thay đổi, đứng yên và đủ nét
+        self._gate = FrameGate()
+        self._overlay = []  # Khung viền các mã của lần giải mã gần nhất (vẽ lên ảnh xem trước)
         
         # Camera settings from Config
         self.frame_width = CAMERA_WIDTH
         self.frame_height = CAMERA_HEIGHT
         self.fps = CAMERA_FPS
+        
+        # Số liệu cho trang Chẩn đoán hiệu năng
+        self._capture_meter = METRICS.meter("camera.capture")
+        self._decode_meter = METRICS.meter("camera.decode")
+        self._decode_hit_meter = METRICS.meter("camera.decode_hit")
+        # Độ trễ từ lúc chụp tới khi giải mã xong, theo từng camera
+        self._latency_stats = METRICS.stages("camera_decode")
     
     def run(self):
         """Main thread loop - capture and process frames"""
         try:
-            self.cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
+            self.source = self._source or DeviceFrameSource(
+                self.camera_index, self.frame_width, self.frame_height, self.fps
+            )
             
-            if not self.cap.isOpened():
+            if not self.source.open():
                 self.error_occurred.emit("Không thể mở camera. Vui lòng kiểm tra kết nối.")
                 return
             
-            # Configure camera resolution (HD)
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
-            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
-            
+            self._lane = self._pool.lane(self.source.name, self._gate.process, self._on_decoded)
             self._running = True
             self.camera_started.emit()
             
             while self._running:
-                ret, frame = self.cap.read()
+                frame = self.source.read()
                 
-                if not ret:
+                if frame is None:
+                    if not self.source.live:
+                        break  # Hết video / thư mục ảnh
                     time.sleep(0.1)
                     continue
+                self._capture_meter.mark()
                 
-                # Process frame for QR codes
-                self._process_frame(frame)
+                # Giải mã trên luồng chung; camera không chờ kết quả
+                self._lane.submit(frame)
                 
                 # Convert frame to QImage and emit
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                for points in self._overlay:
+                    cv2.polylines(rgb_frame, [np.array(points, dtype=np.int32)], True, (0, 255, 0), 3)
                 h, w, ch = rgb_frame.shape
                 bytes_per_line = ch * w
                 
@@ -111,32 +164,24 @@ class CameraService(QThread):
         finally:
             self._cleanup()
     
-    def _process_frame(self, frame: np.ndarray):
-        """Process frame to detect QR codes"""
-        try:
-            # Decode QR codes in frame
-            decoded_objects = pyzbar.decode(frame)
-            
-            for obj in decoded_objects:
-                qr_data = obj.data.decode('utf-8')
-                current_time = time.time()
-                
-                # Avoid duplicate detections
-                with QMutexLocker(self._mutex):
-                    if (qr_data != self._last_qr_data or 
-                        current_time - self._last_qr_time > self._qr_cooldown):
-                        self._last_qr_data = qr_data
-                        self._last_qr_time = current_time
-                        self.qr_detected.emit(qr_data)
-                
-                # Draw rectangle around QR code
-                points = obj.polygon
-                if len(points) == 4:
-                    pts = np.array(points, dtype=np.int32)
-                    cv2.polylines(frame, [pts], True, (0, 255, 0), 3)
-                    
-        except Exception as e:
-            print(f"QR decode error: {e}")
+    def _on_decoded(self, decoded_objects: list, latency: float):
+        """Result of one frame (decode pool thread; khung bị bỏ qua trả lại mã của khung trước)"""
+        if not self._running:
+            return
+        if self._gate.decoded:
+            self._decode_meter.mark()
+            if decoded_objects:
+                self._decode_hit_meter.mark()
+            self._latency_stats.record(self._lane.name, bool(decoded_objects), latency)
+        self._overlay = [obj.polygon for obj in decoded_objects if len(obj.polygon) == 4]
+        if decoded_objects:
+            # Quét hàng loạt: phiên quét tự loại trùng, không cần thời gian chờ
+            self.codes_detected.emit([obj.data for obj in decoded_objects])
+        
+        for obj in decoded_objects:
+            # Avoid duplicate detections
+            if self._deduper.accept(obj.data):
+                self.qr_detected.emit(obj.data)
     
     def stop(self):
         """Stop the camera thread"""
@@ -145,9 +190,12 @@ class CameraService(QThread):
     
     def _cleanup(self):
         """Release camera resources"""
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
-        self.cap = None
+        if self._lane is not None:
+            self._lane.close()
+        self._overlay = []
+        if self.source is not None:
+            self.source.close()
+        self.source = None
         self._running = False
         self.camera_stopped.emit()
     
@@ -162,20 +210,24 @@ class CameraService(QThread):
     
     def reset_qr_detection(self):
         """Reset QR detection state (allow re-detection of same code)"""
-        with QMutexLocker(self._mutex):
-            self._last_qr_data = ""
-            self._last_qr_time = 0
+        self._deduper.reset()
+        self._gate.reset()
+    
+    def set_tracking(self, enabled: bool):
+        """Re-check only the last code's region first (single-code scanning)"""
+        self._gate.tracking = enabled
             
     # Xóa hàm static get_available_cameras cũ gây lag
     @staticmethod
     def decode_qr_from_image(image_path: str) -> Optional[str]:
-        try:
-            img = cv2.imread(image_path)
-            if img is None: return None
-            decoded = pyzbar.decode(img)
-            if decoded: return decoded[0].data.decode('utf-8')
-            return None
-        except Exception: return None
+        codes = decode_image_file(image_path)
+        return codes[0] if codes else None
+    
+    @staticmethod
+    def decode_all_qr_from_image(image_path: str) -> List[str]:
+        """Every distinct code in an image (e.g. a photo of a whole shelf)"""
+        # Nhiều ảnh cùng lúc: ImageDecodeService (thư mục / ZIP / PDF, nhiều tiến trình)
+        return decode_image_file(image_path)
     
     @staticmethod
     def decode_qr_from_qimage(qimage: QImage) -> Optional[str]:
@@ -186,8 +238,8 @@ class CameraService(QThread):
             ptr = qimage.bits()
             ptr.setsize(height * width * 3)
             arr = np.array(ptr).reshape(height, width, 3)
-            decoded = pyzbar.decode(arr)
-            if decoded: return decoded[0].data.decode('utf-8')
+            decoded = decode_frame(arr)
+            if decoded: return decoded[0].data
             return None
         except Exception: return None
 
@@ -198,15 +250,15 @@ class SingleShotCamera:
         self.camera_index = camera_index
     
     def capture_frame(self) -> Optional[np.ndarray]:
-        cap = cv2.VideoCapture(self.camera_index, cv2.CAP_DSHOW)
-        if not cap.isOpened(): return None
-        ret, frame = cap.read()
-        cap.release()
-        return frame if ret else None
+        source = DeviceFrameSource(self.camera_index)
+        if not source.open(): return None
+        frame = source.read()
+        source.close()
+        return frame
     
     def capture_and_decode(self) -> Optional[str]:
         frame = self.capture_frame()
         if frame is None: return None
-        decoded = pyzbar.decode(frame)
-        if decoded: return decoded[0].data.decode('utf-8')
+        decoded = decode_frame(frame)
+        if decoded: return decoded[0].data
         return None
\ No newline at end of file
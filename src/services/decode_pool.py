@@ -0,0 +1,175 @@
+"""
+Decode Pool - One bounded set of decode threads shared by every camera (no Qt dependency)
+
+Each camera gets a lane that holds at most its newest undecoded frame: a
+camera producing frames faster than they can be decoded drops the older
+ones instead of queueing them, and a lane never has two frames in flight,
+so its FrameGate still sees frames in order. Workers take lanes with a
+frame waiting in round-robin order, so a busy camera cannot starve the
+others, and the number of threads (CPU) follows decode demand rather than
+the number of cameras. OpenCV releases the GIL while decoding, and the
+qr_decoder detectors are per thread.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from ..config import CAMERA_DECODE_WORKERS
+from .metrics import METRICS
+
+
+class DecodeLane:
+    """One camera's place in a DecodePool; submit() frames, close() when done"""
+
+    def __init__(self, pool: 'DecodePool', name: str, process: Callable[[np.ndarray], Any],
+                 on_result: Callable[[Any, float], None]):
+        """
+        Args:
+            process: Runs on a pool thread for each frame taken (e.g. FrameGate.process)
+            on_result: Called on the pool thread with (result, seconds since submit)
+        """
+        self.pool = pool
+        self.name = name
+        self.process = process
+        self.on_result = on_result
+        self.submitted = 0
+        self.dropped = 0    # Frames replaced by a newer one before a worker took them
+        self._frame: Optional[np.ndarray] = None
+        self._submitted_at = 0.0
+        self._busy = False
+        self._queued = False
+        self._closed = False
+
+    def submit(self, frame: np.ndarray) -> bool:
+        """Queue a frame (replacing one not yet taken); False if one was dropped"""
+        return self.pool._submit(self, frame)
+
+    def close(self):
+        self.pool._close(self)
+
+
+class DecodePool:
+    """Fixed number of daemon decode threads, started on first use"""
+
+    _instance: Optional['DecodePool'] = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'DecodePool':
+        """Process-wide pool used by every CameraService"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, workers: int = CAMERA_DECODE_WORKERS):
+        self.workers = max(1, workers)
+        self._cond = threading.Condition()
+        self._ready = deque()  # Lane có khung chờ, theo thứ tự đến lượt
+        self._lanes: Dict[str, DecodeLane] = {}
+        self._threads = []
+        self._dropped_meter = METRICS.meter("camera.dropped")
+
+    def lane(self, name: str, process: Callable[[np.ndarray], Any],
+             on_result: Callable[[Any, float], None]) -> DecodeLane:
+        """Register a camera; names must be unique among open lanes"""
+        with self._cond:
+            if name in self._lanes:
+                raise ValueError(f"Camera đã được đăng ký: {name}")
+            lane = self._lanes[name] = DecodeLane(self, name, process, on_result)
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"qr-decode-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            return lane
+
+    @property
+    def lanes(self) -> int:
+        with self._cond:
+            return len(self._lanes)
+
+    def _submit(self, lane: DecodeLane, frame: np.ndarray) -> bool:
+        with self._cond:
+            if lane._closed:
+                return False
+            dropped = lane._frame is not None
+            lane._frame = frame
+            lane._submitted_at = time.perf_counter()
+            lane.submitted += 1
+            if dropped:
+                lane.dropped += 1
+                self._dropped_meter.mark()
+            if not lane._busy and not lane._queued:
+                lane._queued = True
+                self._ready.append(lane)
+                self._cond.notify()
+            return not dropped
+
+    def _close(self, lane: DecodeLane):
+        with self._cond:
+            lane._closed = True
+            lane._frame = None
+            if lane._queued:
+                self._ready.remove(lane)
+                lane._queued = False
+            if self._lanes.get(lane.name) is lane:
+                del self._lanes[lane.name]
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                lane = self._ready.popleft()
+                lane._queued = False
+                lane._busy = True
+                frame, submitted_at = lane._frame, lane._submitted_at
+                lane._frame = None
+            try:
+                result = lane.process(frame)
+                lane.on_result(result, time.perf_counter() - submitted_at)
+            except Exception as e:
+                print(f"QR decode error ({lane.name}): {e}")
+            finally:
+                with self._cond:
+                    lane._busy = False
+                    # Khung mới đến trong lúc giải mã: xếp lại cuối hàng (các camera khác đi trước)
+                    if lane._frame is not None and not lane._closed:
+                        lane._queued = True
+                        self._ready.append(lane)
+                        self._cond.notify()
+
+
+class DetectionDeduper:
+    """
+    Reports each code once per cooldown window, whichever camera saw it:
+    a label held up to two gate cameras (or lingering in front of one)
+    raises a single detection.
+    """
+
+    def __init__(self, cooldown: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._seen: Dict[str, float] = {}
+
+    def accept(self, data: str) -> bool:
+        """True if data was not reported within the last cooldown seconds"""
+        now = self.clock()
+        with self._lock:
+            last = self._seen.get(data)
+            if last is not None and now - last <= self.cooldown:
+                return False
+            self._seen[data] = now
+            if len(self._seen) > 256:
+                self._seen = {k: t for k, t in self._seen.items() if now - t <= self.cooldown}
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._seen.clear()
@@ -0,0 +1,510 @@
+"""
+Export Job Service - Run exports (PDF, CSV / Excel) and equipment imports in a background process pool
+"""
+import math
+import multiprocessing
+import queue
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from ..config import EXPORT_WORKERS, EXPORT_POLL_INTERVAL_MS
+
+
+class JobKind:
+    EQUIPMENT_REPORT = "equipment_report"
+    QR_SHEET = "qr_sheet"
+    EQUIPMENT_DETAIL = "equipment_detail"
+    DOSSIER_PDF = "dossier_pdf"      # Nhiều hồ sơ gộp 1 PDF (có bookmark)
+    DOSSIER_ZIP = "dossier_zip"      # Mỗi hồ sơ 1 PDF, nén vào 1 file ZIP
+    TABULAR = "tabular"              # CSV / Excel
+    EQUIPMENT_IMPORT = "equipment_import"  # Nhập trang bị từ CSV / Excel
+
+
+class JobStatus:
+    QUEUED = "Đang chờ"
+    RUNNING = "Đang chạy"
+    DONE = "Hoàn thành"
+    FAILED = "Lỗi"
+    CANCELLED = "Đã hủy"
+
+    FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class ExportCancelled(Exception):
+    """Raised inside a worker when the user cancels a running job"""
+
+
+# ----------------------------------------------------------------------
+# Phía tiến trình con (worker) - các hàm cấp module để pickle được
+# ----------------------------------------------------------------------
+
+_worker_service = None
+
+# Khoảng tối thiểu giữa 2 lần gửi tiến độ về GUI (giây)
+_PROGRESS_MIN_INTERVAL = 0.1
+
+
+def _get_worker_service():
+    """The worker process's shared ExportService (fonts are registered once)"""
+    global _worker_service
+    if _worker_service is None:
+        from .export_service import ExportService
+        _worker_service = ExportService.instance()
+    return _worker_service
+
+
+def _progress_reporter(job_id: int, shard: Optional[int], progress_queue, cancel_event):
+    """Progress callback for ExportService that also checks for cancellation"""
+    last_sent = [0.0]
+
+    def report(done: int, total: int):
+        if cancel_event.is_set():
+            raise ExportCancelled()
+        now = time.monotonic()
+        if done >= total or now - last_sent[0] >= _PROGRESS_MIN_INTERVAL:
+            last_sent[0] = now
+            progress_queue.put((job_id, shard, done, total))
+
+    return report
+
+
+def _run_export_job(job_id: int, kind: str, params: Dict[str, Any], save_path: str,
+                    progress_queue, cancel_event) -> Union[str, Dict[str, Optional[str]]]:
+    """
+    Entry point executed in a worker process.
+
+    Returns the written file's path; an import returns
+    {'path': error report or None, 'message': summary} instead.
+    """
+    from ..models.equipment import Equipment
+    from ..models.maintenance_log import MaintenanceLog
+    from ..models.loan_log import LoanLog
+
+    report = _progress_reporter(job_id, None, progress_queue, cancel_event)
+    progress_queue.put((job_id, None, 0, 0))
+    if kind == JobKind.EQUIPMENT_IMPORT:
+        # save_path là file nguồn: không bao giờ xóa khi hủy
+        from .import_service import ImportService
+        result = ImportService().import_file(
+            save_path, user_id=params.get('user_id'),
+            username=params.get('username') or "Hệ thống", progress_callback=report
+        )
+        return {'path': result.error_report, 'message': result.summary}
+
+    service = _get_worker_service()
+    try:
+        if kind == JobKind.EQUIPMENT_REPORT:
+            return service.export_equipment_report(
+                save_path=save_path, progress_callback=report, **params
+            )
+        if kind == JobKind.QR_SHEET:
+            equipment_list = Equipment.get_by_ids(params['equipment_ids'])
+            return service.export_qr_sheet(
+                equipment_list, save_path=save_path, progress_callback=report
+            )
+        if kind == JobKind.EQUIPMENT_DETAIL:
+            equipment = Equipment.get_by_id(params['equipment_id'])
+            if not equipment:
+                raise ValueError("Không tìm thấy thiết bị!")
+            return service.export_equipment_detail(
+                equipment,
+                MaintenanceLog.get_by_equipment(equipment.id),
+                LoanLog.get_by_equipment(equipment.id),
+                save_path=save_path,
+                progress_callback=report
+            )
+        if kind == JobKind.DOSSIER_PDF:
+            return service.export_equipment_dossiers(
+                params['equipment_ids'], save_path=save_path, progress_callback=report
+            )
+        if kind == JobKind.TABULAR:
+            from .tabular_export_service import TabularExportService
+            return TabularExportService().export(
+                params['dataset'], save_path=save_path,
+                filters=params['filters'], progress_callback=report
+            )
+        raise ValueError(f"Loại tác vụ không hợp lệ: {kind}")
+    except ExportCancelled:
+        # Không để lại file PDF dở dang
+        Path(save_path).unlink(missing_ok=True)
+        raise
+
+
+def _render_dossier_shard(job_id: int, shard: int, equipment_ids: List[int], work_dir: str,
+                          progress_queue, cancel_event) -> List[Tuple[str, str]]:
+    """Render the dossiers of one shard into work_dir (worker process)"""
+    report = _progress_reporter(job_id, shard, progress_queue, cancel_event)
+    if cancel_event.is_set():
+        raise ExportCancelled()
+    return _get_worker_service().export_equipment_dossier_files(
+        equipment_ids, work_dir, progress_callback=report
+    )
+
+
+def _pack_dossier_zip(job_id: int, files: List[Tuple[str, str]], save_path: str,
+                      progress_queue, cancel_event) -> str:
+    """Stream rendered dossiers into one ZIP (worker process)"""
+    report = _progress_reporter(job_id, None, progress_queue, cancel_event)
+    used_names = set()
+    try:
+        # PDF đã nén sẵn nên chỉ lưu (ZIP_STORED), tránh tốn CPU vô ích
+        with zipfile.ZipFile(save_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for done, (arcname, path) in enumerate(files, 1):
+                name = arcname
+                stem = arcname.rsplit(".", 1)[0]
+                suffix = 2
+                while name in used_names:
+                    name = f"{stem}_{suffix}.pdf"
+                    suffix += 1
+                used_names.add(name)
+                zf.write(path, name)
+                report(done, len(files))
+    except ExportCancelled:
+        Path(save_path).unlink(missing_ok=True)
+        raise
+    return save_path
+
+
+# ----------------------------------------------------------------------
+# Phía GUI
+# ----------------------------------------------------------------------
+
+@dataclass
+class ExportJob:
+    """State of one queued export, as seen by the GUI"""
+    id: int
+    kind: str
+    title: str
+    save_path: str
+    status: str = JobStatus.QUEUED
+    done: int = 0
+    total: int = 0
+    result: Optional[str] = None
+    error: Optional[str] = None
+    message: Optional[str] = None    # Tóm tắt kết quả (tác vụ nhập dữ liệu)
+    created_at: datetime = field(default_factory=datetime.now)
+    future: Any = field(default=None, repr=False)
+    cancel_event: Any = field(default=None, repr=False)
+
+    # Tác vụ chia nhỏ (hồ sơ ZIP): các phần render song song rồi mới nén
+    shards: List[Any] = field(default_factory=list, repr=False)
+    shard_done: Dict[int, int] = field(default_factory=dict, repr=False)
+    work_dir: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in JobStatus.FINISHED
+
+    @property
+    def percent(self) -> int:
+        if self.status == JobStatus.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.done * 100 / self.total))
+
+
+class ExportJobManager(QObject):
+    """
+    Queue of export jobs executed in a process pool.
+
+    ReportLab layout is CPU bound, so jobs run in separate processes and the
+    GUI thread only polls a progress queue. Jobs waiting in the queue can be
+    cancelled immediately; running jobs stop at their next progress report.
+    """
+
+    job_added = pyqtSignal(int)
+    job_updated = pyqtSignal(int)
+    job_finished = pyqtSignal(int)
+
+    DOSSIER_SHARD_MAX = 50
+
+    _instance: Optional['ExportJobManager'] = None
+
+    @classmethod
+    def instance(cls) -> 'ExportJobManager':
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, max_workers: int = EXPORT_WORKERS):
+        super().__init__()
+        self.max_workers = max_workers
+        self._jobs: Dict[int, ExportJob] = {}
+        self._next_id = 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._mp_manager = None
+        self._progress_queue = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(EXPORT_POLL_INTERVAL_MS)
+        self._timer.timeout.connect(self._poll)
+
+    def _ensure_pool(self):
+        """Start the worker pool lazily on the first submitted job"""
+        if self._executor is not None:
+            return
+        # spawn: an toàn với Qt (không fork tiến trình đang có thread GUI)
+        ctx = multiprocessing.get_context("spawn")
+        self._mp_manager = ctx.Manager()
+        self._progress_queue = self._mp_manager.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+
+    # ---------------- Submit ----------------
+
+    def submit(self, kind: str, title: str, params: Dict[str, Any], save_path: str) -> ExportJob:
+        """Queue a job and return its handle"""
+        self._ensure_pool()
+        job = ExportJob(id=self._next_id, kind=kind, title=title, save_path=str(save_path))
+        self._next_id += 1
+        job.cancel_event = self._mp_manager.Event()
+        job.future = self._executor.submit(
+            _run_export_job, job.id, kind, params, job.save_path,
+            self._progress_queue, job.cancel_event
+        )
+        self._jobs[job.id] = job
+        self.job_added.emit(job.id)
+        if not self._timer.isActive():
+            self._timer.start()
+        return job
+
+    def submit_equipment_report(self, save_path: str, filters: dict = None,
+                                group_by: str = None) -> ExportJob:
+        return self.submit(
+            JobKind.EQUIPMENT_REPORT,
+            "Danh sách trang bị",
+            {'filters': filters, 'group_by': group_by},
+            save_path
+        )
+
+    def submit_qr_sheet(self, save_path: str, equipment_ids: List[int]) -> ExportJob:
+        return self.submit(
+            JobKind.QR_SHEET,
+            f"Bảng mã QR ({len(equipment_ids)} thiết bị)",
+            {'equipment_ids': list(equipment_ids)},
+            save_path
+        )
+
+    def submit_tabular(self, dataset: str, save_path: str, filters: dict = None) -> ExportJob:
+        """CSV/XLSX export; the format follows the file extension"""
+        from .tabular_export_service import TabularExportService
+        _, label = TabularExportService.DATASETS[dataset]
+        fmt = Path(save_path).suffix.lstrip('.').upper() or "CSV"
+        return self.submit(
+            JobKind.TABULAR,
+            f"{label} ({fmt})",
+            {'dataset': dataset, 'filters': filters},
+            save_path
+        )
+
+    def submit_equipment_import(self, source_path: str, user_id: Optional[int] = None,
+                                username: str = None) -> ExportJob:
+        """Bulk equipment import; the job result is the error report (if any)"""
+        return self.submit(
+            JobKind.EQUIPMENT_IMPORT,
+            f"Nhập trang bị từ {Path(source_path).name}",
+            {'user_id': user_id, 'username': username},
+            source_path
+        )
+
+    def submit_dossier_archive(self, save_path: str, equipment_ids: List[int],
+                               merged: bool = False) -> ExportJob:
+        """
+        Batch dossier export for many equipment.
+
+        merged=True renders one PDF with a bookmark per item (sequential, one
+        worker). Otherwise the selection is split into shards rendered in
+        parallel by all workers, then streamed into a single ZIP.
+        """
+        equipment_ids = list(dict.fromkeys(equipment_ids))
+        title = f"Hồ sơ hàng loạt ({len(equipment_ids)} thiết bị)"
+        if merged:
+            return self.submit(
+                JobKind.DOSSIER_PDF, title, {'equipment_ids': equipment_ids}, save_path
+            )
+
+        self._ensure_pool()
+        job = ExportJob(id=self._next_id, kind=JobKind.DOSSIER_ZIP, title=title,
+                        save_path=str(save_path), total=len(equipment_ids))
+        self._next_id += 1
+        job.cancel_event = self._mp_manager.Event()
+        job.work_dir = tempfile.mkdtemp(prefix="dossier_", dir=str(Path(save_path).parent))
+
+        # Khoảng 4 phần mỗi worker để cân tải, mỗi phần tối đa DOSSIER_SHARD_MAX thiết bị
+        shard_size = max(1, min(self.DOSSIER_SHARD_MAX,
+                                math.ceil(len(equipment_ids) / (self.max_workers * 4))))
+        for shard, start in enumerate(range(0, len(equipment_ids), shard_size)):
+            job.shards.append(self._executor.submit(
+                _render_dossier_shard, job.id, shard,
+                equipment_ids[start:start + shard_size], job.work_dir,
+                self._progress_queue, job.cancel_event
+            ))
+        self._jobs[job.id] = job
+        self.job_added.emit(job.id)
+        if not self._timer.isActive():
+            self._timer.start()
+        return job
+
+    def submit_equipment_detail(self, equipment_id: int, serial_number: str,
+                                save_path: str = None) -> ExportJob:
+        if not save_path:
+            from .export_service import ExportService
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            ExportService.EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+            save_path = ExportService.EXPORT_DIR / f"equipment_{serial_number}_{timestamp}.pdf"
+        return self.submit(
+            JobKind.EQUIPMENT_DETAIL,
+            f"Hồ sơ {serial_number}",
+            {'equipment_id': equipment_id},
+            save_path
+        )
+
+    # ---------------- Query / control ----------------
+
+    def get(self, job_id: int) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ExportJob]:
+        return list(self._jobs.values())
+
+    def pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.is_finished)
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job, or ask a running one to stop"""
+        job = self._jobs.get(job_id)
+        if not job or job.is_finished:
+            return False
+        if job.shards and job.future is None:
+            job.cancel_event.set()
+            for future in job.shards:
+                future.cancel()
+            return True
+        if job.future.cancel():
+            self._finish(job, JobStatus.CANCELLED)
+            return True
+        job.cancel_event.set()
+        return True
+
+    def clear_finished(self):
+        """Forget finished jobs (the files stay on disk)"""
+        for job_id in [j.id for j in self._jobs.values() if j.is_finished]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        """Cancel everything and stop the workers (called on app exit)"""
+        self._timer.stop()
+        for job in self._jobs.values():
+            if not job.is_finished:
+                for future in job.shards + [job.future]:
+                    if future is not None:
+                        future.cancel()
+                job.cancel_event.set()
+                self._cleanup_work_dir(job)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._mp_manager is not None:
+            self._mp_manager.shutdown()
+            self._mp_manager = None
+
+    # ---------------- Polling ----------------
+
+    def _cleanup_work_dir(self, job: ExportJob):
+        if job.work_dir:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            job.work_dir = None
+
+    def _finish(self, job: ExportJob, status: str, error: str = None):
+        job.status = status
+        job.error = error
+        self._cleanup_work_dir(job)
+        self.job_updated.emit(job.id)
+        self.job_finished.emit(job.id)
+
+    def _poll_shards(self, job: ExportJob) -> bool:
+        """
+        Advance a sharded job; returns True when it reached a final state.
+        Once every shard has rendered, the ZIP packing step is queued.
+        """
+        if not all(f.done() for f in job.shards):
+            return False
+        files = []
+        for future in job.shards:
+            try:
+                files.extend(future.result())
+            except (ExportCancelled, CancelledError):
+                self._finish(job, JobStatus.CANCELLED)
+                return True
+            except Exception as e:
+                job.cancel_event.set()
+                self._finish(job, JobStatus.FAILED, str(e) or e.__class__.__name__)
+                return True
+        if job.cancel_event.is_set():
+            self._finish(job, JobStatus.CANCELLED)
+            return True
+        job.future = self._executor.submit(
+            _pack_dossier_zip, job.id, files, job.save_path,
+            self._progress_queue, job.cancel_event
+        )
+        job.shards = []
+        return False
+
+    def _poll(self):
+        """Drain progress messages and collect finished futures"""
+        updated = set()
+        while True:
+            try:
+                job_id, shard, done, total = self._progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            except (EOFError, OSError):
+                break
+            job = self._jobs.get(job_id)
+            if not job or job.is_finished:
+                continue
+            job.status = JobStatus.RUNNING
+            if shard is None:
+                job.done, job.total = done, total
+            else:
+                job.shard_done[shard] = done
+                job.done = sum(job.shard_done.values())
+            updated.add(job_id)
+
+        for job in list(self._jobs.values()):
+            if job.is_finished:
+                continue
+            if job.future is None:
+                if self._poll_shards(job):
+                    updated.discard(job.id)
+                continue
+            if not job.future.done():
+                continue
+            try:
+                result = job.future.result()
+                if isinstance(result, dict):
+                    job.result, job.message = result.get('path'), result.get('message')
+                else:
+                    job.result = result
+                status, error = JobStatus.DONE, None
+            except (ExportCancelled, CancelledError):
+                status, error = JobStatus.CANCELLED, None
+            except Exception as e:
+                status, error = JobStatus.FAILED, str(e) or e.__class__.__name__
+            updated.discard(job.id)
+            self._finish(job, status, error)
+
+        for job_id in updated:
+            self.job_updated.emit(job_id)
+
+        if not self.pending_count():
+            self._timer.stop()
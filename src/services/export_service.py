@@ -7,20 +7,147 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import mm, cm
 from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph, 
-    Spacer, Image as RLImage, PageBreak
+    Spacer, Image as RLImage, PageBreak, Flowable
 )
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from PIL import Image
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Callable, Iterator, Tuple
 import io
-import os
+import re
+import threading
 
-from ..config import DATA_DIR, APP_NAME
+from ..config import DATA_DIR, ASSETS_DIR, APP_NAME
 from ..models.equipment import Equipment
+from ..models.maintenance_log import MaintenanceLog
+from ..models.loan_log import LoanLog
 from ..services.qr_service import QRService
+from ..services.qr_payload import equipment_payload
+
+
+# Cặp font (thường, đậm) hỗ trợ tiếng Việt, thử theo thứ tự. Font đóng gói
+# trong assets/fonts đứng đầu để bản Linux không rơi về Helvetica (mất dấu).
+FONT_CANDIDATES = [
+    (ASSETS_DIR / "fonts" / "DejaVuSans.ttf", ASSETS_DIR / "fonts" / "DejaVuSans-Bold.ttf"),
+    (Path("C:/Windows/Fonts/arial.ttf"), Path("C:/Windows/Fonts/arialbd.ttf")),
+    (Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
+     Path("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")),
+    (Path("/usr/share/fonts/dejavu-sans-fonts/DejaVuSans.ttf"),
+     Path("/usr/share/fonts/dejavu-sans-fonts/DejaVuSans-Bold.ttf")),
+    (Path("/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf"),
+     Path("/usr/share/fonts/truetype/noto/NotoSans-Bold.ttf")),
+]
+
+_setup_lock = threading.Lock()
+_setup_cache: Optional[Tuple[str, str, object]] = None
+
+
+def _register_fonts() -> Tuple[str, str]:
+    """Parse and register the first available Vietnamese font pair"""
+    for regular_path, bold_path in FONT_CANDIDATES:
+        if not regular_path.exists():
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont('VNSans', str(regular_path)))
+            bold_name = 'VNSans'  # Fallback nếu không có bold
+            if bold_path.exists():
+                pdfmetrics.registerFont(TTFont('VNSans-Bold', str(bold_path)))
+                bold_name = 'VNSans-Bold'
+            pdfmetrics.registerFontFamily('VNSans', normal='VNSans', bold=bold_name,
+                                          italic='VNSans', boldItalic=bold_name)
+            return 'VNSans', bold_name
+        except Exception as e:
+            print(f"Lỗi đăng ký font {regular_path}: {e}")
+    print("Không tìm thấy font tiếng Việt, dùng Helvetica")
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+def _build_styles(font_name: str, bold_font_name: str):
+    """Sample stylesheet plus the *VN paragraph styles used by every report"""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='TitleVN',
+        parent=styles['Title'],
+        fontName=bold_font_name,
+        fontSize=18,
+        spaceAfter=20
+    ))
+    styles.add(ParagraphStyle(
+        name='HeadingVN',
+        parent=styles['Heading2'],
+        fontName=bold_font_name,
+        fontSize=14,
+        spaceAfter=10
+    ))
+    styles.add(ParagraphStyle(
+        name='BodyVN',
+        parent=styles['Normal'],
+        fontName=font_name,
+        fontSize=10,
+        spaceAfter=6
+    ))
+    return styles
+
+
+def _pdf_setup() -> Tuple[str, str, object]:
+    """
+    Fonts and styles, built once per process. Parsed TTFonts stay in the
+    reportlab registry and the stylesheet is read-only afterwards, so the
+    result can be shared across threads.
+    """
+    global _setup_cache
+    if _setup_cache is None:
+        with _setup_lock:
+            if _setup_cache is None:
+                font_name, bold_font_name = _register_fonts()
+                _setup_cache = (font_name, bold_font_name,
+                                _build_styles(font_name, bold_font_name))
+    return _setup_cache
+
+
+class _StreamingDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate that pulls its flowables lazily from an iterator.
+    build() consumes the flowable list from the front, so keeping a small
+    look-ahead in that list lets huge reports render without ever holding
+    all tables in memory.
+    """
+    
+    def __init__(self, filename, feed: Iterator, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._feed = feed
+    
+    def filterFlowables(self, flowables):
+        # handle_flowable() cũng được gọi cho danh sách _hanging nội bộ
+        if flowables is self._hanging:
+            return
+        # Giữ tối thiểu 2 phần tử để vòng lặp build() không kết thúc sớm
+        # và keepWithNext (tiêu đề nhóm) còn nhìn thấy bảng phía sau
+        while len(flowables) < 2:
+            nxt = next(self._feed, None)
+            if nxt is None:
+                break
+            flowables.append(nxt)
+
+
+class _Bookmark(Flowable):
+    """Zero-size flowable adding a PDF outline entry at its position"""
+    
+    def __init__(self, key: str, title: str, level: int = 0):
+        super().__init__()
+        self.key = key
+        self.title = title
+        self.level = level
+    
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+    
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=self.level)
+        self.canv.showOutline()
 
 
 class ExportService:
@@ -30,64 +157,33 @@ class ExportService:
     
     EXPORT_DIR = DATA_DIR / "exports"
     
+    EQUIPMENT_TABLE_HEADER = ['STT', 'Tên thiết bị', 'Số hiệu', 'Loại', 'NSX',
+                              'Năm SX', 'Tình trạng', 'Đơn vị', 'Vị trí']
+    EQUIPMENT_TABLE_COL_WIDTHS = [1*cm, 4*cm, 3*cm, 2.5*cm, 2.5*cm, 1.5*cm, 3*cm, 2*cm, 3*cm]
+    
+    # Số dòng mỗi bảng con trong báo cáo dạng luồng (khoảng 1 trang A4 ngang)
+    REPORT_CHUNK_ROWS = 30
+    
+    # Số thiết bị nạp trước (kèm lịch sử) mỗi lần khi xuất hồ sơ hàng loạt
+    DOSSIER_PREFETCH_SIZE = 100
+    
+    _instance: Optional['ExportService'] = None
+    _instance_lock = threading.Lock()
+    
+    @classmethod
+    def instance(cls) -> 'ExportService':
+        """Process-wide service; every method is safe to call from any thread"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
     def __init__(self):
         self.EXPORT_DIR.mkdir(parents=True, exist_ok=True)
         self.qr_service = QRService()
-        
-        # Default fonts fallback
-        self.font_name = 'Helvetica'
-        self.bold_font_name = 'Helvetica-Bold'
-        
-        self._register_fonts()
-        self.styles = getSampleStyleSheet()
-        self._setup_styles()
-    
-    def _register_fonts(self):
-        """Register Vietnamese-compatible fonts (Arial)"""
-        try:
-            # Đường dẫn font trên Windows
-            arial_path = "C:/Windows/Fonts/arial.ttf"
-            arial_bold_path = "C:/Windows/Fonts/arialbd.ttf"
-            
-            # Kiểm tra và đăng ký Arial Regular
-            if os.path.exists(arial_path):
-                pdfmetrics.registerFont(TTFont('Arial', arial_path))
-                self.font_name = 'Arial'
-                
-                # Kiểm tra và đăng ký Arial Bold
-                if os.path.exists(arial_bold_path):
-                    pdfmetrics.registerFont(TTFont('Arial-Bold', arial_bold_path))
-                    self.bold_font_name = 'Arial-Bold'
-                else:
-                    self.bold_font_name = 'Arial' # Fallback nếu không có bold
-                    
-        except Exception as e:
-            print(f"Lỗi đăng ký font: {e}")
-            # Vẫn chạy tiếp với font mặc định
-    
-    def _setup_styles(self):
-        """Setup custom paragraph styles with Vietnamese font"""
-        self.styles.add(ParagraphStyle(
-            name='TitleVN',
-            parent=self.styles['Title'],
-            fontName=self.bold_font_name, 
-            fontSize=18,
-            spaceAfter=20
-        ))
-        self.styles.add(ParagraphStyle(
-            name='HeadingVN',
-            parent=self.styles['Heading2'],
-            fontName=self.bold_font_name, 
-            fontSize=14,
-            spaceAfter=10
-        ))
-        self.styles.add(ParagraphStyle(
-            name='BodyVN',
-            parent=self.styles['Normal'],
-            fontName=self.font_name, 
-            fontSize=10,
-            spaceAfter=6
-        ))
+        # Font và style chỉ dựng một lần cho cả tiến trình
+        self.font_name, self.bold_font_name, self.styles = _pdf_setup()
     
     def export_equipment_list(
         self, 
@@ -127,30 +223,53 @@ class ExportService:
         elements.append(Spacer(1, 10*mm))
         
         # Table data
-        table_data = [
-            ['STT', 'Tên thiết bị', 'Số hiệu', 'Loại', 'NSX', 
-             'Năm SX', 'Tình trạng', 'Đơn vị', 'Vị trí']
-        ]
+        table_data = [self.EQUIPMENT_TABLE_HEADER]
         
         for idx, equip in enumerate(equipment_list, 1):
-            unit_display = equip.unit_name if equip.unit_name else "-"
-            
-            table_data.append([
-                str(idx),
-                equip.name[:30] + '...' if len(equip.name) > 30 else equip.name,
-                equip.serial_number,
-                equip.category[:15] if len(equip.category) > 15 else equip.category,
-                equip.manufacturer[:15] if len(equip.manufacturer) > 15 else equip.manufacturer,
-                str(equip.manufacture_year) if equip.manufacture_year else '-',
-                equip.status,
-                unit_display[:15] if len(unit_display) > 15 else unit_display,
-                equip.location[:15] if len(equip.location) > 15 else equip.location
-            ])
-        
-        # Create table
-        col_widths = [1*cm, 4*cm, 3*cm, 2.5*cm, 2.5*cm, 1.5*cm, 3*cm, 2*cm, 3*cm]
-        table = Table(table_data, colWidths=col_widths, repeatRows=1)
+            table_data.append(self._equipment_row_cells(
+                idx, equip.name, equip.serial_number, equip.category,
+                equip.manufacturer, equip.manufacture_year, equip.status,
+                equip.unit_name, equip.location
+            ))
+        
+        table = self._equipment_table(table_data)
+        
+        elements.append(table)
+        
+        # Footer
+        elements.append(Spacer(1, 10*mm))
+        elements.append(Paragraph(
+            f"Tổng số: {len(equipment_list)} thiết bị",
+            self.styles['BodyVN']
+        ))
         
+        doc.build(elements)
+        return str(filepath)
+    
+    @staticmethod
+    def _equipment_row_cells(idx, name, serial_number, category, manufacturer,
+                             manufacture_year, status, unit_name, location) -> list:
+        """Format one equipment row for the list table (truncated, single line)"""
+        name = name or ''
+        category = category or ''
+        manufacturer = manufacturer or ''
+        location = location or ''
+        unit_display = unit_name if unit_name else "-"
+        return [
+            str(idx),
+            name[:30] + '...' if len(name) > 30 else name,
+            serial_number,
+            category[:15],
+            manufacturer[:15],
+            str(manufacture_year) if manufacture_year else '-',
+            status,
+            unit_display[:15],
+            location[:15]
+        ]
+    
+    def _equipment_table(self, table_data: list) -> Table:
+        """Build a styled equipment table; the first row is the header"""
+        table = Table(table_data, colWidths=self.EQUIPMENT_TABLE_COL_WIDTHS, repeatRows=1)
         table.setStyle(TableStyle([
             # Header
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1976D2')),
@@ -172,25 +291,123 @@ class ExportService:
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F5F5F5')])
         ]))
+        return table
+    
+    def export_equipment_report(
+        self,
+        save_path: str = None,
+        filters: dict = None,
+        group_by: str = None,
+        title: str = "DANH SÁCH VŨ KHÍ TRANG BỊ",
+        chunk_rows: int = REPORT_CHUNK_ROWS,
+        progress_callback: Callable[[int, int], None] = None
+    ) -> str:
+        """
+        Export the equipment list as a streaming PDF report.
+        
+        Rows are pulled from a DB cursor in chunks and laid out as fixed-size
+        tables with a repeated header, so memory stays bounded and layout time
+        grows linearly with the row count.
+        
+        Args:
+            save_path: Output file (defaults to EXPORT_DIR)
+            filters: Same keys as Equipment.build_filter
+            group_by: None, 'unit' or 'category' (ordering done in SQL)
+            title: Report title
+            chunk_rows: Rows per table chunk
+            progress_callback: Called as (rows_done, rows_total)
+            
+        Returns:
+            Path of the generated PDF
+        """
+        if save_path:
+            filepath = Path(save_path)
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = self.EXPORT_DIR / f"equipment_report_{timestamp}.pdf"
+        
+        total = Equipment.count_filtered(filters)
+        group_counts = Equipment.count_by_group(filters, group_by)
+        row_chunks = Equipment.iter_report_rows(filters, group_by, chunk_size=max(chunk_rows, 500))
+        
+        header = [
+            Paragraph(title, self.styles['TitleVN']),
+            Paragraph(
+                f"Ngày xuất: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+                self.styles['BodyVN']
+            ),
+            Spacer(1, 10*mm),
+        ]
+        feed = self._iter_report_flowables(
+            row_chunks, group_by, group_counts, chunk_rows, total, progress_callback
+        )
         
-        elements.append(table)
-        
-        # Footer
-        elements.append(Spacer(1, 10*mm))
-        elements.append(Paragraph(
-            f"Tổng số: {len(equipment_list)} thiết bị",
-            self.styles['BodyVN']
-        ))
-        
-        doc.build(elements)
+        doc = _StreamingDocTemplate(
+            str(filepath),
+            feed,
+            pagesize=landscape(A4),
+            rightMargin=1*cm,
+            leftMargin=1*cm,
+            topMargin=1.5*cm,
+            bottomMargin=1*cm
+        )
+        try:
+            doc.build(header)
+        finally:
+            # Đóng cursor nếu build bị dừng giữa chừng (lỗi hoặc hủy)
+            feed.close()
+            row_chunks.close()
         return str(filepath)
     
+    def _iter_report_flowables(self, row_chunks, group_by, group_counts, chunk_rows,
+                               total, progress_callback) -> Iterator:
+        """Turn streamed rows into table chunks, group headings and a footer"""
+        buffer = []
+        current_group = None
+        idx = 0
+        
+        def flush():
+            table = self._equipment_table([self.EQUIPMENT_TABLE_HEADER] + buffer)
+            buffer.clear()
+            return table
+        
+        for rows in row_chunks:
+            for row in rows:
+                if group_by:
+                    group_name = row['group_name']
+                    if idx == 0 or group_name != current_group:
+                        if buffer:
+                            yield flush()
+                        current_group = group_name
+                        label = group_name or "(Chưa phân loại)"
+                        count = group_counts.get(group_name, 0)
+                        yield Spacer(1, 4*mm)
+                        yield Paragraph(f"{label} ({count} thiết bị)", self.styles['HeadingVN'])
+                idx += 1
+                buffer.append(self._equipment_row_cells(
+                    idx, row['name'], row['serial_number'], row['category'],
+                    row['manufacturer'], row['manufacture_year'], row['status'],
+                    row['unit_name'], row['location']
+                ))
+                if len(buffer) >= chunk_rows:
+                    yield flush()
+                    if progress_callback:
+                        progress_callback(idx, total)
+        if buffer:
+            yield flush()
+        if progress_callback:
+            progress_callback(idx, total)
+        
+        yield Spacer(1, 10*mm)
+        yield Paragraph(f"Tổng số: {idx} thiết bị", self.styles['BodyVN'])
+    
     def export_qr_sheet(
         self,
         equipment_list: List[Equipment],
         save_path: str = None, # [MỚI] Nhận đường dẫn lưu file
         qr_per_row: int = 4,
-        qr_size: int = 35  # mm
+        qr_size: int = 35,  # mm
+        progress_callback: Callable[[int, int], None] = None
     ) -> str:
         """
         Export QR code sheet for printing
@@ -229,11 +446,14 @@ class ExportService:
         qr_data = []
         current_row = []
         
-        for equip in equipment_list:
+        total = len(equipment_list)
+        error_correction = QRService.error_correction_for(qr_size)
+        for done, equip in enumerate(equipment_list, 1):
             # Generate QR with label
             qr_img, _ = self.qr_service.generate_qr_with_label(
-                f"VKTBKT|{equip.id}|{equip.serial_number}",
-                f"{equip.serial_number}"
+                equipment_payload(equip.id, equip.serial_number),
+                f"{equip.serial_number}",
+                error_correction=error_correction
             )
             
             # Convert PIL Image to ReportLab Image
@@ -254,6 +474,9 @@ class ExportService:
             if len(current_row) == qr_per_row:
                 qr_data.append(current_row)
                 current_row = []
+            
+            if progress_callback:
+                progress_callback(done, total)
         
         # Add remaining items
         if current_row:
@@ -280,7 +503,8 @@ class ExportService:
         equipment: Equipment,
         maintenance_logs: list = None,
         loan_logs: list = None,
-        save_path: str = None # [MỚI] Nhận đường dẫn lưu file
+        save_path: str = None, # [MỚI] Nhận đường dẫn lưu file
+        progress_callback: Callable[[int, int], None] = None
     ) -> str:
         """
         Export detailed equipment report with maintenance and loan history
@@ -302,6 +526,29 @@ class ExportService:
             bottomMargin=2*cm
         )
         
+        elements = self._equipment_detail_flowables(equipment, maintenance_logs, loan_logs)
+        
+        # Footer
+        elements.append(Spacer(1, 15*mm))
+        elements.append(Paragraph(
+            f"Xuất ngày: {datetime.now().strftime('%d/%m/%Y %H:%M')} | {APP_NAME}",
+            self.styles['BodyVN']
+        ))
+        
+        if progress_callback:
+            progress_callback(0, 1)
+        doc.build(elements)
+        if progress_callback:
+            progress_callback(1, 1)
+        return str(filepath)
+    
+    def _equipment_detail_flowables(
+        self,
+        equipment: Equipment,
+        maintenance_logs: list = None,
+        loan_logs: list = None
+    ) -> list:
+        """Flowables of one equipment dossier (info, QR, maintenance and loan history)"""
         elements = []
         
         # Title
@@ -326,12 +573,7 @@ class ExportService:
         unit_display = equipment.unit_name if equipment.unit_name else "-"
         
         # Format receive_date
-        receive_date_str = "-"
-        if equipment.receive_date:
-            if hasattr(equipment.receive_date, 'strftime'):
-                receive_date_str = equipment.receive_date.strftime('%d/%m/%Y')
-            else:
-                receive_date_str = str(equipment.receive_date)[:10]
+        receive_date_str = equipment.receive_date.strftime('%d/%m/%Y') if equipment.receive_date else "-"
         
         loan_status_display = equipment.loan_status if equipment.loan_status else "Đang ở kho"
 
@@ -378,11 +620,7 @@ class ExportService:
             log_data = [['STT', 'Loại', 'Mô tả', 'Kỹ thuật viên', 'Ngày', 'Trạng thái']]
             
             for idx, log in enumerate(maintenance_logs, 1):
-                start_date = log.start_date
-                if isinstance(start_date, str):
-                    date_str = start_date[:10]
-                else:
-                    date_str = start_date.strftime('%d/%m/%Y') if start_date else '-'
+                date_str = log.start_date.strftime('%d/%m/%Y') if log.start_date else '-'
                 
                 tech_name = getattr(log, 'technician_name', None) or getattr(log, 'technician', '-')
                 
@@ -419,20 +657,8 @@ class ExportService:
             loan_data = [['STT', 'Đơn vị mượn', 'Ngày mượn', 'Ngày trả', 'Trạng thái', 'Ghi chú']]
             
             for idx, loan in enumerate(loan_logs, 1):
-                loan_date = loan.loan_date
-                if isinstance(loan_date, str):
-                    loan_date_str = loan_date[:10]
-                else:
-                    loan_date_str = loan_date.strftime('%d/%m/%Y') if loan_date else '-'
-                
-                return_date = loan.return_date
-                if return_date:
-                    if isinstance(return_date, str):
-                        return_date_str = return_date[:10]
-                    else:
-                        return_date_str = return_date.strftime('%d/%m/%Y')
-                else:
-                    return_date_str = '-'
+                loan_date_str = loan.loan_date.strftime('%d/%m/%Y') if loan.loan_date else '-'
+                return_date_str = loan.return_date.strftime('%d/%m/%Y') if loan.return_date else '-'
                 
                 loan_data.append([
                     str(idx),
@@ -456,12 +682,101 @@ class ExportService:
             
             elements.append(loan_table)
         
-        # Footer
-        elements.append(Spacer(1, 15*mm))
-        elements.append(Paragraph(
-            f"Xuất ngày: {datetime.now().strftime('%d/%m/%Y %H:%M')} | {APP_NAME}",
-            self.styles['BodyVN']
-        ))
+        return elements
+    
+    def _iter_dossier_batches(self, equipment_ids: List[int], batch_size: int):
+        """Yield (equipment, maintenance_logs, loan_logs) with set-based prefetch per batch"""
+        for start in range(0, len(equipment_ids), batch_size):
+            batch_ids = equipment_ids[start:start + batch_size]
+            equipment_list = Equipment.get_by_ids(batch_ids)
+            maintenance_by_id = MaintenanceLog.get_by_equipment_ids(batch_ids)
+            loans_by_id = LoanLog.get_by_equipment_ids(batch_ids)
+            for equipment in equipment_list:
+                yield (
+                    equipment,
+                    maintenance_by_id.get(equipment.id, []),
+                    loans_by_id.get(equipment.id, [])
+                )
+    
+    @staticmethod
+    def dossier_filename(equipment: Equipment) -> str:
+        """File name of one dossier inside a batch archive"""
+        safe_serial = re.sub(r'[\\/:*?"<>|\s]+', '_', equipment.serial_number).strip('_')
+        return f"{safe_serial or equipment.id}.pdf"
+    
+    def export_equipment_dossier_files(
+        self,
+        equipment_ids: List[int],
+        out_dir: str,
+        progress_callback: Callable[[int, int], None] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Render one dossier PDF per equipment into out_dir.
         
-        doc.build(elements)
-        return str(filepath)
\ No newline at end of file
+        Returns:
+            List of (archive name, file path) in input order
+        """
+        files = []
+        total = len(equipment_ids)
+        for done, (equipment, maintenance_logs, loan_logs) in enumerate(
+            self._iter_dossier_batches(equipment_ids, self.DOSSIER_PREFETCH_SIZE), 1
+        ):
+            filepath = Path(out_dir) / f"{equipment.id}.pdf"
+            self.export_equipment_detail(equipment, maintenance_logs, loan_logs, save_path=str(filepath))
+            files.append((self.dossier_filename(equipment), str(filepath)))
+            if progress_callback:
+                progress_callback(done, total)
+        return files
+    
+    def export_equipment_dossiers(
+        self,
+        equipment_ids: List[int],
+        save_path: str = None,
+        progress_callback: Callable[[int, int], None] = None
+    ) -> str:
+        """
+        Export many dossiers as one PDF, one bookmark per equipment.
+        
+        Dossiers are laid out as a stream (see _StreamingDocTemplate) so only
+        one prefetch batch is held in memory at a time.
+        """
+        if save_path:
+            filepath = Path(save_path)
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = self.EXPORT_DIR / f"ho_so_trang_bi_{timestamp}.pdf"
+        
+        total = len(equipment_ids)
+        
+        def feed():
+            for done, (equipment, maintenance_logs, loan_logs) in enumerate(
+                self._iter_dossier_batches(equipment_ids, self.DOSSIER_PREFETCH_SIZE), 1
+            ):
+                if done > 1:
+                    yield PageBreak()
+                yield _Bookmark(f"eq{equipment.id}", f"{equipment.serial_number} - {equipment.name}")
+                yield from self._equipment_detail_flowables(equipment, maintenance_logs, loan_logs)
+                if progress_callback:
+                    progress_callback(done, total)
+            yield Spacer(1, 15*mm)
+            yield Paragraph(
+                f"Xuất ngày: {datetime.now().strftime('%d/%m/%Y %H:%M')} | {APP_NAME}",
+                self.styles['BodyVN']
+            )
+        
+        flowables = feed()
+        doc = _StreamingDocTemplate(
+            str(filepath),
+            flowables,
+            pagesize=A4,
+            rightMargin=2*cm,
+            leftMargin=2*cm,
+            topMargin=2*cm,
+            bottomMargin=2*cm,
+            title="Hồ sơ vũ khí trang bị"
+        )
+        try:
+            doc.build([next(flowables)])
+        finally:
+            flowables.close()
+        return str(filepath)
@@ -0,0 +1,164 @@
+"""
+Frame Gate - Decide which camera frames are worth a QR decode (no Qt dependency)
+
+A full-frame decode costs tens of milliseconds; comparing two 160x90
+thumbnails costs well under one. An idle scan station (empty desk, or a
+label that was already read and is still lying there) therefore only pays
+for the thumbnail, and a frame is decoded when the picture has changed,
+stopped moving and is sharp enough to be read.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .qr_decoder import DecodedCode, decode_frame
+
+THUMB_WIDTH = 160
+SHARPNESS_WIDTH = 320
+
+
+@dataclass
+class GateStats:
+    """Counters since the gate was created (or reset)"""
+    frames: int = 0
+    decoded: int = 0         # Frames that ran the decoder (full frame or region)
+    tracked: int = 0         # ...of which the region decode alone found the code
+    skipped_static: int = 0  # Same picture as the last decoded frame
+    skipped_motion: int = 0  # Picture still moving, wait for it to settle
+    skipped_blur: int = 0    # Too little detail to hold a readable code
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class FrameGate:
+    """
+    process(frame) returns the codes in a frame, running the decoder only
+    when needed; on a skipped static frame it returns the codes of the last
+    decoded one (so overlays and the duplicate cooldown behave as before).
+
+    With tracking on, a changed frame is first decoded only inside the last
+    code's polygon (plus a margin), falling back to the full frame when the
+    code is no longer there. Tracking is meant for single-code scanning:
+    while it holds, new codes elsewhere in the frame are not looked for.
+    """
+
+    def __init__(self, decoder: Callable[[np.ndarray], List[DecodedCode]] = decode_frame,
+                 tracking: bool = True, pixel_threshold: int = 12,
+                 change_ratio: float = 0.002, motion_ratio: float = 0.02,
+                 max_motion_skips: int = 5, min_sharpness: float = 60.0,
+                 refresh_s: float = 1.0, roi_margin: float = 0.35,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            decoder: Function decoding a BGR frame (or crop)
+            tracking: Re-check the last code's region before the full frame
+            pixel_threshold: Grey-level difference for a thumbnail pixel to count as changed
+            change_ratio: Share of changed pixels vs. the last decoded frame to decode again
+            motion_ratio: Share of changed pixels vs. the previous frame that means "moving"
+            max_motion_skips: Decode anyway after this many moving frames in a row
+            min_sharpness: Minimum Laplacian variance (on a 320 px wide thumbnail)
+            refresh_s: Decode a static picture holding a code again after this many seconds
+            roi_margin: Margin around the tracked polygon, as a fraction of its size
+        """
+        self.decoder = decoder
+        self.tracking = tracking
+        self.pixel_threshold = pixel_threshold
+        self.change_ratio = change_ratio
+        self.motion_ratio = motion_ratio
+        self.max_motion_skips = max_motion_skips
+        self.min_sharpness = min_sharpness
+        self.refresh_s = refresh_s
+        self.roi_margin = roi_margin
+        self.clock = clock
+        self.stats = GateStats()
+        self.decoded = False  # Did the last process() call run the decoder
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame, so the next frame is decoded"""
+        self._previous: Optional[np.ndarray] = None
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+        self._codes: List[DecodedCode] = []
+        self._roi: Optional[Tuple[int, int, int, int]] = None
+        self._motion_skips = 0
+
+    def process(self, frame: np.ndarray) -> List[DecodedCode]:
+        self.stats.frames += 1
+        self.decoded = False
+        now = self.clock()
+
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape
+        medium = cv2.resize(gray, (SHARPNESS_WIDTH, max(1, h * SHARPNESS_WIDTH // w)),
+                            interpolation=cv2.INTER_AREA)
+        thumb = cv2.resize(medium, (THUMB_WIDTH, max(1, h * THUMB_WIDTH // w)),
+                           interpolation=cv2.INTER_AREA)
+        moving = self._previous is not None and self._changed(thumb, self._previous) > self.motion_ratio
+        self._previous = thumb
+
+        # 1. Không có gì thay đổi so với khung đã giải mã gần nhất (khung trống không cần
+        #    giải mã lại định kỳ: mã chỉ xuất hiện khi ảnh thay đổi)
+        if (self._reference is not None
+                and (now - self._reference_time < self.refresh_s or not self._codes)
+                and self._changed(thumb, self._reference) <= self.change_ratio):
+            self.stats.skipped_static += 1
+            return list(self._codes)
+
+        # 2. Đang di chuyển: ảnh nhòe, chờ ổn định (nhưng không chờ mãi)
+        if moving and self._motion_skips < self.max_motion_skips:
+            self._motion_skips += 1
+            self.stats.skipped_motion += 1
+            return []
+        self._motion_skips = 0
+
+        # 3. Quá mờ / trống trơn: không thể chứa mã đọc được
+        if cv2.Laplacian(medium, cv2.CV_16S).var() < self.min_sharpness:
+            self.stats.skipped_blur += 1
+            self._remember(thumb, now, [])
+            return []
+
+        self.decoded = True
+        self.stats.decoded += 1
+        roi = self._roi  # reset() có thể chạy từ luồng giao diện
+        codes = self._decode_region(frame, roi) if self.tracking and roi else None
+        if codes:
+            self.stats.tracked += 1
+        else:
+            codes = self.decoder(frame)
+        self._remember(thumb, now, codes)
+        return list(codes)
+
+    def _changed(self, a: np.ndarray, b: np.ndarray) -> float:
+        """Share of thumbnail pixels that differ noticeably"""
+        return np.count_nonzero(cv2.absdiff(a, b) > self.pixel_threshold) / a.size
+
+    def _remember(self, thumb: np.ndarray, now: float, codes: List[DecodedCode]):
+        self._reference = thumb
+        self._reference_time = now
+        self._codes = codes
+        self._roi = None
+        if len(codes) == 1 and len(codes[0].polygon) >= 3:
+            xs = [p[0] for p in codes[0].polygon]
+            ys = [p[1] for p in codes[0].polygon]
+            mx = int((max(xs) - min(xs)) * self.roi_margin)
+            my = int((max(ys) - min(ys)) * self.roi_margin)
+            self._roi = (min(xs) - mx, min(ys) - my, max(xs) + mx, max(ys) + my)
+
+    def _decode_region(self, frame: np.ndarray, roi: Tuple[int, int, int, int]) -> List[DecodedCode]:
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = roi
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if x1 - x0 < 21 or y1 - y0 < 21:
+            return []
+        codes = self.decoder(frame[y0:y1, x0:x1])
+        # Tọa độ vùng cắt -> tọa độ khung hình
+        return [
+            DecodedCode(code.data, [(x + x0, y + y0) for x, y in code.polygon])
+            for code in codes
+        ]
@@ -0,0 +1,342 @@
+"""
+Frame Sources - Where the scan pipeline gets its frames from (no Qt dependency)
+
+CameraService reads a FrameSource instead of calling cv2.VideoCapture
+directly, so the same decode path runs on a webcam, a recorded video, a
+folder of photos or generated frames (headless benchmarks, Linux hosts
+without a camera).
+"""
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..config import CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS
+from .qr_payload import equipment_payload
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def capture_backend() -> int:
+    """
+    cv2 capture API for this OS: DirectShow on Windows (opens far faster than
+    the default MSMF), AVFoundation on macOS, V4L2 on Linux.
+    """
+    if sys.platform.startswith("win"):
+        return cv2.CAP_DSHOW
+    if sys.platform == "darwin":
+        return cv2.CAP_AVFOUNDATION
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+
+def open_capture(index: int) -> cv2.VideoCapture:
+    """Open a camera with the OS backend, falling back to OpenCV's own choice"""
+    cap = cv2.VideoCapture(index, capture_backend())
+    if not cap.isOpened():
+        cap.release()
+        cap = cv2.VideoCapture(index, cv2.CAP_ANY)
+    return cap
+
+
+class FrameSource:
+    """
+    open() once, then read() BGR frames until it returns None, then close().
+    Live sources (cameras) may return None for a dropped frame and should be
+    read again; for the others None means the end of the stream.
+    """
+    name = "source"
+    live = False
+
+    def open(self) -> bool:
+        return True
+
+    def read(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def expected_codes(self) -> Optional[List[str]]:
+        """Codes really present in the last frame, or None when unknown"""
+        return None
+
+    def __enter__(self) -> 'FrameSource':
+        if not self.open():
+            raise IOError(f"Không mở được nguồn ảnh: {self.name}")
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        while True:
+            frame = self.read()
+            if frame is None:
+                if self.live:
+                    continue
+                return
+            yield frame
+
+
+class DeviceFrameSource(FrameSource):
+    """Webcam / USB scanner camera"""
+    live = True
+
+    def __init__(self, index: int = 0, width: int = CAMERA_WIDTH,
+                 height: int = CAMERA_HEIGHT, fps: int = CAMERA_FPS):
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.name = f"camera:{index}"
+        self._cap: Optional[cv2.VideoCapture] = None
+
+    def open(self) -> bool:
+        self._cap = open_capture(self.index)
+        if not self._cap.isOpened():
+            return False
+        self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self._cap.set(cv2.CAP_PROP_FPS, self.fps)
+        return True
+
+    def read(self) -> Optional[np.ndarray]:
+        if self._cap is None:
+            return None
+        ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def close(self):
+        if self._cap is not None and self._cap.isOpened():
+            self._cap.release()
+        self._cap = None
+
+
+class VideoFileFrameSource(FrameSource):
+    """Recorded video (e.g. a clip from a scan station), optionally looped"""
+
+    def __init__(self, path, loop: bool = False):
+        self.path = Path(path)
+        self.loop = loop
+        self.name = f"video:{self.path.name}"
+        self._cap: Optional[cv2.VideoCapture] = None
+
+    def open(self) -> bool:
+        self._cap = cv2.VideoCapture(str(self.path))
+        return self._cap.isOpened()
+
+    def read(self) -> Optional[np.ndarray]:
+        if self._cap is None:
+            return None
+        ret, frame = self._cap.read()
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return frame if ret else None
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = None
+
+
+class ImageDirectoryFrameSource(FrameSource):
+    """Every image file in a folder, in name order (unreadable files are skipped)"""
+
+    def __init__(self, directory, loop: bool = False):
+        self.directory = Path(directory)
+        self.loop = loop
+        self.name = f"images:{self.directory.name}"
+        self._files: List[Path] = []
+        self._position = 0
+
+    def open(self) -> bool:
+        self._files = sorted(
+            p for p in self.directory.iterdir()
+            if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
+        ) if self.directory.is_dir() else []
+        self._position = 0
+        return bool(self._files)
+
+    def read(self) -> Optional[np.ndarray]:
+        while self._files:
+            if self._position >= len(self._files):
+                if not self.loop:
+                    return None
+                self._position = 0
+            path = self._files[self._position]
+            self._position += 1
+            # imdecode thay cho imread: đọc được đường dẫn có dấu tiếng Việt trên Windows
+            frame = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                return frame
+        return None
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    Camera-sized frames, each showing one equipment code at a random position,
+    size and perspective, with blur, sensor noise and uneven lighting.
+    Deterministic for a given seed, and expected_codes() gives the truth.
+    """
+
+    def __init__(self, count: int = 100, payloads: Sequence[str] = None, seed: int = 0,
+                 width: int = CAMERA_WIDTH, height: int = CAMERA_HEIGHT,
+                 module_px=(3, 8), noise: float = 6.0, blur: float = 1.5,
+                 perspective: float = 0.12, empty_ratio: float = 0.0, hold: int = 1,
+                 payload_format: str = None, error_correction: str = "H",
+                 code_px: Optional[Tuple[int, int]] = None):
+        """
+        Args:
+            count: Number of frames before the stream ends
+            payloads: Codes to show in turn (default: label of equipment i, serial SN-0000000i)
+            module_px: Range of QR module size in pixels (distance to the code)
+            code_px: Range of the whole code's size in pixels instead (a given print
+                size at a given distance: denser codes get smaller modules)
+            noise: Standard deviation of Gaussian sensor noise (0-255 scale)
+            blur: Maximum Gaussian blur sigma (focus / motion)
+            perspective: Maximum corner displacement as a fraction of the code size
+            empty_ratio: Share of frames with no code at all
+            hold: Frames each scene stays in view (only the sensor noise changes),
+                like a label held in front of the camera or an empty desk
+            payload_format: 'legacy' or 'compact' default payloads (default: what
+                QRService prints, see qr_payload)
+            error_correction: Minimum QR error correction level L, M, Q or H
+        """
+        self.count = count
+        self.payloads = list(payloads) if payloads else [
+            equipment_payload(i, f"SN-{i:08d}", payload_format) for i in range(1, max(count, 1) + 1)
+        ]
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.module_px = module_px
+        self.code_px = code_px
+        self.error_correction = error_correction
+        self.noise = noise
+        self.blur = blur
+        self.perspective = perspective
+        self.empty_ratio = empty_ratio
+        self.hold = max(1, hold)
+        self.name = f"synthetic:{count}"
+        self._rng = random.Random(seed)
+        self._np_rng = np.random.default_rng(seed)
+        self._index = 0
+        self._expected: List[str] = []
+        self._modules = {}
+        self._scene: Optional[np.ndarray] = None
+
+    def open(self) -> bool:
+        self._rng = random.Random(self.seed)
+        self._np_rng = np.random.default_rng(self.seed)
+        self._index = 0
+        self._scene = None
+        return True
+
+    def expected_codes(self) -> Optional[List[str]]:
+        return list(self._expected)
+
+    def read(self) -> Optional[np.ndarray]:
+        if self._index >= self.count * self.hold:
+            return None
+        if self._index % self.hold == 0:
+            self._scene = self._render_scene(self.payloads[(self._index // self.hold) % len(self.payloads)])
+        self._index += 1
+
+        frame = self._scene.copy()
+        if self.noise > 0:
+            frame += self._np_rng.normal(0, self.noise, frame.shape).astype(np.float32)
+        gray = np.clip(frame, 0, 255).astype(np.uint8)
+        return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+    def _render_scene(self, payload: str) -> np.ndarray:
+        """Noise-free frame: background, lighting, the code and the blur"""
+        rng = self._rng
+
+        # Nền xám với độ sáng thay đổi theo chiều ngang (ánh sáng không đều)
+        base = rng.uniform(70, 200)
+        ramp = np.linspace(-rng.uniform(0, 40), rng.uniform(0, 40), self.width, dtype=np.float32)
+        frame = np.empty((self.height, self.width), dtype=np.float32)
+        frame[:] = base + ramp
+
+        if rng.random() < self.empty_ratio:
+            self._expected = []
+        else:
+            self._expected = [payload]
+            self._draw_code(frame, payload)
+
+        sigma = rng.uniform(0, self.blur)
+        if sigma > 0.3:
+            frame = cv2.GaussianBlur(frame, (0, 0), sigma)
+        return frame
+
+    def symbol_size(self, payload: str = None) -> int:
+        """QR modules per side (quiet zone excluded) of a payload, default the first one"""
+        from ..config import QR_BORDER
+        return self._module_matrix(payload or self.payloads[0]).shape[0] - 2 * QR_BORDER
+
+    def _module_matrix(self, payload: str) -> np.ndarray:
+        """QR modules (True = dark) incl. quiet zone, same settings as QRService"""
+        key = (payload, self.error_correction)
+        matrix = self._modules.get(key)
+        if matrix is None:
+            from .qr_service import make_qr
+            matrix = np.array(make_qr(payload, self.error_correction).get_matrix(), dtype=bool)
+            if len(self._modules) > 256:
+                self._modules.clear()
+            self._modules[key] = matrix
+        return matrix
+
+    def _draw_code(self, frame: np.ndarray, payload: str):
+        rng = self._rng
+        matrix = self._module_matrix(payload)
+        if self.code_px:
+            side = rng.randint(*self.code_px)
+        else:
+            side = matrix.shape[0] * rng.randint(*self.module_px)
+        side = min(side, self.height - 2, self.width - 2)
+        code = np.where(matrix, 20.0, 235.0).astype(np.float32)
+        code = cv2.resize(code, (side, side), interpolation=cv2.INTER_NEAREST)
+
+        # Góc nghiêng: dịch ngẫu nhiên 4 góc rồi biến đổi phối cảnh vào vị trí ngẫu nhiên
+        jitter = self.perspective * side
+        x0 = rng.uniform(jitter, max(jitter, self.width - side - jitter))
+        y0 = rng.uniform(jitter, max(jitter, self.height - side - jitter))
+        src = np.float32([[0, 0], [side, 0], [side, side], [0, side]])
+        dst = np.float32([
+            [x0 + cx + rng.uniform(-jitter, jitter), y0 + cy + rng.uniform(-jitter, jitter)]
+            for cx, cy in src
+        ])
+        matrix_p = cv2.getPerspectiveTransform(src, dst)
+        size = (self.width, self.height)
+        warped = cv2.warpPerspective(code, matrix_p, size, flags=cv2.INTER_LINEAR)
+        mask = cv2.warpPerspective(np.ones_like(code), matrix_p, size, flags=cv2.INTER_LINEAR)
+        # Nhãn in dưới cùng ánh sáng: tối / sáng hơn theo nền
+        light = rng.uniform(0.6, 1.1)
+        frame *= (1 - mask)
+        frame += mask * warped * light
+
+
+def open_frame_source(spec: str) -> FrameSource:
+    """
+    Source from a command-line style spec:
+    '0' (camera index), 'synthetic' or 'synthetic:200', a folder of images,
+    or a video file.
+    """
+    spec = spec.strip()
+    if spec.isdigit():
+        return DeviceFrameSource(int(spec))
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        _, _, count = spec.partition(":")
+        return SyntheticFrameSource(count=int(count) if count else 100)
+    if os.path.isdir(spec):
+        return ImageDirectoryFrameSource(spec)
+    if os.path.isfile(spec):
+        return VideoFileFrameSource(spec)
+    raise ValueError(f"Nguồn ảnh không hợp lệ: {spec}")
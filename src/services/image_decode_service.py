@@ -0,0 +1,255 @@
+"""
+Image Decode Service - Read QR labels from many photos at once (no Qt dependency)
+
+Field units send folders or ZIP archives of label photos, or scanned PDFs.
+Every image is decoded with the live scanner's cascade (with a larger time
+budget) in a process pool, then all codes are resolved against the
+database together through a BatchScanSession.
+"""
+import csv
+import multiprocessing
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from ..config import IMAGE_DECODE_WORKERS, IMAGE_DECODE_BUDGET_MS
+from .batch_scan_service import BatchScanSession
+from .frame_sources import IMAGE_EXTENSIONS
+from .qr_decoder import DecoderCascade, decode_frame
+from .qr_payload import parse_equipment_code
+
+try:
+    import pymupdf
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+PDF_DPI = 200
+# Ảnh chụp điện thoại (12MP+) được giải mã ở bản thu nhỏ trước, bản gốc chỉ khi không thấy mã
+MAX_IMAGE_SIDE = 2000
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    """One image: a file, a member of a ZIP archive, or a page of a PDF"""
+    path: str
+    member: Optional[str] = None
+    page: Optional[int] = None
+
+    @property
+    def name(self) -> str:
+        if self.member is not None:
+            return f"{self.path}/{self.member}"
+        if self.page is not None:
+            return f"{self.path}#trang {self.page + 1}"
+        return self.path
+
+
+@dataclass
+class ImageDecodeResult:
+    """Codes found in one image (error set when it could not be read)"""
+    name: str
+    codes: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkDecodeResult:
+    images: List[ImageDecodeResult] = field(default_factory=list)
+    session: BatchScanSession = field(default_factory=BatchScanSession)
+    seconds: float = 0.0
+
+    @property
+    def decoded_images(self) -> int:
+        return sum(1 for image in self.images if image.codes)
+
+    @property
+    def failed_images(self) -> int:
+        return sum(1 for image in self.images if image.error)
+
+    @property
+    def summary(self) -> str:
+        text = (f"Đã đọc {len(self.images)} ảnh, {self.decoded_images} ảnh có mã QR, "
+                f"{self.session.count} thiết bị")
+        if self.failed_images:
+            text += f", {self.failed_images} ảnh không mở được"
+        return text
+
+
+def _load_image(ref: ImageRef, archives: Dict[str, object]) -> Optional[np.ndarray]:
+    # Đọc thẳng ảnh xám: bộ giải mã chỉ dùng ảnh xám, giải nén JPEG nhanh hơn ~1/4
+    if ref.member is not None:
+        archive = archives.get(ref.path)
+        if archive is None:
+            archive = archives[ref.path] = zipfile.ZipFile(ref.path)
+        data = np.frombuffer(archive.read(ref.member), dtype=np.uint8)
+        return cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    if ref.page is not None:
+        document = archives.get(ref.path)
+        if document is None:
+            document = archives[ref.path] = pymupdf.open(ref.path)
+        pixmap = document[ref.page].get_pixmap(dpi=PDF_DPI, colorspace=pymupdf.csGRAY)
+        gray = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+        return gray[:, :pixmap.width]
+    # imdecode thay cho imread: đọc được đường dẫn có dấu tiếng Việt trên Windows
+    return cv2.imdecode(np.fromfile(ref.path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def _decode_image(image: np.ndarray, cascade: DecoderCascade) -> List[str]:
+    h, w = image.shape[:2]
+    scale = MAX_IMAGE_SIDE / max(h, w)
+    if scale < 1:
+        small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        codes = decode_frame(small, cascade)
+        if codes:
+            return [code.data for code in codes]
+    return [code.data for code in decode_frame(image, cascade)]
+
+
+def decode_image_file(path: str) -> List[str]:
+    """Every code in one image file, decoded in this process"""
+    result = _decode_chunk([ImageRef(path)], IMAGE_DECODE_BUDGET_MS)[0]
+    return result.codes
+
+
+def _init_worker():
+    # Mỗi tiến trình một lõi: để OpenCV tự chia luồng thì N tiến trình tranh nhau N lõi
+    cv2.setNumThreads(1)
+
+
+def _decode_chunk(refs: List[ImageRef], budget_ms: float) -> List[ImageDecodeResult]:
+    """Decode a list of images (worker process)"""
+    cascade = DecoderCascade(budget_ms=budget_ms, name="image_decode")
+    archives: Dict[str, object] = {}
+    results = []
+    try:
+        for ref in refs:
+            try:
+                image = _load_image(ref, archives)
+                if image is None:
+                    results.append(ImageDecodeResult(ref.name, error="Không đọc được ảnh"))
+                else:
+                    results.append(ImageDecodeResult(ref.name, _decode_image(image, cascade)))
+            except Exception as e:
+                results.append(ImageDecodeResult(ref.name, error=str(e)))
+    finally:
+        for archive in archives.values():
+            archive.close()
+    return results
+
+
+class ImageDecodeService:
+    """
+    Bulk QR decoding of photos / scans.
+
+    list_images() expands a folder (recursively, including ZIP and PDF files
+    in it), a ZIP archive, a PDF or a single image into ImageRefs; decode()
+    spreads them over a process pool in chunks and resolves every code with
+    one BatchScanSession.
+    """
+
+    CHUNK = 8
+
+    def __init__(self, workers: int = IMAGE_DECODE_WORKERS, budget_ms: float = IMAGE_DECODE_BUDGET_MS):
+        self.workers = workers
+        self.budget_ms = budget_ms
+
+    @staticmethod
+    def list_images(path: str) -> List[ImageRef]:
+        root = Path(path)
+        if root.is_dir():
+            files = sorted(p for p in root.rglob("*") if p.is_file())
+        elif root.is_file():
+            files = [root]
+        else:
+            raise FileNotFoundError(f"Không tìm thấy: {path}")
+
+        refs = []
+        for file in files:
+            suffix = file.suffix.lower()
+            if suffix in IMAGE_EXTENSIONS:
+                refs.append(ImageRef(str(file)))
+            elif suffix == ".zip":
+                with zipfile.ZipFile(file) as archive:
+                    refs.extend(
+                        ImageRef(str(file), member=info.filename)
+                        for info in archive.infolist()
+                        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+                        and Path(info.filename).suffix.lower() in IMAGE_EXTENSIONS
+                    )
+            elif suffix == ".pdf":
+                if not PYMUPDF_AVAILABLE:
+                    raise RuntimeError("Cần cài đặt thư viện PyMuPDF để đọc file PDF (pip install pymupdf)")
+                with pymupdf.open(str(file)) as document:
+                    refs.extend(ImageRef(str(file), page=i) for i in range(document.page_count))
+        return refs
+
+    def decode(self, path: str, progress_callback: Optional[Callable] = None,
+               resolve: bool = True) -> BulkDecodeResult:
+        """
+        Decode every image under path. With resolve, the codes are also
+        looked up in the database (result.session); otherwise the caller
+        feeds them into its own session.
+        """
+        started = time.perf_counter()
+        refs = self.list_images(path)
+        chunks = [refs[i:i + self.CHUNK] for i in range(0, len(refs), self.CHUNK)]
+        result = BulkDecodeResult()
+        for images in self._run_chunks(chunks):
+            result.images.extend(images)
+            for image in images:
+                result.session.add(image.codes)
+            if progress_callback:
+                progress_callback(len(result.images), len(refs))
+        if resolve:
+            result.session.resolve()
+        result.seconds = time.perf_counter() - started
+        return result
+
+    def _run_chunks(self, chunks: List[List[ImageRef]]) -> Iterator[List[ImageDecodeResult]]:
+        if self.workers > 1 and len(chunks) > 1:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)), mp_context=ctx,
+                                     initializer=_init_worker) as pool:
+                try:
+                    yield from pool.map(_decode_chunk, chunks, [self.budget_ms] * len(chunks))
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+        else:
+            for chunk in chunks:
+                yield _decode_chunk(chunk, self.budget_ms)
+
+    @staticmethod
+    def write_report(result: BulkDecodeResult, filepath: str) -> str:
+        """CSV with one row per (image, code), or per image without a code"""
+        session = result.session
+        with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Ảnh", "Mã QR", "ID", "Số hiệu", "Tên thiết bị", "Đơn vị", "Kết quả"])
+            for image in result.images:
+                if image.error or not image.codes:
+                    writer.writerow([image.name, "", "", "", "", "",
+                                     f"Lỗi: {image.error}" if image.error else "Không thấy mã QR"])
+                    continue
+                for payload in image.codes:
+                    code = parse_equipment_code(payload)
+                    if code is None:
+                        writer.writerow([image.name, payload, "", "", "", "", "Mã không thuộc hệ thống"])
+                        continue
+                    equipment = session.items.get(code.equipment_id)
+                    if equipment is None:
+                        outcome = "Không có trong CSDL" if code.equipment_id in session.not_found else "Chưa tra cứu"
+                        writer.writerow([image.name, payload, code.equipment_id, code.serial_number or "",
+                                         "", "", outcome])
+                        continue
+                    outcome = "Khớp" if code.matches(equipment.serial_number) else "Nhãn QR không khớp số hiệu"
+                    writer.writerow([image.name, payload, equipment.id, equipment.serial_number,
+                                     equipment.name, equipment.unit_name or "", outcome])
+        return filepath
@@ -0,0 +1,374 @@
+"""
+Import Service - Bulk import of equipment from CSV / Excel (XLSX) files
+"""
+import csv
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..config import DATA_DIR, EQUIPMENT_STATUS, EXPORT_WORKERS
+from ..models.database import Database, to_db_timestamp
+from ..models.lookups import LOOKUPS, STATUS_EQUIPMENT, STATUS_EQUIPMENT_LOAN
+from .qr_service import QRService
+
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+
+# Tiêu đề cột chấp nhận được (khớp với file xuất Excel/CSV và tên trường)
+COLUMN_ALIASES = {
+    'name': ('tên thiết bị', 'tên', 'name'),
+    'serial_number': ('số hiệu', 'serial', 'serial_number'),
+    'category': ('loại', 'loại trang bị', 'category'),
+    'manufacturer': ('nhà sản xuất', 'nsx', 'manufacturer'),
+    'manufacture_year': ('năm sx', 'năm sản xuất', 'manufacture_year'),
+    'status': ('tình trạng', 'status'),
+    'unit': ('đơn vị', 'unit'),
+    'location': ('vị trí', 'location'),
+    'receive_date': ('ngày cấp phát', 'receive_date'),
+    'description': ('mô tả', 'description'),
+}
+
+REQUIRED_FIELDS = {
+    'name': "Tên thiết bị",
+    'serial_number': "Số hiệu",
+    'category': "Loại",
+}
+
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y")
+
+
+def _generate_qr_chunk(items: List[Tuple[int, str]]) -> List[Tuple[str, int]]:
+    """Render QR images for (id, serial) pairs (worker process)"""
+    qr_service = QRService()
+    result = []
+    for equipment_id, serial_number in items:
+        _, path = qr_service.generate_equipment_qr(equipment_id, serial_number)
+        result.append((path, equipment_id))
+    return result
+
+
+@dataclass
+class ImportResult:
+    """Outcome of one import run"""
+    total_rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    qr_generated: int = 0
+    error_report: Optional[str] = None
+    errors: List[Tuple[int, str, str]] = field(default_factory=list)  # (dòng, số hiệu, lỗi)
+
+    @property
+    def summary(self) -> str:
+        text = f"Đã nhập {self.imported}/{self.total_rows} thiết bị"
+        if self.rejected:
+            text += f", {self.rejected} dòng bị từ chối"
+        return text
+
+
+class ImportService:
+    """
+    Bulk equipment import.
+
+    The file is validated in one pass: names are resolved through in-memory
+    category/unit maps and serial numbers are checked against the DB with a
+    single join on a temp table. Valid rows are inserted with executemany in
+    one transaction (audit rows included), then QR images are generated by a
+    process pool and their paths written back in one batch update.
+    """
+
+    EXPORT_DIR = DATA_DIR / "exports"
+    INSERT_BATCH = 5000
+    QR_CHUNK = 500
+
+    def __init__(self, qr_workers: int = EXPORT_WORKERS):
+        self.db = Database()
+        self.qr_workers = qr_workers
+        self.EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # ---------------- Đọc file ----------------
+
+    def read_rows(self, path: str) -> Iterator[list]:
+        """Yield raw rows (header first) from a CSV or XLSX file"""
+        suffix = Path(path).suffix.lower()
+        if suffix == '.xlsx':
+            if not OPENPYXL_AVAILABLE:
+                raise RuntimeError("Cần cài đặt thư viện openpyxl để đọc file Excel (pip install openpyxl)")
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                for row in wb.worksheets[0].iter_rows(values_only=True):
+                    yield list(row)
+            finally:
+                wb.close()
+        elif suffix == '.csv':
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                sample = f.read(4096)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+                except csv.Error:
+                    dialect = csv.excel
+                yield from csv.reader(f, dialect)
+        else:
+            raise ValueError("Chỉ hỗ trợ file .csv hoặc .xlsx")
+
+    @staticmethod
+    def _map_header(header: list) -> Dict[str, int]:
+        """Map field name -> column index from the header row"""
+        normalized = [str(h).strip().casefold() if h is not None else "" for h in header]
+        mapping = {}
+        for field_name, aliases in COLUMN_ALIASES.items():
+            for idx, title in enumerate(normalized):
+                if title in aliases:
+                    mapping[field_name] = idx
+                    break
+        missing = [label for key, label in REQUIRED_FIELDS.items() if key not in mapping]
+        if missing:
+            raise ValueError(f"File thiếu cột bắt buộc: {', '.join(missing)}")
+        return mapping
+
+    # ---------------- Kiểm tra dữ liệu ----------------
+
+    def _load_lookup_maps(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Category name -> id, unit name/code -> id"""
+        categories = {
+            row['name'].casefold(): row['id']
+            for row in self.db.fetch_all("SELECT id, name FROM categories WHERE is_active = 1")
+        }
+        units = {}
+        for row in self.db.fetch_all("SELECT id, name, code FROM units WHERE is_active = 1"):
+            units[row['name'].casefold()] = row['id']
+            if row['code']:
+                units.setdefault(row['code'].casefold(), row['id'])
+        return categories, units
+
+    @staticmethod
+    def _cell(row: list, mapping: Dict[str, int], key: str):
+        idx = mapping.get(key)
+        if idx is None or idx >= len(row):
+            return None
+        value = row[idx]
+        if isinstance(value, str):
+            value = value.strip()
+            return value or None
+        return value
+
+    @staticmethod
+    def _parse_date(value) -> Optional[datetime]:
+        if value is None or isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime.combine(value, datetime.min.time())
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(str(value), fmt)
+            except ValueError:
+                continue
+        raise ValueError(f"Ngày không hợp lệ: {value}")
+
+    def _validate(self, rows: Iterator[list], mapping: Dict[str, int],
+                  result: ImportResult) -> List[tuple]:
+        """One pass over the data rows; returns insert tuples, fills result.errors"""
+        categories, units = self._load_lookup_maps()
+        status_ids = {status: LOOKUPS.ensure_id(STATUS_EQUIPMENT, status) for status in EQUIPMENT_STATUS}
+        in_stock_id = LOOKUPS.ensure_id(STATUS_EQUIPMENT_LOAN, "Đang ở kho")
+        seen_serials = set()
+        valid = []
+        current_year = datetime.now().year
+
+        for line_no, row in enumerate(rows, start=2):
+            if not row or all(v is None or str(v).strip() == "" for v in row):
+                continue
+            result.total_rows += 1
+            serial = self._cell(row, mapping, 'serial_number')
+            serial = str(serial) if serial is not None else None
+            try:
+                for key, label in REQUIRED_FIELDS.items():
+                    if not self._cell(row, mapping, key):
+                        raise ValueError(f"Thiếu '{label}'")
+                if serial in seen_serials:
+                    raise ValueError("Số hiệu bị trùng trong file")
+
+                category_id = categories.get(str(self._cell(row, mapping, 'category')).casefold())
+                if category_id is None:
+                    raise ValueError(f"Loại trang bị không tồn tại: {self._cell(row, mapping, 'category')}")
+
+                unit_id = None
+                unit_value = self._cell(row, mapping, 'unit')
+                if unit_value is not None:
+                    unit_id = units.get(str(unit_value).casefold())
+                    if unit_id is None:
+                        raise ValueError(f"Đơn vị không tồn tại: {unit_value}")
+
+                status = self._cell(row, mapping, 'status') or EQUIPMENT_STATUS[0]
+                if status not in EQUIPMENT_STATUS:
+                    raise ValueError(f"Tình trạng không hợp lệ: {status}")
+
+                year = self._cell(row, mapping, 'manufacture_year')
+                if year is not None:
+                    try:
+                        year = int(float(year))
+                    except (TypeError, ValueError):
+                        raise ValueError(f"Năm sản xuất không hợp lệ: {year}")
+                    if not 1900 <= year <= current_year:
+                        raise ValueError(f"Năm sản xuất không hợp lệ: {year}")
+
+                receive_date = self._parse_date(self._cell(row, mapping, 'receive_date'))
+            except ValueError as e:
+                result.errors.append((line_no, serial or "", str(e)))
+                continue
+
+            seen_serials.add(serial)
+            valid.append((
+                str(self._cell(row, mapping, 'name')), serial, category_id,
+                str(self._cell(row, mapping, 'manufacturer') or ""), year, status_ids[status],
+                in_stock_id, unit_id,
+                str(self._cell(row, mapping, 'location') or ""),
+                str(self._cell(row, mapping, 'description') or ""),
+                to_db_timestamp(receive_date), line_no
+            ))
+        return valid
+
+    # ---------------- Nhập dữ liệu ----------------
+
+    def import_file(
+        self,
+        path: str,
+        user_id: Optional[int] = None,
+        username: str = "Hệ thống",
+        progress_callback: Callable[[int, int], None] = None
+    ) -> ImportResult:
+        """
+        Validate and import a CSV/XLSX file.
+
+        Returns:
+            ImportResult with counts and the path of the error report (if any)
+        """
+        result = ImportResult()
+        rows = self.read_rows(path)
+        try:
+            header = next(rows, None)
+            if header is None:
+                raise ValueError("File không có dữ liệu")
+            mapping = self._map_header(header)
+            valid = self._validate(rows, mapping, result)
+        finally:
+            rows.close()
+        if progress_callback:
+            progress_callback(0, len(valid))
+
+        inserted = self._insert(valid, result, user_id, username, source_name=Path(path).name)
+        result.imported = len(inserted)
+        result.rejected = len(result.errors)
+
+        if inserted:
+            result.qr_generated = self._generate_qr(inserted, progress_callback)
+        if result.errors:
+            result.error_report = self._write_error_report(result.errors)
+        return result
+
+    def _insert(self, valid: List[tuple], result: ImportResult, user_id: Optional[int],
+                username: str, source_name: str) -> List[Tuple[int, str]]:
+        """Insert valid rows in one transaction; returns (id, serial) of new rows"""
+        if not valid:
+            return []
+        with self.db.get_connection() as conn:
+            # Kiểm tra trùng số hiệu với CSDL bằng 1 phép join
+            conn.execute("CREATE TEMP TABLE import_serials (serial_number TEXT PRIMARY KEY, line_no INTEGER)")
+            conn.executemany(
+                "INSERT INTO import_serials (serial_number, line_no) VALUES (?, ?)",
+                [(v[1], v[-1]) for v in valid]
+            )
+            duplicates = {
+                row['serial_number']: row['line_no']
+                for row in conn.execute('''
+                    SELECT s.serial_number, s.line_no
+                    FROM import_serials s
+                    JOIN equipment e ON e.serial_number = s.serial_number
+                ''')
+            }
+            for serial, line_no in duplicates.items():
+                result.errors.append((line_no, serial, "Số hiệu đã tồn tại trong hệ thống"))
+            result.errors.sort()
+            conn.executemany("DELETE FROM import_serials WHERE serial_number = ?",
+                             [(serial,) for serial in duplicates])
+            rows_to_insert = [v[:-1] for v in valid if v[1] not in duplicates]
+
+            for start in range(0, len(rows_to_insert), self.INSERT_BATCH):
+                conn.executemany('''
+                    INSERT INTO equipment
+                    (name, serial_number, category_id, manufacturer, manufacture_year,
+                     status_id, loan_status_id, unit_id, location, description, receive_date,
+                     created_by)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [row + (user_id,) for row in rows_to_insert[start:start + self.INSERT_BATCH]])
+
+            inserted = [
+                (row['id'], row['serial_number'])
+                for row in conn.execute('''
+                    SELECT e.id, e.serial_number
+                    FROM import_serials s
+                    JOIN equipment e ON e.serial_number = s.serial_number
+                    ORDER BY e.id
+                ''')
+            ]
+            names = {row[1]: row[0] for row in rows_to_insert}
+            conn.executemany('''
+                INSERT INTO audit_logs (user_id, username, action, target_type, target_id, details)
+                VALUES (?, ?, 'CREATE', 'Equipment', ?, ?)
+            ''', [
+                (user_id, username, equipment_id,
+                 f"Thêm mới trang bị: {names[serial]} (Số hiệu: {serial}) [Nhập từ file {source_name}]")
+                for equipment_id, serial in inserted
+            ])
+            conn.execute("DROP TABLE import_serials")
+        return inserted
+
+    def _generate_qr(self, inserted: List[Tuple[int, str]],
+                     progress_callback: Optional[Callable]) -> int:
+        """Generate QR images in parallel processes, then store their paths"""
+        chunks = [inserted[i:i + self.QR_CHUNK] for i in range(0, len(inserted), self.QR_CHUNK)]
+        updates = []
+        if self.qr_workers > 1 and len(chunks) > 1:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.qr_workers, mp_context=ctx) as pool:
+                try:
+                    for chunk_result in pool.map(_generate_qr_chunk, chunks):
+                        updates.extend(chunk_result)
+                        if progress_callback:
+                            progress_callback(len(updates), len(inserted))
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+                finally:
+                    self._store_qr_paths(updates)
+        else:
+            try:
+                for chunk in chunks:
+                    updates.extend(_generate_qr_chunk(chunk))
+                    if progress_callback:
+                        progress_callback(len(updates), len(inserted))
+            finally:
+                self._store_qr_paths(updates)
+        return len(updates)
+
+    def _store_qr_paths(self, updates: List[Tuple[str, int]]):
+        if not updates:
+            return
+        with self.db.get_connection() as conn:
+            conn.executemany("UPDATE equipment SET qr_code_path = ? WHERE id = ?", updates)
+
+    def _write_error_report(self, errors: List[Tuple[int, str, str]]) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = self.EXPORT_DIR / f"loi_nhap_thiet_bi_{timestamp}.csv"
+        with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Dòng", "Số hiệu", "Lỗi"])
+            writer.writerows(errors)
+        return str(filepath)
@@ -0,0 +1,86 @@
+"""
+Keyboard Wedge - Handheld USB scanners that type the code like a keyboard (no Qt dependency)
+
+A scanner types a whole payload ("VK1:7PSK3", "VKTBKT|12|SN-01", or a plain
+serial from a 1D barcode) a few milliseconds per key, then Enter. A person
+cannot keep every gap that short, so keystroke timing alone tells the two
+apart. The payload goes straight to ScanLookupService: no camera, no OpenCV.
+"""
+import time
+from typing import List, Optional, Tuple
+
+from ..config import WEDGE_MAX_INTERVAL_MS, WEDGE_MIN_LENGTH
+from ..models.equipment import Equipment
+from .metrics import METRICS
+from .qr_payload import EquipmentCode, parse_equipment_code
+from .scan_lookup_service import ScanLookupService
+
+
+class WedgeDetector:
+    """
+    Groups keystrokes into bursts. Timestamps are in seconds (any
+    monotonic clock); feed() each printable character, enter() on Enter.
+    """
+
+    def __init__(self, max_interval_ms: float = WEDGE_MAX_INTERVAL_MS,
+                 min_length: int = WEDGE_MIN_LENGTH):
+        self.max_interval_ms = max_interval_ms
+        self.min_length = min_length
+        self.reset()
+
+    def reset(self):
+        self._chars: List[str] = []
+        self._last: Optional[float] = None
+
+    @property
+    def length(self) -> int:
+        return len(self._chars)
+
+    def _in_burst(self, now: float) -> bool:
+        return self._last is not None and (now - self._last) * 1000 <= self.max_interval_ms
+
+    def feed(self, text: str, now: float) -> bool:
+        """
+        Add typed text; False when it starts a new burst (the keys before
+        it came too slowly, so they were typed by hand)
+        """
+        continues = self._in_burst(now)
+        if not continues:
+            self._chars = []
+        self._chars.append(text)
+        self._last = now
+        return continues
+
+    def expired(self, now: float) -> bool:
+        """No key for longer than a scanner would pause"""
+        return self._last is not None and not self._in_burst(now)
+
+    def enter(self, now: float) -> Optional[str]:
+        """End of line: the payload if it arrived as one fast burst, else None"""
+        payload = "".join(self._chars).strip()
+        fast = self._in_burst(now)
+        self.reset()
+        if fast and len(payload) >= self.min_length:
+            METRICS.meter("wedge.scan").mark()
+            return payload
+        return None
+
+
+def resolve_payload(payload: str, by_serial: bool = True) -> Tuple[Optional[EquipmentCode], Optional[Equipment]]:
+    """
+    (label code, equipment) for a scanned payload, from the scan cache.
+    Text that is not an equipment code is looked up as a serial number
+    (barcode labels) when by_serial is set.
+    """
+    started = time.perf_counter()
+    code = parse_equipment_code(payload)
+    lookup = ScanLookupService.instance()
+    if code is not None:
+        equipment = lookup.get_by_id(code.equipment_id)
+    elif by_serial:
+        equipment = lookup.get_by_serial(payload)
+    else:
+        equipment = None
+    METRICS.stages("scan_resolve").record("wedge" if by_serial else "camera", equipment is not None,
+                                          time.perf_counter() - started)
+    return code, equipment
@@ -0,0 +1,227 @@
+"""
+Metrics Service - In-process counters, rate meters and LRU caches for diagnostics
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Cửa sổ (giây) dùng để tính tốc độ sự kiện/giây
+RATE_WINDOW_SECONDS = 5.0
+
+
+class Meter:
+    """Thread-safe event counter with a rate over the last RATE_WINDOW_SECONDS"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self.count = 0
+
+    def mark(self, n: int = 1):
+        now = time.monotonic()
+        with self._lock:
+            self.count += n
+            self._events.append((now, n))
+            self._trim(now)
+
+    def _trim(self, now: float):
+        cutoff = now - RATE_WINDOW_SECONDS
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+
+    def rate(self) -> float:
+        with self._lock:
+            self._trim(time.monotonic())
+            return sum(n for _, n in self._events) / RATE_WINDOW_SECONDS
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self.count = 0
+
+
+class LRUCache:
+    """Small thread-safe LRU map that counts hits and misses"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Membership test that does not count as a hit or miss"""
+        with self._lock:
+            return key in self._data
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class StageStats:
+    """Thread-safe attempts / hits / time per named stage of a multi-stage process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: "OrderedDict[str, list]" = OrderedDict()
+        self.runs = 0
+        self.cut_short = 0  # Runs stopped by a time budget before every stage was tried
+
+    def record(self, stage: str, hit: bool, seconds: float):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += bool(hit)
+            entry[2] += seconds
+
+    def record_run(self, cut_short: bool = False):
+        with self._lock:
+            self.runs += 1
+            self.cut_short += bool(cut_short)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.runs = 0
+            self.cut_short = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'cut_short': self.cut_short,
+                'stages': {
+                    name: {
+                        'attempts': attempts,
+                        'hits': hits,
+                        'hit_ratio': hits / attempts if attempts else 0.0,
+                        'avg_ms': total * 1000 / attempts if attempts else 0.0,
+                        'total_ms': total * 1000,
+                    }
+                    for name, (attempts, hits, total) in self._stages.items()
+                },
+            }
+
+
+class MetricsRegistry:
+    """Process-wide registry of named meters and caches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meters: Dict[str, Meter] = {}
+        self._caches: Dict[str, LRUCache] = {}
+        self._stages: Dict[str, StageStats] = {}
+
+    def meter(self, name: str) -> Meter:
+        with self._lock:
+            meter = self._meters.get(name)
+            if meter is None:
+                meter = self._meters[name] = Meter()
+            return meter
+
+    def cache(self, name: str, maxsize: int = 256) -> LRUCache:
+        """Get or create the named LRU cache"""
+        with self._lock:
+            cache = self._caches.get(name)
+            if cache is None:
+                cache = self._caches[name] = LRUCache(maxsize)
+            return cache
+
+    def stages(self, name: str) -> StageStats:
+        """Get or create the named per-stage statistics"""
+        with self._lock:
+            stages = self._stages.get(name)
+            if stages is None:
+                stages = self._stages[name] = StageStats()
+            return stages
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            meters = dict(self._meters)
+            caches = dict(self._caches)
+            stages = dict(self._stages)
+        return {
+            'meters': {name: {'count': m.count, 'rate': m.rate()} for name, m in meters.items()},
+            'caches': {name: c.stats() for name, c in caches.items()},
+            'stages': {name: s.stats() for name, s in stages.items()},
+        }
+
+
+METRICS = MetricsRegistry()
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None if it cannot be read"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return None
+        with open(f"/proc/{os.getpid()}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return None
@@ -0,0 +1,179 @@
+"""
+QR Decoder - Find and decode every QR code in a frame (no Qt dependency)
+
+decode_frame() runs a cascade: the primary engine on the grey frame, then
+on a denoised contrast-equalised and thresholded copy (low light, glare),
+then at half and double scale (codes too close / too far), then a second
+engine. Each stage only runs when every earlier one found nothing, and no
+new stage starts once the frame has used up DECODE_BUDGET_MS.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..config import DECODE_BUDGET_MS
+from .metrics import METRICS
+
+try:
+    from pyzbar import pyzbar
+    PYZBAR_AVAILABLE = True
+except ImportError:
+    # pyzbar cần thư viện hệ thống libzbar; máy build Linux có thể không có
+    PYZBAR_AVAILABLE = False
+
+# Bộ dò QR dựa trên ArUco (OpenCV >= 4.8): ổn định hơn bộ dò cũ, không bị treo nhiều giây
+ARUCO_AVAILABLE = hasattr(cv2, "QRCodeDetectorAruco")
+
+STAGES = ("gray", "clahe", "threshold", "pyramid", "fallback")
+
+
+@dataclass
+class DecodedCode:
+    """One code found in a frame: its text and corner points in frame pixels"""
+    data: str
+    polygon: List[Tuple[int, int]]
+
+
+# Các đối tượng cv2 không dùng chung giữa các luồng
+_local = threading.local()
+
+
+def _detector(kind: str):
+    detector = getattr(_local, kind, None)
+    if detector is None:
+        if kind == "aruco":
+            detector = cv2.QRCodeDetectorAruco()
+        elif kind == "clahe":
+            detector = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        else:
+            detector = cv2.QRCodeDetector()
+        setattr(_local, kind, detector)
+    return detector
+
+
+def _decode_pyzbar(gray: np.ndarray) -> List[DecodedCode]:
+    return [
+        DecodedCode(obj.data.decode('utf-8', errors='replace'), [(p.x, p.y) for p in obj.polygon])
+        for obj in pyzbar.decode(gray)
+    ]
+
+
+def _decode_multi(detector, gray: np.ndarray) -> List[DecodedCode]:
+    ok, texts, points, _ = detector.detectAndDecodeMulti(gray)
+    if not ok or points is None:
+        return []
+    return [
+        DecodedCode(text, [(int(x), int(y)) for x, y in corners])
+        for text, corners in zip(texts, points) if text
+    ]
+
+
+def _decode_aruco(gray: np.ndarray) -> List[DecodedCode]:
+    return _decode_multi(_detector("aruco"), gray)
+
+
+def _decode_opencv(gray: np.ndarray) -> List[DecodedCode]:
+    return _decode_multi(_detector("opencv"), gray)
+
+
+def _decode_opencv_single(gray: np.ndarray) -> List[DecodedCode]:
+    # Một mã: detectAndDecodeMulti của bộ dò cũ có khung mất vài giây, bản đơn thì không
+    text, points, _ = _detector("opencv").detectAndDecode(gray)
+    if not text or points is None:
+        return []
+    return [DecodedCode(text, [(int(x), int(y)) for x, y in points.reshape(-1, 2)])]
+
+
+def engines() -> Tuple[Callable, Optional[Callable]]:
+    """(primary, second) decode engine on this machine"""
+    if PYZBAR_AVAILABLE:
+        return _decode_pyzbar, _decode_aruco if ARUCO_AVAILABLE else _decode_opencv_single
+    if ARUCO_AVAILABLE:
+        return _decode_aruco, _decode_opencv_single
+    return _decode_opencv, None
+
+
+def _scaled(codes: List[DecodedCode], factor: float) -> List[DecodedCode]:
+    return [
+        DecodedCode(code.data, [(int(x / factor), int(y / factor)) for x, y in code.polygon])
+        for code in codes
+    ]
+
+
+class DecoderCascade:
+    """
+    Runs the stages in order until one finds a code, recording attempts,
+    hits and time per stage in METRICS.stages(name).
+    """
+
+    def __init__(self, stages: Sequence[str] = STAGES, budget_ms: float = DECODE_BUDGET_MS,
+                 name: str = "qr_decode"):
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Bước giải mã không hợp lệ: {', '.join(sorted(unknown))}")
+        self.stages = tuple(stages)
+        self.budget_ms = budget_ms
+        self.stats = METRICS.stages(name)
+        self.primary, self.second = engines()
+
+    def decode(self, frame: np.ndarray) -> List[DecodedCode]:
+        started = time.perf_counter()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        deadline = started + self.budget_ms / 1000
+        images = {'gray': gray}
+        for index, stage in enumerate(self.stages):
+            if index and time.perf_counter() >= deadline:
+                self.stats.record_run(cut_short=True)
+                return []
+            if stage == "fallback" and self.second is None:
+                continue
+            stage_started = time.perf_counter()
+            codes = self._run_stage(stage, images, deadline)
+            self.stats.record(stage, bool(codes), time.perf_counter() - stage_started)
+            if codes:
+                self.stats.record_run()
+                return codes
+        self.stats.record_run()
+        return []
+
+    def _run_stage(self, stage: str, images: dict, deadline: float) -> List[DecodedCode]:
+        gray = images['gray']
+        if stage == "gray":
+            return self.primary(gray)
+        if stage == "fallback":
+            return self.second(gray)
+
+        # Các bước tăng cường dùng chung ảnh đã lọc nhiễu hạt (median 3x3):
+        # nhiễu cảm biến khi thiếu sáng làm hỏng ngưỡng hóa và làm bộ dò chạy chậm
+        denoised = images.get('denoised')
+        if denoised is None:
+            denoised = images['denoised'] = cv2.medianBlur(gray, 3)
+        if stage == "clahe":
+            return self.primary(_detector("clahe").apply(denoised))
+        if stage == "threshold":
+            binary = cv2.adaptiveThreshold(denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                           cv2.THRESH_BINARY, 31, 5)
+            return self.primary(binary)
+        # Thu nhỏ trước (rẻ, mã ở quá gần / mờ), phóng to sau (mã ở xa, ô quá nhỏ)
+        codes = _scaled(self.primary(cv2.pyrDown(denoised)), 0.5)
+        if codes or time.perf_counter() >= deadline:
+            return codes
+        return _scaled(self.primary(cv2.pyrUp(denoised)), 2.0)
+
+
+CASCADE = DecoderCascade()
+
+
+def decode_frame(frame: np.ndarray, cascade: DecoderCascade = None) -> List[DecodedCode]:
+    """Every distinct code in a BGR (or grayscale) frame (default cascade: the live scanner's)"""
+    seen = set()
+    result = []
+    for code in (cascade or CASCADE).decode(frame):
+        if code.data not in seen:
+            seen.add(code.data)
+            result.append(code)
+    return result
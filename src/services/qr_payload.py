@@ -0,0 +1,91 @@
+"""
+QR Payload - Text stored in equipment QR labels (no qrcode/PIL dependency)
+
+Two formats are read:
+    VKTBKT|<id>|<serial>    legacy labels, byte mode, length grows with the serial
+    VK1:<id base 36><check> compact labels (current), e.g. "VK1:7PSK3"
+
+The compact text uses only QR alphanumeric characters (5.5 bits each
+instead of 8), so a label fits in version 1-2 even at error correction H.
+It no longer carries the serial: the 2-character check is computed from
+id and serial, so a label printed before the serial changed (or a fake
+one reusing an id) still fails the match against the database.
+"""
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+from ..config import QR_PAYLOAD_FORMAT
+
+LEGACY_PREFIX = "VKTBKT"
+COMPACT_PREFIX = "VK1:"
+CHECK_LENGTH = 2
+
+_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        raise ValueError("Giá trị âm không mã hóa được")
+    text = ""
+    while True:
+        value, digit = divmod(value, 36)
+        text = _DIGITS[digit] + text
+        if not value:
+            return text
+
+
+def serial_check(equipment_id: int, serial_number: str) -> str:
+    """2 base-36 characters derived from id and serial (1 in 1296 false match)"""
+    value = zlib.crc32(f"{equipment_id}|{serial_number}".encode("utf-8")) % (36 ** CHECK_LENGTH)
+    return to_base36(value).rjust(CHECK_LENGTH, "0")
+
+
+@dataclass(frozen=True)
+class EquipmentCode:
+    """What an equipment label says: its id, plus the serial (legacy) or a check of it (compact)"""
+    equipment_id: int
+    serial_number: Optional[str] = None
+    check: Optional[str] = None
+
+    def matches(self, serial_number: str) -> bool:
+        """Was this label printed for the equipment with this serial"""
+        if self.serial_number is not None:
+            return self.serial_number == serial_number
+        return self.check == serial_check(self.equipment_id, serial_number)
+
+    @property
+    def label(self) -> str:
+        """Serial for messages; compact labels only have their check"""
+        return self.serial_number if self.serial_number is not None else f"mã kiểm tra {self.check}"
+
+
+def equipment_payload(equipment_id: int, serial_number: str, fmt: str = None) -> str:
+    """Text to print in an equipment QR code ('compact' or 'legacy', default QR_PAYLOAD_FORMAT)"""
+    if (fmt or QR_PAYLOAD_FORMAT) == "legacy":
+        return f"{LEGACY_PREFIX}|{equipment_id}|{serial_number}"
+    return f"{COMPACT_PREFIX}{to_base36(equipment_id)}{serial_check(equipment_id, serial_number)}"
+
+
+def parse_equipment_code(qr_data: str) -> Optional[EquipmentCode]:
+    """The equipment code in a scanned payload (either format), None for anything else"""
+    if qr_data.startswith(LEGACY_PREFIX + "|"):
+        parts = qr_data.split('|')
+        if len(parts) >= 3:
+            try:
+                return EquipmentCode(int(parts[1]), serial_number=parts[2])
+            except ValueError:
+                return None
+        return None
+
+    # Một số máy quét trả chữ thường cho chế độ chữ-số của QR
+    text = qr_data.strip().upper()
+    if text.startswith(COMPACT_PREFIX) and len(text) > len(COMPACT_PREFIX) + CHECK_LENGTH:
+        body = text[len(COMPACT_PREFIX):]
+        # int(..., 36) tự nhận cả dấu +/-, "_" và khoảng trắng: kiểm tra từng ký tự trước
+        if not all(c in _DIGITS for c in body):
+            return None
+        equipment_id = int(body[:-CHECK_LENGTH], 36)
+        if equipment_id > 0:
+            return EquipmentCode(equipment_id, check=body[-CHECK_LENGTH:])
+    return None
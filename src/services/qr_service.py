@@ -2,14 +2,52 @@
 QR Code Service - Generate and decode QR codes
 """
 import qrcode
-from qrcode.constants import ERROR_CORRECT_H
+from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
 from PIL import Image
 from pathlib import Path
 from typing import Optional, Tuple
 import io
 import base64
 
-from ..config import QR_BOX_SIZE, QR_BORDER, QR_VERSION, DATA_DIR
+from ..config import (
+    QR_BOX_SIZE, QR_BORDER, QR_VERSION, DATA_DIR,
+    QR_ERROR_CORRECTION_BY_SIZE, QR_ERROR_CORRECTION_DEFAULT
+)
+from .metrics import METRICS
+from .qr_payload import equipment_payload, parse_equipment_code
+
+ERROR_CORRECTION_LEVELS = {
+    "L": ERROR_CORRECT_L,  # ~7% ô hỏng vẫn đọc được
+    "M": ERROR_CORRECT_M,  # ~15%
+    "Q": ERROR_CORRECT_Q,  # ~25%
+    "H": ERROR_CORRECT_H,  # ~30%
+}
+
+
+def make_qr(data: str, error_correction: str = QR_ERROR_CORRECTION_DEFAULT,
+            box_size: int = QR_BOX_SIZE, border: int = QR_BORDER) -> qrcode.QRCode:
+    """
+    Smallest QR symbol for data at error_correction or better: the level is
+    raised as long as that does not need a bigger version (more modules).
+    """
+    order = list(ERROR_CORRECTION_LEVELS)
+    best = None
+    for level in order[order.index(error_correction):]:
+        qr = qrcode.QRCode(
+            version=QR_VERSION,
+            error_correction=ERROR_CORRECTION_LEVELS[level],
+            box_size=box_size,
+            border=border
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+        if best is not None and qr.version > best.version:
+            break
+        best = qr
+    return best
+
+# Ảnh QR thiết bị theo (id, số hiệu), dùng lại khi mở chi tiết / xuất hồ sơ
+_qr_image_cache = METRICS.cache("qr_image", maxsize=128)
 
 
 class QRService:
@@ -24,6 +62,14 @@ class QRService:
         # Ensure QR storage directory exists
         self.QR_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
     
+    @staticmethod
+    def error_correction_for(size_mm: float) -> str:
+        """Minimum error correction level for a code printed size_mm wide"""
+        for max_mm, level in QR_ERROR_CORRECTION_BY_SIZE:
+            if size_mm <= max_mm:
+                return level
+        return QR_ERROR_CORRECTION_DEFAULT
+    
     def generate_qr_code(
         self, 
         data: str, 
@@ -31,7 +77,8 @@ class QRService:
         box_size: int = QR_BOX_SIZE,
         border: int = QR_BORDER,
         fill_color: str = "black",
-        back_color: str = "white"
+        back_color: str = "white",
+        error_correction: str = QR_ERROR_CORRECTION_DEFAULT
     ) -> Tuple[Image.Image, Optional[str]]:
         """
         Generate a QR code image
@@ -43,18 +90,12 @@ class QRService:
             border: Border size in boxes
             fill_color: Color of QR code
             back_color: Background color
+            error_correction: Minimum level L, M, Q or H (see error_correction_for)
             
         Returns:
             Tuple of (PIL Image, saved file path or None)
         """
-        qr = qrcode.QRCode(
-            version=QR_VERSION,
-            error_correction=ERROR_CORRECT_H,  # High error correction
-            box_size=box_size,
-            border=border
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
+        qr = make_qr(data, error_correction, box_size, border)
         
         img = qr.make_image(fill_color=fill_color, back_color=back_color)
         
@@ -89,11 +130,19 @@ class QRService:
         Returns:
             Tuple of (PIL Image, saved file path)
         """
-        # QR data format: VKTBKT|ID|SERIAL
-        qr_data = f"VKTBKT|{equipment_id}|{serial_number}"
+        # QR data format: VK1:<id base 36><mã kiểm tra> (xem qr_payload)
+        qr_data = equipment_payload(equipment_id, serial_number)
         filename = f"equip_{equipment_id}_{serial_number}.png"
         
+        # Ảnh đã tạo được giữ lại (chỉ đọc) miễn là file PNG vẫn còn
+        key = (equipment_id, serial_number)
+        file_path = self.QR_STORAGE_DIR / filename
+        img = _qr_image_cache.get(key)
+        if img is not None and file_path.exists():
+            return img, str(file_path)
+        
         img, path = self.generate_qr_code(qr_data, filename)
+        _qr_image_cache.put(key, img)
         return img, path
     
     def decode_qr_data(self, qr_data: str) -> Optional[dict]:
@@ -107,12 +156,13 @@ class QRService:
             Dictionary with decoded data or None
         """
         try:
-            parts = qr_data.split('|')
-            if len(parts) >= 3 and parts[0] == 'VKTBKT':
+            code = parse_equipment_code(qr_data)
+            if code is not None:
                 return {
                     'type': 'equipment',
-                    'equipment_id': int(parts[1]),
-                    'serial_number': parts[2]
+                    'equipment_id': code.equipment_id,
+                    'serial_number': code.serial_number,  # None với nhãn rút gọn
+                    'code': code
                 }
             # Unknown format, return raw
             return {
@@ -147,6 +197,7 @@ class QRService:
     
     def delete_qr(self, equipment_id: int, serial_number: str) -> bool:
         """Delete QR code file for equipment"""
+        _qr_image_cache.pop((equipment_id, serial_number))
         path = self.get_qr_path(equipment_id, serial_number)
         if path.exists():
             path.unlink()
@@ -158,7 +209,8 @@ class QRService:
         data: str,
         label: str,
         filename: str = None,
-        label_height: int = 40
+        label_height: int = 40,
+        error_correction: str = QR_ERROR_CORRECTION_DEFAULT
     ) -> Tuple[Image.Image, Optional[str]]:
         """
         Generate QR code with text label below
@@ -168,6 +220,7 @@ class QRService:
             label: Text label to display below QR
             filename: Optional filename to save
             label_height: Height of label area in pixels
+            error_correction: Minimum level L, M, Q or H
             
         Returns:
             Tuple of (PIL Image, saved file path or None)
@@ -175,7 +228,7 @@ class QRService:
         from PIL import ImageDraw, ImageFont
         
         # Generate base QR
-        qr_img, _ = self.generate_qr_code(data)
+        qr_img, _ = self.generate_qr_code(data, error_correction=error_correction)
         
         # Create new image with space for label
         qr_width, qr_height = qr_img.size
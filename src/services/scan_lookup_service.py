@@ -0,0 +1,139 @@
+"""
+Scan Lookup Service - Bounded cache that resolves scanned QR codes to equipment
+"""
+import copy
+import threading
+from typing import Optional
+
+from ..models.equipment import Equipment
+from ..models.lookups import LOOKUPS
+from .metrics import METRICS, LRUCache
+
+# Số thiết bị giữ trong bộ đệm (mỗi mục vài KB)
+SCAN_CACHE_SIZE = 2048
+# Số thiết bị cùng đơn vị nạp sẵn khi quét trúng thiết bị đầu tiên của đơn vị đó
+PREFETCH_LIMIT = 500
+
+
+class ScanLookupService:
+    """
+    Repeat scans at a gate or during a stocktake hit the same items, so
+    resolved equipment (with images) is kept in an LRU keyed by id, with a
+    serial -> id index beside it. Controllers call invalidate() after writing
+    an item; clear() drops everything (unit changes). A miss also prefetches
+    the rest of the item's unit on a background thread.
+
+    Callers get a copy of the cached object and may modify it freely.
+    """
+
+    _instance: Optional['ScanLookupService'] = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> 'ScanLookupService':
+        """Process-wide service; every method is safe to call from any thread"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __init__(self):
+        self._items = METRICS.cache("equipment_scan", maxsize=SCAN_CACHE_SIZE)
+        self._serials = LRUCache(SCAN_CACHE_SIZE)
+        self._lock = threading.Lock()
+        # Tăng mỗi lần xoá: dữ liệu đọc trước thời điểm xoá không được ghi vào bộ đệm
+        self._generation = 0
+        self._lookups_version = LOOKUPS.version
+        self._prefetched_units = set()
+
+    # ---------------- Tra cứu ----------------
+
+    def get_by_id(self, equipment_id: int) -> Optional[Equipment]:
+        self._check_lookups()
+        equipment = self._items.get(equipment_id)
+        if equipment is None:
+            generation = self._generation
+            equipment = Equipment.get_by_id(equipment_id)
+            if equipment is None:
+                return None
+            self._store(equipment, generation)
+            self._schedule_prefetch(equipment.unit_id)
+        return self._copy(equipment)
+
+    def get_by_serial(self, serial_number: str) -> Optional[Equipment]:
+        self._check_lookups()
+        equipment_id = self._serials.get(serial_number)
+        if equipment_id is not None:
+            equipment = self.get_by_id(equipment_id)
+            # Chỉ mục số hiệu có thể cũ nếu mục theo id đã bị đẩy ra rồi đổi số hiệu
+            if equipment is not None and equipment.serial_number == serial_number:
+                return equipment
+        generation = self._generation
+        equipment = Equipment.get_by_serial(serial_number)
+        if equipment is None:
+            return None
+        self._store(equipment, generation)
+        self._schedule_prefetch(equipment.unit_id)
+        return self._copy(equipment)
+
+    # ---------------- Làm mới ----------------
+
+    def invalidate(self, equipment_id: int):
+        """Forget one item after it (or its loan / maintenance state) changed"""
+        with self._lock:
+            self._generation += 1
+            equipment = self._items.pop(equipment_id)
+            if equipment is not None:
+                self._serials.pop(equipment.serial_number)
+
+    def clear(self):
+        """Forget everything, e.g. after a unit was renamed or deleted"""
+        with self._lock:
+            self._generation += 1
+            self._items.clear()
+            self._serials.clear()
+            self._prefetched_units.clear()
+
+    def _check_lookups(self):
+        # Đổi tên loại trang bị / trạng thái làm tên trong các mục đã lưu bị cũ
+        if self._lookups_version != LOOKUPS.version:
+            self._lookups_version = LOOKUPS.version
+            self.clear()
+
+    # ---------------- Nội bộ ----------------
+
+    def _store(self, equipment: Equipment, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._items.put(equipment.id, equipment)
+            self._serials.put(equipment.serial_number, equipment.id)
+
+    @staticmethod
+    def _copy(equipment: Equipment) -> Equipment:
+        result = copy.copy(equipment)
+        result.images = list(equipment.images)
+        return result
+
+    def _schedule_prefetch(self, unit_id: Optional[int]):
+        if not unit_id:
+            return
+        with self._lock:
+            if unit_id in self._prefetched_units:
+                return
+            self._prefetched_units.add(unit_id)
+        threading.Thread(target=self._prefetch_unit, args=(unit_id, self._generation),
+                         name=f"scan-prefetch-{unit_id}", daemon=True).start()
+
+    def _prefetch_unit(self, unit_id: int, generation: int):
+        """Load the rest of a unit's inventory (no hit/miss counted)"""
+        try:
+            ids = Equipment.get_ids_by_unit(unit_id, include_children=False)[:PREFETCH_LIMIT]
+            ids = [i for i in ids if i not in self._items]
+            items = Equipment.get_by_ids(ids)
+            Equipment.load_images_many(items)
+            for equipment in items:
+                self._store(equipment, generation)
+        except Exception as e:
+            print(f"Lỗi nạp sẵn thiết bị đơn vị {unit_id}: {e}")
@@ -0,0 +1,145 @@
+"""
+Tabular Export Service - Stream CSV / Excel (XLSX) files straight from the database
+"""
+import csv
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Optional
+
+from ..config import DATA_DIR
+from ..models.equipment import Equipment
+from ..models.loan_log import LoanLog
+from ..models.maintenance_log import MaintenanceLog
+from ..models.audit_log import AuditLog
+from ..models.stocktake import StocktakeSession
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+
+class TabularExportService:
+    """
+    Write equipment, loan, maintenance and audit data as CSV or XLSX.
+
+    Rows come from a DB cursor in chunks (model.iter_export_rows) and are
+    written as they arrive, so memory use does not depend on the row count.
+    CSV is the fastest path and is meant for very large audit exports.
+    """
+
+    EXPORT_DIR = DATA_DIR / "exports"
+
+    # dataset -> (model, tên sheet / tên file mặc định)
+    DATASETS = {
+        'equipment': (Equipment, "Trang bị"),
+        'loans': (LoanLog, "Cho mượn"),
+        'maintenance': (MaintenanceLog, "Bảo dưỡng"),
+        'audit': (AuditLog, "Nhật ký"),
+        'stocktake': (StocktakeSession, "Kiểm kê"),
+    }
+
+    FORMATS = ('csv', 'xlsx')
+    CHUNK_ROWS = 5000
+
+    # Giới hạn số dòng của 1 sheet Excel (kể cả dòng tiêu đề)
+    XLSX_MAX_ROWS = 1048576
+
+    def __init__(self):
+        self.EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+
+    def export(
+        self,
+        dataset: str,
+        save_path: str = None,
+        filters: dict = None,
+        fmt: str = None,
+        progress_callback: Callable[[int, int], None] = None
+    ) -> str:
+        """
+        Export a dataset with the same filters as its view.
+
+        Args:
+            dataset: 'equipment', 'loans', 'maintenance', 'audit' or 'stocktake'
+            save_path: Output file; its extension picks the format if fmt is None
+            filters: Keyword arguments of the model's build_filter
+            fmt: 'csv' or 'xlsx'
+            progress_callback: Called as (rows_done, rows_total)
+
+        Returns:
+            Path of the generated file
+        """
+        if dataset not in self.DATASETS:
+            raise ValueError(f"Dữ liệu không hợp lệ: {dataset}")
+        model, _ = self.DATASETS[dataset]
+
+        if not fmt:
+            fmt = Path(save_path).suffix.lstrip('.').lower() if save_path else 'csv'
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+        if fmt == 'xlsx' and not OPENPYXL_AVAILABLE:
+            raise RuntimeError("Cần cài đặt thư viện openpyxl để xuất Excel (pip install openpyxl)")
+
+        if save_path:
+            filepath = Path(save_path)
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filepath = self.EXPORT_DIR / f"{dataset}_{timestamp}.{fmt}"
+
+        header = [label for _, label in model.EXPORT_COLUMNS]
+        total = model.count_filtered(filters)
+        row_chunks = model.iter_export_rows(filters, chunk_size=self.CHUNK_ROWS)
+        try:
+            if fmt == 'csv':
+                self._write_csv(filepath, header, row_chunks, total, progress_callback)
+            else:
+                self._write_xlsx(filepath, self.DATASETS[dataset][1], header,
+                                 row_chunks, total, progress_callback)
+        finally:
+            row_chunks.close()
+        return str(filepath)
+
+    def _write_csv(self, filepath: Path, header: list, row_chunks, total: int,
+                   progress_callback: Optional[Callable]):
+        # utf-8-sig: Excel trên Windows nhận đúng tiếng Việt nhờ BOM
+        with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            done = 0
+            for rows in row_chunks:
+                writer.writerows(rows)
+                done += len(rows)
+                if progress_callback:
+                    progress_callback(done, total)
+        if progress_callback:
+            progress_callback(total, total)
+
+    def _write_xlsx(self, filepath: Path, sheet_title: str, header: list, row_chunks,
+                    total: int, progress_callback: Optional[Callable]):
+        # write_only: openpyxl ghi từng dòng ra file tạm, không giữ cả bảng trong RAM
+        wb = Workbook(write_only=True)
+        sheet_no = 1
+        ws = wb.create_sheet(sheet_title)
+        ws.append(header)
+        sheet_rows = 1
+        done = 0
+        for rows in row_chunks:
+            for row in rows:
+                if sheet_rows >= self.XLSX_MAX_ROWS:
+                    sheet_no += 1
+                    ws = wb.create_sheet(f"{sheet_title} ({sheet_no})")
+                    ws.append(header)
+                    sheet_rows = 1
+                ws.append([
+                    ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v
+                    for v in row
+                ])
+                sheet_rows += 1
+            done += len(rows)
+            if progress_callback:
+                progress_callback(done, total)
+        wb.save(str(filepath))
+        if progress_callback:
+            progress_callback(total, total)
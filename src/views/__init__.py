@@ -1,29 +1,48 @@
 """
 Views Package - UI components
+
+Submodules are imported on first attribute access (see services/__init__).
 """
-from .main_window import MainWindow
-from .dashboard_view import DashboardView
-from .equipment_view import EquipmentView
-from .scan_view import ScanView
-from .input_dialog import EquipmentInputDialog
-from .maintenance_dialog import MaintenanceDialog
-from .maintenance_view import MaintenanceHistoryView, MaintenanceListView
-from .loan_dialog import LoanDialog
-from .loan_view import LoanHistoryView, LoanListView
-from .styles import StyleSheet
-from .unit_view import UnitView, UnitDialog
-from .user_view import UserView, UserDialog, ChangePasswordDialog
-from .login_dialog import LoginDialog
-from .category_view import CategoryView, CategoryDialog
-from .maintenance_type_view import MaintenanceTypeView, MaintenanceTypeDialog
+from importlib import import_module
+
+_EXPORTS = {
+    'MainWindow': '.main_window',
+    'DashboardView': '.dashboard_view',
+    'EquipmentView': '.equipment_view',
+    'ScanView': '.scan_view',
+    'EquipmentInputDialog': '.input_dialog',
+    'MaintenanceDialog': '.maintenance_dialog',
+    'MaintenanceHistoryView': '.maintenance_view',
+    'MaintenanceListView': '.maintenance_view',
+    'LoanDialog': '.loan_dialog',
+    'LoanHistoryView': '.loan_view',
+    'LoanListView': '.loan_view',
+    'StyleSheet': '.styles',
+    'UnitView': '.unit_view',
+    'UnitDialog': '.unit_view',
+    'UserView': '.user_view',
+    'UserDialog': '.user_view',
+    'ChangePasswordDialog': '.user_view',
+    'LoginDialog': '.login_dialog',
+    'CategoryView': '.category_view',
+    'CategoryDialog': '.category_view',
+    'MaintenanceTypeView': '.maintenance_type_view',
+    'MaintenanceTypeDialog': '.maintenance_type_view',
+    'ExportJobsPanel': '.export_jobs_panel',
+    'DiagnosticsView': '.diagnostics_view',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
-__all__ = [
-    'MainWindow', 'DashboardView', 'EquipmentView', 
-    'ScanView', 'EquipmentInputDialog', 'MaintenanceDialog',
-    'MaintenanceHistoryView', 'MaintenanceListView',
-    'LoanDialog', 'LoanHistoryView', 'LoanListView',
-    'StyleSheet', 'UnitView', 'UnitDialog', 'UserView', 
-    'UserDialog', 'ChangePasswordDialog', 'LoginDialog',
-    'CategoryView', 'CategoryDialog',
-    'MaintenanceTypeView', 'MaintenanceTypeDialog'
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -9,9 +9,9 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QFont, QColor
-from datetime import datetime
 
 from ..controllers.audit_controller import AuditController
+from .export_jobs_panel import request_tabular_export
 
 # Bản dịch hành động
 ACTION_TRANSLATION = {
@@ -30,7 +30,8 @@ TARGET_TRANSLATION = {
     "User": "Người dùng",
     "Unit": "Đơn vị",
     "Category": "Loại trang bị",
-    "MaintenanceType": "Loại công việc"
+    "MaintenanceType": "Loại công việc",
+    "Stocktake": "Kiểm kê"
 }
 
 class AuditView(QWidget):
@@ -136,6 +137,12 @@ class AuditView(QWidget):
         refresh_btn.clicked.connect(self.refresh_data)
         row2_layout.addWidget(refresh_btn)
         
+        export_btn = QPushButton("📊 Xuất Excel/CSV")
+        export_btn.setObjectName("secondary")
+        export_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        export_btn.clicked.connect(self._export_tabular)
+        row2_layout.addWidget(export_btn)
+        
         filter_layout.addLayout(row2_layout)
         layout.addWidget(filter_frame)
         
@@ -223,6 +230,17 @@ class AuditView(QWidget):
         self.current_page = 1
         self._update_pagination()
         
+    def _export_tabular(self):
+        """Xuất toàn bộ nhật ký theo bộ lọc (không giới hạn 1000 dòng như bảng)"""
+        filters = {
+            'keyword': self.search_input.text().strip() or None,
+            'action': self.action_filter.currentData(),
+        }
+        if self.date_filter_check.isChecked():
+            filters['start_date'] = self.from_date.date().toPyDate()
+            filters['end_date'] = self.to_date.date().toPyDate()
+        request_tabular_export(self, 'audit', "nhat_ky_he_thong", filters)
+        
     def _populate_table(self, logs: list):
         self.table.setRowCount(len(logs))
         for row, log in enumerate(logs):
@@ -233,16 +251,7 @@ class AuditView(QWidget):
             self.table.setItem(row, 0, id_item)
             
             # Format date
-            date_str = "-"
-            if log.created_at:
-                try:
-                    if isinstance(log.created_at, str):
-                        dt = datetime.strptime(log.created_at, "%Y-%m-%d %H:%M:%S")
-                        date_str = dt.strftime("%d/%m/%Y %H:%M")
-                    else:
-                        date_str = log.created_at.strftime("%d/%m/%Y %H:%M")
-                except:
-                    date_str = str(log.created_at)[:16]
+            date_str = log.created_at.strftime("%d/%m/%Y %H:%M") if log.created_at else "-"
             self.table.setItem(row, 1, QTableWidgetItem(date_str))
             
             self.table.setItem(row, 2, QTableWidgetItem(log.username or "-"))
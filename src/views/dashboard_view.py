@@ -312,12 +312,7 @@ class DashboardView(QWidget):
             self.activity_table.setItem(row, 0, QTableWidgetItem(log.equipment_name))
             self.activity_table.setItem(row, 1, QTableWidgetItem(log.maintenance_type))
             
-            date_str = ""
-            if log.start_date:
-                if isinstance(log.start_date, str):
-                    date_str = log.start_date[:10]
-                else:
-                    date_str = log.start_date.strftime('%d/%m/%Y')
+            date_str = log.start_date.strftime('%d/%m/%Y') if log.start_date else ""
             self.activity_table.setItem(row, 2, QTableWidgetItem(date_str))
             
             status_item = QTableWidgetItem(log.status)
@@ -0,0 +1,274 @@
+"""
+Diagnostics View - Live performance metrics for Admins
+"""
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QGridLayout,
+    QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+    QFrame, QAbstractItemView, QCheckBox, QFileDialog, QMessageBox
+)
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QFont
+from datetime import datetime
+import json
+import platform
+import time
+
+from ..models.query_stats import QUERY_STATS
+from ..services.metrics import METRICS, process_rss_bytes
+from ..services.export_job_service import ExportJobManager, JobStatus
+from ..config import APP_VERSION
+
+REFRESH_INTERVAL_MS = 1000
+TOP_CALL_SITES = 15
+
+CACHE_LABELS = {
+    "qr_image": "Ảnh QR",
+    "thumbnail": "Ảnh thu nhỏ",
+    "equipment_scan": "Tra cứu quét",
+}
+
+
+def _export_queue_depth() -> tuple:
+    """(queued, running) export jobs"""
+    statuses = [job.status for job in ExportJobManager.instance().jobs()]
+    return statuses.count(JobStatus.QUEUED), statuses.count(JobStatus.RUNNING)
+
+
+def collect_diagnostics() -> dict:
+    """Everything shown on the page, plus full per-SQL stats, as plain data"""
+    queued, running = _export_queue_depth()
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'app_version': APP_VERSION,
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'process_rss_bytes': process_rss_bytes(),
+        'export_jobs': {'queued': queued, 'running': running},
+        'metrics': METRICS.snapshot(),
+        'queries': QUERY_STATS.snapshot(),
+    }
+
+
+class DiagnosticsView(QWidget):
+    """
+    Admin page with live DB, camera, cache, export queue and memory metrics.
+    Refreshes once a second while visible.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.main_window = parent
+        self._last_query_count = None
+        self._last_refresh = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_INTERVAL_MS)
+        self._timer.timeout.connect(self.refresh_data)
+        self._setup_ui()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(30, 30, 30, 30)
+        layout.setSpacing(20)
+
+        # Header
+        header_layout = QHBoxLayout()
+        title = QLabel("📈 Chẩn đoán hiệu năng")
+        title.setObjectName("title")
+        title.setFont(QFont("Segoe UI", 16, QFont.Weight.Bold))
+        header_layout.addWidget(title)
+        header_layout.addStretch()
+
+        self.query_stats_check = QCheckBox("Đo truy vấn SQL")
+        self.query_stats_check.setChecked(QUERY_STATS.enabled)
+        self.query_stats_check.toggled.connect(QUERY_STATS.enable)
+        header_layout.addWidget(self.query_stats_check)
+
+        reset_btn = QPushButton("↺ Đặt lại")
+        reset_btn.setObjectName("secondary")
+        reset_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        reset_btn.clicked.connect(self._reset)
+        header_layout.addWidget(reset_btn)
+
+        dump_btn = QPushButton("💾 Xuất số liệu")
+        dump_btn.setObjectName("secondary")
+        dump_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        dump_btn.clicked.connect(self._dump_to_file)
+        header_layout.addWidget(dump_btn)
+        layout.addLayout(header_layout)
+
+        # Metric grid
+        metrics_frame = QFrame()
+        metrics_frame.setObjectName("card")
+        grid = QGridLayout(metrics_frame)
+        grid.setHorizontalSpacing(30)
+        self.metric_labels = {}
+        metric_rows = [
+            ("db_qps", "Truy vấn CSDL / giây"),
+            ("db_latency", "Độ trễ truy vấn p50 / p95 / p99"),
+            ("db_slow", "Truy vấn chậm"),
+            ("camera_fps", "Camera: khung hình / giải mã (FPS)"),
+            ("camera_hit", "Tỷ lệ giải mã thấy mã QR"),
+            ("camera_lanes", "Theo camera: có mã / lần giải mã (độ trễ ms TB)"),
+            ("decode_stages", "Bước giải mã: trúng / số lần thử (ms TB)"),
+            ("scan_resolve", "Tra cứu mã quét: tìm thấy / số lần (ms TB)"),
+            ("caches", "Tỷ lệ trúng bộ nhớ đệm"),
+            ("export_queue", "Tác vụ xuất file đang chờ / chạy"),
+            ("rss", "Bộ nhớ tiến trình (RSS)"),
+        ]
+        for row, (key, text) in enumerate(metric_rows):
+            name_label = QLabel(text)
+            name_label.setObjectName("subtitle")
+            value_label = QLabel("-")
+            value_label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+            value_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+            grid.addWidget(name_label, row, 0)
+            grid.addWidget(value_label, row, 1)
+            self.metric_labels[key] = value_label
+        grid.setColumnStretch(1, 1)
+        layout.addWidget(metrics_frame)
+
+        # Slowest call sites
+        sites_title = QLabel("Vị trí gọi tốn thời gian nhất")
+        sites_title.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
+        layout.addWidget(sites_title)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels([
+            "Hàm gọi", "Số lần", "Tổng (ms)", "TB (ms)", "p95 (ms)", "Max (ms)"
+        ])
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for col in range(1, 6):
+            header.setSectionResizeMode(col, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        layout.addWidget(self.table)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_data()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh_data(self):
+        queries = QUERY_STATS.snapshot()
+        metrics = METRICS.snapshot()
+        overall = queries['overall']
+
+        # Tốc độ truy vấn tính từ chênh lệch giữa hai lần làm mới
+        now = time.monotonic()
+        qps = 0.0
+        if self._last_query_count is not None and now > self._last_refresh:
+            qps = max(0, overall['count'] - self._last_query_count) / (now - self._last_refresh)
+        self._last_query_count = overall['count']
+        self._last_refresh = now
+
+        if queries['enabled']:
+            self.metric_labels['db_qps'].setText(f"{qps:.1f}")
+            self.metric_labels['db_latency'].setText(
+                f"{overall['p50_ms']:.2f} / {overall['p95_ms']:.2f} / {overall['p99_ms']:.2f} ms"
+            )
+            self.metric_labels['db_slow'].setText(
+                f"{queries['slow_count']} (≥ {queries['slow_ms']:.0f} ms, ghi vào {queries['slow_log_path']})"
+            )
+        else:
+            for key in ('db_qps', 'db_latency', 'db_slow'):
+                self.metric_labels[key].setText("Chưa bật đo truy vấn")
+
+        meters = metrics['meters']
+        capture = meters.get('camera.capture', {'count': 0, 'rate': 0.0})
+        decode = meters.get('camera.decode', {'count': 0, 'rate': 0.0})
+        hits = meters.get('camera.decode_hit', {'count': 0, 'rate': 0.0})
+        self.metric_labels['camera_fps'].setText(f"{capture['rate']:.1f} / {decode['rate']:.1f}")
+        if decode['count']:
+            self.metric_labels['camera_hit'].setText(
+                f"{hits['count'] / decode['count']:.1%} ({hits['count']}/{decode['count']})"
+            )
+        else:
+            self.metric_labels['camera_hit'].setText("-")
+
+        lanes = metrics['stages'].get('camera_decode')
+        if lanes and lanes['stages']:
+            parts = [
+                f"{name}: {stats['hits']}/{stats['attempts']} ({stats['avg_ms']:.0f})"
+                for name, stats in lanes['stages'].items()
+            ]
+            dropped = meters.get('camera.dropped', {'count': 0})['count']
+            if dropped:
+                parts.append(f"bỏ khung: {dropped}")
+            self.metric_labels['camera_lanes'].setText("   ".join(parts))
+        else:
+            self.metric_labels['camera_lanes'].setText("-")
+
+        stages = metrics['stages'].get('qr_decode')
+        if stages and stages['runs']:
+            parts = [
+                f"{name}: {stats['hits']}/{stats['attempts']} ({stats['avg_ms']:.0f})"
+                for name, stats in stages['stages'].items()
+            ]
+            if stages['cut_short']:
+                parts.append(f"hết ngân sách: {stages['cut_short']}/{stages['runs']}")
+            self.metric_labels['decode_stages'].setText("   ".join(parts))
+        else:
+            self.metric_labels['decode_stages'].setText("-")
+
+        resolve = metrics['stages'].get('scan_resolve')
+        if resolve and resolve['stages']:
+            self.metric_labels['scan_resolve'].setText("   ".join(
+                f"{name}: {stats['hits']}/{stats['attempts']} ({stats['avg_ms']:.2f})"
+                for name, stats in resolve['stages'].items()
+            ))
+        else:
+            self.metric_labels['scan_resolve'].setText("-")
+
+        cache_parts = []
+        for name, stats in sorted(metrics['caches'].items()):
+            label = CACHE_LABELS.get(name, name)
+            cache_parts.append(f"{label}: {stats['hit_ratio']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+        self.metric_labels['caches'].setText("   ".join(cache_parts) or "-")
+
+        queued, running = _export_queue_depth()
+        self.metric_labels['export_queue'].setText(f"{queued} / {running}")
+
+        rss = process_rss_bytes()
+        self.metric_labels['rss'].setText(f"{rss / (1024 * 1024):.1f} MB" if rss is not None else "Không đọc được")
+
+        sites = sorted(queries['by_call_site'].items(), key=lambda kv: kv[1]['total_ms'], reverse=True)
+        sites = sites[:TOP_CALL_SITES]
+        self.table.setRowCount(len(sites))
+        for row, (site, stats) in enumerate(sites):
+            site_item = QTableWidgetItem(site)
+            site_item.setToolTip("\n".join(stats['statements']))
+            self.table.setItem(row, 0, site_item)
+            values = [str(stats['count']), f"{stats['total_ms']:.1f}", f"{stats['avg_ms']:.2f}",
+                      f"{stats['p95_ms']:.2f}", f"{stats['max_ms']:.2f}"]
+            for col, value in enumerate(values, 1):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, col, item)
+
+    def _reset(self):
+        QUERY_STATS.reset()
+        self._last_query_count = None
+        self.refresh_data()
+
+    def _dump_to_file(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Xuất số liệu chẩn đoán", f"diagnostics_{timestamp}.json", "JSON (*.json)"
+        )
+        if not filename:
+            return
+        try:
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(collect_diagnostics(), f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể ghi file:\n{e}")
+            return
+        QMessageBox.information(self, "Thành công", f"Đã lưu số liệu chẩn đoán:\n{filename}")
@@ -16,10 +16,11 @@ from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog
 from ..models.loan_log import LoanLog
 from ..services.qr_service import QRService
-from ..services.export_service import ExportService
+from ..services.export_job_service import ExportJobManager
 from .maintenance_view import MaintenanceHistoryView
 from .loan_view import LoanHistoryView
 from ..config import DATA_DIR # [MỚI] Import thư mục gốc để lấy ảnh
+from .thumbnails import load_thumbnail
 
 
 # --- [MỚI] CLASS HỖ TRỢ CLICK VÀO ẢNH ---
@@ -89,7 +90,6 @@ class EquipmentDetailDialog(QDialog):
         self.equipment = equipment
         self.maintenance_logs = maintenance_logs or []
         self.qr_service = qr_service or QRService()
-        self.export_service = ExportService()
         self._setup_ui()
     
     def _setup_ui(self):
@@ -219,12 +219,7 @@ class EquipmentDetailDialog(QDialog):
                         QLabel:hover { border: 2px solid #1976D2; }
                     """)
                     
-                    pixmap = QPixmap(str(full_path)).scaled(
-                        116, 116, 
-                        Qt.AspectRatioMode.KeepAspectRatio, 
-                        Qt.TransformationMode.SmoothTransformation
-                    )
-                    lbl.setPixmap(pixmap)
+                    lbl.setPixmap(load_thumbnail(full_path, 116))
                     lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
                     lbl.setToolTip("Click để phóng to ảnh")
                     
@@ -294,14 +289,7 @@ class EquipmentDetailDialog(QDialog):
             self.loan_status_label.setStyleSheet("color: #FF9800;")
     
     def _format_date(self, date_value):
-        if date_value is None:
-            return "-"
-        if hasattr(date_value, 'strftime'):
-            return date_value.strftime("%d/%m/%Y")
-        try:
-            return str(date_value)[:10]
-        except:
-            return "-"
+        return date_value.strftime("%d/%m/%Y") if date_value else "-"
     
     def _on_maintenance_updated(self):
         self.equipment = Equipment.get_by_id(self.equipment.id)
@@ -328,19 +316,12 @@ class EquipmentDetailDialog(QDialog):
                 break
     
     def _export_detail(self):
-        try:
-            maintenance_logs = MaintenanceLog.get_by_equipment(self.equipment.id)
-            loan_logs = LoanLog.get_by_equipment(self.equipment.id)
-            filepath = self.export_service.export_equipment_detail(
-                self.equipment, maintenance_logs, loan_logs
-            )
-            reply = QMessageBox.information(
-                self, "Thành công",
-                f"Đã xuất hồ sơ PDF!\n\nĐường dẫn: {filepath}",
-                QMessageBox.StandardButton.Open | QMessageBox.StandardButton.Ok
-            )
-            if reply == QMessageBox.StandardButton.Open:
-                import os
-                os.startfile(filepath)
-        except Exception as e:
-            QMessageBox.critical(self, "Lỗi", f"Không thể xuất file: {str(e)}")
\ No newline at end of file
+        # Xuất hồ sơ ở tiến trình nền, theo dõi trong panel tiến trình xuất file
+        ExportJobManager.instance().submit_equipment_detail(
+            self.equipment.id, self.equipment.serial_number
+        )
+        QMessageBox.information(
+            self, "Đang xuất hồ sơ",
+            "Đã đưa hồ sơ vào hàng đợi xuất file.\n"
+            "Theo dõi tiến độ tại mục Xem → Tiến trình xuất file."
+        )
\ No newline at end of file
@@ -6,7 +6,7 @@ from PyQt6.QtWidgets import (
     QPushButton, QTableWidget, QTableWidgetItem,
     QHeaderView, QLineEdit, QComboBox, QFrame,
     QMessageBox, QMenu, QFileDialog, QAbstractItemView,
-    QDateEdit, QCheckBox # [MỚI] Import
+    QDateEdit, QCheckBox, QInputDialog # [MỚI] Import
 )
 from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QFont, QAction, QPixmap, QImage, QColor
@@ -15,11 +15,13 @@ from datetime import datetime
 from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog
 from ..models.category import Category
+from ..models.unit import Unit
 from ..controllers.maintenance_controller import MaintenanceController
 from ..services.qr_service import QRService
-from ..services.export_service import ExportService
+from ..services.export_job_service import ExportJobManager
 from ..config import EQUIPMENT_STATUS
 from .input_dialog import EquipmentInputDialog
+from .export_jobs_panel import request_tabular_export
 from .maintenance_dialog import MaintenanceDialog
 from .equipment_detail_dialog import EquipmentDetailDialog
 
@@ -33,7 +35,6 @@ class EquipmentView(QWidget):
         super().__init__(parent)
         self.main_window = parent
         self.qr_service = QRService()
-        self.export_service = ExportService()
         self.maintenance_controller = MaintenanceController()
         self.current_equipment_list = []
         self.current_page = 1
@@ -86,6 +87,12 @@ class EquipmentView(QWidget):
         add_btn.clicked.connect(self.show_add_dialog)
         header_layout.addWidget(add_btn)
         
+        import_btn = QPushButton("📥 Nhập từ file")
+        import_btn.setObjectName("secondary")
+        import_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        import_btn.clicked.connect(self.import_from_file)
+        header_layout.addWidget(import_btn)
+        
         layout.addLayout(header_layout)
         
         # --- SEARCH AND FILTER BAR (Cải tiến) ---
@@ -253,12 +260,24 @@ class EquipmentView(QWidget):
         export_list_btn.clicked.connect(self.export_equipment_list)
         pagination_layout.addWidget(export_list_btn)
         
+        export_table_btn = QPushButton("📊 Xuất Excel/CSV")
+        export_table_btn.setObjectName("secondary")
+        export_table_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        export_table_btn.clicked.connect(self.export_tabular)
+        pagination_layout.addWidget(export_table_btn)
+        
         export_qr_btn = QPushButton("🏷️ Xuất mã QR")
         export_qr_btn.setObjectName("secondary")
         export_qr_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         export_qr_btn.clicked.connect(self.export_qr_sheet)
         pagination_layout.addWidget(export_qr_btn)
         
+        export_dossier_btn = QPushButton("🗂️ Xuất hồ sơ hàng loạt")
+        export_dossier_btn.setObjectName("secondary")
+        export_dossier_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        export_dossier_btn.clicked.connect(self.export_dossiers)
+        pagination_layout.addWidget(export_dossier_btn)
+        
         layout.addLayout(pagination_layout)
         
         # Initial load will happen in showEvent
@@ -334,15 +353,7 @@ class EquipmentView(QWidget):
     
     # [MỚI] Hàm format ngày hiển thị
     def _format_date(self, date_val):
-        if not date_val: return "-"
-        if hasattr(date_val, 'strftime'): return date_val.strftime("%d/%m/%Y")
-        s = str(date_val)[:10]
-        try:
-            if "-" in s:
-                p = s.split("-")
-                return f"{p[2]}/{p[1]}/{p[0]}"
-        except: pass
-        return s
+        return date_val.strftime("%d/%m/%Y") if date_val else "-"
 
     def _populate_table(self, equipment_list: list):
         """Populate table with equipment data"""
@@ -624,11 +635,30 @@ class EquipmentView(QWidget):
         dialog = EquipmentDetailDialog(self, equipment, logs, self.qr_service)
         dialog.exec()
     
+    def _current_filters(self) -> dict:
+        """Filters currently selected in the view, in Equipment.build_filter form"""
+        filters = {
+            'keyword': self.search_input.text().strip() or None,
+            'category': self.category_filter.currentData(),
+            'status': self.status_filter.currentData(),
+        }
+        if self.date_filter_check.isChecked():
+            filters['start_date'] = datetime.combine(self.from_date.date().toPyDate(), datetime.min.time())
+            filters['end_date'] = datetime.combine(self.to_date.date().toPyDate(), datetime.max.time())
+        return filters
+    
     def export_equipment_list(self):
         """Cho phép người dùng chọn nơi lưu file"""
         if not self.current_equipment_list:
             QMessageBox.warning(self, "Thông báo", "Không có dữ liệu để xuất!")
             return
+        
+        group_options = {"Không nhóm": None, "Theo đơn vị": "unit", "Theo loại trang bị": "category"}
+        group_label, ok = QInputDialog.getItem(
+            self, "Xuất danh sách", "Nhóm báo cáo:", list(group_options.keys()), 0, False
+        )
+        if not ok:
+            return
             
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         default_name = f"danh_sach_thiet_bi_{timestamp}.pdf"
@@ -641,21 +671,16 @@ class EquipmentView(QWidget):
         )
         
         if filename:
-            try:
-                filepath = self.export_service.export_equipment_list(
-                    self.current_equipment_list,
-                    save_path=filename
-                )
-                reply = QMessageBox.information(
-                    self, "Thành công",
-                    f"Đã xuất file PDF thành công!\n\nĐường dẫn: {filepath}",
-                    QMessageBox.StandardButton.Open | QMessageBox.StandardButton.Ok
-                )
-                if reply == QMessageBox.StandardButton.Open:
-                    import os
-                    os.startfile(filepath)
-            except Exception as e:
-                QMessageBox.critical(self, "Lỗi", f"Không thể xuất file: {str(e)}")
+            # Báo cáo dạng luồng, chạy nền để giao diện không bị treo
+            ExportJobManager.instance().submit_equipment_report(
+                save_path=filename,
+                filters=self._current_filters(),
+                group_by=group_options[group_label]
+            )
+    
+    def export_tabular(self):
+        """Xuất danh sách theo bộ lọc hiện tại ra Excel/CSV (chạy nền)"""
+        request_tabular_export(self, 'equipment', "danh_sach_thiet_bi", self._current_filters())
     
     def export_qr_sheet(self):
         """Cho phép người dùng chọn nơi lưu file QR"""
@@ -674,21 +699,78 @@ class EquipmentView(QWidget):
         )
         
         if filename:
-            try:
-                filepath = self.export_service.export_qr_sheet(
-                    self.current_equipment_list,
-                    save_path=filename
-                )
-                reply = QMessageBox.information(
-                    self, "Thành công",
-                    f"Đã xuất bảng mã QR thành công!\n\nĐường dẫn: {filepath}",
-                    QMessageBox.StandardButton.Open | QMessageBox.StandardButton.Ok
-                )
-                if reply == QMessageBox.StandardButton.Open:
-                    import os
-                    os.startfile(filepath)
-            except Exception as e:
-                QMessageBox.critical(self, "Lỗi", f"Không thể xuất file: {str(e)}")
+            ExportJobManager.instance().submit_qr_sheet(
+                save_path=filename,
+                equipment_ids=[e.id for e in self.current_equipment_list]
+            )
+    
+    def export_dossiers(self):
+        """Xuất hồ sơ của nhiều thiết bị (theo bộ lọc hoặc theo đơn vị) vào 1 file"""
+        scopes = ["Danh sách đang lọc", "Theo đơn vị (gồm đơn vị cấp dưới)"]
+        scope, ok = QInputDialog.getItem(
+            self, "Xuất hồ sơ hàng loạt", "Phạm vi:", scopes, 0, False
+        )
+        if not ok:
+            return
+        
+        if scope == scopes[0]:
+            equipment_ids = Equipment.get_ids_filtered(self._current_filters())
+            name_hint = "ho_so"
+        else:
+            units = Unit.get_all()
+            if not units:
+                QMessageBox.warning(self, "Thông báo", "Chưa có đơn vị nào!")
+                return
+            unit_names = [u.name for u in units]
+            unit_name, ok = QInputDialog.getItem(
+                self, "Xuất hồ sơ hàng loạt", "Đơn vị:", unit_names, 0, False
+            )
+            if not ok:
+                return
+            unit = units[unit_names.index(unit_name)]
+            equipment_ids = Equipment.get_ids_by_unit(unit.id)
+            name_hint = f"ho_so_don_vi_{unit.id}"
+        
+        if not equipment_ids:
+            QMessageBox.warning(self, "Thông báo", "Không có dữ liệu để xuất!")
+            return
+        
+        formats = ["File ZIP (mỗi thiết bị 1 PDF)", "Một file PDF gộp (có mục lục)"]
+        fmt, ok = QInputDialog.getItem(
+            self, "Xuất hồ sơ hàng loạt",
+            f"Số thiết bị: {len(equipment_ids)}\nĐịnh dạng:", formats, 0, False
+        )
+        if not ok:
+            return
+        merged = fmt == formats[1]
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if merged:
+            default_name, file_filter = f"{name_hint}_{timestamp}.pdf", "PDF Files (*.pdf)"
+        else:
+            default_name, file_filter = f"{name_hint}_{timestamp}.zip", "ZIP Files (*.zip)"
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Lưu hồ sơ hàng loạt", default_name, file_filter
+        )
+        
+        if filename:
+            ExportJobManager.instance().submit_dossier_archive(
+                save_path=filename,
+                equipment_ids=equipment_ids,
+                merged=merged
+            )
+    
+    def import_from_file(self):
+        """Nhập hàng loạt trang bị từ file CSV/Excel (chạy nền)"""
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Nhập trang bị từ file", "",
+            "Excel/CSV (*.xlsx *.csv);;Excel (*.xlsx);;CSV (*.csv)"
+        )
+        if not filename:
+            return
+        
+        from ..controllers.equipment_controller import EquipmentController
+        EquipmentController().import_equipment_file(filename)
     
     def showEvent(self, event):
         """Load lại danh mục mỗi khi vào view"""
@@ -0,0 +1,198 @@
+"""
+Export Jobs Panel - Dock widget listing background export jobs
+"""
+from datetime import datetime
+
+from PyQt6.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+    QAbstractItemView, QProgressBar, QFileDialog, QMessageBox
+)
+from PyQt6.QtCore import Qt, QUrl
+from PyQt6.QtGui import QColor, QDesktopServices
+
+from ..services.export_job_service import ExportJobManager, JobStatus
+
+
+STATUS_COLORS = {
+    JobStatus.QUEUED: "#757575",
+    JobStatus.RUNNING: "#1976D2",
+    JobStatus.DONE: "#4CAF50",
+    JobStatus.FAILED: "#F44336",
+    JobStatus.CANCELLED: "#FF9800",
+}
+
+
+XLSX_FILTER = "Excel (*.xlsx)"
+CSV_FILTER = "CSV UTF-8 (*.csv)"
+
+
+def request_tabular_export(parent, dataset: str, file_stem: str, filters: dict = None):
+    """Ask for a CSV/XLSX file name and queue the export as a background job"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename, selected_filter = QFileDialog.getSaveFileName(
+        parent,
+        "Xuất dữ liệu Excel/CSV",
+        f"{file_stem}_{timestamp}.xlsx",
+        f"{XLSX_FILTER};;{CSV_FILTER}"
+    )
+    if not filename:
+        return None
+
+    lower = filename.lower()
+    if not lower.endswith((".xlsx", ".csv")):
+        filename += ".csv" if selected_filter == CSV_FILTER else ".xlsx"
+    from ..services.tabular_export_service import OPENPYXL_AVAILABLE
+    if filename.lower().endswith(".xlsx") and not OPENPYXL_AVAILABLE:
+        QMessageBox.warning(
+            parent, "Thiếu thư viện",
+            "Chưa cài đặt openpyxl nên không thể xuất Excel.\nVui lòng chọn định dạng CSV."
+        )
+        return None
+
+    return ExportJobManager.instance().submit_tabular(dataset, filename, filters)
+
+
+class ExportJobsPanel(QDockWidget):
+    """
+    Dock listing queued/running/finished exports with progress and cancel
+    """
+
+    COLUMNS = ["Tác vụ", "Trạng thái", "Tiến độ", "Tệp kết quả"]
+
+    def __init__(self, parent=None):
+        super().__init__("📤 Tiến trình xuất file", parent)
+        self.setObjectName("exportJobsDock")
+        self.manager = ExportJobManager.instance()
+        self._rows = {}  # job_id -> row
+        self._setup_ui()
+
+        self.manager.job_added.connect(self._on_job_added)
+        self.manager.job_updated.connect(self._on_job_updated)
+
+    def _setup_ui(self):
+        container = QWidget()
+        layout = QVBoxLayout(container)
+        layout.setContentsMargins(8, 8, 8, 8)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        self.table.setColumnWidth(2, 180)
+        self.table.itemSelectionChanged.connect(self._update_buttons)
+        self.table.cellDoubleClicked.connect(lambda row, col: self._open_selected())
+        layout.addWidget(self.table)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+
+        self.open_btn = QPushButton("📂 Mở file")
+        self.open_btn.clicked.connect(self._open_selected)
+        btn_layout.addWidget(self.open_btn)
+
+        self.cancel_btn = QPushButton("⛔ Hủy")
+        self.cancel_btn.setObjectName("danger")
+        self.cancel_btn.clicked.connect(self._cancel_selected)
+        btn_layout.addWidget(self.cancel_btn)
+
+        self.clear_btn = QPushButton("🧹 Xóa mục đã xong")
+        self.clear_btn.setObjectName("secondary")
+        self.clear_btn.clicked.connect(self._clear_finished)
+        btn_layout.addWidget(self.clear_btn)
+
+        layout.addLayout(btn_layout)
+        self.setWidget(container)
+        self._update_buttons()
+
+    def _selected_job(self):
+        row = self.table.currentRow()
+        if row < 0:
+            return None
+        item = self.table.item(row, 0)
+        return self.manager.get(item.data(Qt.ItemDataRole.UserRole)) if item else None
+
+    def _update_buttons(self):
+        job = self._selected_job()
+        self.cancel_btn.setEnabled(bool(job and not job.is_finished))
+        self.open_btn.setEnabled(bool(job and job.status == JobStatus.DONE))
+
+    def _on_job_added(self, job_id: int):
+        job = self.manager.get(job_id)
+        if not job:
+            return
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self._rows[job_id] = row
+
+        title_item = QTableWidgetItem(job.title)
+        title_item.setData(Qt.ItemDataRole.UserRole, job_id)
+        self.table.setItem(row, 0, title_item)
+        self.table.setItem(row, 1, QTableWidgetItem())
+        progress = QProgressBar()
+        progress.setRange(0, 100)
+        progress.setTextVisible(True)
+        self.table.setCellWidget(row, 2, progress)
+        self.table.setItem(row, 3, QTableWidgetItem(job.save_path))
+
+        self._on_job_updated(job_id)
+        self.table.scrollToBottom()
+        # Hiện panel khi có tác vụ mới
+        self.show()
+        self.raise_()
+
+    def _on_job_updated(self, job_id: int):
+        job = self.manager.get(job_id)
+        row = self._rows.get(job_id)
+        if not job or row is None:
+            return
+
+        status_item = self.table.item(row, 1)
+        status_item.setText(job.status)
+        status_item.setForeground(QColor(STATUS_COLORS.get(job.status, "#757575")))
+        if job.error or job.message:
+            status_item.setToolTip(job.error or job.message)
+
+        progress = self.table.cellWidget(row, 2)
+        if job.status == JobStatus.RUNNING and not job.total:
+            progress.setRange(0, 0)  # Chưa biết tổng -> chạy vô định
+        else:
+            progress.setRange(0, 100)
+            progress.setValue(job.percent)
+            if job.total and not job.is_finished:
+                progress.setFormat(f"{job.done}/{job.total} (%p%)")
+            else:
+                progress.setFormat("%p%")
+
+        if job.result:
+            self.table.item(row, 3).setText(job.result)
+        self._update_buttons()
+
+    def _open_selected(self):
+        job = self._selected_job()
+        if job and job.status == JobStatus.DONE and job.result:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(job.result))
+
+    def _cancel_selected(self):
+        job = self._selected_job()
+        if job:
+            self.manager.cancel(job.id)
+
+    def _clear_finished(self):
+        self.manager.clear_finished()
+        for job_id, row in sorted(self._rows.items(), key=lambda kv: kv[1], reverse=True):
+            if self.manager.get(job_id) is None:
+                self.table.removeRow(row)
+        # Đánh lại chỉ số dòng còn lại
+        self._rows = {
+            self.table.item(r, 0).data(Qt.ItemDataRole.UserRole): r
+            for r in range(self.table.rowCount())
+        }
+        self._update_buttons()
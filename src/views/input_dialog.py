@@ -7,14 +7,14 @@ from PyQt6.QtWidgets import (
     QPushButton, QFrame, QMessageBox, QDateEdit, QGroupBox, QWidget, QFileDialog
 )
 from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtGui import QFont, QPixmap
-from datetime import datetime
+from PyQt6.QtGui import QFont
 from pathlib import Path
 
 from ..models.equipment import Equipment
 from ..models.unit import Unit, UNIT_LEVELS, get_level_name
 from ..models.category import Category
 from ..config import EQUIPMENT_STATUS, DATA_DIR
+from .thumbnails import load_thumbnail
 
 
 class EquipmentInputDialog(QDialog):
@@ -218,10 +218,7 @@ class EquipmentInputDialog(QDialog):
         else:
             full_path = img_path
             
-        pixmap = QPixmap(full_path).scaled(
-            80, 80, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-        )
-        lbl.setPixmap(pixmap)
+        lbl.setPixmap(load_thumbnail(full_path, 80))
         lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         del_btn = QPushButton("Xóa")
@@ -309,13 +306,8 @@ class EquipmentInputDialog(QDialog):
             self.year_spin.setValue(self.equipment.manufacture_year)
             
         if self.equipment.receive_date:
-            try:
-                if isinstance(self.equipment.receive_date, str):
-                    dt = datetime.fromisoformat(self.equipment.receive_date.replace('Z', '+00:00'))
-                else:
-                    dt = self.equipment.receive_date
-                self.receive_date_edit.setDate(QDate(dt.year, dt.month, dt.day))
-            except: pass
+            dt = self.equipment.receive_date
+            self.receive_date_edit.setDate(QDate(dt.year, dt.month, dt.day))
             
         idx = self.status_combo.findText(self.equipment.status)
         if idx >= 0: self.status_combo.setCurrentIndex(idx)
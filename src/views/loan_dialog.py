@@ -8,12 +8,12 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QDateTime, pyqtSignal
 from PyQt6.QtGui import QFont, QPixmap
-from datetime import datetime
 import os
 
 from ..models.equipment import Equipment
 from ..models.loan_log import LoanLog, LOAN_STATUS
 from ..config import DATA_DIR
+from .thumbnails import load_thumbnail
 
 # --- CLASS HỖ TRỢ CLICK VÀO ẢNH ---
 class ClickableLabel(QLabel):
@@ -257,8 +257,7 @@ class LoanDialog(QDialog):
         
         full_path = str(DATA_DIR / img_path) if is_existing else img_path
         if os.path.exists(full_path):
-            pixmap = QPixmap(full_path).scaled(60, 60, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            lbl.setPixmap(pixmap)
+            lbl.setPixmap(load_thumbnail(full_path, 60))
         else:
             lbl.setText("X")
             
@@ -315,20 +314,14 @@ class LoanDialog(QDialog):
         if not self.loan: return
         self.borrower_input.setText(self.loan.borrower_unit)
         
-        # Xử lý an toàn String to Datetime
+        # Model đã trả về datetime (hoặc None)
         for date_attr, widget in [('loan_date', self.loan_date), 
                                   ('expected_return_date', self.expected_return_date),
                                   ('return_date', self.return_date)]:
             dt = getattr(self.loan, date_attr)
             if dt:
-                if isinstance(dt, str):
-                    try: dt = datetime.fromisoformat(dt.split('.')[0].replace('Z', ''))
-                    except ValueError:
-                        try: dt = datetime.strptime(dt.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                        except: pass
-                if isinstance(dt, datetime):
-                    widget.setDateTime(QDateTime(dt))
-                    if date_attr == 'return_date': widget.setEnabled(True)
+                widget.setDateTime(QDateTime(dt))
+                if date_attr == 'return_date': widget.setEnabled(True)
 
         idx = self.status_combo.findText(self.loan.status)
         if idx >= 0: self.status_combo.setCurrentIndex(idx)
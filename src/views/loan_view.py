@@ -15,6 +15,7 @@ from ..models.equipment import Equipment
 from ..models.loan_log import LoanLog, LOAN_STATUS
 from ..controllers.loan_controller import LoanController
 from .loan_dialog import LoanDialog
+from .export_jobs_panel import request_tabular_export
 from ..controllers.user_controller import UserController 
 from ..models.user import UserRole
 
@@ -178,17 +179,13 @@ class LoanHistoryView(QWidget):
             self.table.setItem(row, 0, QTableWidgetItem(str(log.id)))
             self.table.setItem(row, 1, QTableWidgetItem(log.borrower_unit))
             
-            loan_str = log.loan_date.strftime("%d/%m/%Y") if hasattr(log.loan_date, 'strftime') else str(log.loan_date)[:10]
+            loan_str = log.loan_date.strftime("%d/%m/%Y") if log.loan_date else "-"
             self.table.setItem(row, 2, QTableWidgetItem(loan_str))
             
-            expected_str = "-"
-            if log.expected_return_date:
-                expected_str = log.expected_return_date.strftime("%d/%m/%Y") if hasattr(log.expected_return_date, 'strftime') else str(log.expected_return_date)[:10]
+            expected_str = log.expected_return_date.strftime("%d/%m/%Y") if log.expected_return_date else "-"
             self.table.setItem(row, 3, QTableWidgetItem(expected_str))
             
-            return_str = "-"
-            if log.return_date:
-                return_str = log.return_date.strftime("%d/%m/%Y") if hasattr(log.return_date, 'strftime') else str(log.return_date)[:10]
+            return_str = log.return_date.strftime("%d/%m/%Y") if log.return_date else "-"
             self.table.setItem(row, 4, QTableWidgetItem(return_str))
             
             status_item = QTableWidgetItem(log.status)
@@ -409,6 +406,10 @@ class LoanListView(QWidget):
         self.status_filter.currentIndexChanged.connect(self.refresh_data)
         header_layout.addWidget(self.status_filter)
         
+        export_btn = QPushButton("📊 Xuất Excel/CSV")
+        export_btn.clicked.connect(self._export_tabular)
+        header_layout.addWidget(export_btn)
+        
         refresh_btn = QPushButton("🔄 Làm mới")
         refresh_btn.clicked.connect(self.refresh_data)
         header_layout.addWidget(refresh_btn)
@@ -512,6 +513,20 @@ class LoanListView(QWidget):
     def _on_search(self, text):
         self.refresh_data()
     
+    def _current_filters(self) -> dict:
+        """Bộ lọc hiện tại, dạng tham số của LoanLog.build_filter"""
+        filters = {
+            'keyword': self.search_input.text().strip() or None,
+            'status': self.status_filter.currentData(),
+        }
+        if self.date_filter_check.isChecked():
+            filters['start_date'] = self.from_date.date().toPyDate()
+            filters['end_date'] = self.to_date.date().toPyDate()
+        return filters
+    
+    def _export_tabular(self):
+        request_tabular_export(self, 'loans', "cho_muon", self._current_filters())
+    
     def _populate_table(self, logs: list):
         self.table.setRowCount(len(logs))
         
@@ -526,12 +541,10 @@ class LoanListView(QWidget):
             self.table.setItem(row, 2, QTableWidgetItem(log.equipment_serial))
             self.table.setItem(row, 3, QTableWidgetItem(log.borrower_unit))
             
-            loan_str = log.loan_date.strftime("%d/%m/%Y") if hasattr(log.loan_date, 'strftime') else str(log.loan_date)[:10]
+            loan_str = log.loan_date.strftime("%d/%m/%Y") if log.loan_date else "-"
             self.table.setItem(row, 4, QTableWidgetItem(loan_str))
             
-            return_str = "-"
-            if log.return_date:
-                return_str = log.return_date.strftime("%d/%m/%Y") if hasattr(log.return_date, 'strftime') else str(log.return_date)[:10]
+            return_str = log.return_date.strftime("%d/%m/%Y") if log.return_date else "-"
             self.table.setItem(row, 5, QTableWidgetItem(return_str))
             
             status_item = QTableWidgetItem(log.status)
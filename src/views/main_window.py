@@ -8,25 +8,51 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QIcon, QAction
+from importlib import import_module
 
 from .styles import StyleSheet
-from .dashboard_view import DashboardView
-from .equipment_view import EquipmentView
-from .scan_view import ScanView
-from .unit_view import UnitView
-from .user_view import UserView
-from .category_view import CategoryView
-from .maintenance_type_view import MaintenanceTypeView
-from .audit_view import AuditView # [MỚI] Import Giao diện Nhật ký
+from .export_jobs_panel import ExportJobsPanel
+from ..services.export_job_service import ExportJobManager, JobKind, JobStatus
 from ..models.user import User, UserRole
 from ..config import APP_NAME, APP_VERSION, DEFAULT_THEME
 
 
+def _page_property(index: int):
+    """Attribute access to a stacked page, building it on first use"""
+    return property(lambda self: self._page(index))
+
+
 class MainWindow(QMainWindow):
     """
     Main application window with sidebar navigation
     """
     
+    # Các trang trong QStackedWidget: (module, class) theo chỉ số.
+    # Mỗi trang chỉ được import và khởi tạo khi mở lần đầu.
+    PAGES = [
+        ("dashboard_view", "DashboardView"),            # 0
+        ("equipment_view", "EquipmentView"),            # 1
+        ("maintenance_view", "MaintenanceListView"),    # 2
+        ("scan_view", "ScanView"),                      # 3
+        ("category_view", "CategoryView"),              # 4
+        ("maintenance_type_view", "MaintenanceTypeView"),  # 5
+        ("unit_view", "UnitView"),                      # 6
+        ("user_view", "UserView"),                      # 7
+        ("audit_view", "AuditView"),                    # 8
+        ("diagnostics_view", "DiagnosticsView"),        # 9
+    ]
+    
+    dashboard_view = _page_property(0)
+    equipment_view = _page_property(1)
+    maintenance_view = _page_property(2)
+    scan_view = _page_property(3)
+    category_view = _page_property(4)
+    maintenance_type_view = _page_property(5)
+    unit_view = _page_property(6)
+    user_view = _page_property(7)
+    audit_view = _page_property(8)
+    diagnostics_view = _page_property(9)
+    
     def __init__(self, current_user: User = None):
         super().__init__()
         self.current_user = current_user
@@ -37,6 +63,7 @@ class MainWindow(QMainWindow):
         self.nav_buttons = []
         self.admin_nav_buttons = []
         self.manager_nav_buttons = []
+        self._pages = {}  # index -> view đã khởi tạo
         
         self._setup_ui()
         self._apply_styles()
@@ -46,8 +73,8 @@ class MainWindow(QMainWindow):
         """Set current logged in user"""
         self.current_user = user
         self._update_ui_for_permissions()
-        if hasattr(self, 'user_view'):
-            self.user_view.set_current_user(user)
+        if 7 in self._pages:
+            self._pages[7].set_current_user(user)
     
     def _setup_ui(self):
         """Setup the main UI structure"""
@@ -68,29 +95,15 @@ class MainWindow(QMainWindow):
         self.content_stack = QStackedWidget()
         main_layout.addWidget(self.content_stack)
         
-        from .maintenance_view import MaintenanceListView
-        
-        # Khởi tạo các View
-        self.dashboard_view = DashboardView(self)
-        self.equipment_view = EquipmentView(self)
-        self.maintenance_view = MaintenanceListView(self)
-        self.scan_view = ScanView(self)
-        self.category_view = CategoryView(self)
-        self.maintenance_type_view = MaintenanceTypeView(self)
-        self.unit_view = UnitView(self)
-        self.user_view = UserView(self, current_user=self.current_user)
-        self.audit_view = AuditView(self) # [MỚI] Khởi tạo Audit View
-        
-        # Thêm vào Stack
-        self.content_stack.addWidget(self.dashboard_view)   # 0
-        self.content_stack.addWidget(self.equipment_view)   # 1
-        self.content_stack.addWidget(self.maintenance_view) # 2
-        self.content_stack.addWidget(self.scan_view)        # 3
-        self.content_stack.addWidget(self.category_view)    # 4
-        self.content_stack.addWidget(self.maintenance_type_view) # 5
-        self.content_stack.addWidget(self.unit_view)        # 6
-        self.content_stack.addWidget(self.user_view)        # 7
-        self.content_stack.addWidget(self.audit_view)       # 8 [MỚI]
+        # Chỗ giữ chỗ cho từng trang, thay bằng view thật khi mở lần đầu
+        for _ in self.PAGES:
+            self.content_stack.addWidget(QWidget())
+        
+        # Panel tiến trình xuất file (ẩn cho tới khi có tác vụ)
+        self.export_jobs_panel = ExportJobsPanel(self)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.export_jobs_panel)
+        self.export_jobs_panel.hide()
+        ExportJobManager.instance().job_finished.connect(self._on_export_job_finished)
         
         self._setup_menu()
         
@@ -133,6 +146,7 @@ class MainWindow(QMainWindow):
             ("🏢  Quản lý Đơn vị", 6, True, False),
             ("👥  Quản lý Tài khoản", 7, False, True),
             ("📜  Nhật ký Hệ thống", 8, False, True), # Chỉ Admin thấy
+            ("📈  Chẩn đoán hiệu năng", 9, False, True),
         ]
         
         for text, index, is_manager, is_admin in nav_items:
@@ -190,6 +204,10 @@ class MainWindow(QMainWindow):
         file_menu.addAction(exit_action)
         
         view_menu = menubar.addMenu("Xem")
+        jobs_action = self.export_jobs_panel.toggleViewAction()
+        jobs_action.setText("Tiến trình xuất file")
+        view_menu.addAction(jobs_action)
+        view_menu.addSeparator()
         self.admin_actions = []
         
         self.category_action = QAction("Quản lý LTB", self)
@@ -267,7 +285,7 @@ class MainWindow(QMainWindow):
         if role == UserRole.VIEWER and index != 3:
             QMessageBox.warning(self, "Không có quyền", "Bạn chỉ có quyền quét mã QR!")
             return
-        if role == UserRole.MANAGER and index in [7, 8]: # [MỚI] Manager không được xem Nhật ký
+        if role == UserRole.MANAGER and index in [7, 8, 9]: # [MỚI] Manager không được xem Nhật ký
             QMessageBox.warning(self, "Không có quyền", "Chức năng này chỉ dành cho Quản trị viên!")
             return
         
@@ -275,7 +293,29 @@ class MainWindow(QMainWindow):
         for i, btn in enumerate(self.nav_buttons):
             btn.setChecked(i == index)
     
+    def _page(self, index: int) -> QWidget:
+        """Return the view at index, importing and building it if needed"""
+        page = self._pages.get(index)
+        if page is not None:
+            return page
+        module_name, class_name = self.PAGES[index]
+        view_class = getattr(import_module(f".{module_name}", __package__), class_name)
+        if index == 7:
+            page = view_class(self, current_user=self.current_user)
+        else:
+            page = view_class(self)
+        
+        placeholder = self.content_stack.widget(index)
+        self.content_stack.insertWidget(index, page)
+        self.content_stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self._pages[index] = page
+        if index == 3:
+            page.update_styles(self.stylesheet)
+        return page
+    
     def _switch_view(self, index: int):
+        self._page(index)
         self.content_stack.setCurrentIndex(index)
         if index == 0:
             self.dashboard_view.refresh_data()
@@ -304,8 +344,8 @@ class MainWindow(QMainWindow):
     def _apply_styles(self):
         self.stylesheet.set_theme(self.current_theme)
         self.setStyleSheet(self.stylesheet.get_main_stylesheet())
-        if hasattr(self, 'scan_view'):
-            self.scan_view.update_styles(self.stylesheet)
+        if 3 in self._pages:
+            self._pages[3].update_styles(self.stylesheet)
     
     def _on_export_list(self):
         self.equipment_view.export_equipment_list()
@@ -313,6 +353,52 @@ class MainWindow(QMainWindow):
     def _on_export_qr_sheet(self):
         self.equipment_view.export_qr_sheet()
     
+    def _on_export_job_finished(self, job_id: int):
+        job = ExportJobManager.instance().get(job_id)
+        if not job:
+            return
+        if job.kind == JobKind.EQUIPMENT_IMPORT:
+            self._on_import_finished(job)
+            return
+        if job.status == JobStatus.DONE:
+            self.statusBar().showMessage(f"✅ Đã xuất xong: {job.result}", 8000)
+        elif job.status == JobStatus.FAILED:
+            self.statusBar().showMessage(f"❌ Xuất file thất bại ({job.title}): {job.error}", 8000)
+    
+    def _on_import_finished(self, job):
+        if job.status == JobStatus.FAILED:
+            QMessageBox.critical(self, "Lỗi nhập dữ liệu", f"Không thể nhập file:\n{job.error}")
+            return
+        if 1 in self._pages:
+            self._pages[1].refresh_data()
+        if job.status != JobStatus.DONE:
+            return
+        message = job.message or ""
+        if job.result:
+            message += f"\n\nChi tiết các dòng lỗi: {job.result}"
+            QMessageBox.warning(self, "Nhập dữ liệu", message)
+        else:
+            QMessageBox.information(self, "Nhập dữ liệu", message)
+    
+    def _confirm_cancel_exports(self) -> bool:
+        """Ask before closing while exports are still queued/running"""
+        manager = ExportJobManager.instance()
+        pending = manager.pending_count()
+        if not pending:
+            return True
+        reply = QMessageBox.question(
+            self,
+            "Đang xuất file",
+            f"Còn {pending} tác vụ xuất file chưa hoàn thành.\nHủy các tác vụ này và tiếp tục?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return False
+        for job in manager.jobs():
+            manager.cancel(job.id)
+        return True
+    
     def _on_logout(self):
         reply = QMessageBox.question(
             self,
@@ -322,8 +408,10 @@ class MainWindow(QMainWindow):
             QMessageBox.StandardButton.No
         )
         if reply == QMessageBox.StandardButton.Yes:
-            if hasattr(self, 'scan_view'):
-                self.scan_view.stop_camera()
+            if not self._confirm_cancel_exports():
+                return
+            if 3 in self._pages:
+                self._pages[3].stop_camera()
             self.logout_requested = True
             self.close()
     
@@ -348,6 +436,9 @@ class MainWindow(QMainWindow):
         self.equipment_view.show_equipment_detail(equipment_id)
     
     def closeEvent(self, event):
-        if hasattr(self, 'scan_view'):
-            self.scan_view.stop_camera()
+        if not self.logout_requested and not self._confirm_cancel_exports():
+            event.ignore()
+            return
+        if 3 in self._pages:
+            self._pages[3].stop_camera()
         event.accept()
\ No newline at end of file
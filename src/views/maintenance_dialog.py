@@ -15,6 +15,8 @@ from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog, MAINTENANCE_STATUS
 from ..models.maintenance_type import get_maintenance_type_names
 from ..config import EQUIPMENT_STATUS, DATA_DIR 
+from .thumbnails import load_thumbnail
+from ..services.scan_lookup_service import ScanLookupService
 
 # --- CLASS HỖ TRỢ CLICK VÀO ẢNH GIỐNG TRANG CHI TIẾT ---
 class ClickableLabel(QLabel):
@@ -282,8 +284,7 @@ class MaintenanceDialog(QDialog):
         
         # Load và hiển thị ảnh
         if os.path.exists(full_path):
-            pixmap = QPixmap(full_path).scaled(60, 60, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            lbl.setPixmap(pixmap)
+            lbl.setPixmap(load_thumbnail(full_path, 60))
         else:
             lbl.setText("X")
             
@@ -347,30 +348,11 @@ class MaintenanceDialog(QDialog):
         self.description_input.setPlainText(self.log.description or "")
         self.technician_input.setText(self.log.technician_name or "")
         
-        # Xử lý an toàn kiểu dữ liệu thời gian (String -> Datetime)
+        # Model đã trả về datetime (hoặc None)
         if self.log.start_date:
-            dt = self.log.start_date
-            if isinstance(dt, str):
-                try: 
-                    clean_str = dt.split('.')[0].replace('Z', '')
-                    dt = datetime.fromisoformat(clean_str)
-                except ValueError:
-                    try: dt = datetime.strptime(dt.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    except: pass
-            if isinstance(dt, datetime):
-                self.start_date.setDateTime(QDateTime(dt))
-        
+            self.start_date.setDateTime(QDateTime(self.log.start_date))
         if self.log.end_date:
-            dt = self.log.end_date
-            if isinstance(dt, str):
-                try: 
-                    clean_str = dt.split('.')[0].replace('Z', '')
-                    dt = datetime.fromisoformat(clean_str)
-                except ValueError:
-                    try: dt = datetime.strptime(dt.split('.')[0], '%Y-%m-%d %H:%M:%S')
-                    except: pass
-            if isinstance(dt, datetime):
-                self.end_date.setDateTime(QDateTime(dt))
+            self.end_date.setDateTime(QDateTime(self.log.end_date))
         
         idx = self.status_combo.findText(self.log.status)
         if idx >= 0: self.status_combo.setCurrentIndex(idx)
@@ -380,7 +362,9 @@ class MaintenanceDialog(QDialog):
     def _delete_log(self):
         reply = QMessageBox.question(self, "Xác nhận xóa", "Bạn có chắc muốn xóa bản ghi bảo dưỡng này?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            if self.log and self.log.delete(): self.done(2)
+            if self.log and self.log.delete():
+                ScanLookupService.instance().invalidate(self.log.equipment_id)
+                self.done(2)
             else: QMessageBox.warning(self, "Lỗi", "Không thể xóa bản ghi!")
     
     def get_data_as_dict(self) -> dict:
@@ -15,6 +15,7 @@ from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog, MAINTENANCE_STATUS
 from ..controllers.maintenance_controller import MaintenanceController
 from .maintenance_dialog import MaintenanceDialog
+from .export_jobs_panel import request_tabular_export
 from ..controllers.user_controller import UserController 
 from ..models.user import UserRole
 
@@ -167,19 +168,7 @@ class MaintenanceHistoryView(QWidget):
         self.stats_label.setText(f"Tổng: {total} | Đang thực hiện: {active}")
     
     def _format_date_val(self, date_val):
-        if not date_val:
-            return "-"
-        if hasattr(date_val, 'strftime'):
-            return date_val.strftime("%d/%m/%Y")
-        s_date = str(date_val)[:10]
-        try:
-            if "-" in s_date:
-                parts = s_date.split("-")
-                if len(parts) == 3:
-                    return f"{parts[2]}/{parts[1]}/{parts[0]}"
-        except:
-            pass
-        return s_date
+        return date_val.strftime("%d/%m/%Y") if date_val else "-"
 
     def _populate_table(self, logs: list):
         self.table.setRowCount(len(logs))
@@ -397,6 +386,10 @@ class MaintenanceListView(QWidget):
         header_layout.addWidget(title)
         header_layout.addStretch()
         
+        export_btn = QPushButton("📊 Xuất Excel/CSV")
+        export_btn.clicked.connect(self._export_tabular)
+        header_layout.addWidget(export_btn)
+        
         refresh_btn = QPushButton("↻ Làm mới")
         refresh_btn.clicked.connect(self.refresh_data)
         header_layout.addWidget(refresh_btn)
@@ -552,16 +545,22 @@ class MaintenanceListView(QWidget):
         active = len([l for l in logs if l.status == "Đang thực hiện"])
         self.stats_label.setText(f"Tổng: {total} | Đang thực hiện: {active}")
 
+    def _current_filters(self) -> dict:
+        """Bộ lọc hiện tại, dạng tham số của MaintenanceLog.build_filter"""
+        filters = {
+            'keyword': self.search_input.text().strip() or None,
+            'status': self.status_filter.currentData(),
+        }
+        if self.date_filter_check.isChecked():
+            filters['start_date'] = self.from_date.date().toPyDate()
+            filters['end_date'] = self.to_date.date().toPyDate()
+        return filters
+    
+    def _export_tabular(self):
+        request_tabular_export(self, 'maintenance', "bao_duong", self._current_filters())
+
     def _format_date_val(self, date_val):
-        if not date_val: return "-"
-        if hasattr(date_val, 'strftime'): return date_val.strftime("%d/%m/%Y")
-        s = str(date_val)[:10]
-        try:
-            if "-" in s:
-                p = s.split("-")
-                return f"{p[2]}/{p[1]}/{p[0]}"
-        except: pass
-        return s
+        return date_val.strftime("%d/%m/%Y") if date_val else "-"
 
     def _populate_table(self, logs: list):
         self.table.setRowCount(len(logs))
@@ -12,6 +12,7 @@ import io
 
 from ..models.equipment import Equipment
 from ..services.qr_service import QRService
+from ..services.qr_payload import equipment_payload
 
 
 class QRDialog(QDialog):
@@ -56,7 +57,7 @@ class QRDialog(QDialog):
         
         # Generate QR code with label
         self.qr_image, _ = self.qr_service.generate_qr_with_label(
-            f"VKTBKT|{self.equipment.id}|{self.equipment.serial_number}",
+            equipment_payload(self.equipment.id, self.equipment.serial_number),
             f"{self.equipment.serial_number}"
         )
         
@@ -1,23 +1,104 @@
 """
 Scan View - QR code scanning interface with camera
 """
+import math
+import time
+
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QFrame, QComboBox, QMessageBox,
-    QGroupBox, QFormLayout, QDialog
+    QGroupBox, QFormLayout, QDialog, QCheckBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QInputDialog,
+    QMenu, QFileDialog, QApplication
 )
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QPixmap, QImage, QFont
+from PyQt6.QtCore import Qt, QSize, QTimer, QObject, QEvent, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImage, QFont, QKeyEvent, QPainter
 
 # Import thêm CameraDiscoveryThread
-from ..services.camera_service import CameraService, CameraDiscoveryThread
+from ..services.camera_service import CameraService, CameraDiscoveryThread, ImageDecodeThread
+from ..services.decode_pool import DecodePool, DetectionDeduper
+from ..services.image_decode_service import ImageDecodeService
 from ..services.qr_service import QRService
+from ..services.scan_lookup_service import ScanLookupService
+from ..services.batch_scan_service import BatchScanSession
+from ..services.keyboard_wedge import WedgeDetector, resolve_payload
 from ..models.equipment import Equipment
 from ..models.maintenance_log import MaintenanceLog
+from ..models.unit import Unit
 from ..models.user import UserRole
 from ..controllers.maintenance_controller import MaintenanceController
+from ..controllers.stocktake_controller import StocktakeController
 from .equipment_detail_dialog import EquipmentDetailDialog
 from .maintenance_dialog import MaintenanceDialog
+from .export_jobs_panel import request_tabular_export
+from ..config import WEDGE_SCANNER_ENABLED
+
+
+# Phím bổ trợ: máy quét gõ chữ hoa bằng Shift, không được cắt ngang chuỗi quét
+_MODIFIER_KEYS = (Qt.Key.Key_Shift, Qt.Key.Key_Control, Qt.Key.Key_Alt,
+                  Qt.Key.Key_AltGr, Qt.Key.Key_Meta, Qt.Key.Key_CapsLock)
+_TERMINATOR_KEYS = (Qt.Key.Key_Return, Qt.Key.Key_Enter, Qt.Key.Key_Tab)
+
+
+class WedgeKeyFilter(QObject):
+    """
+    Application-wide key filter for USB keyboard-wedge scanners, installed
+    while the scan view is shown. Printable keys are held back while they
+    may still be a scanner burst; once they turn out to be typed by hand
+    (a slow key, or Enter after a pause) they are replayed to their widget.
+    """
+    scanned = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.detector = WedgeDetector()
+        self._held = []  # (widget, QKeyEvent) chờ xác định
+        self._replaying = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(self.detector.max_interval_ms) + 1)
+        self._timer.timeout.connect(self._release)
+
+    def eventFilter(self, obj, event):
+        # Chỉ xử lý ở widget nhận phím (không ở QWindow), và không khi đang có hộp thoại
+        if (event.type() != QEvent.Type.KeyPress or self._replaying or not obj.isWidgetType()
+                or QApplication.activeModalWidget() is not None):
+            return False
+        key = event.key()
+        if key in _MODIFIER_KEYS:
+            return False
+        # Thời điểm của hệ thống cửa sổ: đúng cả khi giao diện bận và phím dồn hàng đợi
+        now = event.timestamp() / 1000 if event.timestamp() else time.monotonic()
+        if key in _TERMINATOR_KEYS:
+            payload = self.detector.enter(now)
+            if payload:
+                self._timer.stop()
+                self._held.clear()
+                self.scanned.emit(payload)
+                return True
+            self._release()
+            return False
+        text = event.text()
+        if not text or not text.isprintable():
+            self.detector.reset()
+            self._release()
+            return False
+        if not self.detector.feed(text, now):
+            self._release()
+        self._held.append((obj, QKeyEvent(QEvent.Type.KeyPress, key, event.modifiers(), text)))
+        self._timer.start()
+        return True
+
+    def _release(self):
+        """Deliver the held keys to their widgets: they were typed by hand"""
+        self._timer.stop()
+        held, self._held = self._held, []
+        self._replaying = True
+        try:
+            for widget, event in held:
+                QApplication.sendEvent(widget, event)
+        finally:
+            self._replaying = False
 
 
 class ScanView(QWidget):
@@ -29,10 +110,29 @@ class ScanView(QWidget):
         super().__init__(parent)
         self.main_window = parent
         self.qr_service = QRService()
-        self.camera_service = None
+        # Nhiều camera (cổng kho) chạy cùng lúc, dùng chung luồng giải mã và bộ chống lặp
+        self.camera_services = []
+        self.deduper = DetectionDeduper(cooldown=2.0)
+        self._previews = {}  # CameraService -> khung hình mới nhất (xem trước dạng lưới)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setInterval(40)
+        self.preview_timer.timeout.connect(self._paint_previews)
         self.discovery_thread = None # Thread tìm camera
         self.current_equipment = None
         self.maintenance_controller = MaintenanceController()
+        # Quét hàng loạt: gom mã qua nhiều khung hình, định kỳ tra CSDL một lần cho cả nhóm
+        self.batch_session = BatchScanSession()
+        self._batch_rows = {}  # equipment id -> dòng trong bảng
+        # Phiên kiểm kê đang gắn với quét hàng loạt; _stocktake_synced = số mã đã ghi vào phiên
+        self.stocktake_controller = StocktakeController()
+        self.stocktake = None
+        self._stocktake_synced = 0
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setInterval(400)
+        self.batch_timer.timeout.connect(self._resolve_batch)
+        # Máy quét USB (giả lập bàn phím): không cần camera
+        self.wedge_filter = WedgeKeyFilter(self)
+        self.wedge_filter.scanned.connect(self._on_wedge_scanned)
         self._setup_ui()
     
     def _setup_ui(self):
@@ -51,6 +151,18 @@ class ScanView(QWidget):
         header_layout.addWidget(title)
         header_layout.addStretch()
         
+        self.batch_check = QCheckBox("Quét hàng loạt")
+        self.batch_check.setToolTip("Ghi nhận mọi mã QR trong khung hình (kiểm kê giá, kệ)")
+        self.batch_check.toggled.connect(self._on_batch_toggled)
+        header_layout.addWidget(self.batch_check)
+        
+        self.wedge_check = QCheckBox("Máy quét USB")
+        self.wedge_check.setToolTip("Nhận mã từ máy quét cầm tay cắm USB (gõ mã như bàn phím, kết thúc bằng Enter)")
+        self.wedge_check.setChecked(WEDGE_SCANNER_ENABLED)
+        self.wedge_check.toggled.connect(self._on_wedge_toggled)
+        header_layout.addWidget(self.wedge_check)
+        header_layout.addSpacing(15)
+        
         # Camera selection
         header_layout.addWidget(QLabel("Camera:"))
         self.camera_combo = QComboBox()
@@ -213,6 +325,73 @@ class ScanView(QWidget):
         self.equipment_info.hide()
         result_layout.addWidget(self.equipment_info)
         
+        # Batch scan result
+        self.batch_info = QWidget()
+        batch_layout = QVBoxLayout(self.batch_info)
+        batch_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.batch_count_label = QLabel()
+        self.batch_count_label.setFont(QFont("Segoe UI", 18, QFont.Weight.Bold))
+        batch_layout.addWidget(self.batch_count_label)
+        
+        self.batch_detail_label = QLabel()
+        self.batch_detail_label.setObjectName("subtitle")
+        self.batch_detail_label.setWordWrap(True)
+        batch_layout.addWidget(self.batch_detail_label)
+        
+        self.batch_table = QTableWidget(0, 4)
+        self.batch_table.setHorizontalHeaderLabels(["Số hiệu", "Tên thiết bị", "Đơn vị", "Ghi chú"])
+        self.batch_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.batch_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.batch_table.verticalHeader().setVisible(False)
+        self.batch_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.batch_table.setMinimumHeight(300)
+        batch_layout.addWidget(self.batch_table)
+        
+        batch_actions = QHBoxLayout()
+        self.batch_images_btn = QPushButton("🖼️ Đọc từ ảnh")
+        self.batch_images_btn.setObjectName("secondary")
+        self.batch_images_btn.setToolTip("Đọc mã QR từ ảnh chụp nhãn do đơn vị gửi về (thư mục, ZIP, PDF)")
+        images_menu = QMenu(self.batch_images_btn)
+        images_menu.addAction("Thư mục ảnh...", self._on_decode_folder)
+        images_menu.addAction("File ZIP / PDF / ảnh...", self._on_decode_file)
+        self.batch_images_btn.setMenu(images_menu)
+        batch_actions.addWidget(self.batch_images_btn)
+        batch_actions.addStretch()
+        self.batch_clear_btn = QPushButton("🗑️ Xóa phiên quét")
+        self.batch_clear_btn.setObjectName("secondary")
+        self.batch_clear_btn.clicked.connect(self._on_batch_clear)
+        batch_actions.addWidget(self.batch_clear_btn)
+        batch_layout.addLayout(batch_actions)
+        
+        # Stocktake
+        stocktake_group = QGroupBox("Kiểm kê")
+        stocktake_layout = QVBoxLayout(stocktake_group)
+        self.stocktake_label = QLabel()
+        self.stocktake_label.setWordWrap(True)
+        stocktake_layout.addWidget(self.stocktake_label)
+        
+        stocktake_actions = QHBoxLayout()
+        self.stocktake_start_btn = QPushButton("📋 Bắt đầu")
+        self.stocktake_start_btn.clicked.connect(self._on_stocktake_start)
+        stocktake_actions.addWidget(self.stocktake_start_btn)
+        self.stocktake_reconcile_btn = QPushButton("⚖️ Đối chiếu")
+        self.stocktake_reconcile_btn.clicked.connect(self._on_stocktake_reconcile)
+        stocktake_actions.addWidget(self.stocktake_reconcile_btn)
+        self.stocktake_finish_btn = QPushButton("✅ Kết thúc")
+        self.stocktake_finish_btn.clicked.connect(self._on_stocktake_finish)
+        stocktake_actions.addWidget(self.stocktake_finish_btn)
+        self.stocktake_export_btn = QPushButton("📤 Xuất kết quả")
+        self.stocktake_export_btn.setObjectName("secondary")
+        self.stocktake_export_btn.clicked.connect(self._on_stocktake_export)
+        stocktake_actions.addWidget(self.stocktake_export_btn)
+        stocktake_layout.addLayout(stocktake_actions)
+        batch_layout.addWidget(stocktake_group)
+        self._update_stocktake_label()
+        
+        self.batch_info.hide()
+        result_layout.addWidget(self.batch_info)
+        
         right_panel.addWidget(self.result_frame)
         
         # Instructions
@@ -259,28 +438,41 @@ class ScanView(QWidget):
         if not cameras:
             self.camera_combo.addItem("❌ Không tìm thấy camera", -1)
             self.status_label.setText("Trạng thái: Không có camera")
-            self.camera_label.setText("Không tìm thấy camera nào\nVui lòng kiểm tra kết nối")
+            if self.wedge_check.isChecked():
+                self.camera_label.setText("Không tìm thấy camera nào\n\nCó thể quét bằng máy quét USB")
+            else:
+                self.camera_label.setText("Không tìm thấy camera nào\nVui lòng kiểm tra kết nối")
         else:
             for idx in cameras:
                 self.camera_combo.addItem(f"📷 Camera {idx}", idx)
+            if len(cameras) > 1:
+                self.camera_combo.addItem(f"🎥 Tất cả camera ({len(cameras)})", list(cameras))
             self.start_btn.setEnabled(True)
             self.status_label.setText("Trạng thái: Sẵn sàng")
             self.camera_label.setText("Camera đã tắt\n\nNhấn 'Bắt đầu quét' để bật")
             self._update_status_style("default")
 
     def start_camera(self):
-        camera_idx = self.camera_combo.currentData()
-        if camera_idx is None or camera_idx < 0:
+        data = self.camera_combo.currentData()
+        indexes = data if isinstance(data, list) else [data]
+        if not indexes or indexes[0] is None or indexes[0] < 0:
             QMessageBox.warning(self, "Lỗi", "Không tìm thấy camera.")
             return
         
-        self.camera_service = CameraService(camera_idx)
-        self.camera_service.frame_ready.connect(self._on_frame_ready)
-        self.camera_service.qr_detected.connect(self._on_qr_detected)
-        self.camera_service.error_occurred.connect(self._on_camera_error)
-        self.camera_service.camera_started.connect(self._on_camera_started)
-        self.camera_service.camera_stopped.connect(self._on_camera_stopped)
-        self.camera_service.start()
+        pool = DecodePool.shared()
+        for camera_idx in indexes:
+            service = CameraService(camera_idx, pool=pool, deduper=self.deduper)
+            service.frame_ready.connect(self._on_frame_ready)
+            service.qr_detected.connect(self._on_qr_detected)
+            service.codes_detected.connect(self._on_codes_detected)
+            service.error_occurred.connect(self._on_camera_error)
+            service.camera_started.connect(self._on_camera_started)
+            service.camera_stopped.connect(self._on_camera_stopped)
+            service.set_tracking(not self.batch_check.isChecked())
+            self.camera_services.append(service)
+            service.start()
+        if len(self.camera_services) > 1:
+            self.preview_timer.start()
         
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
@@ -289,9 +481,11 @@ class ScanView(QWidget):
         self._update_status_style("waiting")
 
     def stop_camera(self):
-        if self.camera_service:
-            self.camera_service.stop()
-            self.camera_service = None
+        self.preview_timer.stop()
+        services, self.camera_services = self.camera_services, []
+        for service in services:
+            service.stop()
+        self._previews.clear()
         
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
@@ -302,6 +496,10 @@ class ScanView(QWidget):
         self._update_status_style("stopped")
     
     def _on_frame_ready(self, qimage: QImage):
+        if len(self.camera_services) > 1:
+            # Nhiều camera: chỉ giữ khung mới nhất, _paint_previews vẽ lưới theo nhịp riêng
+            self._previews[self.sender()] = qimage
+            return
         scaled = qimage.scaled(
             self.camera_label.size(),
             Qt.AspectRatioMode.KeepAspectRatio,
@@ -309,37 +507,363 @@ class ScanView(QWidget):
         )
         self.camera_label.setPixmap(QPixmap.fromImage(scaled))
     
+    def _paint_previews(self):
+        """Tile the newest frame of every running camera into the preview"""
+        if not self._previews:
+            return
+        services = self.camera_services
+        cols = math.ceil(math.sqrt(len(services)))
+        rows = math.ceil(len(services) / cols)
+        size = self.camera_label.size()
+        tile_w, tile_h = size.width() // cols, size.height() // rows
+        canvas = QPixmap(size)
+        canvas.fill(Qt.GlobalColor.black)
+        painter = QPainter(canvas)
+        painter.setPen(Qt.GlobalColor.white)
+        for i, service in enumerate(services):
+            x, y = (i % cols) * tile_w, (i // cols) * tile_h
+            image = self._previews.get(service)
+            if image is not None:
+                scaled = image.scaled(tile_w, tile_h, Qt.AspectRatioMode.KeepAspectRatio,
+                                      Qt.TransformationMode.FastTransformation)
+                painter.drawImage(x + (tile_w - scaled.width()) // 2, y + (tile_h - scaled.height()) // 2, scaled)
+            painter.drawText(x + 8, y + 20, f"Camera {service.camera_index}")
+        painter.end()
+        self.camera_label.setPixmap(canvas)
+    
     def _on_qr_detected(self, qr_data: str):
         """Handle detected QR code with Security Check"""
+        if self.batch_check.isChecked():
+            return
         self.status_label.setText(f"Trạng thái: Đã phát hiện mã QR!")
         self._update_status_style("success")
         
-        decoded = self.qr_service.decode_qr_data(qr_data)
+        # Quét lặp lại cùng thiết bị: trả từ bộ đệm, không chạm CSDL
+        code, equipment = resolve_payload(qr_data, by_serial=False)
+        if code is None:
+            # Mã không thuộc hệ thống: bỏ qua, bộ chống lặp của camera tránh spam
+            return
+        self._show_scanned(code, equipment)
+    
+    def _on_wedge_scanned(self, payload: str):
+        """A burst from a USB scanner: straight to the lookup cache, no camera involved"""
+        if self.batch_check.isChecked():
+            if self.batch_session.add([payload]):
+                self._update_batch_summary()
+            return
+        self.status_label.setText("Trạng thái: Đã nhận mã từ máy quét")
+        self._update_status_style("success")
         
-        if decoded['type'] == 'equipment':
-            equipment_id = decoded['equipment_id']
-            scanned_serial = decoded['serial_number']
-            
-            equipment = Equipment.get_by_id(equipment_id)
-            
-            if equipment:
-                if equipment.serial_number != scanned_serial:
-                    self.stop_camera()
-                    QMessageBox.warning(
-                        self, 
-                        "Cảnh báo dữ liệu", 
-                        f"Mã QR không hợp lệ!\n\n"
-                        f"- Trong mã QR: {scanned_serial}\n"
-                        f"- Trên hệ thống: {equipment.serial_number}"
-                    )
-                    return
-
-                self._show_equipment_info(equipment)
-            else:
-                QMessageBox.warning(self, "Không tìm thấy", f"Không tìm thấy thiết bị ID: {equipment_id}")
+        # Mã vạch 1D chỉ chứa số hiệu: tra theo số hiệu
+        code, equipment = resolve_payload(payload)
+        if code is None and equipment is None:
+            QMessageBox.warning(self, "Không tìm thấy", f"Không tìm thấy thiết bị có mã / số hiệu: {payload}")
+            return
+        self._show_scanned(code, equipment)
+    
+    def _show_scanned(self, code, equipment):
+        """Show a scanned item after the label / database security check"""
+        if equipment is None:
+            QMessageBox.warning(self, "Không tìm thấy", f"Không tìm thấy thiết bị ID: {code.equipment_id}")
+            return
+        if code is not None and not code.matches(equipment.serial_number):
+            if self.camera_services:
+                self.stop_camera()
+            QMessageBox.warning(
+                self, 
+                "Cảnh báo dữ liệu", 
+                f"Mã QR không hợp lệ!\n\n"
+                f"- Trong mã QR: {code.label}\n"
+                f"- Trên hệ thống: {equipment.serial_number}"
+            )
+            return
+        self._show_equipment_info(equipment)
+    
+    def _on_wedge_toggled(self, checked: bool):
+        if checked and self.isVisible():
+            QApplication.instance().installEventFilter(self.wedge_filter)
+        else:
+            QApplication.instance().removeEventFilter(self.wedge_filter)
+    
+    # ---------------- Quét hàng loạt ----------------
+    
+    def _on_batch_toggled(self, checked: bool):
+        # Bám vùng mã cũ chỉ hợp với quét từng mã; hàng loạt cần tìm cả khung hình
+        for service in self.camera_services:
+            service.set_tracking(not checked)
+        if checked:
+            self._on_reset()
+            self.no_result_label.hide()
+            self.batch_info.show()
+            self._update_batch_summary()
+            self.batch_timer.start()
+        else:
+            self.batch_timer.stop()
+            self.batch_info.hide()
+            self.no_result_label.show()
+    
+    def _on_codes_detected(self, codes: list):
+        """Every frame with codes lands here; only set arithmetic, no database access"""
+        if not self.batch_check.isChecked():
+            return
+        if self.batch_session.add(codes):
+            self._update_batch_summary()
+    
+    def _resolve_batch(self):
+        """Resolve every code collected since the last tick with one IN query"""
+        self._sync_stocktake()
+        if not self.batch_session.pending_count:
+            return
+        try:
+            found = self.batch_session.resolve()
+        except Exception as e:
+            self.status_label.setText(f"Trạng thái: Lỗi tra cứu ({e})")
+            self._update_status_style("stopped")
+            return
+        
+        self.batch_table.setUpdatesEnabled(False)
+        for equipment in found:
+            row = self.batch_table.rowCount()
+            self.batch_table.insertRow(row)
+            self._batch_rows[equipment.id] = row
+            for col, text in enumerate([equipment.serial_number, equipment.name,
+                                        equipment.unit_name or "-", ""]):
+                self.batch_table.setItem(row, col, QTableWidgetItem(text))
+        self.batch_table.setUpdatesEnabled(True)
+        self._update_batch_summary()
+    
+    def _update_batch_summary(self):
+        session = self.batch_session
+        self.batch_count_label.setText(f"Đã quét: {session.count} thiết bị")
+        parts = [f"Đã xác định: {len(session.items)}"]
+        if session.pending_count:
+            parts.append(f"đang tra cứu: {session.pending_count}")
+        if session.mismatched:
+            parts.append(f"sai số hiệu: {len(session.mismatched)}")
+        if session.not_found:
+            parts.append(f"không có trong CSDL: {len(session.not_found)}")
+        if session.foreign:
+            parts.append(f"mã lạ: {len(session.foreign)}")
+        self.batch_detail_label.setText(" · ".join(parts))
+        for equipment_id, label in session.mismatched.items():
+            row = self._batch_rows.get(equipment_id)
+            if row is not None:
+                self.batch_table.item(row, 3).setText(f"⚠️ Nhãn QR không khớp: {label}")
+        if session.count:
+            self.status_label.setText(f"Trạng thái: Đã quét {session.count} thiết bị")
+            self._update_status_style("success")
+    
+    def _on_batch_clear(self):
+        # Không ảnh hưởng phiên kiểm kê: các mã đã ghi vẫn giữ trong CSDL
+        self.batch_session.clear()
+        self._batch_rows.clear()
+        self._stocktake_synced = 0
+        self.batch_table.setRowCount(0)
+        self._update_batch_summary()
+    
+    # ---------------- Đọc mã từ ảnh ----------------
+    
+    def _on_decode_folder(self):
+        path = QFileDialog.getExistingDirectory(self, "Chọn thư mục ảnh nhãn QR")
+        if path:
+            self._start_image_decode(path)
+    
+    def _on_decode_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Chọn file ảnh nhãn QR", "",
+            "Ảnh / ZIP / PDF (*.zip *.pdf *.png *.jpg *.jpeg *.bmp *.tif *.tiff *.webp)"
+        )
+        if path:
+            self._start_image_decode(path)
+    
+    def _start_image_decode(self, path: str):
+        self.batch_images_btn.setEnabled(False)
+        self.batch_images_btn.setText("⏳ Đang đọc ảnh...")
+        self.image_thread = ImageDecodeThread(path, self)
+        self.image_thread.progress.connect(self._on_image_decode_progress)
+        self.image_thread.decoded.connect(self._on_images_decoded)
+        self.image_thread.failed.connect(self._on_image_decode_failed)
+        self.image_thread.finished.connect(self._on_image_decode_finished)
+        self.image_thread.start()
+    
+    def _on_image_decode_progress(self, done: int, total: int):
+        self.batch_images_btn.setText(f"⏳ Đang đọc ảnh {done}/{total}")
+    
+    def _on_images_decoded(self, result):
+        # Cùng đường với camera: gộp vào phiên quét, tra cứu một lần (và ghi vào phiên kiểm kê)
+        for image in result.images:
+            self.batch_session.add(image.codes)
+        self._update_batch_summary()
+        self._resolve_batch()
+        result.session = self.batch_session
+        
+        reply = QMessageBox.question(
+            self, "Đọc mã từ ảnh",
+            f"{result.summary} ({result.seconds:.1f} giây).\n\nLưu báo cáo từng ảnh (CSV)?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        filepath, _ = QFileDialog.getSaveFileName(self, "Lưu báo cáo", "doc_ma_tu_anh.csv", "CSV (*.csv)")
+        if filepath:
+            try:
+                ImageDecodeService.write_report(result, filepath)
+            except OSError as e:
+                QMessageBox.warning(self, "Lỗi", f"Không lưu được báo cáo: {e}")
+    
+    def _on_image_decode_failed(self, error: str):
+        QMessageBox.warning(self, "Lỗi", f"Không đọc được ảnh: {error}")
+    
+    def _on_image_decode_finished(self):
+        self.batch_images_btn.setEnabled(True)
+        self.batch_images_btn.setText("🖼️ Đọc từ ảnh")
+    
+    # ---------------- Kiểm kê ----------------
+    
+    def _is_viewer(self) -> bool:
+        return bool(self.main_window and self.main_window.current_user
+                    and self.main_window.current_user.role == UserRole.VIEWER)
+    
+    def _sync_stocktake(self):
+        """Write codes scanned since the last call into the open stocktake session"""
+        if not self.stocktake or not self.stocktake.is_open:
+            return
+        codes = self.batch_session.equipment_codes(self._stocktake_synced)
+        if not codes:
+            return
+        try:
+            self.stocktake_controller.record_scans(self.stocktake, codes)
+        except Exception as e:
+            self.status_label.setText(f"Trạng thái: Lỗi ghi kiểm kê ({e})")
+            self._update_status_style("stopped")
+            return
+        self._stocktake_synced += len(codes)
+        self._update_stocktake_label()
+    
+    def _update_stocktake_label(self):
+        session = self.stocktake
+        if session is None:
+            self.stocktake_label.setText("Chưa gắn phiên kiểm kê. Nhấn 'Bắt đầu' để đối chiếu "
+                                         "các mã quét được với trang bị của một đơn vị.")
         else:
-            # Tạm dừng xử lý QR này trong 2s để tránh spam, nhưng không chặn hoàn toàn
-            pass 
+            text = f"<b>{session.name}</b> · đã ghi {session.scanned_count} mã"
+            if session.reconciled_at:
+                text += (f" · có mặt {session.found_count}/{session.expected_count}, "
+                         f"thiếu {session.missing_count}, sai đơn vị {session.wrong_unit_count}")
+            if not session.is_open:
+                text += " · <i>đã kết thúc</i>"
+            self.stocktake_label.setText(text)
+        is_open = session is not None and session.is_open
+        self.stocktake_start_btn.setEnabled(not is_open)
+        self.stocktake_reconcile_btn.setEnabled(is_open)
+        self.stocktake_finish_btn.setEnabled(is_open)
+    
+    @staticmethod
+    def _stocktake_summary(session) -> str:
+        return (
+            f"{session.name}\n"
+            f"Đơn vị: {session.unit_name or '-'}\n\n"
+            f"- Có mặt: {session.found_count}/{session.expected_count}\n"
+            f"- Thiếu: {session.missing_count}\n"
+            f"- Sai đơn vị: {session.wrong_unit_count}\n"
+            f"- Không có trong CSDL: {session.unknown_count}"
+        )
+    
+    def _on_stocktake_start(self):
+        if self._is_viewer():
+            QMessageBox.warning(self, "Không có quyền", "Bạn chỉ có quyền xem, không được phép kiểm kê!")
+            return
+        
+        open_sessions = self.stocktake_controller.get_open_sessions()
+        if open_sessions:
+            choices = [f"Tiếp tục: {s.name} ({s.scanned_count} mã)" for s in open_sessions]
+            choices.append("➕ Phiên kiểm kê mới...")
+            choice, ok = QInputDialog.getItem(self, "Kiểm kê", "Chọn phiên:", choices, 0, False)
+            if not ok:
+                return
+            index = choices.index(choice)
+            if index < len(open_sessions):
+                self._attach_stocktake(open_sessions[index])
+                return
+        
+        units = Unit.get_all()
+        if not units:
+            QMessageBox.warning(self, "Thông báo", "Chưa có đơn vị nào!")
+            return
+        unit_names = [f"{u.name} ({u.code})" if u.code else u.name for u in units]
+        unit_name, ok = QInputDialog.getItem(
+            self, "Kiểm kê mới", "Đơn vị (gồm đơn vị cấp dưới):", unit_names, 0, False
+        )
+        if not ok:
+            return
+        success, msg, session = self.stocktake_controller.start_session(units[unit_names.index(unit_name)].id)
+        if not success:
+            QMessageBox.warning(self, "Lỗi", msg)
+            return
+        self._attach_stocktake(session)
+    
+    def _attach_stocktake(self, session):
+        # Ghi cả các mã đã quét trước khi gắn phiên (mã trùng được bỏ qua)
+        self.stocktake = session
+        self._stocktake_synced = 0
+        self._sync_stocktake()
+        self._update_stocktake_label()
+    
+    def _on_stocktake_reconcile(self):
+        if not self.stocktake:
+            return
+        self._sync_stocktake()
+        success, msg, _ = self.stocktake_controller.reconcile(self.stocktake)
+        self._update_stocktake_label()
+        if success:
+            QMessageBox.information(self, "Kết quả đối chiếu", self._stocktake_summary(self.stocktake))
+        else:
+            QMessageBox.warning(self, "Lỗi", msg)
+    
+    def _on_stocktake_finish(self):
+        if not self.stocktake:
+            return
+        reply = QMessageBox.question(
+            self, "Kết thúc kiểm kê",
+            f"Kết thúc phiên '{self.stocktake.name}'?\nSau khi kết thúc, kết quả đối chiếu được giữ nguyên.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self._sync_stocktake()
+        success, msg, _ = self.stocktake_controller.finish_session(self.stocktake)
+        self._update_stocktake_label()
+        if success:
+            QMessageBox.information(self, msg, self._stocktake_summary(self.stocktake))
+        else:
+            QMessageBox.warning(self, "Lỗi", msg)
+    
+    def _on_stocktake_export(self):
+        session = self.stocktake
+        if session is None:
+            sessions = self.stocktake_controller.get_sessions()
+            if not sessions:
+                QMessageBox.warning(self, "Thông báo", "Chưa có phiên kiểm kê nào!")
+                return
+            names = [f"{s.name} ({s.started_at:%d/%m/%Y %H:%M})" if s.started_at else s.name for s in sessions]
+            name, ok = QInputDialog.getItem(self, "Xuất kết quả kiểm kê", "Phiên:", names, 0, False)
+            if not ok:
+                return
+            session = sessions[names.index(name)]
+        
+        if session.is_open and session is self.stocktake:
+            # Xuất theo số liệu mới nhất
+            self._sync_stocktake()
+            success, msg, _ = self.stocktake_controller.reconcile(session)
+            self._update_stocktake_label()
+            if not success:
+                QMessageBox.warning(self, "Lỗi", msg)
+                return
+        elif not session.reconciled_at:
+            QMessageBox.warning(self, "Thông báo", "Phiên kiểm kê này chưa được đối chiếu!")
+            return
+        request_tabular_export(self, 'stocktake', f"kiem_ke_{session.id}", {'session_id': session.id})
     
     def _show_equipment_info(self, equipment: Equipment):
         self.current_equipment = equipment
@@ -376,14 +900,29 @@ class ScanView(QWidget):
         self.info_labels["status"].setStyleSheet(style)
     
     def _on_camera_error(self, error: str):
+        service = self.sender()
+        if len(self.camera_services) > 1 and service in self.camera_services:
+            # Một camera hỏng không dừng các camera còn lại
+            self.camera_services.remove(service)
+            self._previews.pop(service, None)
+            service.stop()
+            self.status_label.setText(f"Trạng thái: Camera {service.camera_index} lỗi ({error}), "
+                                      f"tiếp tục với {len(self.camera_services)} camera")
+            return
         QMessageBox.critical(self, "Lỗi Camera", error)
         self.stop_camera()
     
     def _on_camera_started(self):
-        self.status_label.setText("Trạng thái: Đang quét...")
+        running = sum(service.is_running() for service in self.camera_services)
+        if running > 1:
+            self.status_label.setText(f"Trạng thái: Đang quét ({running} camera)...")
+        else:
+            self.status_label.setText("Trạng thái: Đang quét...")
         self._update_status_style("scanning")
     
     def _on_camera_stopped(self):
+        if any(service.is_running() for service in self.camera_services):
+            return
         self.status_label.setText("Trạng thái: Đã dừng")
         self._update_status_style("stopped")
     
@@ -393,8 +932,8 @@ class ScanView(QWidget):
         self.no_result_label.show()
         self.status_label.setText("Trạng thái: Sẵn sàng quét mã mới")
         self._update_status_style("default")
-        if self.camera_service:
-            self.camera_service.reset_qr_detection()
+        for service in self.camera_services:
+            service.reset_qr_detection()
 
     def _on_view_detail(self):
         if not self.current_equipment: return
@@ -436,6 +975,7 @@ class ScanView(QWidget):
                 if success and new_status:
                     self.current_equipment.status = new_status
                     self.current_equipment.save()
+                    ScanLookupService.instance().invalidate(self.current_equipment.id)
             else:
                 success, msg, _ = self.maintenance_controller.create_maintenance_log(self.current_equipment.id, log_data, new_status)
             
@@ -477,8 +1017,14 @@ class ScanView(QWidget):
         # Chỉ quét camera khi chưa có dữ liệu hoặc danh sách rỗng
         if self.camera_combo.count() == 0:
             self._populate_cameras()
+        if self.batch_check.isChecked():
+            self.batch_timer.start()
+        if self.wedge_check.isChecked():
+            QApplication.instance().installEventFilter(self.wedge_filter)
     
     def hideEvent(self, event):
         super().hideEvent(event)
-        if self.camera_service and self.camera_service.is_running():
-            self.stop_camera()
\ No newline at end of file
+        QApplication.instance().removeEventFilter(self.wedge_filter)
+        if self.camera_services:
+            self.stop_camera()
+        self.batch_timer.stop()
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Thumbnails - Cached scaled QPixmaps for image previews in dialogs
+"""
+import os
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap
+
+from ..services.metrics import METRICS
+
+_cache = METRICS.cache("thumbnail", maxsize=256)
+
+
+def load_thumbnail(path: str, size: int) -> QPixmap:
+    """
+    Scaled pixmap for path, fitting a size x size box. Keyed on the file's
+    mtime so a replaced image is reloaded; missing files give a null pixmap.
+    """
+    path = str(path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return QPixmap()
+    key = (path, size, mtime)
+    pixmap = _cache.get(key)
+    if pixmap is None:
+        pixmap = QPixmap(path).scaled(
+            size, size,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation
+        )
+        _cache.put(key, pixmap)
+    return pixmap
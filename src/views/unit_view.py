@@ -12,6 +12,7 @@ from PyQt6.QtCore import Qt, pyqtSignal, QSize
 from PyQt6.QtGui import QFont, QColor, QIcon
 
 from ..models.unit import Unit, UNIT_LEVELS, get_level_name
+from ..services.scan_lookup_service import ScanLookupService
 
 
 class UnitDetailDialog(QDialog):
@@ -299,6 +300,7 @@ class UnitDialog(QDialog):
         
         try:
             self.unit.save()
+            ScanLookupService.instance().clear()
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Lỗi", f"Không thể lưu đơn vị:\n{str(e)}")
@@ -597,6 +599,7 @@ class UnitView(QWidget):
         
         if reply == QMessageBox.StandardButton.Yes:
             unit.delete()
+            ScanLookupService.instance().clear()
             self.refresh_data()
             self.unit_changed.emit()
             QMessageBox.information(self, "Thành công", "Đã xóa đơn vị!")
\ No newline at end of file